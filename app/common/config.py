@@ -54,6 +54,68 @@ class Settings(BaseSettings):
     REPLICATE_API_TOKEN: Optional[str] = None
     REPLICATE_VIDEO_MODEL: str = "wan-video/wan-2.5-i2v"  # Image to video model
     
+    # Creative service settings
+    # Maximum LLM/image/video calls in flight per generate_creatives request
+    CREATIVE_MAX_CONCURRENCY: int = 8
+    # Storyline video segments generated in parallel per video, and the
+    # per-segment timeout in seconds (a timeout cancels sibling segments)
+    CREATIVE_VIDEO_SEGMENT_WORKERS: int = 3
+    CREATIVE_VIDEO_SEGMENT_TIMEOUT: float = 900
+    # Seconds between status polls of a segment's Replicate prediction (also
+    # how quickly an abandoned segment's prediction is cancelled)
+    CREATIVE_VIDEO_POLL_INTERVAL: float = 2
+    # Segments downloaded in parallel before concatenation
+    CREATIVE_VIDEO_DOWNLOAD_WORKERS: int = 4
+    # Let FFmpeg read segment URLs directly and concatenate while they stream
+    # in (falls back to downloading the segments if that fails)
+    CREATIVE_VIDEO_CONCAT_STREAMING: bool = False
+    # Directory for downloaded segments, e.g. /dev/shm to keep the clips in
+    # memory; defaults to the system temp directory
+    CREATIVE_VIDEO_TEMP_DIR: Optional[str] = None
+    # SQLite file for asynchronous creative jobs; defaults to
+    # creative_jobs.sqlite3 in the system temp directory
+    CREATIVE_JOB_DB_PATH: Optional[str] = None
+    # Creative jobs run concurrently by the background workers
+    CREATIVE_JOB_WORKERS: int = 2
+    # Seconds a creative job stays claimed by a worker process without a
+    # heartbeat; other processes only recover jobs whose lease has expired
+    CREATIVE_JOB_LEASE_SECONDS: float = 60
+    # Runs a creative job gets (including recoveries after crashes) before it
+    # is marked failed
+    CREATIVE_JOB_MAX_ATTEMPTS: int = 3
+    # LLM text responses kept in memory by the response cache (0 disables it)
+    CREATIVE_LLM_CACHE_SIZE: int = 4096
+    # Seconds a cached LLM response stays valid (0 keeps it until evicted)
+    CREATIVE_LLM_CACHE_TTL: float = 30 * 24 * 3600
+    # Directory for the on-disk LLM response cache tier; defaults to
+    # creative_llm_cache in the system temp directory
+    CREATIVE_LLM_CACHE_DIR: Optional[str] = None
+    # Store generated images and reuse them for repeated image prompts; only
+    # takes effect once CREATIVE_ASSET_BASE_URL is set
+    CREATIVE_IMAGE_CACHE_ENABLED: bool = True
+    # Directory for stored image assets and their prompt index; defaults to
+    # creative_image_assets in the system temp directory
+    CREATIVE_IMAGE_CACHE_DIR: Optional[str] = None
+    # Minimum word-set Jaccard similarity for a near-duplicate prompt to reuse
+    # a stored image (0 matches exact normalized prompts only)
+    CREATIVE_IMAGE_CACHE_FUZZY_THRESHOLD: float = 0
+    # Public base URL of stored assets (e.g. https://creative.example.com/assets).
+    # Stored image URLs are passed to video providers and Meta, so it must be
+    # reachable from outside; the image cache stays off while it is unset or
+    # points at a loopback/private host
+    CREATIVE_ASSET_BASE_URL: Optional[str] = None
+    # Provider rate limits shared by every creative request and job, in
+    # requests and estimated tokens per minute (0 disables a limit)
+    CREATIVE_OPENAI_RPM: float = 500
+    CREATIVE_OPENAI_TPM: float = 200000
+    CREATIVE_OPENAI_IMAGE_RPM: float = 50
+    CREATIVE_GEMINI_RPM: float = 1000
+    CREATIVE_GEMINI_TPM: float = 1000000
+    CREATIVE_REPLICATE_RPM: float = 60
+    # Upper bound of each provider's adaptive concurrency limit, which halves
+    # on 429s or slow responses and recovers additively
+    CREATIVE_PROVIDER_MAX_CONCURRENCY: int = 16
+    
     # General settings
     LOG_LEVEL: str = "INFO"
     ENVIRONMENT: str = "development"
@@ -61,6 +123,67 @@ class Settings(BaseSettings):
     # Database settings
     DATABASE_URL: Optional[str] = None
     
+    # Product service settings
+    # Product feed CSV; defaults to products.csv in the product service directory
+    PRODUCT_CSV_PATH: Optional[str] = None
+    # Memory-mapped catalog snapshot (see app.services.product_service.snapshot);
+    # defaults to products.snap next to products.csv when unset
+    PRODUCT_SNAPSHOT_PATH: Optional[str] = None
+    # Seconds between checks for catalog source changes (hot reload); 0 disables
+    PRODUCT_CATALOG_RELOAD_INTERVAL: float = 0
+    # Keep DB products resident and apply delta syncs by updated_at instead
+    # of querying the products table on every request
+    PRODUCT_DB_RESIDENT_CATALOG: bool = False
+    # Rows fetched per keyset page during product DB syncs
+    PRODUCT_DB_SYNC_PAGE_SIZE: int = 1000
+    # Memoized selection results per campaign-spec fingerprint (0 disables)
+    PRODUCT_SELECTION_CACHE_SIZE: int = 1024
+    # Seconds a memoized selection stays valid (0 keeps it until evicted or the catalog reloads)
+    PRODUCT_SELECTION_CACHE_TTL: float = 300
+    # Maximum campaign specs accepted by /select_products/batch
+    PRODUCT_BATCH_MAX_SPECS: int = 1000
+    
+    # Logs service settings
+    # Acknowledge events once queued and insert them in batches (write-behind);
+    # failed batches are retried until written, while new events get
+    # LOG_BUFFER_FULL once the buffer is full. Events still unwritten when the
+    # service shuts down are dropped (they remain in the JSON event file)
+    LOGS_WRITE_BUFFER_ENABLED: bool = True
+    # Events per bulk insert, and seconds a batch waits to fill up
+    LOGS_WRITE_BATCH_SIZE: int = 500
+    LOGS_WRITE_FLUSH_INTERVAL: float = 0.2
+    # Queued events before /append_event waits for the writer (backpressure),
+    # and seconds it waits before failing with LOG_BUFFER_FULL
+    LOGS_WRITE_BUFFER_MAX_EVENTS: int = 10000
+    LOGS_WRITE_ENQUEUE_TIMEOUT: float = 5
+    # Maximum events accepted by /append_events
+    LOGS_BULK_MAX_EVENTS: int = 10000
+    # Largest /append_events body, and largest single NDJSON line, in bytes
+    # (larger requests get HTTP 413)
+    LOGS_BULK_MAX_BODY_BYTES: int = 32 * 1024 * 1024
+    LOGS_BULK_MAX_LINE_BYTES: int = 1024 * 1024
+    # Default /logs total count mode (exact, capped, estimate or none), and the
+    # most matching rows counted in capped mode
+    LOGS_QUERY_COUNT_MODE: str = "exact"
+    LOGS_QUERY_COUNT_CAP: int = 10000
+    # /analytics answers from in-memory counters updated on every write and
+    # recounted from the database every LOGS_ANALYTICS_RECONCILE_INTERVAL
+    # seconds (which also picks up other replicas' writes); 0 recounts on
+    # every request
+    LOGS_ANALYTICS_RECONCILE_INTERVAL: float = 300
+    # Maintain per-minute and per-hour rollup rows for windowed /analytics
+    # (window_minutes); minute rollups are kept for this many hours
+    LOGS_ANALYTICS_ROLLUPS_ENABLED: bool = False
+    LOGS_ANALYTICS_MINUTE_ROLLUP_RETENTION_HOURS: int = 48
+    # JSON event log file of the logs service
+    LOGS_FILE_PATH: str = "logs/logs_service.log"
+    # Format and write the JSON event log file on a background thread; records
+    # beyond LOGS_FILE_QUEUE_SIZE waiting to be written are dropped
+    LOGS_FILE_QUEUE_ENABLED: bool = True
+    LOGS_FILE_QUEUE_SIZE: int = 10000
+    # gzip rotated JSON event log files
+    LOGS_FILE_COMPRESS_ROTATED: bool = False
+    
     model_config = ConfigDict(
         env_file=".env",
         env_file_encoding="utf-8",
@@ -10,7 +10,7 @@ from app.common.middleware import get_logger
 logger = get_logger(__name__)
 
 if SQLALCHEMY_AVAILABLE:
-    from sqlalchemy import Column, String, Text, Boolean, DateTime, JSON, Index
+    from sqlalchemy import Column, String, Text, Boolean, DateTime, JSON, Index, BigInteger
     from sqlalchemy.dialects.postgresql import UUID
     import uuid
     
@@ -33,11 +33,28 @@ if SQLALCHEMY_AVAILABLE:
         __table_args__ = (
             Index('idx_stage_service', 'stage', 'service'),
             Index('idx_timestamp_stage', 'timestamp', 'stage'),
+            Index('idx_timestamp_id', 'timestamp', 'id'),  # /logs keyset pagination
             Index('idx_correlation_id', 'correlation_id'),
         )
         
         def __repr__(self):
             return f"<LogEventORM(id={self.id}, stage={self.stage}, service={self.service}, level={self.level})>"
+    
+    class LogEventRollupORM(Base):
+        """SQLAlchemy ORM model for log event counts per time bucket (windowed analytics)."""
+        __tablename__ = "log_event_rollups"
+        
+        # The primary key doubles as the upsert target and the bucket range index
+        granularity = Column(String(10), primary_key=True)  # minute, hour
+        bucket_start = Column(DateTime, primary_key=True)
+        stage = Column(String(50), primary_key=True)
+        service = Column(String(100), primary_key=True)
+        level = Column(String(20), primary_key=True)
+        count = Column(BigInteger, nullable=False, default=0)
+        
+        def __repr__(self):
+            return f"<LogEventRollupORM({self.granularity} {self.bucket_start}, stage={self.stage}, count={self.count})>"
 else:
     LogEventORM = None
+    LogEventRollupORM = None
 
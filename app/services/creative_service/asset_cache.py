@@ -0,0 +1,271 @@
+"""
+Generated-image asset cache with prompt deduplication.
+
+Image generation is the slowest and most expensive call in creative
+generation, and identical (or nearly identical) image prompts recur across
+variants and campaigns. Generated images are downloaded into an asset store
+(a local directory standing in for an object store) under the hash of the
+normalized prompt and generation parameters, and later requests for the same
+prompt get the stored copy instead of a new generation. Storing the bytes
+also outlives provider URLs, which expire.
+
+Optional fuzzy matching treats prompts whose word sets have a Jaccard
+similarity at or above a threshold as duplicates.
+"""
+
+import hashlib
+import ipaddress
+import os
+import re
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Any, Dict, FrozenSet, Optional, Tuple
+from urllib.parse import urlparse
+import httpx
+from app.common.middleware import get_logger
+
+logger = get_logger(__name__)
+
+# Extensions for the image content types providers return
+_EXTENSIONS = {
+    "image/png": ".png",
+    "image/jpeg": ".jpg",
+    "image/webp": ".webp",
+    "image/gif": ".gif",
+}
+
+# Stored asset names: prompt hash plus extension (no path components)
+ASSET_NAME_PATTERN = re.compile(r"^[0-9a-f]{64}\.[a-z]{3,4}$")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS image_assets (
+    prompt_hash TEXT PRIMARY KEY,
+    normalized_prompt TEXT NOT NULL,
+    asset_name TEXT NOT NULL,
+    source_url TEXT,
+    created_at TEXT NOT NULL
+)
+"""
+
+
+def normalize_image_prompt(prompt: str) -> str:
+    """Lowercase a prompt and collapse whitespace."""
+    return " ".join(prompt.lower().split())
+
+
+def is_public_base_url(url: Optional[str]) -> bool:
+    """
+    Check whether a base URL can be fetched by external services.
+
+    Stored asset URLs are handed to video providers and ad platforms, so
+    loopback, private and link-local hosts (and localhost names) are rejected.
+
+    Args:
+        url: Base URL to check
+
+    Returns:
+        True for an http(s) URL with a public host
+    """
+    if not url:
+        return False
+    parsed = urlparse(url)
+    host = (parsed.hostname or "").lower()
+    if parsed.scheme not in ("http", "https") or not host:
+        return False
+    if host == "localhost" or host.endswith(".localhost") or "." not in host and ":" not in host:
+        return False
+    try:
+        address = ipaddress.ip_address(host)
+    except ValueError:
+        return True
+    return address.is_global
+
+
+def _prompt_tokens(normalized_prompt: str) -> FrozenSet[str]:
+    return frozenset(re.findall(r"\w+", normalized_prompt))
+
+
+class LocalAssetStore:
+    """Filesystem stand-in for an object store holding generated images."""
+
+    def __init__(self, root: str, public_base_url: str):
+        self.root = root
+        self.public_base_url = public_base_url.rstrip("/")
+        os.makedirs(root, exist_ok=True)
+
+    def path_for(self, asset_name: str) -> str:
+        """Local path of a stored asset."""
+        return os.path.join(self.root, asset_name)
+
+    def url_for(self, asset_name: str) -> str:
+        """Public URL of a stored asset."""
+        return f"{self.public_base_url}/{asset_name}"
+
+    def exists(self, asset_name: str) -> bool:
+        return os.path.exists(self.path_for(asset_name))
+
+    def put(self, asset_name: str, data: bytes) -> str:
+        """
+        Store asset bytes atomically.
+
+        Args:
+            asset_name: Asset name
+            data: Image bytes
+
+        Returns:
+            Public URL of the stored asset
+        """
+        path = self.path_for(asset_name)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        return self.url_for(asset_name)
+
+
+class ImageAssetCache:
+    """
+    Maps image-prompt hashes to stored generated images.
+
+    The prompt index is a SQLite table next to the stored assets; the word
+    sets used for fuzzy matching are kept in memory.
+    """
+
+    def __init__(
+        self,
+        store: LocalAssetStore,
+        generation_params: Optional[Dict[str, Any]] = None,
+        fuzzy_threshold: float = 0.0,
+        download_timeout: float = 30.0
+    ):
+        self.store = store
+        self.generation_params = generation_params or {}
+        self.fuzzy_threshold = fuzzy_threshold
+        self.download_timeout = download_timeout
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(store.root, "index.sqlite3"), check_same_thread=False, isolation_level=None)
+        self._conn.execute(_SCHEMA)
+        # Word set and asset per prompt hash, mirroring the index rows
+        self._fuzzy_index: Dict[str, Tuple[FrozenSet[str], str]] = {
+            prompt_hash: (_prompt_tokens(prompt), asset_name)
+            for prompt_hash, prompt, asset_name in self._conn.execute(
+                "SELECT prompt_hash, normalized_prompt, asset_name FROM image_assets"
+            )
+        }
+        self.exact_hits = 0
+        self.fuzzy_hits = 0
+        self.misses = 0
+        self.stored = 0
+        self.store_errors = 0
+
+    def prompt_hash(self, prompt: str) -> str:
+        """Hash of the normalized prompt and the generation parameters."""
+        params = ";".join(f"{k}={v}" for k, v in sorted(self.generation_params.items()))
+        return hashlib.sha256(f"{params}\n{normalize_image_prompt(prompt)}".encode("utf-8")).hexdigest()
+
+    def lookup(self, prompt: str) -> Optional[str]:
+        """
+        Find a stored image for a prompt.
+
+        Args:
+            prompt: Image prompt
+
+        Returns:
+            Public URL of the stored image, or None on a miss
+        """
+        prompt_hash = self.prompt_hash(prompt)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT asset_name FROM image_assets WHERE prompt_hash = ?", (prompt_hash,)
+            ).fetchone()
+        if row is not None and self.store.exists(row[0]):
+            with self._lock:
+                self.exact_hits += 1
+            return self.store.url_for(row[0])
+
+        asset_name = self._fuzzy_match(prompt)
+        with self._lock:
+            if asset_name is not None:
+                self.fuzzy_hits += 1
+                return self.store.url_for(asset_name)
+            self.misses += 1
+        return None
+
+    def store_generated(self, prompt: str, image_url: str) -> str:
+        """
+        Download a generated image into the asset store.
+
+        Args:
+            prompt: Image prompt the image was generated from
+            image_url: Provider URL of the generated image
+
+        Returns:
+            Public URL of the stored copy, or image_url if it could not be stored
+        """
+        prompt_hash = self.prompt_hash(prompt)
+        try:
+            response = httpx.get(image_url, timeout=self.download_timeout, follow_redirects=True)
+            response.raise_for_status()
+            content_type = response.headers.get("content-type", "").split(";")[0].strip()
+            asset_name = prompt_hash + _EXTENSIONS.get(content_type, ".png")
+            stored_url = self.store.put(asset_name, response.content)
+        except Exception as e:
+            logger.warning(f"Could not store generated image {image_url}: {e}")
+            with self._lock:
+                self.store_errors += 1
+            return image_url
+
+        normalized = normalize_image_prompt(prompt)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO image_assets (prompt_hash, normalized_prompt, asset_name, source_url, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (prompt_hash, normalized, asset_name, image_url, datetime.now().isoformat())
+            )
+            self._fuzzy_index[prompt_hash] = (_prompt_tokens(normalized), asset_name)
+            self.stored += 1
+        logger.info(f"Stored generated image as asset {asset_name}")
+        return stored_url
+
+    def stats(self) -> Dict[str, Any]:
+        """Asset count and hit/miss metrics."""
+        with self._lock:
+            hits = self.exact_hits + self.fuzzy_hits
+            lookups = hits + self.misses
+            return {
+                "assets": len(self._fuzzy_index),
+                "fuzzy_threshold": self.fuzzy_threshold,
+                "exact_hits": self.exact_hits,
+                "fuzzy_hits": self.fuzzy_hits,
+                "misses": self.misses,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "stored": self.stored,
+                "store_errors": self.store_errors,
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _fuzzy_match(self, prompt: str) -> Optional[str]:
+        """Stored asset whose prompt word set is most similar, if at or above the threshold."""
+        if self.fuzzy_threshold <= 0:
+            return None
+
+        tokens = _prompt_tokens(normalize_image_prompt(prompt))
+        if not tokens:
+            return None
+
+        best_name, best_score = None, self.fuzzy_threshold
+        with self._lock:
+            candidates = list(self._fuzzy_index.values())
+        for candidate_tokens, asset_name in candidates:
+            # Jaccard similarity cannot reach the threshold when set sizes differ too much
+            small, large = sorted((len(tokens), len(candidate_tokens)))
+            if large == 0 or small / large < best_score:
+                continue
+            score = len(tokens & candidate_tokens) / len(tokens | candidate_tokens)
+            if score >= best_score and self.store.exists(asset_name):
+                best_name, best_score = asset_name, score
+        return best_name
@@ -3,24 +3,92 @@ Utility functions for creative generation.
 """
 
 import os
+import time
+import tempfile
+import threading
 import yaml
 import logging
 import json
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, as_completed, wait
+from contextvars import ContextVar
 import google.generativeai as genai
 from openai import OpenAI
 import replicate
-from typing import Dict, Optional, Tuple, List
+from typing import Any, Dict, Optional, Tuple, List
 from tenacity import (
     retry,
     stop_after_attempt,
-    wait_exponential,
-    retry_if_exception_type,
+    retry_if_exception,
     RetryError
 )
 from app.common.config import settings
+from .llm_cache import LLMResponseCache, llm_cache_key
+from .asset_cache import ImageAssetCache, LocalAssetStore, is_public_base_url
+from .policy import CreativePolicy
+from .rate_limiter import get_provider_limiter, is_retryable_error, provider_backoff, estimate_tokens
 
 logger = logging.getLogger(__name__)
 
+# Text generation parameters (part of the LLM response cache key)
+OPENAI_TEXT_MODEL = "gpt-4.1-mini"
+LLM_TEMPERATURE = 0.7
+LLM_MAX_OUTPUT_TOKENS = 500
+
+# Content-addressed cache of LLM text responses (see llm_cache)
+llm_cache = LLMResponseCache(
+    max_entries=settings.CREATIVE_LLM_CACHE_SIZE,
+    ttl_seconds=settings.CREATIVE_LLM_CACHE_TTL,
+    cache_dir=settings.CREATIVE_LLM_CACHE_DIR or os.path.join(tempfile.gettempdir(), "creative_llm_cache")
+)
+
+# Image generation parameters (part of the image asset cache key)
+OPENAI_IMAGE_MODEL = "dall-e-3"
+OPENAI_IMAGE_SIZE = "1024x1024"
+OPENAI_IMAGE_QUALITY = "standard"
+
+# Stored generated images reused for repeated image prompts (see asset_cache)
+def _create_image_cache() -> Optional[ImageAssetCache]:
+    """
+    Create the generated-image asset cache if it is enabled and can be used.
+    
+    Stored image URLs replace provider URLs everywhere (video generation,
+    API responses, Meta uploads), so the cache stays off unless
+    CREATIVE_ASSET_BASE_URL is a publicly reachable base URL.
+    """
+    if not settings.CREATIVE_IMAGE_CACHE_ENABLED:
+        return None
+    if not is_public_base_url(settings.CREATIVE_ASSET_BASE_URL):
+        message = (
+            "Image asset cache disabled: CREATIVE_ASSET_BASE_URL must be a public base URL "
+            f"external providers can fetch (got {settings.CREATIVE_ASSET_BASE_URL!r})"
+        )
+        # Only a deploy that asked for the cache is misconfigured; by default it is simply off
+        explicitly_enabled = "CREATIVE_IMAGE_CACHE_ENABLED" in settings.model_fields_set
+        if settings.CREATIVE_ASSET_BASE_URL or explicitly_enabled:
+            logger.warning(message)
+        else:
+            logger.debug(message)
+        return None
+    try:
+        return ImageAssetCache(
+            LocalAssetStore(
+                settings.CREATIVE_IMAGE_CACHE_DIR or os.path.join(tempfile.gettempdir(), "creative_image_assets"),
+                settings.CREATIVE_ASSET_BASE_URL
+            ),
+            generation_params={"model": OPENAI_IMAGE_MODEL, "size": OPENAI_IMAGE_SIZE, "quality": OPENAI_IMAGE_QUALITY},
+            fuzzy_threshold=settings.CREATIVE_IMAGE_CACHE_FUZZY_THRESHOLD
+        )
+    except Exception as e:
+        logger.warning(f"Failed to initialize image asset cache: {e}")
+        return None
+
+
+image_cache: Optional[ImageAssetCache] = _create_image_cache()
+
+# Per-request opt-out of the LLM response cache (ABConfig.use_llm_cache); context
+# variables are copied into asyncio tasks and to_thread workers
+llm_cache_enabled: ContextVar[bool] = ContextVar('llm_cache_enabled', default=True)
+
 # Initialize LLM clients
 # Try OpenAI first, then Gemini as fallback
 openai_client = None
@@ -73,39 +141,71 @@ else:
     logger.warning("REPLICATE_API_TOKEN not set. Video generation will be disabled.")
 
 
-def load_creative_policy() -> Dict:
+POLICY_PATH = os.path.join(os.path.dirname(__file__), "creative_policy.yaml")
+
+DEFAULT_POLICY = {
+    "default": {
+        "copy_style": "direct_response",
+        "visual_style": "clean_product_focus",
+        "tone": "professional",
+        "headline_style": "benefit_focused",
+        "primary_text_length": "medium"
+    }
+}
+
+# Parsed policy per file path with the mtime (ns) it was parsed at
+_policy_cache: Dict[str, Tuple[Optional[int], CreativePolicy]] = {}
+_policy_lock = threading.Lock()
+
+
+def load_creative_policy(policy_path: Optional[str] = None) -> Dict:
     """
     Load creative policy from YAML file or return default policy.
     
+    The file is parsed once into an immutable CreativePolicy and re-parsed
+    only when its modification time changes; callers share the cached
+    instance.
+    
+    Args:
+        policy_path: Policy YAML path (defaults to creative_policy.yaml next to this module)
+    
     Returns:
-        Dictionary containing policy rules by category
+        Dictionary containing policy rules by category (read-only)
     """
-    policy_path = os.path.join(
-        os.path.dirname(__file__),
-        "creative_policy.yaml"
-    )
-    
-    default_policy = {
-        "default": {
-            "copy_style": "direct_response",
-            "visual_style": "clean_product_focus",
-            "tone": "professional",
-            "headline_style": "benefit_focused",
-            "primary_text_length": "medium"
-        }
-    }
+    policy_path = policy_path or POLICY_PATH
+    try:
+        mtime = os.stat(policy_path).st_mtime_ns
+    except OSError:
+        mtime = None
+    
+    cached = _policy_cache.get(policy_path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    
+    with _policy_lock:
+        cached = _policy_cache.get(policy_path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        
+        policy = CreativePolicy(_read_policy_file(policy_path, mtime), DEFAULT_POLICY["default"], source_mtime=mtime)
+        _policy_cache[policy_path] = (mtime, policy)
+        logger.info(f"Loaded creative policy with categories: {list(policy.keys())}")
+        return policy
+
+
+def _read_policy_file(policy_path: str, mtime: Optional[int]) -> Dict:
+    """Parse the policy YAML, falling back to the default policy."""
+    if mtime is None:
+        logger.warning(f"Policy file not found at {policy_path}, using default policy")
+        return DEFAULT_POLICY
     
     try:
-        if os.path.exists(policy_path):
-            with open(policy_path, 'r') as f:
-                policy = yaml.safe_load(f)
-                return policy if policy else default_policy
-        else:
-            logger.warning(f"Policy file not found at {policy_path}, using default policy")
-            return default_policy
+        with open(policy_path, 'r') as f:
+            policy = yaml.safe_load(f)
+            return policy if policy else DEFAULT_POLICY
     except Exception as e:
         logger.error(f"Error loading policy file: {e}, using default policy")
-        return default_policy
+        return DEFAULT_POLICY
 
 
 def get_policy_for_category(category: str, policy: Dict) -> Dict:
@@ -119,6 +219,10 @@ def get_policy_for_category(category: str, policy: Dict) -> Dict:
     Returns:
         Policy rules for the category
     """
+    if isinstance(policy, CreativePolicy):
+        # Memoized per category
+        return policy.resolve(category)
+    
     category_lower = category.lower() if category else ""
     
     # Try exact match first
@@ -131,13 +235,29 @@ def get_policy_for_category(category: str, policy: Dict) -> Dict:
             return policy[key]
     
     # Fall back to default
-    return policy.get("default", {
-        "copy_style": "direct_response",
-        "visual_style": "clean_product_focus",
-        "tone": "professional",
-        "headline_style": "benefit_focused",
-        "primary_text_length": "medium"
-    })
+    return policy.get("default", DEFAULT_POLICY["default"])
+
+
+# Copy approach per A/B variant
+COPY_VARIANT_INSTRUCTIONS = {
+    "A": "Use a direct, benefit-focused approach. Emphasize clear value proposition.",
+    "B": "Use a more emotional or storytelling approach. Create connection with the audience."
+}
+
+# Image style per A/B variant
+IMAGE_VARIANT_STYLES = {
+    "A": "product-focused, clean background, professional studio lighting, minimalist composition",
+    "B": "lifestyle context, natural setting, emotional connection, people using the product",
+    "C": "dynamic action shot, vibrant colors, energetic atmosphere, product in use",
+    "D": "comparison or before/after style, problem-solving visual, clear benefits shown",
+    "E": "aspirational lifestyle, premium aesthetic, sophisticated composition, luxury feel"
+}
+
+# Output token budget per creative in batched copy generation
+BATCH_COPY_TOKENS_PER_ITEM = 300
+
+# Read/write buffer for video segment downloads (bytes)
+VIDEO_DOWNLOAD_CHUNK_SIZE = 1024 * 1024
 
 
 def build_copy_prompt(product, campaign_spec, policy: Dict, variant: str) -> str:
@@ -155,12 +275,7 @@ def build_copy_prompt(product, campaign_spec, policy: Dict, variant: str) -> str
     """
     category_policy = get_policy_for_category(product.category, policy)
     
-    variant_instructions = {
-        "A": "Use a direct, benefit-focused approach. Emphasize clear value proposition.",
-        "B": "Use a more emotional or storytelling approach. Create connection with the audience."
-    }
-    
-    variant_instruction = variant_instructions.get(variant, variant_instructions["A"])
+    variant_instruction = COPY_VARIANT_INSTRUCTIONS.get(variant, COPY_VARIANT_INSTRUCTIONS["A"])
     
     prompt = f"""Generate advertising copy for a {campaign_spec.platform} ad campaign.
 
@@ -212,15 +327,7 @@ def build_image_prompt(product, campaign_spec, policy: Dict, variant: str) -> st
     """
     category_policy = get_policy_for_category(product.category, policy)
     
-    variant_styles = {
-        "A": "product-focused, clean background, professional studio lighting, minimalist composition",
-        "B": "lifestyle context, natural setting, emotional connection, people using the product",
-        "C": "dynamic action shot, vibrant colors, energetic atmosphere, product in use",
-        "D": "comparison or before/after style, problem-solving visual, clear benefits shown",
-        "E": "aspirational lifestyle, premium aesthetic, sophisticated composition, luxury feel"
-    }
-    
-    variant_style = variant_styles.get(variant, variant_styles["A"])
+    variant_style = IMAGE_VARIANT_STYLES.get(variant, IMAGE_VARIANT_STYLES["A"])
     visual_style = category_policy.get('visual_style', 'clean_product_focus')
     
     prompt = f"""You are a professional advertising photographer creating an image brief for a {campaign_spec.platform} ad campaign.
@@ -252,19 +359,163 @@ Return ONLY the image description text, no JSON, no markdown, no explanations, j
     return prompt
 
 
+def build_batch_copy_prompt(items: List[Tuple[str, Any, str]], campaign_spec, policy: Dict) -> str:
+    """
+    Build one prompt generating copy and image descriptions for several creatives.
+    
+    Each item carries the same product details, style guidelines and variant
+    approach as build_copy_prompt and build_image_prompt.
+    
+    Args:
+        items: (item_id, product, variant) tuples
+        campaign_spec: CampaignSpec object
+        policy: Full policy dictionary
+        
+    Returns:
+        Prompt string for LLM (JSON Mode with batch_copy_schema)
+    """
+    blocks = []
+    for item_id, product, variant in items:
+        category_policy = get_policy_for_category(product.category, policy)
+        blocks.append(f"""Item {item_id}:
+- Title: {product.title}
+- Description: {product.description}
+- Price: ${product.price:.2f}
+- Category: {product.category}
+- Copy Style: {category_policy.get('copy_style', 'direct_response')}
+- Tone: {category_policy.get('tone', 'professional')}
+- Headline Style: {category_policy.get('headline_style', 'benefit_focused')}
+- Primary Text Length: {category_policy.get('primary_text_length', 'medium')}
+- Variant Approach: {COPY_VARIANT_INSTRUCTIONS.get(variant, COPY_VARIANT_INSTRUCTIONS["A"])}
+- Visual Style: {category_policy.get('visual_style', 'clean_product_focus')}
+- Variant Image Style: {IMAGE_VARIANT_STYLES.get(variant, IMAGE_VARIANT_STYLES["A"])}""")
+    
+    items_text = "\n\n".join(blocks)
+    
+    prompt = f"""Generate advertising copy and an image description for each of the following {len(items)} items of a {campaign_spec.platform} ad campaign.
+
+Campaign Details:
+- Objective: {campaign_spec.objective}
+- Platform: {campaign_spec.platform}
+
+Platform Requirements:
+- Meta: Headline max 40 chars, Primary text max 125 chars
+- TikTok: Headline max 80 chars, Primary text max 220 chars
+- Google: Headline max 30 chars, Primary text max 90 chars
+
+Image Description Requirements:
+- 2-3 sentences suitable for professional product photography or AI image generation
+- Focus on composition, lighting, mood, colors, background and key visual elements
+- Match the item's visual style and variant image style
+- Do NOT include product name, text overlays, or written content
+
+{items_text}
+
+Generate ONLY a JSON object with this exact structure, with one entry per item:
+{{
+  "creatives": [
+    {{
+      "item_id": "the item id",
+      "headline": "the headline text",
+      "primary_text": "the primary text content",
+      "image_description": "the image description"
+    }}
+  ]
+}}
+
+Do not include any markdown formatting, explanations, or additional text. Return only the JSON object."""
+    
+    return prompt
+
+
+def batch_copy_schema() -> Dict:
+    """JSON schema for batched copy responses (one entry per item)."""
+    return {
+        "type": "object",
+        "properties": {
+            "creatives": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "item_id": {"type": "string"},
+                        "headline": {"type": "string"},
+                        "primary_text": {"type": "string"},
+                        "image_description": {"type": "string"}
+                    },
+                    "required": ["item_id", "headline", "primary_text", "image_description"]
+                }
+            }
+        },
+        "required": ["creatives"]
+    }
+
+
+def parse_batch_copy_response(llm_response: Optional[str], item_ids: List[str]) -> Dict[str, Dict[str, Optional[str]]]:
+    """
+    Parse a batched copy response into per-item results.
+    
+    Entries with unknown item ids or without a headline and primary text are
+    dropped, so callers can fall back to per-item calls for the missing items.
+    
+    Args:
+        llm_response: Raw LLM response text
+        item_ids: Item ids sent in the batch
+        
+    Returns:
+        Dict mapping item id to headline, primary_text and image_description (may be None)
+    """
+    if not llm_response:
+        return {}
+    
+    text = llm_response.strip()
+    if "```json" in text:
+        text = text.split("```json")[1].split("```")[0].strip()
+    elif text.startswith("```"):
+        text = text.split("```")[1].split("```")[0].strip()
+    
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError as e:
+        logger.warning(f"Failed to parse batched copy response as JSON: {e}")
+        return {}
+    
+    entries = data.get("creatives") if isinstance(data, dict) else data
+    if not isinstance(entries, list):
+        return {}
+    
+    wanted = set(item_ids)
+    results: Dict[str, Dict[str, Optional[str]]] = {}
+    for entry in entries:
+        if not isinstance(entry, dict):
+            continue
+        item_id = str(entry.get("item_id", ""))
+        headline = str(entry.get("headline") or "").strip()
+        primary_text = str(entry.get("primary_text") or "").strip()
+        image_description = str(entry.get("image_description") or "").strip()
+        if item_id in wanted and item_id not in results and headline and primary_text:
+            results[item_id] = {
+                "headline": headline,
+                "primary_text": primary_text,
+                "image_description": image_description or None
+            }
+    return results
+
+
 @retry(
     stop=stop_after_attempt(3),
-    wait=wait_exponential(multiplier=1, min=2, max=30),
-    retry=retry_if_exception_type((Exception,)),
+    wait=provider_backoff(min_seconds=2, max_seconds=30),
+    retry=retry_if_exception(is_retryable_error),
     reraise=True
 )
-def _call_openai_api_internal(prompt: str, json_mode: bool = False) -> Optional[str]:
+def _call_openai_api_internal(prompt: str, json_mode: bool = False, max_output_tokens: int = LLM_MAX_OUTPUT_TOKENS) -> Optional[str]:
     """
     Internal function to call OpenAI API with retry logic.
     
     Args:
         prompt: Prompt string
         json_mode: Whether to request JSON output
+        max_output_tokens: Output token limit
         
     Returns:
         Generated text or None if error
@@ -275,32 +526,38 @@ def _call_openai_api_internal(prompt: str, json_mode: bool = False) -> Optional[
     messages = [{"role": "user", "content": prompt}]
     
     kwargs = {
-        "model": "gpt-4.1-mini",
+        "model": OPENAI_TEXT_MODEL,
         "messages": messages,
-        "temperature": 0.7,
-        "max_tokens": 500
+        "temperature": LLM_TEMPERATURE,
+        "max_tokens": max_output_tokens
     }
     
     if json_mode:
         kwargs["response_format"] = {"type": "json_object"}
     
-    response = openai_client.chat.completions.create(**kwargs)
+    with get_provider_limiter("openai").request(estimate_tokens(prompt, max_output_tokens)):
+        response = openai_client.chat.completions.create(**kwargs)
     return response.choices[0].message.content.strip() if response.choices else None
 
 
 @retry(
     stop=stop_after_attempt(3),
-    wait=wait_exponential(multiplier=1, min=2, max=30),
-    retry=retry_if_exception_type((Exception,)),
+    wait=provider_backoff(min_seconds=2, max_seconds=30),
+    retry=retry_if_exception(is_retryable_error),
     reraise=True
 )
-def _call_gemini_api_internal(prompt: str, response_schema: Optional[Dict] = None) -> Optional[str]:
+def _call_gemini_api_internal(
+    prompt: str,
+    response_schema: Optional[Dict] = None,
+    max_output_tokens: int = LLM_MAX_OUTPUT_TOKENS
+) -> Optional[str]:
     """
     Internal function to call Gemini API with retry logic and optional JSON Mode.
     
     Args:
         prompt: Prompt string
         response_schema: Optional JSON schema for structured output (JSON Mode)
+        max_output_tokens: Output token limit
         
     Returns:
         Generated text or None if error
@@ -309,8 +566,8 @@ def _call_gemini_api_internal(prompt: str, response_schema: Optional[Dict] = Non
         return None
     
     generation_config = genai.types.GenerationConfig(
-        temperature=0.7,
-        max_output_tokens=500
+        temperature=LLM_TEMPERATURE,
+        max_output_tokens=max_output_tokens
     )
     
     # Use JSON Mode if schema provided
@@ -318,40 +575,63 @@ def _call_gemini_api_internal(prompt: str, response_schema: Optional[Dict] = Non
         generation_config.response_schema = response_schema
         generation_config.response_mime_type = "application/json"
     
-    response = gemini_model.generate_content(
-        prompt,
-        generation_config=generation_config
-    )
+    with get_provider_limiter("gemini").request(estimate_tokens(prompt, max_output_tokens)):
+        response = gemini_model.generate_content(
+            prompt,
+            generation_config=generation_config
+        )
     return response.text.strip() if response and response.text else None
 
 
-def call_gemini_text(prompt: str, response_schema: Optional[Dict] = None) -> Optional[str]:
+def call_gemini_text(
+    prompt: str,
+    response_schema: Optional[Dict] = None,
+    max_output_tokens: Optional[int] = None
+) -> Optional[str]:
     """
     Call LLM API (OpenAI or Gemini) for text generation with exponential backoff retry.
     
     This function implements retry logic to handle:
     - Rate limiting (429 errors)
     - Timeout errors
-    - Transient network errors
+    - Transient network errors and 5xx responses
+    
+    Other errors are not retried. Calls go through the shared per-provider
+    rate limiter (see rate_limiter).
+    
+    Responses are served from and stored in the LLM response cache unless the
+    current request opted out (llm_cache_enabled).
     
     Args:
         prompt: Prompt string
         response_schema: Optional JSON schema for structured output (JSON Mode)
                        When provided, forces JSON output matching the schema
+        max_output_tokens: Output token limit (defaults to LLM_MAX_OUTPUT_TOKENS)
         
     Returns:
         Generated text or None if error after retries
         If response_schema is provided, returns valid JSON string
     """
     logger.debug(f"call_gemini_text called with prompt length: {len(prompt)}")
+    use_cache = llm_cache_enabled.get()
+    max_output_tokens = max_output_tokens or LLM_MAX_OUTPUT_TOKENS
     
     # Try OpenAI first
     if openai_client:
-        logger.debug(f"Calling OpenAI API with model: gpt-4.1-mini, JSON Mode: {response_schema is not None}")
+        json_mode = response_schema is not None
+        cache_key = llm_cache_key("openai", OPENAI_TEXT_MODEL, prompt, LLM_TEMPERATURE, max_output_tokens, json_mode)
+        cached = llm_cache.get(cache_key) if use_cache else None
+        if cached:
+            logger.debug("OpenAI response served from LLM cache")
+            return cached
+        
+        logger.debug(f"Calling OpenAI API with model: {OPENAI_TEXT_MODEL}, JSON Mode: {json_mode}")
         try:
-            result = _call_openai_api_internal(prompt, json_mode=(response_schema is not None))
+            result = _call_openai_api_internal(prompt, json_mode=json_mode, max_output_tokens=max_output_tokens)
             if result:
                 logger.debug(f"OpenAI API call successful, response length: {len(result)}")
+                if use_cache:
+                    llm_cache.put(cache_key, result)
                 return result
         except RetryError as e:
             logger.error(f"OpenAI API call failed after retries: {e.last_attempt.exception()}")
@@ -360,10 +640,18 @@ def call_gemini_text(prompt: str, response_schema: Optional[Dict] = None) -> Opt
     
     # Fallback to Gemini
     if gemini_model:
+        cache_key = llm_cache_key("gemini", settings.GEMINI_MODEL, prompt, LLM_TEMPERATURE, max_output_tokens, response_schema)
+        cached = llm_cache.get(cache_key) if use_cache else None
+        if cached:
+            logger.debug("Gemini response served from LLM cache")
+            return cached
+        
         logger.debug(f"Calling Gemini API with model: {settings.GEMINI_MODEL}, JSON Mode: {response_schema is not None}")
         try:
-            result = _call_gemini_api_internal(prompt, response_schema=response_schema)
+            result = _call_gemini_api_internal(prompt, response_schema=response_schema, max_output_tokens=max_output_tokens)
             logger.debug(f"Gemini API call successful, response length: {len(result) if result else 0}")
+            if result and use_cache:
+                llm_cache.put(cache_key, result)
             return result
         except RetryError as e:
             logger.error(f"Gemini API call failed after retries: {e.last_attempt.exception()}")
@@ -388,25 +676,36 @@ def call_openai_image(image_prompt: str) -> Optional[str]:
         logger.debug("OpenAI image client not available, skipping image generation")
         return None
     
+    if image_cache is not None:
+        cached_url = image_cache.lookup(image_prompt)
+        if cached_url:
+            logger.info(f"Reusing stored image for image prompt: {cached_url}")
+            return cached_url
+    
     try:
         logger.info("Calling OpenAI DALL-E 3 for image generation (native API)")
+        original_prompt = image_prompt
         
         # DALL-E 3 has a 4000 character limit for prompts
         if len(image_prompt) > 4000:
             image_prompt = image_prompt[:3997] + "..."
             logger.warning(f"Image prompt truncated to 4000 characters")
         
-        response = openai_image_client.images.generate(
-            model="dall-e-3",
-            prompt=image_prompt,
-            size="1024x1024",
-            quality="standard",
-            n=1
-        )
+        with get_provider_limiter("openai_image").request():
+            response = openai_image_client.images.generate(
+                model=OPENAI_IMAGE_MODEL,
+                prompt=image_prompt,
+                size=OPENAI_IMAGE_SIZE,
+                quality=OPENAI_IMAGE_QUALITY,
+                n=1
+            )
         
         image_url = response.data[0].url
         logger.info(f"✅ DALL-E 3 image generated successfully!")
         logger.info(f"Image URL: {image_url}")
+        if image_cache is not None and image_url:
+            # Provider URLs expire; return the stored copy when it could be saved
+            image_url = image_cache.store_generated(original_prompt, image_url)
         return image_url
         
     except Exception as e:
@@ -696,39 +995,52 @@ Describe the video motion, camera movement, and visual effects in detail. Keep i
 
 @retry(
     stop=stop_after_attempt(3),
-    wait=wait_exponential(multiplier=1, min=4, max=10),
-    retry=retry_if_exception_type(Exception)
+    wait=provider_backoff(min_seconds=4, max_seconds=10),
+    retry=retry_if_exception(is_retryable_error)
 )
-def call_replicate_video(image_url: str, video_description: str) -> Optional[str]:
+def call_replicate_video(
+    image_url: str,
+    video_description: str,
+    cancel_event: Optional[threading.Event] = None
+) -> Optional[str]:
     """
     Generate video from image using Replicate Wan 2.5 model.
     
     Args:
         image_url: URL of the input image (from DALL-E 3)
         video_description: Text description/prompt for video generation
+        cancel_event: Optional event that, once set, cancels the Replicate
+            prediction (so it stops using quota) and makes the call return None
         
     Returns:
-        Video URL or None if generation fails
+        Video URL or None if generation fails or was cancelled
     """
     if not replicate_client:
         logger.warning("Replicate client not initialized, video generation disabled")
         return None
+    if cancel_event is not None and cancel_event.is_set():
+        return None
     
     try:
         logger.info(f"Generating video with Replicate Wan 2.5...")
         logger.info(f"Image URL: {image_url[:100]}...")
         logger.info(f"Video description: {video_description}")
         
+        model_input = {
+            "image": image_url,
+            "prompt": video_description,
+            "duration": 5,  # 5 seconds
+            "num_frames": 125,  # 25 fps * 5 seconds
+        }
+        
         # Run the model
-        output = replicate_client.run(
-            settings.REPLICATE_VIDEO_MODEL,
-            input={
-                "image": image_url,
-                "prompt": video_description,
-                "duration": 5,  # 5 seconds
-                "num_frames": 125,  # 25 fps * 5 seconds
-            }
-        )
+        with get_provider_limiter("replicate").request():
+            if cancel_event is None:
+                output = replicate_client.run(settings.REPLICATE_VIDEO_MODEL, input=model_input)
+            else:
+                output = _run_cancellable_prediction(settings.REPLICATE_VIDEO_MODEL, model_input, cancel_event)
+                if cancel_event.is_set():
+                    return None
         
         # The output is typically a FileOutput object or URL
         if output:
@@ -744,6 +1056,45 @@ def call_replicate_video(image_url: str, video_description: str) -> Optional[str
         raise
 
 
+def _run_cancellable_prediction(model: str, model_input: Dict[str, Any], cancel_event: threading.Event) -> Any:
+    """
+    Create a Replicate prediction and poll it until it finishes or cancel_event is set.
+    
+    Unlike replicate_client.run, the prediction ID is kept, so a prediction
+    nobody waits for any more is cancelled on Replicate instead of running
+    (and billing) to completion.
+    
+    Returns:
+        Prediction output, or None if it was cancelled
+        
+    Raises:
+        RuntimeError: If the prediction failed
+    """
+    owner_name, _, version = model.partition(":")
+    if version:
+        prediction = replicate_client.predictions.create(version=version, input=model_input)
+    else:
+        prediction = replicate_client.predictions.create(model=owner_name, input=model_input)
+    
+    while prediction.status not in ("succeeded", "failed", "canceled"):
+        if cancel_event.wait(settings.CREATIVE_VIDEO_POLL_INTERVAL):
+            try:
+                prediction.cancel()
+                logger.warning(f"Cancelled Replicate prediction {prediction.id}")
+            except Exception as e:
+                logger.error(f"Cancelling Replicate prediction {prediction.id} failed: {e}")
+            return None
+        prediction.reload()
+    
+    if prediction.status != "succeeded":
+        raise RuntimeError(f"Replicate prediction {prediction.id} {prediction.status}: {prediction.error}")
+    output = prediction.output
+    # Models returning several files list them; the video is the last one
+    if isinstance(output, list):
+        return output[-1] if output else None
+    return output
+
+
 def fallback_video_url(product) -> Optional[str]:
     """
     Generate fallback video URL (placeholder or None).
@@ -934,8 +1285,8 @@ def download_video(url: str, output_path: str) -> bool:
         response = requests.get(url, stream=True, timeout=60)
         response.raise_for_status()
         
-        with open(output_path, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
+        with open(output_path, 'wb', buffering=VIDEO_DOWNLOAD_CHUNK_SIZE) as f:
+            for chunk in response.iter_content(chunk_size=VIDEO_DOWNLOAD_CHUNK_SIZE):
                 if chunk:
                     f.write(chunk)
         
@@ -947,10 +1298,97 @@ def download_video(url: str, output_path: str) -> bool:
         return False
 
 
+def _download_segments(video_urls: List[str], temp_dir: str, request_id: str = "") -> Optional[List[str]]:
+    """
+    Download video segments concurrently (CREATIVE_VIDEO_DOWNLOAD_WORKERS).
+    
+    Args:
+        video_urls: Segment URLs in playback order
+        temp_dir: Directory for the downloaded files
+        request_id: Request ID for logging
+        
+    Returns:
+        Local paths in playback order, or None if any download failed
+    """
+    video_files = [os.path.join(temp_dir, f"segment_{i}.mp4") for i in range(len(video_urls))]
+    max_workers = max(1, min(settings.CREATIVE_VIDEO_DOWNLOAD_WORKERS, len(video_urls)))
+    
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="video-download") as executor:
+        futures = {
+            executor.submit(download_video, url, video_file): i
+            for i, (url, video_file) in enumerate(zip(video_urls, video_files))
+        }
+        for future in as_completed(futures):
+            if not future.result():
+                i = futures[future]
+                logger.error(f"[{request_id}] - Failed to download segment {i} from {video_urls[i]}")
+                # The video needs every segment; skip downloads that have not started
+                for other in futures:
+                    other.cancel()
+                return None
+    
+    return video_files
+
+
+def _run_ffmpeg_concat(inputs: List[str], output_path: str, temp_dir: str, request_id: str = "", network: bool = False) -> bool:
+    """
+    Concatenate inputs with the FFmpeg concat demuxer (stream copy, no re-encoding).
+    
+    Args:
+        inputs: Local paths, or URLs when network is True
+        output_path: Output file path
+        temp_dir: Directory for the concat list
+        request_id: Request ID for logging
+        network: Let FFmpeg open http(s) inputs itself
+        
+    Returns:
+        True if FFmpeg succeeded
+    """
+    import subprocess
+    
+    # Create concat file for FFmpeg
+    concat_file = os.path.join(temp_dir, "concat_list.txt")
+    with open(concat_file, "w") as f:
+        for video_input in inputs:
+            # Escape single quotes for FFmpeg
+            escaped_input = video_input.replace("'", "'\\''")
+            f.write(f"file '{escaped_input}'\n")
+    
+    cmd = ["ffmpeg", "-f", "concat", "-safe", "0"]
+    if network:
+        cmd += ["-protocol_whitelist", "file,http,https,tcp,tls,crypto"]
+    cmd += [
+        "-i", concat_file,
+        "-c", "copy",
+        "-y",  # Overwrite output file
+        output_path
+    ]
+    
+    logger.debug(f"[{request_id}] - Running FFmpeg command: {' '.join(cmd)}")
+    result = subprocess.run(
+        cmd,
+        capture_output=True,
+        text=True,
+        timeout=120
+    )
+    
+    if result.returncode != 0:
+        logger.error(f"[{request_id}] - FFmpeg error: {result.stderr}")
+        logger.error(f"[{request_id}] - FFmpeg stdout: {result.stdout}")
+        return False
+    return True
+
+
 def concatenate_videos(video_urls: List[str], output_path: str, request_id: str = "") -> Optional[str]:
     """
     Concatenate multiple videos into one using FFmpeg.
     
+    Segments are downloaded in parallel into CREATIVE_VIDEO_TEMP_DIR (point
+    it at a tmpfs such as /dev/shm to keep clips in memory). With
+    CREATIVE_VIDEO_CONCAT_STREAMING, FFmpeg reads the segment URLs directly
+    and concatenates while they stream in, falling back to downloading if
+    that fails.
+    
     Args:
         video_urls: List of video URLs to concatenate
         output_path: Output file path
@@ -960,8 +1398,6 @@ def concatenate_videos(video_urls: List[str], output_path: str, request_id: str
         Output file path if successful, None otherwise
     """
     import subprocess
-    import tempfile
-    import os
     import shutil
     import contextlib
     
@@ -976,7 +1412,7 @@ def concatenate_videos(video_urls: List[str], output_path: str, request_id: str
     @contextlib.contextmanager
     def temp_video_dir():
         """Context manager for temporary video directory with automatic cleanup."""
-        temp_dir = tempfile.mkdtemp(prefix=f"video_concat_{request_id}_")
+        temp_dir = tempfile.mkdtemp(prefix=f"video_concat_{request_id}_", dir=settings.CREATIVE_VIDEO_TEMP_DIR)
         try:
             yield temp_dir
         finally:
@@ -989,51 +1425,18 @@ def concatenate_videos(video_urls: List[str], output_path: str, request_id: str
     
     try:
         with temp_video_dir() as temp_dir:
-            video_files = []
+            streamable = all(url.startswith(("http://", "https://")) for url in video_urls)
+            if settings.CREATIVE_VIDEO_CONCAT_STREAMING and streamable:
+                if _run_ffmpeg_concat(video_urls, output_path, temp_dir, request_id, network=True):
+                    logger.info(f"[{request_id}] - Videos concatenated successfully from streamed segments: {output_path}")
+                    return output_path
+                logger.warning(f"[{request_id}] - Streaming concatenation failed, downloading segments instead")
             
-            # Download all videos
-            for i, url in enumerate(video_urls):
-                video_file = os.path.join(temp_dir, f"segment_{i}.mp4")
-                if download_video(url, video_file):
-                    video_files.append(video_file)
-                else:
-                    logger.error(f"[{request_id}] - Failed to download segment {i} from {url}")
-                    return None
-            
-            if len(video_files) != len(video_urls):
-                logger.error(f"[{request_id}] - Not all videos downloaded successfully")
+            video_files = _download_segments(video_urls, temp_dir, request_id)
+            if video_files is None:
                 return None
             
-            # Create concat file for FFmpeg
-            concat_file = os.path.join(temp_dir, "concat_list.txt")
-            with open(concat_file, "w") as f:
-                for video_file in video_files:
-                    # Escape single quotes in file path for FFmpeg
-                    escaped_path = video_file.replace("'", "'\\''")
-                    f.write(f"file '{escaped_path}'\n")
-            
-            # Run FFmpeg to concatenate videos
-            cmd = [
-                "ffmpeg",
-                "-f", "concat",
-                "-safe", "0",
-                "-i", concat_file,
-                "-c", "copy",
-                "-y",  # Overwrite output file
-                output_path
-            ]
-            
-            logger.debug(f"[{request_id}] - Running FFmpeg command: {' '.join(cmd)}")
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                timeout=120
-            )
-            
-            if result.returncode != 0:
-                logger.error(f"[{request_id}] - FFmpeg error: {result.stderr}")
-                logger.error(f"[{request_id}] - FFmpeg stdout: {result.stdout}")
+            if not _run_ffmpeg_concat(video_files, output_path, temp_dir, request_id):
                 return None
             
             logger.info(f"[{request_id}] - Videos concatenated successfully: {output_path}")
@@ -1050,42 +1453,128 @@ def concatenate_videos(video_urls: List[str], output_path: str, request_id: str
 def generate_video_segments(
     image_url: str,
     storyline: Dict,
-    request_id: str = ""
+    request_id: str = "",
+    progress: Optional[List[Dict]] = None
 ) -> List[Optional[str]]:
     """
     Generate multiple video segments based on storyline.
     
+    Segments are generated in parallel on a bounded thread pool
+    (CREATIVE_VIDEO_SEGMENT_WORKERS). A segment that raises or runs longer
+    than CREATIVE_VIDEO_SEGMENT_TIMEOUT seconds fails hard: the final video
+    needs every segment, so sibling segments that have not started are
+    cancelled and running ones are no longer waited for. Their Replicate
+    predictions are cancelled too, within CREATIVE_VIDEO_POLL_INTERVAL, by
+    the worker threads polling them.
+    
     Args:
         image_url: Product image URL (with person using it)
         storyline: Storyline dict with segments
         request_id: Request ID for logging
+        progress: Optional list that receives one status entry per segment
+            (segment_id, status, elapsed_seconds, error), in segment order
         
     Returns:
-        List of video URLs (one per segment)
+        List of video URLs (one per segment, None for failed segments)
     """
-    logger.info(f"[{request_id}] - Generating {len(storyline['segments'])} video segments")
-    
-    video_urls = []
-    
-    for segment in storyline['segments']:
-        segment_id = segment['segment_id']
-        video_prompt = segment['video_prompt']
-        
-        logger.info(f"[{request_id}] - Generating segment {segment_id}")
-        logger.info(f"[{request_id}] - Video prompt: {video_prompt}")
-        
+    segments = storyline['segments']
+    logger.info(f"[{request_id}] - Generating {len(segments)} video segments")
+    if not segments:
+        return []
+    
+    video_urls: List[Optional[str]] = [None] * len(segments)
+    statuses: List[Dict] = [
+        {"segment_id": segment['segment_id'], "status": "pending", "elapsed_seconds": None, "error": None}
+        for segment in segments
+    ]
+    started_at: Dict[int, float] = {}
+    timeout = settings.CREATIVE_VIDEO_SEGMENT_TIMEOUT
+    # Set on the first hard failure (or when giving up) so queued segments are
+    # not started and running Replicate predictions are cancelled
+    aborted = threading.Event()
+    
+    def run_segment(index: int) -> Optional[str]:
+        segment = segments[index]
+        if aborted.is_set():
+            statuses[index]["status"] = "cancelled"
+            return None
+        started_at[index] = time.monotonic()
+        statuses[index]["status"] = "running"
+        logger.info(f"[{request_id}] - Generating segment {segment['segment_id']}")
+        logger.info(f"[{request_id}] - Video prompt: {segment['video_prompt']}")
         try:
-            video_url = call_replicate_video(image_url, video_prompt)
-            video_urls.append(video_url)
+            return call_replicate_video(image_url, segment['video_prompt'], cancel_event=aborted)
+        except Exception:
+            aborted.set()
+            raise
+    
+    def finish(index: int, status: str, error: Optional[str] = None) -> None:
+        statuses[index]["status"] = status
+        statuses[index]["error"] = error
+        if index in started_at:
+            statuses[index]["elapsed_seconds"] = round(time.monotonic() - started_at[index], 3)
+    
+    executor = ThreadPoolExecutor(
+        max_workers=max(1, min(settings.CREATIVE_VIDEO_SEGMENT_WORKERS, len(segments))),
+        thread_name_prefix="video-segment"
+    )
+    futures = {executor.submit(run_segment, i): i for i in range(len(segments))}
+    pending = set(futures)
+    failed_hard = False
+    reported = 0
+    try:
+        while pending and not failed_hard:
+            done, pending = wait(pending, timeout=min(1.0, timeout), return_when=FIRST_COMPLETED)
             
-            if video_url:
-                logger.info(f"[{request_id}] - Segment {segment_id} generated successfully")
-            else:
-                logger.error(f"[{request_id}] - Segment {segment_id} generation failed")
+            for future in done:
+                index = futures[future]
+                segment_id = segments[index]['segment_id']
+                try:
+                    video_urls[index] = future.result()
+                except Exception as e:
+                    logger.error(f"[{request_id}] - Error generating segment {segment_id}: {e}")
+                    finish(index, "failed", str(e))
+                    failed_hard = True
+                    continue
                 
-        except Exception as e:
-            logger.error(f"[{request_id}] - Error generating segment {segment_id}: {e}")
-            video_urls.append(None)
+                if statuses[index]["status"] == "cancelled":
+                    continue
+                if video_urls[index]:
+                    logger.info(f"[{request_id}] - Segment {segment_id} generated successfully")
+                    finish(index, "succeeded")
+                else:
+                    logger.error(f"[{request_id}] - Segment {segment_id} generation failed")
+                    finish(index, "failed", "No video returned")
+            
+            now = time.monotonic()
+            for future in list(pending):
+                index = futures[future]
+                if index in started_at and now - started_at[index] > timeout:
+                    logger.error(f"[{request_id}] - Segment {segments[index]['segment_id']} timed out after {timeout}s")
+                    finish(index, "timed_out", f"Timed out after {timeout}s")
+                    pending.discard(future)
+                    future.cancel()
+                    aborted.set()
+                    failed_hard = True
+            
+            completed = sum(1 for status in statuses if status["status"] not in ("pending", "running"))
+            if completed != reported:
+                reported = completed
+                logger.info(f"[{request_id}] - Segment progress: {completed}/{len(segments)} finished")
+        
+        if failed_hard and pending:
+            logger.warning(f"[{request_id}] - Cancelling {len(pending)} sibling segments after a hard failure")
+            for future in pending:
+                future.cancel()
+                finish(futures[future], "cancelled")
+    finally:
+        if failed_hard or pending:
+            aborted.set()
+        # Never block on segments that were abandoned after a hard failure
+        executor.shutdown(wait=not failed_hard, cancel_futures=True)
+    
+    if progress is not None:
+        progress.extend(statuses)
     
     # Check if all segments were generated successfully
     successful_count = sum(1 for url in video_urls if url is not None)
@@ -0,0 +1,462 @@
+"""
+Background jobs for long-running creative generation.
+
+Storyline and Replicate video generation can run for minutes, far longer
+than callers keep an HTTP request open. A job records the generate_creatives
+request in a local SQLite store and runs it on a bounded worker pool;
+creatives are stored as they are generated so clients can poll the job and
+fetch results incrementally with a cursor. A cursor belongs to one attempt:
+a rerun starts the results over, and clients restart from cursor 0.
+
+Several processes may share the store (multiple uvicorn workers, restarts).
+Each runner owns the jobs it queued or claimed under a lease that its
+heartbeat thread keeps renewing; a job is only recovered by another runner
+once its lease has expired (its owner died). Every run counts as an attempt,
+and a job that has used up its attempts (e.g. because it keeps crashing the
+process) is marked failed instead of being requeued again.
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+from app.common.middleware import get_logger
+
+logger = get_logger(__name__)
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+
+# Runs one generate_creatives request (as a dict), calling on_creative with each
+# creative (as a dict) once generated, and returns the final response as a dict
+JobHandler = Callable[[Dict[str, Any], Callable[[Dict[str, Any]], None]], Dict[str, Any]]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS creative_jobs (
+    job_id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    request TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    owner TEXT,
+    lease_expires_at REAL,
+    attempts INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS creative_job_results (
+    job_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    creative TEXT NOT NULL,
+    PRIMARY KEY (job_id, seq)
+);
+"""
+
+# Columns added after the first release of the store (migrated on open)
+_ADDED_COLUMNS = {
+    "owner": "TEXT",
+    "lease_expires_at": "REAL",
+    "attempts": "INTEGER NOT NULL DEFAULT 0",
+}
+
+
+class JobStore:
+    """
+    SQLite-backed store for creative jobs and their incremental results.
+
+    A single connection is shared by the request handlers and the job
+    workers; every operation holds the store lock. Claims are single UPDATE
+    statements, so they are atomic across processes sharing the file.
+    Lease times are Unix timestamps.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(creative_jobs)")}
+        for name, definition in _ADDED_COLUMNS.items():
+            if name not in columns:
+                self._conn.execute(f"ALTER TABLE creative_jobs ADD COLUMN {name} {definition}")
+
+    def create_job(
+        self,
+        request: Dict[str, Any],
+        owner: Optional[str] = None,
+        lease_seconds: float = 0
+    ) -> str:
+        """
+        Store a new queued job.
+
+        Args:
+            request: generate_creatives request as a JSON-serializable dict
+            owner: Runner that will run the job (None leaves it to recovery)
+            lease_seconds: How long the owner's claim lasts without renewal
+
+        Returns:
+            New job ID
+        """
+        job_id = str(uuid.uuid4())
+        now = datetime.now().isoformat()
+        lease_expires_at = time.time() + lease_seconds if owner else None
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO creative_jobs (job_id, status, request, created_at, updated_at, owner, lease_expires_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, JOB_QUEUED, json.dumps(request), now, now, owner, lease_expires_at)
+            )
+        return job_id
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get a job's status, request and final result.
+
+        Args:
+            job_id: Job ID
+
+        Returns:
+            Job dict (with creatives_total), or None if the job does not exist
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM creative_jobs WHERE job_id = ?", (job_id,)).fetchone()
+            if row is None:
+                return None
+            creatives_total = self._conn.execute(
+                "SELECT COUNT(*) FROM creative_job_results WHERE job_id = ?", (job_id,)
+            ).fetchone()[0]
+        return {
+            "job_id": row["job_id"],
+            "status": row["status"],
+            "request": json.loads(row["request"]),
+            "result": json.loads(row["result"]) if row["result"] else None,
+            "error": row["error"],
+            "created_at": row["created_at"],
+            "updated_at": row["updated_at"],
+            "owner": row["owner"],
+            "lease_expires_at": row["lease_expires_at"],
+            "attempts": row["attempts"],
+            "creatives_total": creatives_total,
+        }
+
+    def get_creatives(
+        self,
+        job_id: str,
+        cursor: int = 0,
+        limit: Optional[int] = None,
+        attempt: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Get the creatives a job has generated so far, in generation order.
+
+        Args:
+            job_id: Job ID
+            cursor: Number of creatives the client has already fetched
+            limit: Maximum creatives to return (None for all)
+            attempt: Only return creatives if this is still the job's current
+                attempt (a new attempt discards the previous one's results)
+
+        Returns:
+            List of creative dicts starting at the cursor
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT r.creative FROM creative_job_results r JOIN creative_jobs j ON j.job_id = r.job_id "
+                "WHERE r.job_id = ? AND r.seq >= ? AND (? IS NULL OR j.attempts = ?) ORDER BY r.seq LIMIT ?",
+                (job_id, cursor, attempt, attempt, -1 if limit is None else limit)
+            ).fetchall()
+        return [json.loads(row["creative"]) for row in rows]
+
+    def claim(self, job_id: str, owner: str, lease_seconds: float) -> Optional[int]:
+        """
+        Start a run of a job if it is free to run, dropping results left by an interrupted run.
+
+        A job can be claimed when it is queued for this owner, or when it is
+        unfinished and nobody holds a live lease on it. Claiming sets it
+        running, takes the lease and counts an attempt.
+
+        Args:
+            job_id: Job ID
+            owner: Claiming runner
+            lease_seconds: How long the claim lasts without renewal
+
+        Returns:
+            Attempt number of this run, or None if the job is finished or
+            another live runner owns it
+        """
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE creative_jobs SET status = ?, owner = ?, lease_expires_at = ?, "
+                "attempts = attempts + 1, updated_at = ? "
+                "WHERE job_id = ? AND status IN (?, ?) AND ("
+                "(status = ? AND owner = ?) OR owner IS NULL OR lease_expires_at IS NULL OR lease_expires_at < ?)",
+                (JOB_RUNNING, owner, now + lease_seconds, datetime.now().isoformat(),
+                 job_id, JOB_QUEUED, JOB_RUNNING, JOB_QUEUED, owner, now)
+            )
+            if cursor.rowcount != 1:
+                return None
+            self._conn.execute("DELETE FROM creative_job_results WHERE job_id = ?", (job_id,))
+            return self._conn.execute(
+                "SELECT attempts FROM creative_jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()[0]
+
+    def renew_leases(self, owner: str, lease_seconds: float) -> int:
+        """
+        Extend the leases of every unfinished job an owner holds.
+
+        Args:
+            owner: Runner holding the leases
+            lease_seconds: New lease length from now
+
+        Returns:
+            Number of leases renewed
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE creative_jobs SET lease_expires_at = ? WHERE owner = ? AND status IN (?, ?)",
+                (time.time() + lease_seconds, owner, JOB_QUEUED, JOB_RUNNING)
+            )
+        return cursor.rowcount
+
+    def append_creative(self, job_id: str, creative: Dict[str, Any], owner: Optional[str] = None) -> bool:
+        """
+        Store the next generated creative of a running job.
+
+        Args:
+            job_id: Job ID
+            creative: Creative as a dict
+            owner: If given, only store it while this runner still owns the job
+
+        Returns:
+            False if the job has been taken over by another runner
+        """
+        with self._lock:
+            if owner is not None and not self._owns(job_id, owner):
+                return False
+            self._conn.execute(
+                "INSERT INTO creative_job_results (job_id, seq, creative) "
+                "SELECT ?, COUNT(*), ? FROM creative_job_results WHERE job_id = ?",
+                (job_id, json.dumps(creative), job_id)
+            )
+            self._conn.execute(
+                "UPDATE creative_jobs SET updated_at = ? WHERE job_id = ?",
+                (datetime.now().isoformat(), job_id)
+            )
+        return True
+
+    def finish(
+        self,
+        job_id: str,
+        status: str,
+        result: Optional[Dict[str, Any]] = None,
+        error: Optional[str] = None,
+        owner: Optional[str] = None
+    ) -> bool:
+        """
+        Record a job's final status and response.
+
+        Args:
+            job_id: Job ID
+            status: JOB_SUCCEEDED or JOB_FAILED
+            result: Final generate_creatives response as a dict
+            error: Error message for failed jobs
+            owner: If given, only record it while this runner still owns the job
+
+        Returns:
+            False if the job has been taken over by another runner
+        """
+        with self._lock:
+            if owner is not None and not self._owns(job_id, owner):
+                return False
+            self._conn.execute(
+                "UPDATE creative_jobs SET result = ?, error = ?, lease_expires_at = NULL WHERE job_id = ?",
+                (json.dumps(result) if result is not None else None, error, job_id)
+            )
+            self._set_status(job_id, status)
+        return True
+
+    def unfinished_jobs(self) -> List[str]:
+        """IDs of queued or running jobs, oldest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT job_id FROM creative_jobs WHERE status IN (?, ?) ORDER BY created_at",
+                (JOB_QUEUED, JOB_RUNNING)
+            ).fetchall()
+        return [row["job_id"] for row in rows]
+
+    def orphaned_jobs(self) -> List[str]:
+        """IDs of unfinished jobs without a live lease (their runner is gone), oldest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT job_id FROM creative_jobs WHERE status IN (?, ?) "
+                "AND (owner IS NULL OR lease_expires_at IS NULL OR lease_expires_at < ?) ORDER BY created_at",
+                (JOB_QUEUED, JOB_RUNNING, time.time())
+            ).fetchall()
+        return [row["job_id"] for row in rows]
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+    def _owns(self, job_id: str, owner: str) -> bool:
+        """Whether a runner still owns a running job (lock held)."""
+        row = self._conn.execute(
+            "SELECT 1 FROM creative_jobs WHERE job_id = ? AND owner = ? AND status = ?",
+            (job_id, owner, JOB_RUNNING)
+        ).fetchone()
+        return row is not None
+
+    def _set_status(self, job_id: str, status: str) -> None:
+        """Update a job's status and timestamp (lock held)."""
+        self._conn.execute(
+            "UPDATE creative_jobs SET status = ?, updated_at = ? WHERE job_id = ?",
+            (status, datetime.now().isoformat(), job_id)
+        )
+
+
+class CreativeJobRunner:
+    """
+    Runs stored creative jobs on a bounded pool of worker threads.
+
+    Each job runs its handler in its own worker thread, so a job's event loop
+    and blocking client calls never touch the server's event loop. A
+    heartbeat thread renews this runner's job leases every third of the
+    lease and picks up jobs orphaned by runners that died.
+    """
+
+    def __init__(
+        self,
+        store: JobStore,
+        handler: JobHandler,
+        max_workers: int = 2,
+        lease_seconds: float = 60,
+        max_attempts: int = 3
+    ):
+        """
+        Args:
+            store: Job store (may be shared with other processes)
+            handler: Runs one job
+            max_workers: Jobs run concurrently
+            lease_seconds: Seconds a job stays owned without a heartbeat
+            max_attempts: Runs a job gets before it is marked failed
+        """
+        self.store = store
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max(1, max_attempts)
+        self._handler = handler
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="creative-job")
+        # Jobs handed to the executor but not yet claimed (not rescheduled by recovery)
+        self._scheduled = set()
+        self._scheduled_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._heartbeat = threading.Thread(target=self._heartbeat_loop, name="creative-job-heartbeat", daemon=True)
+        self._heartbeat.start()
+
+    def submit(self, request: Dict[str, Any]) -> str:
+        """
+        Store a job and queue it for a worker.
+
+        Args:
+            request: generate_creatives request as a JSON-serializable dict
+
+        Returns:
+            New job ID
+        """
+        job_id = self.store.create_job(request, owner=self.owner, lease_seconds=self.lease_seconds)
+        self._schedule(job_id)
+        logger.info(f"Queued creative job {job_id}")
+        return job_id
+
+    def recover(self) -> int:
+        """
+        Requeue unfinished jobs whose runner is gone (lease expired).
+
+        Returns:
+            Number of jobs requeued
+        """
+        job_ids = [job_id for job_id in self.store.orphaned_jobs() if self._schedule(job_id)]
+        if job_ids:
+            logger.info(f"Requeued {len(job_ids)} orphaned creative jobs")
+        return len(job_ids)
+
+    def shutdown(self, wait: bool = False) -> None:
+        """Stop accepting jobs; unfinished jobs stay stored and are recovered once their lease expires."""
+        self._stop_event.set()
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+    def _schedule(self, job_id: str) -> bool:
+        with self._scheduled_lock:
+            if job_id in self._scheduled:
+                return False
+            self._scheduled.add(job_id)
+        try:
+            self._executor.submit(self._run, job_id)
+        except RuntimeError:
+            # Executor already shut down
+            with self._scheduled_lock:
+                self._scheduled.discard(job_id)
+            return False
+        return True
+
+    def _heartbeat_loop(self) -> None:
+        interval = max(self.lease_seconds / 3, 0.01)
+        while not self._stop_event.wait(interval):
+            try:
+                self.store.renew_leases(self.owner, self.lease_seconds)
+                self.recover()
+            except Exception as e:
+                logger.error(f"Creative job heartbeat failed: {e}")
+
+    def _run(self, job_id: str) -> None:
+        try:
+            attempt = self.store.claim(job_id, self.owner, self.lease_seconds)
+        finally:
+            with self._scheduled_lock:
+                self._scheduled.discard(job_id)
+        if attempt is None:
+            logger.debug(f"Creative job {job_id} is finished or owned by another runner")
+            return
+
+        if attempt > self.max_attempts:
+            logger.error(f"Creative job {job_id} failed: gave up after {self.max_attempts} attempts")
+            self.store.finish(
+                job_id, JOB_FAILED,
+                error=f"Job did not complete after {self.max_attempts} attempts",
+                owner=self.owner
+            )
+            return
+
+        job = self.store.get_job(job_id)
+        logger.info(f"Running creative job {job_id} (attempt {attempt}/{self.max_attempts})")
+        try:
+            result = self._handler(
+                job["request"],
+                lambda creative: self.store.append_creative(job_id, creative, owner=self.owner)
+            )
+        except Exception as e:
+            logger.error(f"Creative job {job_id} failed: {e}", exc_info=True)
+            self.store.finish(job_id, JOB_FAILED, error=str(e), owner=self.owner)
+            return
+
+        if result.get("status") == "success":
+            finished = self.store.finish(job_id, JOB_SUCCEEDED, result=result, owner=self.owner)
+        else:
+            finished = self.store.finish(job_id, JOB_FAILED, result=result, error=result.get("message"), owner=self.owner)
+        if not finished:
+            logger.warning(f"Creative job {job_id} was taken over by another runner; result discarded")
+            return
+        logger.info(f"Creative job {job_id} finished with status {result.get('status')}")
@@ -0,0 +1,225 @@
+"""
+Content-addressed cache for LLM text responses.
+
+Copy and image-prompt prompts are built deterministically from the product,
+category policy and variant, so re-running a catalog sends the same prompts
+again. Responses are cached under a SHA-256 of everything that determines
+them (provider, model, prompt, temperature, output limit and JSON mode /
+schema) in two tiers:
+
+- a bounded in-memory LRU
+- an optional on-disk tier (one JSON file per key) that survives restarts
+
+Entries older than the TTL are misses in both tiers.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from app.common.middleware import get_logger
+
+logger = get_logger(__name__)
+
+
+def llm_cache_key(
+    provider: str,
+    model: str,
+    prompt: str,
+    temperature: float,
+    max_output_tokens: int,
+    response_format: Any = None
+) -> str:
+    """
+    Content address of an LLM call.
+
+    Args:
+        provider: LLM provider ("openai" or "gemini")
+        model: Model name
+        prompt: Prompt string
+        temperature: Sampling temperature
+        max_output_tokens: Output token limit
+        response_format: JSON mode flag or response schema (None for free text)
+
+    Returns:
+        Hex SHA-256 digest
+    """
+    payload = json.dumps(
+        {
+            "provider": provider,
+            "model": model,
+            "prompt": prompt,
+            "temperature": temperature,
+            "max_output_tokens": max_output_tokens,
+            "response_format": response_format,
+        },
+        sort_keys=True,
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    Two-tier (memory LRU + disk) cache of LLM responses with TTL.
+
+    - max_entries bounds the memory tier; 0 disables the cache entirely
+    - ttl_seconds is measured in wall-clock time so disk entries expire
+      across restarts (0 disables TTL)
+    - cache_dir enables the disk tier (None keeps the cache in memory only)
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 0, cache_dir: Optional[str] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.cache_dir = cache_dir
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.disk_errors = 0
+
+    @property
+    def enabled(self) -> bool:
+        """Whether responses are cached at all (max_entries > 0)."""
+        return self.max_entries > 0
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Look up a cached response.
+
+        Args:
+            key: Key from llm_cache_key
+
+        Returns:
+            Cached response, or None on a miss
+        """
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                stored_at, value = entry
+                if self._expired(stored_at):
+                    del self._entries[key]
+                    self.expirations += 1
+                else:
+                    self._entries.move_to_end(key)
+                    self.memory_hits += 1
+                    return value
+
+        entry = self._read_disk(key)
+        with self._lock:
+            if entry is not None:
+                stored_at, value = entry
+                self._store_memory(key, stored_at, value)
+                self.disk_hits += 1
+                return value
+            self.misses += 1
+            return None
+
+    def put(self, key: str, value: str) -> None:
+        """
+        Store a response in both tiers.
+
+        Args:
+            key: Key from llm_cache_key
+            value: Response text
+        """
+        if not self.enabled or not value:
+            return
+
+        stored_at = time.time()
+        with self._lock:
+            self._store_memory(key, stored_at, value)
+        self._write_disk(key, stored_at, value)
+
+    def clear(self) -> None:
+        """Drop the memory tier (disk entries are kept; metrics are kept)."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Cache size and hit/miss metrics."""
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "disk_enabled": self.cache_dir is not None,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "disk_errors": self.disk_errors,
+            }
+
+    def _expired(self, stored_at: float) -> bool:
+        return self.ttl_seconds > 0 and time.time() - stored_at > self.ttl_seconds
+
+    def _store_memory(self, key: str, stored_at: float, value: str) -> None:
+        """Insert into the memory LRU (lock held)."""
+        self._entries[key] = (stored_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def _read_disk(self, key: str) -> Optional[Tuple[float, str]]:
+        """Read a disk entry, removing it if expired."""
+        if self.cache_dir is None:
+            return None
+
+        path = self._disk_path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Unreadable LLM cache entry {path}: {e}")
+            with self._lock:
+                self.disk_errors += 1
+            return None
+
+        stored_at = entry.get("stored_at", 0.0)
+        if self._expired(stored_at):
+            with self._lock:
+                self.expirations += 1
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+        return stored_at, entry.get("response")
+
+    def _write_disk(self, key: str, stored_at: float, value: str) -> None:
+        """Write a disk entry atomically (write to a temp file, then rename)."""
+        if self.cache_dir is None:
+            return
+
+        path = self._disk_path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"stored_at": stored_at, "response": value}, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not write LLM cache entry {path}: {e}")
+            with self._lock:
+                self.disk_errors += 1
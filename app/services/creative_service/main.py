@@ -9,20 +9,40 @@ This service generates creative content (text, images) for ad campaigns using:
 - A/B variant generation
 """
 
-from fastapi import FastAPI
-from typing import Union, Dict, Optional, List
+import asyncio
+import json
+import threading
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.responses import FileResponse, StreamingResponse
+import os
+import tempfile
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Union, Dict, Optional, List, Tuple
 from datetime import datetime
 import uuid
 from app.common.middleware import setup_logging, RequestIDMiddleware, get_cors_middleware_class, get_logger
 from app.common.config import settings
 from app.common.exceptions import register_exception_handlers
 
-from .schemas import GenerateCreativesRequest, GenerateCreativesResponse, ABConfig
-from app.common.schemas import Creative, ErrorResponse
+from .schemas import (
+    GenerateCreativesRequest,
+    GenerateCreativesResponse,
+    ABConfig,
+    CreativeJobSubmitResponse,
+    CreativeJobStatusResponse
+)
+from .jobs import JobStore, CreativeJobRunner, JOB_SUCCEEDED, JOB_FAILED
+from . import creative_utils
+from .asset_cache import ASSET_NAME_PATTERN
+from app.common.schemas import CampaignSpec, Creative, ErrorResponse, Product
 from .creative_utils import (
     load_creative_policy,
     build_copy_prompt,
     build_image_prompt,
+    build_batch_copy_prompt,
+    batch_copy_schema,
+    parse_batch_copy_response,
+    BATCH_COPY_TOKENS_PER_ITEM,
     call_gemini_text,
     call_openai_image,
     call_gemini_image,
@@ -37,18 +57,36 @@ from .creative_utils import (
     generate_storyline,
     generate_lifestyle_product_image_prompt,
     generate_video_segments,
-    concatenate_videos
+    concatenate_videos,
+    llm_cache_enabled
 )
+from .rate_limiter import provider_limiter_stats
 
 # Configure unified logging
 setup_logging(level=settings.LOG_LEVEL, service_name="creative_service")
 logger = get_logger(__name__)
 
+# Background runner for asynchronous creative jobs (created on first use)
+_job_runner: Optional[CreativeJobRunner] = None
+_job_runner_lock = threading.Lock()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Restart orphaned creative jobs at startup and stop the job workers at shutdown."""
+    _get_job_runner()
+    try:
+        yield
+    finally:
+        _shutdown_job_runner()
+
+
 # Initialize FastAPI app
 app = FastAPI(
     title="Creative Service",
     description="MCP microservice for generating ad creatives",
-    version="2.0.0"
+    version="2.0.0",
+    lifespan=lifespan
 )
 
 # Add middleware
@@ -63,7 +101,464 @@ register_exception_handlers(app)
 @app.get("/health")
 async def health_check():
     """Health check endpoint."""
-    return {"status": "healthy", "service": "creative_service"}
+    return {
+        "status": "healthy",
+        "service": "creative_service",
+        "llm_cache": creative_utils.llm_cache.stats(),
+        "image_cache": creative_utils.image_cache.stats() if creative_utils.image_cache is not None else None,
+        "provider_limits": provider_limiter_stats()
+    }
+
+
+@app.get("/assets/{asset_name}")
+async def get_asset(asset_name: str):
+    """
+    Serve a stored generated image.
+    
+    Args:
+        asset_name: Asset name from a stored image URL
+        
+    Returns:
+        Image file, or 404 if the asset does not exist
+    """
+    image_cache = creative_utils.image_cache
+    if image_cache is None or not ASSET_NAME_PATTERN.match(asset_name) or not image_cache.store.exists(asset_name):
+        raise HTTPException(status_code=404, detail="Asset not found")
+    return FileResponse(image_cache.store.path_for(asset_name))
+
+
+async def _run_blocking(limiter: asyncio.Semaphore, func, *args, **kwargs):
+    """Run a blocking client call in a worker thread, bounded by the concurrency limiter."""
+    async with limiter:
+        return await asyncio.to_thread(func, *args, **kwargs)
+
+
+async def _generate_creative(
+    product: Product,
+    variant: str,
+    campaign_spec: CampaignSpec,
+    policy: Dict,
+    ab_config: ABConfig,
+    limiter: asyncio.Semaphore,
+    prefetched: Optional[Dict[str, Optional[str]]] = None
+) -> Tuple[Optional[Creative], Dict[str, List[Dict]]]:
+    """
+    Generate one creative (copy, image, optional video) for a product variant.
+    
+    The copy and image-prompt LLM calls are independent and run concurrently;
+    image and video generation follow once the image description is known.
+    
+    Args:
+        product: Product to generate the creative for
+        variant: Variant label ("A", "B", ...)
+        campaign_spec: Campaign specification
+        policy: Creative policy
+        ab_config: A/B testing configuration
+        limiter: Semaphore bounding concurrent external calls
+        prefetched: Copy and image description from a batched LLM call, replacing the per-item calls
+        
+    Returns:
+        Tuple of (creative or None on failure, debug entries keyed like debug_info)
+    """
+    debug_info: Dict[str, List[Dict]] = {
+        "copy_prompts": [],
+        "image_prompts": [],
+        "raw_llm_responses": [],
+        "image_generation": [],
+        "qa_results": [],
+        "execution_steps": []
+    }
+    
+    try:
+        logger.info(f"Processing product: {product.product_id} - {product.title} (variant {variant})")
+        
+        # Step 4a: Build prompts
+        copy_prompt = build_copy_prompt(
+            product,
+            campaign_spec,
+            policy,
+            variant
+        )
+        image_prompt_prompt = build_image_prompt(
+            product,
+            campaign_spec,
+            policy,
+            variant
+        )
+        
+        debug_info["copy_prompts"].append({
+            "product_id": product.product_id,
+            "variant": variant,
+            "prompt": copy_prompt
+        })
+        debug_info["image_prompts"].append({
+            "product_id": product.product_id,
+            "variant": variant,
+            "prompt": image_prompt_prompt
+        })
+        
+        # Step 4b/4c: Call LLM for copy (JSON Mode) and for the image prompt concurrently
+        logger.debug(f"Calling LLM for copy and image prompt generation (variant {variant})")
+        debug_info["execution_steps"].append({
+            "step": "call_llm_copy",
+            "product_id": product.product_id,
+            "variant": variant,
+            "prompt_length": len(copy_prompt),
+            "timestamp": datetime.now().isoformat()
+        })
+        debug_info["execution_steps"].append({
+            "step": "call_llm_image_prompt",
+            "product_id": product.product_id,
+            "variant": variant,
+            "prompt_length": len(image_prompt_prompt),
+            "timestamp": datetime.now().isoformat()
+        })
+        
+        # Define JSON schema for copy response (JSON Mode)
+        copy_schema = {
+            "type": "object",
+            "properties": {
+                "headline": {"type": "string"},
+                "primary_text": {"type": "string"}
+            },
+            "required": ["headline", "primary_text"]
+        }
+        if prefetched is not None:
+            copy_response = json.dumps({"headline": prefetched["headline"], "primary_text": prefetched["primary_text"]})
+            image_description = prefetched.get("image_description")
+            if not image_description:
+                image_description = await _run_blocking(limiter, call_gemini_text, image_prompt_prompt)
+        else:
+            copy_response, image_description = await asyncio.gather(
+                _run_blocking(limiter, call_gemini_text, copy_prompt, response_schema=copy_schema),
+                _run_blocking(limiter, call_gemini_text, image_prompt_prompt)
+            )
+        copy_llm_success = copy_response is not None and len(copy_response) > 0
+        image_description_success = image_description is not None and len(image_description) > 0
+        
+        debug_info["raw_llm_responses"].append({
+            "product_id": product.product_id,
+            "variant": variant,
+            "type": "copy",
+            "batched": prefetched is not None,
+            "llm_call_success": copy_llm_success,
+            "response": copy_response,
+            "response_length": len(copy_response) if copy_response else 0,
+            "error": None if copy_llm_success else "LLM returned None or empty response"
+        })
+        debug_info["raw_llm_responses"].append({
+            "product_id": product.product_id,
+            "variant": variant,
+            "type": "image_prompt",
+            "batched": bool(prefetched and prefetched.get("image_description")),
+            "llm_call_success": image_description_success,
+            "response": image_description,
+            "response_length": len(image_description) if image_description else 0,
+            "error": None if image_description_success else "LLM returned None or empty response"
+        })
+        
+        # Parse copy response
+        logger.debug(f"Parsing copy response for variant {variant}")
+        headline, primary_text = parse_copy_response(copy_response)
+        parse_success = headline is not None and primary_text is not None
+        
+        debug_info["execution_steps"].append({
+            "step": "parse_copy_response",
+            "product_id": product.product_id,
+            "variant": variant,
+            "parse_success": parse_success,
+            "headline": headline,
+            "primary_text": primary_text[:50] + "..." if primary_text and len(primary_text) > 50 else primary_text,
+            "timestamp": datetime.now().isoformat()
+        })
+        
+        # Fallback if LLM failed
+        if not headline or not primary_text:
+            logger.warning(f"LLM copy generation failed for variant {variant}, using fallback")
+            debug_info["execution_steps"].append({
+                "step": "fallback_copy",
+                "product_id": product.product_id,
+                "variant": variant,
+                "reason": "LLM response parsing failed or empty",
+                "timestamp": datetime.now().isoformat()
+            })
+            headline, primary_text = fallback_text_generation(
+                product,
+                campaign_spec,
+                variant
+            )
+        
+        if not image_description:
+            logger.warning(f"LLM image prompt generation failed for variant {variant}, using fallback")
+            debug_info["execution_steps"].append({
+                "step": "fallback_image_prompt",
+                "product_id": product.product_id,
+                "variant": variant,
+                "reason": "LLM returned None or empty response",
+                "timestamp": datetime.now().isoformat()
+            })
+            image_description = f"Professional product photography of {product.title}, {get_policy_for_category(product.category, policy).get('visual_style', 'clean')} style"
+        
+        # Step 4d: Optionally call image generator
+        if ab_config.enable_image_generation:
+            logger.debug(f"Calling image generator for variant {variant}")
+            
+            # Try OpenAI DALL-E 3 first
+            image_url = await _run_blocking(limiter, call_openai_image, image_description)
+            
+            # Fallback to Gemini if DALL-E fails
+            if not image_url:
+                logger.debug(f"DALL-E 3 failed, trying Gemini")
+                image_url = await _run_blocking(limiter, call_gemini_image, image_description)
+            
+            image_generator_success = image_url is not None and len(image_url) > 0
+            
+            if not image_url:
+                logger.debug(f"All image generators failed for variant {variant}, using fallback")
+                image_url = fallback_image_url(product)
+        else:
+            logger.debug(f"Image generation disabled, using fallback")
+            image_url = fallback_image_url(product)
+            image_generator_success = False
+        
+        # Record image generation debug info
+        debug_info["image_generation"].append({
+            "product_id": product.product_id,
+            "variant": variant,
+            "image_prompt_llm_success": image_description_success,
+            "image_description": image_description,
+            "image_generator_success": image_generator_success,
+            "final_image_url": image_url,
+            "used_fallback": not image_generator_success
+        })
+        
+        # Step 4d-2: Optionally generate video from image
+        video_url = None
+        storyline = None
+        product_image_url = None
+        video_segments = None
+        final_video_url = None
+        segment_progress: List[Dict] = []
+        
+        if ab_config.enable_storyline_video:
+            # New: Storyline-based multi-segment video generation
+            logger.info(f"Generating storyline-based video for variant {variant}")
+            request_id = f"{product.product_id}_{variant}"
+            
+            try:
+                # Step 1: Generate storyline
+                storyline = await _run_blocking(
+                    limiter,
+                    generate_storyline,
+                    product_title=product.title,
+                    product_description=product.description,
+                    category=product.category,
+                    platform=campaign_spec.platform,
+                    objective=campaign_spec.objective,
+                    num_segments=ab_config.num_video_segments,
+                    request_id=request_id
+                )
+                
+                if storyline:
+                    # Step 2: Generate lifestyle product image (with person)
+                    lifestyle_prompt = await _run_blocking(
+                        limiter,
+                        generate_lifestyle_product_image_prompt,
+                        product_title=product.title,
+                        product_description=product.description,
+                        category=product.category,
+                        storyline_style=storyline.get('style', 'minimalist_modern'),
+                        request_id=request_id
+                    )
+                    
+                    product_image_url = await _run_blocking(limiter, call_openai_image, lifestyle_prompt)
+                    
+                    if product_image_url:
+                        # Step 3: Generate video segments (in parallel on the segment pool)
+                        video_segments = await _run_blocking(
+                            limiter,
+                            generate_video_segments,
+                            image_url=product_image_url,
+                            storyline=storyline,
+                            request_id=request_id,
+                            progress=segment_progress
+                        )
+                        
+                        # Check if all segments were generated
+                        if video_segments and all(url is not None for url in video_segments):
+                            # Step 4: Concatenate videos
+                            import tempfile
+                            output_path = tempfile.mktemp(suffix=".mp4")
+                            
+                            final_video_path = await _run_blocking(
+                                limiter,
+                                concatenate_videos,
+                                video_urls=video_segments,
+                                output_path=output_path,
+                                request_id=request_id
+                            )
+                            
+                            if final_video_path:
+                                # TODO: Upload to cloud storage and get public URL
+                                # For now, use the first segment URL as placeholder
+                                final_video_url = video_segments[0]
+                                logger.info(f"[{request_id}] - Storyline video generation completed!")
+                            else:
+                                logger.error(f"[{request_id}] - Failed to concatenate videos")
+                        else:
+                            logger.error(f"[{request_id}] - Not all video segments generated successfully")
+                    else:
+                        logger.error(f"[{request_id}] - Failed to generate product image")
+                else:
+                    logger.error(f"[{request_id}] - Failed to generate storyline")
+                    
+            except Exception as e:
+                logger.error(f"[{request_id}] - Storyline video generation failed: {e}")
+            
+            # Use final_video_url as video_url for backward compatibility
+            video_url = final_video_url
+            
+            debug_info["storyline_video_generation"] = [{
+                "product_id": product.product_id,
+                "variant": variant,
+                "storyline": storyline,
+                "product_image_url": product_image_url,
+                "num_segments": len(video_segments) if video_segments else 0,
+                "video_segments": video_segments,
+                "segment_progress": segment_progress,
+                "final_video_url": final_video_url,
+                "success": final_video_url is not None
+            }]
+            
+        elif ab_config.enable_video_generation and image_url and image_generator_success:
+            # Old: Single video generation from image
+            logger.debug(f"Generating single video for variant {variant}")
+            
+            # Generate video description
+            video_description = generate_video_description(product, campaign_spec, variant)
+            
+            # Generate video from image
+            try:
+                video_url = await _run_blocking(limiter, call_replicate_video, image_url, video_description)
+                video_generator_success = video_url is not None
+            except Exception as e:
+                logger.error(f"Video generation failed: {e}")
+                video_url = fallback_video_url(product)
+                video_generator_success = False
+            
+            debug_info["video_generation"] = [{
+                "product_id": product.product_id,
+                "variant": variant,
+                "video_description": video_description,
+                "video_generator_success": video_generator_success,
+                "final_video_url": video_url,
+                "used_fallback": not video_generator_success
+            }]
+        
+        # Step 4e: Assemble Creative object
+        creative = Creative(
+            creative_id=str(uuid.uuid4()),
+            product_id=product.product_id,
+            platform=campaign_spec.platform,
+            variant_id=variant,
+            primary_text=primary_text,
+            headline=headline,
+            image_url=image_url,
+            video_url=video_url,
+            # Storyline-based video fields
+            storyline=storyline,
+            product_image_url=product_image_url,
+            video_segments=video_segments,
+            final_video_url=final_video_url,
+            style_profile=get_policy_for_category(product.category, policy),
+            ab_group="control" if variant == "A" else "variant"
+        )
+        
+        # Step 4f: QA checks
+        is_valid, issues = run_creative_qa(creative)
+        debug_info["qa_results"].append({
+            "product_id": product.product_id,
+            "variant": variant,
+            "is_valid": is_valid,
+            "issues": issues
+        })
+        
+        if not is_valid:
+            logger.warning(f"QA issues for variant {variant}: {issues}")
+            # Continue anyway, but log the issues
+        
+        logger.info(f"Generated creative {creative.creative_id} for variant {variant}")
+        return creative, debug_info
+        
+    except Exception as e:
+        logger.error(f"Error generating creative for variant {variant}: {e}", exc_info=True)
+        return None, debug_info
+
+
+async def _prefetch_batched_copy(
+    units: List[Tuple[Product, str]],
+    campaign_spec: CampaignSpec,
+    policy: Dict,
+    ab_config: ABConfig,
+    limiter: asyncio.Semaphore
+) -> Tuple[List[Optional[Dict[str, Optional[str]]]], List[Dict]]:
+    """
+    Generate copy and image descriptions for units in batched JSON-mode LLM calls.
+    
+    Units are packed copy_batch_size to a call and the batches run concurrently.
+    Units missing from a failed or partial batch response get None and fall
+    back to per-item calls in _generate_creative.
+    
+    Args:
+        units: (product, variant) pairs in generation order
+        campaign_spec: Campaign specification
+        policy: Creative policy
+        ab_config: A/B testing configuration
+        limiter: Semaphore bounding concurrent external calls
+        
+    Returns:
+        Tuple of (per-unit results aligned with units, batch_copy_calls debug entries)
+    """
+    batch_size = ab_config.copy_batch_size
+    batches = [list(range(start, min(start + batch_size, len(units)))) for start in range(0, len(units), batch_size)]
+    
+    async def run_batch(indices: List[int]) -> Tuple[Dict[str, Dict[str, Optional[str]]], Dict]:
+        items = [(str(n + 1), units[i][0], units[i][1]) for n, i in enumerate(indices)]
+        prompt = build_batch_copy_prompt(items, campaign_spec, policy)
+        try:
+            response = await _run_blocking(
+                limiter,
+                call_gemini_text,
+                prompt,
+                response_schema=batch_copy_schema(),
+                max_output_tokens=BATCH_COPY_TOKENS_PER_ITEM * len(items)
+            )
+            error = None
+        except Exception as e:
+            logger.error(f"Batched copy generation failed: {e}")
+            response, error = None, str(e)
+        
+        parsed = parse_batch_copy_response(response, [item_id for item_id, _, _ in items])
+        return parsed, {
+            "items": [{"item_id": item_id, "product_id": product.product_id, "variant": variant} for item_id, product, variant in items],
+            "prompt_length": len(prompt),
+            "llm_call_success": bool(response),
+            "response": response,
+            "parsed_items": len(parsed),
+            "fallback_items": [item_id for item_id, _, _ in items if item_id not in parsed],
+            "error": error
+        }
+    
+    results: List[Optional[Dict[str, Optional[str]]]] = [None] * len(units)
+    debug_entries = []
+    for indices, (parsed, debug_entry) in zip(batches, await asyncio.gather(*(run_batch(indices) for indices in batches))):
+        for n, i in enumerate(indices):
+            results[i] = parsed.get(str(n + 1))
+        debug_entries.append(debug_entry)
+    
+    logger.info(f"Batched copy generation: {sum(r is not None for r in results)}/{len(units)} creatives "
+               f"in {len(batches)} LLM calls")
+    return results, debug_entries
 
 
 @app.post("/generate_creatives", response_model=Union[GenerateCreativesResponse, ErrorResponse])
@@ -74,6 +569,24 @@ async def generate_creatives(request: GenerateCreativesRequest) -> Union[Generat
     Args:
         request: Request containing campaign_spec and products
         
+    Returns:
+        Generated creatives with debug information, or ErrorResponse on failure
+    """
+    return await _generate_creatives(request)
+
+
+async def _generate_creatives(
+    request: GenerateCreativesRequest,
+    on_creative: Optional[Callable[[int, Creative], None]] = None
+) -> Union[GenerateCreativesResponse, ErrorResponse]:
+    """
+    Generate creatives for a request (shared by the synchronous endpoint and creative jobs).
+    
+    Args:
+        request: Request containing campaign_spec and products
+        on_creative: Optional callback receiving each creative as soon as its unit finishes, with
+            the unit's index (product-major, then variant); the response lists creatives in unit order
+        
     Returns:
         Generated creatives with debug information, or ErrorResponse on failure
     """
@@ -101,6 +614,8 @@ async def generate_creatives(request: GenerateCreativesRequest) -> Union[Generat
         
         # Step 2: Parse ab_config (with defaults)
         ab_config = request.ab_config or ABConfig()
+        # Scoped to this request's task and inherited by its LLM calls
+        llm_cache_enabled.set(ab_config.use_llm_cache)
         variants_per_product = ab_config.variants_per_product
         max_creatives = ab_config.max_creatives
         enable_image_generation = ab_config.enable_image_generation
@@ -159,342 +674,61 @@ async def generate_creatives(request: GenerateCreativesRequest) -> Union[Generat
         
         all_creatives: List[Creative] = []
         
-        # Step 5: Generate creatives for each product
+        # Step 5: Generate creatives for every product x variant concurrently
         variant_labels = ["A", "B", "C", "D", "E"][:variants_per_product]
+        units = [(product, variant) for product in request.products for variant in variant_labels]
+        limiter = asyncio.Semaphore(settings.CREATIVE_MAX_CONCURRENCY)
         
-        for product in request.products:
-            # Check if we've reached max_creatives limit
-            if len(all_creatives) >= max_creatives:
-                logger.info(f"Reached max_creatives limit ({max_creatives}), stopping generation")
-                break
+        # Failed units do not count towards max_creatives, so units are started in
+        # waves sized to the creatives still missing; results are merged in unit
+        # order, giving the same creatives and debug info as generating one by one
+        next_unit = 0
+        while next_unit < len(units) and len(all_creatives) < max_creatives:
+            wave_start = next_unit
+            wave = units[next_unit:next_unit + max_creatives - len(all_creatives)]
+            next_unit += len(wave)
+            logger.info(f"Generating {len(wave)} creatives concurrently (limit {settings.CREATIVE_MAX_CONCURRENCY} calls in flight)")
             
-            logger.info(f"Processing product: {product.product_id} - {product.title}")
+            prefetched: List[Optional[Dict[str, Optional[str]]]] = [None] * len(wave)
+            if ab_config.batch_copy_generation:
+                prefetched, batch_debug = await _prefetch_batched_copy(
+                    wave, request.campaign_spec, policy, ab_config, limiter
+                )
+                debug_info.setdefault("batch_copy_calls", []).extend(batch_debug)
             
-            # Generate variants for this product
-            variants = variant_labels[:variants_per_product]
+            tasks = [
+                asyncio.create_task(_generate_creative(
+                    product, variant, request.campaign_spec, policy, ab_config, limiter, prefetched=unit_copy
+                ))
+                for (product, variant), unit_copy in zip(wave, prefetched)
+            ]
             
-            for variant in variants:
-                try:
-                    # Step 4a: Build prompts
-                    copy_prompt = build_copy_prompt(
-                        product,
-                        request.campaign_spec,
-                        policy,
-                        variant
-                    )
-                    image_prompt_prompt = build_image_prompt(
-                        product,
-                        request.campaign_spec,
-                        policy,
-                        variant
-                    )
-                    
-                    debug_info["copy_prompts"].append({
-                        "product_id": product.product_id,
-                        "variant": variant,
-                        "prompt": copy_prompt
-                    })
-                    debug_info["image_prompts"].append({
-                        "product_id": product.product_id,
-                        "variant": variant,
-                        "prompt": image_prompt_prompt
-                    })
-                    
-                    # Step 4b: Call LLM for copy with JSON Mode for structured output
-                    logger.debug(f"Calling LLM for copy generation (variant {variant})")
-                    debug_info["execution_steps"].append({
-                        "step": "call_llm_copy",
-                        "product_id": product.product_id,
-                        "variant": variant,
-                        "prompt_length": len(copy_prompt),
-                        "timestamp": datetime.now().isoformat()
-                    })
-                    
-                    # Define JSON schema for copy response (JSON Mode)
-                    copy_schema = {
-                        "type": "object",
-                        "properties": {
-                            "headline": {"type": "string"},
-                            "primary_text": {"type": "string"}
-                        },
-                        "required": ["headline", "primary_text"]
-                    }
-                    copy_response = call_gemini_text(copy_prompt, response_schema=copy_schema)
-                    copy_llm_success = copy_response is not None and len(copy_response) > 0
-                    
-                    debug_info["raw_llm_responses"].append({
-                        "product_id": product.product_id,
-                        "variant": variant,
-                        "type": "copy",
-                        "llm_call_success": copy_llm_success,
-                        "response": copy_response,
-                        "response_length": len(copy_response) if copy_response else 0,
-                        "error": None if copy_llm_success else "LLM returned None or empty response"
-                    })
-                    
-                    # Parse copy response
-                    logger.debug(f"Parsing copy response for variant {variant}")
-                    headline, primary_text = parse_copy_response(copy_response)
-                    parse_success = headline is not None and primary_text is not None
-                    
-                    debug_info["execution_steps"].append({
-                        "step": "parse_copy_response",
-                        "product_id": product.product_id,
-                        "variant": variant,
-                        "parse_success": parse_success,
-                        "headline": headline,
-                        "primary_text": primary_text[:50] + "..." if primary_text and len(primary_text) > 50 else primary_text,
-                        "timestamp": datetime.now().isoformat()
-                    })
-                    
-                    # Fallback if LLM failed
-                    if not headline or not primary_text:
-                        logger.warning(f"LLM copy generation failed for variant {variant}, using fallback")
-                        debug_info["execution_steps"].append({
-                            "step": "fallback_copy",
-                            "product_id": product.product_id,
-                            "variant": variant,
-                            "reason": "LLM response parsing failed or empty",
-                            "timestamp": datetime.now().isoformat()
-                        })
-                        headline, primary_text = fallback_text_generation(
-                            product,
-                            request.campaign_spec,
-                            variant
-                        )
-                    
-                    # Step 4c: Call LLM for image prompt
-                    logger.debug(f"Calling LLM for image prompt generation (variant {variant})")
-                    debug_info["execution_steps"].append({
-                        "step": "call_llm_image_prompt",
-                        "product_id": product.product_id,
-                        "variant": variant,
-                        "prompt_length": len(image_prompt_prompt),
-                        "timestamp": datetime.now().isoformat()
-                    })
-                    
-                    image_description = call_gemini_text(image_prompt_prompt)
-                    image_description_success = image_description is not None and len(image_description) > 0
-                    
-                    debug_info["raw_llm_responses"].append({
-                        "product_id": product.product_id,
-                        "variant": variant,
-                        "type": "image_prompt",
-                        "llm_call_success": image_description_success,
-                        "response": image_description,
-                        "response_length": len(image_description) if image_description else 0,
-                        "error": None if image_description_success else "LLM returned None or empty response"
-                    })
-                    
-                    if not image_description:
-                        logger.warning(f"LLM image prompt generation failed for variant {variant}, using fallback")
-                        debug_info["execution_steps"].append({
-                            "step": "fallback_image_prompt",
-                            "product_id": product.product_id,
-                            "variant": variant,
-                            "reason": "LLM returned None or empty response",
-                            "timestamp": datetime.now().isoformat()
-                        })
-                        image_description = f"Professional product photography of {product.title}, {get_policy_for_category(product.category, policy).get('visual_style', 'clean')} style"
-                    
-                    # Step 4d: Optionally call image generator
-                    if enable_image_generation:
-                        logger.debug(f"Calling image generator for variant {variant}")
-                        
-                        # Try OpenAI DALL-E 3 first
-                        image_url = call_openai_image(image_description)
-                        
-                        # Fallback to Gemini if DALL-E fails
-                        if not image_url:
-                            logger.debug(f"DALL-E 3 failed, trying Gemini")
-                            image_url = call_gemini_image(image_description)
-                        
-                        image_generator_success = image_url is not None and len(image_url) > 0
-                        
-                        if not image_url:
-                            logger.debug(f"All image generators failed for variant {variant}, using fallback")
-                            image_url = fallback_image_url(product)
-                    else:
-                        logger.debug(f"Image generation disabled, using fallback")
-                        image_url = fallback_image_url(product)
-                        image_generator_success = False
-                    
-                    # Record image generation debug info
-                    debug_info["image_generation"].append({
-                        "product_id": product.product_id,
-                        "variant": variant,
-                        "image_prompt_llm_success": image_description_success,
-                        "image_description": image_description,
-                        "image_generator_success": image_generator_success,
-                        "final_image_url": image_url,
-                        "used_fallback": not image_generator_success
-                    })
-                    
-                    # Step 4d-2: Optionally generate video from image
-                    video_url = None
-                    storyline = None
-                    product_image_url = None
-                    video_segments = None
-                    final_video_url = None
-                    
-                    enable_storyline_video = ab_config.enable_storyline_video
-                    enable_video_generation = ab_config.enable_video_generation
-                    
-                    if enable_storyline_video:
-                        # New: Storyline-based multi-segment video generation
-                        logger.info(f"Generating storyline-based video for variant {variant}")
-                        request_id = f"{product.product_id}_{variant}"
-                        
-                        try:
-                            # Step 1: Generate storyline
-                            storyline = generate_storyline(
-                                product_title=product.title,
-                                product_description=product.description,
-                                category=product.category,
-                                platform=request.campaign_spec.platform,
-                                objective=request.campaign_spec.objective,
-                                num_segments=ab_config.num_video_segments,
-                                request_id=request_id
-                            )
-                            
-                            if storyline:
-                                # Step 2: Generate lifestyle product image (with person)
-                                lifestyle_prompt = generate_lifestyle_product_image_prompt(
-                                    product_title=product.title,
-                                    product_description=product.description,
-                                    category=product.category,
-                                    storyline_style=storyline.get('style', 'minimalist_modern'),
-                                    request_id=request_id
-                                )
-                                
-                                product_image_url = call_openai_image(lifestyle_prompt)
-                                
-                                if product_image_url:
-                                    # Step 3: Generate video segments
-                                    video_segments = generate_video_segments(
-                                        image_url=product_image_url,
-                                        storyline=storyline,
-                                        request_id=request_id
-                                    )
-                                    
-                                    # Check if all segments were generated
-                                    if video_segments and all(url is not None for url in video_segments):
-                                        # Step 4: Concatenate videos
-                                        import tempfile
-                                        output_path = tempfile.mktemp(suffix=".mp4")
-                                        
-                                        final_video_path = concatenate_videos(
-                                            video_urls=video_segments,
-                                            output_path=output_path,
-                                            request_id=request_id
-                                        )
-                                        
-                                        if final_video_path:
-                                            # TODO: Upload to cloud storage and get public URL
-                                            # For now, use the first segment URL as placeholder
-                                            final_video_url = video_segments[0]
-                                            logger.info(f"[{request_id}] - Storyline video generation completed!")
-                                        else:
-                                            logger.error(f"[{request_id}] - Failed to concatenate videos")
-                                    else:
-                                        logger.error(f"[{request_id}] - Not all video segments generated successfully")
-                                else:
-                                    logger.error(f"[{request_id}] - Failed to generate product image")
-                            else:
-                                logger.error(f"[{request_id}] - Failed to generate storyline")
-                                
-                        except Exception as e:
-                            logger.error(f"[{request_id}] - Storyline video generation failed: {e}")
-                        
-                        # Use final_video_url as video_url for backward compatibility
-                        video_url = final_video_url
-                        
-                        debug_info["storyline_video_generation"] = debug_info.get("storyline_video_generation", [])
-                        debug_info["storyline_video_generation"].append({
-                            "product_id": product.product_id,
-                            "variant": variant,
-                            "storyline": storyline,
-                            "product_image_url": product_image_url,
-                            "num_segments": len(video_segments) if video_segments else 0,
-                            "video_segments": video_segments,
-                            "final_video_url": final_video_url,
-                            "success": final_video_url is not None
-                        })
-                        
-                    elif enable_video_generation and image_url and image_generator_success:
-                        # Old: Single video generation from image
-                        logger.debug(f"Generating single video for variant {variant}")
-                        
-                        # Generate video description
-                        video_description = generate_video_description(product, request.campaign_spec, variant)
-                        
-                        # Generate video from image
-                        try:
-                            video_url = call_replicate_video(image_url, video_description)
-                            video_generator_success = video_url is not None
-                        except Exception as e:
-                            logger.error(f"Video generation failed: {e}")
-                            video_url = fallback_video_url(product)
-                            video_generator_success = False
-                        
-                        debug_info["video_generation"] = debug_info.get("video_generation", [])
-                        debug_info["video_generation"].append({
-                            "product_id": product.product_id,
-                            "variant": variant,
-                            "video_description": video_description,
-                            "video_generator_success": video_generator_success,
-                            "final_video_url": video_url,
-                            "used_fallback": not video_generator_success
-                        })
-                    
-                    # Step 4e: Assemble Creative object
-                    creative = Creative(
-                        creative_id=str(uuid.uuid4()),
-                        product_id=product.product_id,
-                        platform=request.campaign_spec.platform,
-                        variant_id=variant,
-                        primary_text=primary_text,
-                        headline=headline,
-                        image_url=image_url,
-                        video_url=video_url,
-                        # Storyline-based video fields
-                        storyline=storyline,
-                        product_image_url=product_image_url,
-                        video_segments=video_segments,
-                        final_video_url=final_video_url,
-                        style_profile=get_policy_for_category(product.category, policy),
-                        ab_group="control" if variant == "A" else "variant"
-                    )
-                    
-                    # Step 4f: QA checks
-                    is_valid, issues = run_creative_qa(creative)
-                    debug_info["qa_results"].append({
-                        "product_id": product.product_id,
-                        "variant": variant,
-                        "is_valid": is_valid,
-                        "issues": issues
-                    })
-                    
-                    if not is_valid:
-                        logger.warning(f"QA issues for variant {variant}: {issues}")
-                        # Continue anyway, but log the issues
-                    
-                    all_creatives.append(creative)
-                    logger.info(f"Generated creative {creative.creative_id} for variant {variant}")
-                    
-                    # Check if we've reached max_creatives limit
-                    if len(all_creatives) >= max_creatives:
-                        logger.info(f"Reached max_creatives limit ({max_creatives})")
-                        break
-                    
-                except Exception as e:
-                    logger.error(f"Error generating creative for variant {variant}: {e}", exc_info=True)
-                    # Continue with next variant
-                    continue
+            # Hand each creative to on_creative as soon as its unit finishes (a
+            # slow unit does not hold back the others), then merge in unit order
+            results: List[Optional[Tuple[Optional[Creative], Dict[str, Any]]]] = [None] * len(wave)
+            task_index = {task: i for i, task in enumerate(tasks)}
+            try:
+                pending = set(tasks)
+                while pending:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in sorted(done, key=task_index.get):
+                        i = task_index[task]
+                        results[i] = task.result()
+                        creative = results[i][0]
+                        if creative is not None and on_creative is not None:
+                            on_creative(wave_start + i, creative)
+            finally:
+                for task in tasks:
+                    task.cancel()
             
-            # Break outer loop if we've reached max_creatives
-            if len(all_creatives) >= max_creatives:
-                break
+            for creative, unit_debug in results:
+                for key, entries in unit_debug.items():
+                    debug_info.setdefault(key, []).extend(entries)
+                if creative is not None:
+                    all_creatives.append(creative)
+        
+        if len(all_creatives) >= max_creatives:
+            logger.info(f"Reached max_creatives limit ({max_creatives})")
         
         # Step 6: Check if we have any creatives
         if not all_creatives:
@@ -564,6 +798,193 @@ async def generate_creatives(request: GenerateCreativesRequest) -> Union[Generat
         )
 
 
+def _format_stream_event(event: str, data: Dict[str, Any], stream_format: str) -> str:
+    """Serialize one stream event as an NDJSON line or an SSE message."""
+    if stream_format == "sse":
+        return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+    return json.dumps({"event": event, **data}) + "\n"
+
+
+async def _stream_creative_events(request: GenerateCreativesRequest, stream_format: str):
+    """
+    Generate creatives and yield each one as a stream event as soon as it is kept.
+    
+    Yields "creative" events in completion order, each with the unit "index"
+    that orders it in the final response, then one "summary" event with the
+    debug info, or an "error" event if no creatives could be generated.
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+    task = asyncio.create_task(_generate_creatives(
+        request,
+        on_creative=lambda index, creative: queue.put_nowait((index, creative))
+    ))
+    # Runs after every creative was queued
+    task.add_done_callback(lambda _: queue.put_nowait(None))
+    
+    try:
+        while True:
+            item = await queue.get()
+            if item is None:
+                break
+            index, creative = item
+            yield _format_stream_event(
+                "creative", {"index": index, "creative": creative.model_dump(mode="json")}, stream_format
+            )
+        
+        response = task.result().model_dump(mode="json")
+        if response["status"] == "success":
+            yield _format_stream_event("summary", {
+                "status": "success",
+                "creatives_total": len(response["creatives"]),
+                "debug": response["debug"]
+            }, stream_format)
+        else:
+            yield _format_stream_event("error", response, stream_format)
+    finally:
+        # Client disconnected: stop generating
+        if not task.done():
+            task.cancel()
+
+
+@app.post("/generate_creatives/stream")
+async def stream_creatives(
+    request: GenerateCreativesRequest,
+    stream_format: str = Query("ndjson", alias="format", description="ndjson or sse")
+) -> StreamingResponse:
+    """
+    Generate creatives and stream each one as soon as it passes QA.
+    
+    Args:
+        request: Same request as /generate_creatives
+        stream_format: "ndjson" (one JSON object per line) or "sse" (server-sent events)
+        
+    Returns:
+        Stream of "creative" events followed by a "summary" (or "error") event
+    """
+    if stream_format not in ("ndjson", "sse"):
+        raise HTTPException(status_code=400, detail="format must be 'ndjson' or 'sse'")
+    
+    media_type = "text/event-stream" if stream_format == "sse" else "application/x-ndjson"
+    return StreamingResponse(
+        _stream_creative_events(request, stream_format),
+        media_type=media_type,
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+def _run_creative_job(request_data: Dict[str, Any], on_creative: Callable[[Dict[str, Any]], None]) -> Dict[str, Any]:
+    """Run a stored creative job in a job worker thread (on its own event loop)."""
+    request = GenerateCreativesRequest.model_validate(request_data)
+    response = asyncio.run(_generate_creatives(
+        request,
+        on_creative=lambda index, creative: on_creative(creative.model_dump(mode="json"))
+    ))
+    return response.model_dump(mode="json")
+
+
+def _get_job_runner() -> CreativeJobRunner:
+    """Get the creative job runner, opening the job store and requeueing orphaned jobs on first use."""
+    global _job_runner
+    
+    if _job_runner is None:
+        with _job_runner_lock:
+            if _job_runner is None:
+                path = settings.CREATIVE_JOB_DB_PATH or os.path.join(tempfile.gettempdir(), "creative_jobs.sqlite3")
+                runner = CreativeJobRunner(
+                    JobStore(path),
+                    _run_creative_job,
+                    max_workers=settings.CREATIVE_JOB_WORKERS,
+                    lease_seconds=settings.CREATIVE_JOB_LEASE_SECONDS,
+                    max_attempts=settings.CREATIVE_JOB_MAX_ATTEMPTS
+                )
+                runner.recover()
+                _job_runner = runner
+                logger.info(f"Creative job store at {path}")
+    return _job_runner
+
+
+def _shutdown_job_runner() -> None:
+    """Stop the job workers; unfinished jobs stay in the store and are recovered once their lease expires."""
+    global _job_runner
+    
+    with _job_runner_lock:
+        if _job_runner is not None:
+            _job_runner.shutdown()
+            _job_runner = None
+
+
+@app.post("/generate_creatives/jobs", response_model=CreativeJobSubmitResponse, status_code=202)
+async def submit_creatives_job(request: GenerateCreativesRequest) -> CreativeJobSubmitResponse:
+    """
+    Queue a creative generation job and return its ID immediately.
+    
+    Use for requests with video generation enabled, which run far longer than
+    callers keep an HTTP request open. Poll GET /generate_creatives/jobs/{job_id}
+    for status and creatives.
+    
+    Args:
+        request: Same request as /generate_creatives
+        
+    Returns:
+        Job ID and initial job status
+    """
+    job_id = _get_job_runner().submit(request.model_dump(mode="json"))
+    return CreativeJobSubmitResponse(status="accepted", job_id=job_id, job_status="queued")
+
+
+@app.get("/generate_creatives/jobs/{job_id}", response_model=Union[CreativeJobStatusResponse, ErrorResponse])
+async def get_creatives_job(
+    job_id: str,
+    cursor: int = 0,
+    attempt: Optional[int] = Query(None, description="attempt from the previous poll")
+) -> Union[CreativeJobStatusResponse, ErrorResponse]:
+    """
+    Get a creative job's status and the creatives generated since a cursor.
+    
+    A job whose runner died is rerun, and the rerun starts its creatives
+    over. When the attempt passed with the cursor is no longer the job's
+    current one, creatives are returned from cursor 0 with cursor_reset set.
+    
+    Args:
+        job_id: Job ID returned on submission
+        cursor: Creatives already fetched (pass the previous next_cursor)
+        attempt: Attempt the cursor belongs to (pass the previous attempt)
+        
+    Returns:
+        Job status with new creatives, or ErrorResponse if the job does not exist
+    """
+    store = _get_job_runner().store
+    job = store.get_job(job_id)
+    if job is None:
+        return ErrorResponse(
+            status="error",
+            error_code="JOB_NOT_FOUND",
+            message=f"Creative job {job_id} not found",
+            details={"job_id": job_id}
+        )
+    
+    current_attempt = job["attempts"]
+    cursor_reset = attempt is not None and attempt != current_attempt and cursor > 0
+    cursor = 0 if cursor_reset else max(0, cursor)
+    # Empty if another attempt started since get_job; the next poll resets
+    creatives = store.get_creatives(job_id, cursor, attempt=current_attempt)
+    result = job["result"] or {}
+    return CreativeJobStatusResponse(
+        status="success",
+        job_id=job_id,
+        job_status=job["status"],
+        created_at=job["created_at"],
+        updated_at=job["updated_at"],
+        creatives=creatives,
+        creatives_total=max(job["creatives_total"], cursor + len(creatives)),
+        next_cursor=cursor + len(creatives),
+        attempt=current_attempt,
+        cursor_reset=cursor_reset,
+        error=job["error"],
+        debug=result.get("debug") if job["status"] in (JOB_SUCCEEDED, JOB_FAILED) else None
+    )
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8002)
@@ -0,0 +1,96 @@
+"""
+Immutable, pre-compiled creative policy.
+
+The creative policy YAML maps categories to style profiles. A parsed policy
+is shared by every request until the file changes, so it is frozen, and
+category resolution (exact key, then first key contained in the category,
+then "default") is memoized per category instead of re-scanning the keys
+for every variant.
+"""
+
+import threading
+from typing import Any, Dict, Optional
+
+
+def _readonly(self, *args, **kwargs):
+    raise TypeError(f"{type(self).__name__} is read-only")
+
+
+class FrozenDict(dict):
+    """
+    Read-only dict.
+
+    Still a dict, so it serializes and validates like one; mutating methods
+    raise TypeError.
+    """
+
+    __setitem__ = _readonly
+    __delitem__ = _readonly
+    __ior__ = _readonly
+    clear = _readonly
+    pop = _readonly
+    popitem = _readonly
+    setdefault = _readonly
+    update = _readonly
+
+    def __hash__(self):
+        return id(self)
+
+    def __copy__(self):
+        return dict(self)
+
+    def __deepcopy__(self, memo):
+        return freeze(dict(self))
+
+    def __reduce__(self):
+        return (freeze, (dict(self),))
+
+
+def freeze(value: Any) -> Any:
+    """Recursively convert dicts to FrozenDict and lists to tuples."""
+    if isinstance(value, dict):
+        return FrozenDict((key, freeze(item)) for key, item in value.items())
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+class CreativePolicy(FrozenDict):
+    """
+    Parsed creative policy: category -> style profile, with memoized resolution.
+    """
+
+    def __init__(self, policy: Dict[str, Any], fallback: Dict[str, Any], source_mtime: Optional[int] = None):
+        super().__init__((key, freeze(profile)) for key, profile in policy.items())
+        self._fallback = self.get("default", freeze(fallback))
+        # Partial-match candidates, in file order
+        self._partial_keys = tuple(key for key in self if key != "default")
+        self._resolved: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        self.source_mtime = source_mtime
+
+    def resolve(self, category: Optional[str]) -> Dict[str, Any]:
+        """
+        Get the style profile for a product category.
+
+        Args:
+            category: Product category
+
+        Returns:
+            Read-only style profile
+        """
+        category_lower = category.lower() if category else ""
+        profile = self._resolved.get(category_lower)
+        if profile is None:
+            profile = self._match(category_lower)
+            with self._lock:
+                self._resolved[category_lower] = profile
+        return profile
+
+    def _match(self, category_lower: str) -> Dict[str, Any]:
+        if category_lower in self:
+            return self[category_lower]
+        for key in self._partial_keys:
+            if key in category_lower:
+                return self[key]
+        return self._fallback
@@ -0,0 +1,362 @@
+"""
+Shared per-provider rate limiting and adaptive concurrency for external calls.
+
+Every OpenAI, Gemini and Replicate call made by any creative request goes
+through its provider's ProviderLimiter:
+
+- token buckets cap requests per minute and (estimated) tokens per minute
+- an AIMD concurrency limit halves on 429 responses or when latency exceeds
+  the provider's target and grows back additively on fast successes, so
+  callers slow down together instead of retrying into a saturated quota
+
+Retry policies use is_retryable_error so only throttling, timeouts,
+connection failures and 5xx responses are retried; other errors (bad
+requests, authentication, validation) fail immediately. Backoff is jittered
+and honors Retry-After.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+from tenacity import wait_random_exponential
+from app.common.config import settings
+from app.common.middleware import get_logger
+
+logger = get_logger(__name__)
+
+# HTTP statuses worth retrying (timeouts, throttling, transient server errors)
+RETRYABLE_STATUS_CODES = {408, 425, 429, 500, 502, 503, 504}
+
+# Provider/client exception class names that signal throttling
+THROTTLE_ERROR_NAMES = {"RateLimitError", "ResourceExhausted", "TooManyRequests"}
+
+# Provider/client exception class names for transient failures without a status code
+TRANSIENT_ERROR_NAMES = {
+    "APITimeoutError", "APIConnectionError", "InternalServerError", "ServiceUnavailable",
+    "DeadlineExceeded", "Timeout", "TimeoutException", "ConnectTimeout", "ReadTimeout",
+    "ConnectError", "ConnectionError", "ReadError", "RemoteProtocolError",
+}
+
+# Longest Retry-After honored before retrying (seconds)
+MAX_RETRY_AFTER = 60.0
+
+
+def _error_names(exc: BaseException) -> set:
+    return {cls.__name__ for cls in type(exc).__mro__}
+
+
+def error_status_code(exc: BaseException) -> Optional[int]:
+    """HTTP status carried by a client exception (or its response), if any."""
+    for source in (exc, getattr(exc, "response", None)):
+        if source is None:
+            continue
+        for attr in ("status_code", "status", "code", "http_status"):
+            value = getattr(source, attr, None)
+            if isinstance(value, int) and not isinstance(value, bool) and 100 <= value < 600:
+                return value
+    return None
+
+
+def is_throttle_error(exc: BaseException) -> bool:
+    """Whether an exception means the provider is rate limiting us."""
+    return error_status_code(exc) == 429 or bool(_error_names(exc) & THROTTLE_ERROR_NAMES)
+
+
+def is_retryable_error(exc: BaseException) -> bool:
+    """
+    Whether a failed provider call is worth retrying.
+
+    Args:
+        exc: Exception raised by the call
+
+    Returns:
+        True for throttling, timeouts, connection failures and transient server errors
+    """
+    if is_throttle_error(exc):
+        return True
+    status = error_status_code(exc)
+    if status is not None:
+        return status in RETRYABLE_STATUS_CODES
+    if isinstance(exc, (TimeoutError, ConnectionError)):
+        return True
+    return bool(_error_names(exc) & TRANSIENT_ERROR_NAMES)
+
+
+def retry_after_seconds(exc: BaseException) -> Optional[float]:
+    """Retry-After delay requested by the provider, if any."""
+    headers = getattr(getattr(exc, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        value = headers.get("retry-after") or headers.get("Retry-After")
+        return float(value) if value is not None else None
+    except (TypeError, ValueError, AttributeError):
+        return None
+
+
+def provider_backoff(min_seconds: float = 2, max_seconds: float = 30):
+    """
+    Tenacity wait strategy: full-jitter exponential backoff, at least Retry-After.
+
+    Args:
+        min_seconds: Minimum wait
+        max_seconds: Maximum jittered wait
+
+    Returns:
+        Callable taking a tenacity RetryCallState
+    """
+    jittered = wait_random_exponential(multiplier=1, min=min_seconds, max=max_seconds)
+
+    def wait(retry_state) -> float:
+        delay = jittered(retry_state)
+        outcome = retry_state.outcome
+        exc = outcome.exception() if outcome is not None else None
+        retry_after = retry_after_seconds(exc) if exc is not None else None
+        if retry_after:
+            delay = max(delay, min(retry_after, MAX_RETRY_AFTER))
+        return delay
+
+    return wait
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket refilled continuously at rate_per_minute.
+
+    Acquisitions reserve tokens immediately (the balance may go negative)
+    and sleep until the reservation is covered, so waiters are served in
+    arrival order without polling. A rate of 0 disables the bucket.
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate_per_second = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate_per_second > 0
+
+    def acquire(self, amount: float = 1.0) -> float:
+        """
+        Take tokens, blocking until they are available.
+
+        Args:
+            amount: Tokens to take (capped at the bucket capacity)
+
+        Returns:
+            Seconds spent waiting
+        """
+        if not self.enabled or amount <= 0:
+            return 0.0
+
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate_per_second)
+            self._updated_at = now
+            self._tokens -= min(amount, self.capacity)
+            wait = -self._tokens / self.rate_per_second if self._tokens < 0 else 0.0
+
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def available(self) -> float:
+        """Tokens currently available (negative while reservations are pending)."""
+        with self._lock:
+            elapsed = time.monotonic() - self._updated_at
+            return min(self.capacity, self._tokens + elapsed * self.rate_per_second)
+
+
+class AdaptiveConcurrencyLimit:
+    """
+    Concurrency limit adjusted by additive increase / multiplicative decrease.
+
+    - each fast success adds 1/limit (about +1 per limit's worth of calls)
+    - a throttled or slower-than-target call multiplies the limit by
+      decrease_factor, at most once per cooldown so one congestion event
+      does not collapse the limit
+    """
+
+    def __init__(
+        self,
+        maximum: int,
+        minimum: int = 1,
+        latency_target: float = 30.0,
+        decrease_factor: float = 0.5,
+        cooldown: float = 1.0
+    ):
+        self.maximum = max(1, maximum)
+        self.minimum = max(1, min(minimum, self.maximum))
+        self.latency_target = latency_target
+        self.decrease_factor = decrease_factor
+        self.cooldown = cooldown
+        self.limit = float(self.maximum)
+        self.in_flight = 0
+        self.decreases = 0
+        self._last_decrease = float("-inf")
+        self._condition = threading.Condition()
+
+    def acquire(self) -> None:
+        """Block until a call slot is free under the current limit."""
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+
+    def release(self) -> None:
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify()
+
+    def on_success(self, latency: float) -> None:
+        """Record a completed call."""
+        if latency > self.latency_target:
+            self.on_congestion()
+            return
+        with self._condition:
+            previous = int(self.limit)
+            self.limit = min(float(self.maximum), self.limit + 1.0 / self.limit)
+            if int(self.limit) > previous:
+                self._condition.notify_all()
+
+    def on_congestion(self) -> None:
+        """Record a throttled or slow call."""
+        with self._condition:
+            now = time.monotonic()
+            if now - self._last_decrease < self.cooldown:
+                return
+            self._last_decrease = now
+            self.limit = max(float(self.minimum), self.limit * self.decrease_factor)
+            self.decreases += 1
+
+
+class ProviderLimiter:
+    """Request/token buckets plus adaptive concurrency for one provider."""
+
+    def __init__(
+        self,
+        name: str,
+        requests_per_minute: float = 0,
+        tokens_per_minute: float = 0,
+        max_concurrency: int = 16,
+        latency_target: float = 30.0
+    ):
+        self.name = name
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.concurrency = AdaptiveConcurrencyLimit(max_concurrency, latency_target=latency_target)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.throttled = 0
+        self.failed = 0
+        self.wait_seconds = 0.0
+
+    @contextmanager
+    def request(self, estimated_tokens: int = 0) -> Iterator[None]:
+        """
+        Run one provider call under the provider's limits.
+
+        Args:
+            estimated_tokens: Prompt plus maximum output tokens for the TPM bucket
+        """
+        waited = self.requests.acquire(1)
+        waited += self.tokens.acquire(estimated_tokens)
+        self.concurrency.acquire()
+        started = time.monotonic()
+        try:
+            yield
+        except BaseException as e:
+            with self._lock:
+                self.calls += 1
+                self.wait_seconds += waited
+                if is_throttle_error(e):
+                    self.throttled += 1
+                else:
+                    self.failed += 1
+            if is_throttle_error(e):
+                logger.warning(f"{self.name} throttled the request; reducing concurrency")
+                self.concurrency.on_congestion()
+            raise
+        else:
+            with self._lock:
+                self.calls += 1
+                self.wait_seconds += waited
+            self.concurrency.on_success(time.monotonic() - started)
+        finally:
+            self.concurrency.release()
+
+    def stats(self) -> Dict[str, Any]:
+        """Limits and call metrics."""
+        with self._lock:
+            return {
+                "requests_per_minute": self.requests.rate_per_second * 60,
+                "tokens_per_minute": self.tokens.rate_per_second * 60,
+                "concurrency_limit": int(self.concurrency.limit),
+                "in_flight": self.concurrency.in_flight,
+                "concurrency_decreases": self.concurrency.decreases,
+                "calls": self.calls,
+                "throttled": self.throttled,
+                "failed": self.failed,
+                "wait_seconds": round(self.wait_seconds, 3),
+            }
+
+
+def estimate_tokens(prompt: str, max_output_tokens: int = 0) -> int:
+    """Rough token estimate (4 characters per token) plus the output budget."""
+    return len(prompt) // 4 + max_output_tokens
+
+
+# Limits per provider: (requests/min setting, tokens/min setting, latency target in seconds)
+_PROVIDERS = {
+    "openai": ("CREATIVE_OPENAI_RPM", "CREATIVE_OPENAI_TPM", 30.0),
+    "openai_image": ("CREATIVE_OPENAI_IMAGE_RPM", None, 90.0),
+    "gemini": ("CREATIVE_GEMINI_RPM", "CREATIVE_GEMINI_TPM", 30.0),
+    "replicate": ("CREATIVE_REPLICATE_RPM", None, 900.0),
+}
+
+_limiters: Dict[str, ProviderLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_provider_limiter(name: str) -> ProviderLimiter:
+    """
+    Get the process-wide limiter for a provider (created from settings on first use).
+
+    Args:
+        name: "openai", "openai_image", "gemini" or "replicate"
+
+    Returns:
+        Shared ProviderLimiter
+    """
+    limiter = _limiters.get(name)
+    if limiter is None:
+        with _limiters_lock:
+            limiter = _limiters.get(name)
+            if limiter is None:
+                rpm_setting, tpm_setting, latency_target = _PROVIDERS[name]
+                limiter = ProviderLimiter(
+                    name,
+                    requests_per_minute=getattr(settings, rpm_setting),
+                    tokens_per_minute=getattr(settings, tpm_setting) if tpm_setting else 0,
+                    max_concurrency=settings.CREATIVE_PROVIDER_MAX_CONCURRENCY,
+                    latency_target=latency_target
+                )
+                _limiters[name] = limiter
+    return limiter
+
+
+def provider_limiter_stats() -> Dict[str, Dict[str, Any]]:
+    """Stats of every provider limiter created so far."""
+    with _limiters_lock:
+        limiters = dict(_limiters)
+    return {name: limiter.stats() for name, limiter in limiters.items()}
+
+
+def reset_provider_limiters() -> None:
+    """Drop all provider limiters (they are recreated from settings on next use)."""
+    with _limiters_lock:
+        _limiters.clear()
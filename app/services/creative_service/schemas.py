@@ -15,6 +15,9 @@ class ABConfig(BaseModel):
     enable_video_generation: bool = Field(default=False, description="Whether to attempt video generation from images via Replicate API")
     enable_storyline_video: bool = Field(default=False, description="Whether to generate multi-segment storyline-based videos (15 seconds)")
     num_video_segments: int = Field(default=3, ge=1, le=10, description="Number of video segments for storyline videos")
+    batch_copy_generation: bool = Field(default=False, description="Whether to generate copy and image descriptions for several creatives per LLM call")
+    copy_batch_size: int = Field(default=5, ge=1, le=20, description="Creatives per batched copy generation call")
+    use_llm_cache: bool = Field(default=True, description="Whether LLM copy/prompt responses may be served from and stored in the response cache")
 
 
 class GenerateCreativesRequest(BaseModel):
@@ -34,3 +37,26 @@ class GenerateCreativesResponse(BaseModel):
         from_attributes=True,  # Pydantic v2: Allow creating from ORM objects
         arbitrary_types_allowed=False
     )
+
+
+class CreativeJobSubmitResponse(BaseModel):
+    """Response to submitting an asynchronous creative generation job."""
+    status: str = Field(..., description="Response status: 'accepted'")
+    job_id: str = Field(..., description="ID to poll the job with")
+    job_status: str = Field(..., description="Job status: 'queued', 'running', 'succeeded' or 'failed'")
+
+
+class CreativeJobStatusResponse(BaseModel):
+    """Status of an asynchronous creative generation job with its creatives so far."""
+    status: str = Field(..., description="Response status: 'success'")
+    job_id: str = Field(..., description="Job ID")
+    job_status: str = Field(..., description="Job status: 'queued', 'running', 'succeeded' or 'failed'")
+    created_at: str = Field(..., description="Job submission time (ISO 8601)")
+    updated_at: str = Field(..., description="Last job update time (ISO 8601)")
+    creatives: List[Creative] = Field(default_factory=list, description="Creatives generated since the requested cursor")
+    creatives_total: int = Field(..., description="Creatives generated so far")
+    next_cursor: int = Field(..., description="Cursor to pass on the next poll to fetch only new creatives")
+    attempt: int = Field(0, description="Run of the job the creatives and next_cursor belong to; pass it with the cursor")
+    cursor_reset: bool = Field(False, description="The job was rerun since the given attempt, so creatives start over from cursor 0")
+    error: Optional[str] = Field(None, description="Error message if the job failed")
+    debug: Optional[Dict] = Field(None, description="Debug information, once the job has finished")
@@ -1,16 +1,26 @@
 """
 File logging configuration for logs service.
 
-Configures JSON-structured rotating file logs.
+Configures JSON-structured rotating file logs. By default records are handed
+to a QueueHandler and formatted and written by a QueueListener thread, so
+request handlers never wait on disk writes or log rotation; the file is
+flushed whenever the queue drains rather than after every record.
+stop_file_logging drains the queue and switches to synchronous writes;
+start_file_logging switches back.
 """
 
+import atexit
+import gzip
 import logging
 import logging.handlers
 import json
 import os
+import queue
+import shutil
+import threading
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
 
 class JSONFormatter(logging.Formatter):
@@ -19,7 +29,8 @@ class JSONFormatter(logging.Formatter):
     def format(self, record: logging.LogRecord) -> str:
         """Format log record as JSON line."""
         log_data = {
-            "timestamp": datetime.utcnow().isoformat(),
+            # Creation time, not write time (records may be written later by the queue listener)
+            "timestamp": datetime.utcfromtimestamp(record.created).isoformat(),
             "level": record.levelname,
             "service": getattr(record, "service", "logs_service"),
             "stage": getattr(record, "stage", "orchestrator"),
@@ -31,48 +42,244 @@ class JSONFormatter(logging.Formatter):
         # Add exception info if present
         if record.exc_info:
             log_data["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            log_data["exception"] = record.exc_text
         
         return json.dumps(log_data, ensure_ascii=False)
 
 
-def setup_file_logging(log_file_path: str = "logs/logs_service.log") -> logging.Logger:
+class BufferedRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """
+    RotatingFileHandler with a large write buffer and deferred flushing.
+    
+    Records are not flushed one by one; flush_buffer() writes the buffer out
+    (the queue listener calls it whenever its queue is empty). Rotated files
+    are optionally gzip-compressed.
+    """
+    
+    def __init__(self, *args, buffer_size: int = 64 * 1024, compress: bool = False, defer_flush: bool = True, **kwargs):
+        self.buffer_size = buffer_size
+        self.defer_flush = defer_flush
+        super().__init__(*args, **kwargs)
+        if compress:
+            self.namer = _gzip_namer
+            self.rotator = _gzip_rotator
+    
+    def _open(self):
+        # The file is opened on the first record (delay=True), so create its directory here
+        Path(self.baseFilename).parent.mkdir(parents=True, exist_ok=True)
+        return open(self.baseFilename, self.mode, buffering=self.buffer_size, encoding=self.encoding, errors=self.errors)
+    
+    def flush(self):
+        # Called after every record by StreamHandler.emit
+        if not self.defer_flush:
+            self.flush_buffer()
+    
+    def flush_buffer(self) -> None:
+        """Write buffered records to the file."""
+        with self.lock:
+            if self.stream and hasattr(self.stream, "flush"):
+                self.stream.flush()
+    
+    def close(self):
+        self.flush_buffer()
+        super().close()
+
+
+def _gzip_namer(name: str) -> str:
+    return name + ".gz"
+
+
+def _gzip_rotator(source: str, dest: str) -> None:
+    with open(source, "rb") as f_in, gzip.open(dest, "wb") as f_out:
+        shutil.copyfileobj(f_in, f_out)
+    os.remove(source)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops (and counts) records when the queue is full instead of blocking."""
+    
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+    
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Resolve the message and traceback now; keep the extra attributes
+        # (service, stage, context, ...) for the JSON formatter
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+    
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class FlushingQueueListener(logging.handlers.QueueListener):
+    """QueueListener that flushes buffered handlers whenever its queue is empty."""
+    
+    def __init__(self, log_queue: queue.Queue, *handlers: logging.Handler):
+        super().__init__(log_queue, *handlers)
+        self.written = 0
+    
+    def dequeue(self, block: bool):
+        if block and self.queue.empty():
+            for handler in self.handlers:
+                if isinstance(handler, BufferedRotatingFileHandler):
+                    handler.flush_buffer()
+        record = self.queue.get(block)
+        if record is not self._sentinel:
+            self.written += 1
+        return record
+    
+    def enqueue_sentinel(self) -> None:
+        # Wait for space instead of failing when the queue is full at shutdown
+        self.queue.put(self._sentinel)
+
+
+# Active queue handler and listener (set by setup_file_logging when queued)
+_queue_handler: Optional[DroppingQueueHandler] = None
+_queue_listener: Optional[FlushingQueueListener] = None
+# File handler and queue size of the queued file logger, kept so the queue
+# can be restarted after stop_file_logging
+_queued_file_handler: Optional[BufferedRotatingFileHandler] = None
+_queue_size = 10000
+_listener_lock = threading.Lock()
+
+FILE_LOGGER_NAME = "logs_service_file"
+
+
+def setup_file_logging(
+    log_file_path: str = "logs/logs_service.log",
+    use_queue: bool = True,
+    queue_size: int = 10000,
+    compress_rotated: bool = False
+) -> logging.Logger:
     """
     Set up rotating file logging with JSON format.
     
     Args:
         log_file_path: Path to log file
+        use_queue: Format and write records on a background listener thread
+        queue_size: Records queued before new ones are dropped (queued mode)
+        compress_rotated: gzip rotated log files
         
     Returns:
         Configured logger instance
     """
-    # Ensure logs directory exists
-    log_dir = Path(log_file_path).parent
-    log_dir.mkdir(parents=True, exist_ok=True)
+    global _queued_file_handler, _queue_size
     
     # Create logger
-    logger = logging.getLogger("logs_service_file")
+    logger = logging.getLogger(FILE_LOGGER_NAME)
     logger.setLevel(logging.INFO)
     
     # Remove existing handlers
-    logger.handlers.clear()
+    stop_file_logging()
+    with _listener_lock:
+        _queued_file_handler = None
+        for old_handler in logger.handlers:
+            old_handler.close()
+        logger.handlers.clear()
     
     # Create rotating file handler
-    handler = logging.handlers.RotatingFileHandler(
+    handler = BufferedRotatingFileHandler(
         filename=log_file_path,
         maxBytes=5 * 1024 * 1024,  # 5MB
         backupCount=3,
-        encoding='utf-8'
+        encoding='utf-8',
+        compress=compress_rotated,
+        defer_flush=use_queue,
+        delay=True
     )
     
     # Set JSON formatter
     handler.setFormatter(JSONFormatter())
     
-    # Add handler to logger
-    logger.addHandler(handler)
+    if not use_queue:
+        logger.addHandler(handler)
+        return logger
+    
+    with _listener_lock:
+        _queued_file_handler = handler
+        _queue_size = max(1, queue_size)
+        _start_queue(logger)
     
     return logger
 
 
+def start_file_logging() -> None:
+    """
+    Restart the listener thread after stop_file_logging (e.g. on a new app startup).
+    
+    No-op when the queue is already running or file logging is not queued.
+    """
+    with _listener_lock:
+        if _queue_listener is None and _queued_file_handler is not None:
+            _start_queue(logging.getLogger(FILE_LOGGER_NAME))
+
+
+def stop_file_logging() -> None:
+    """
+    Write all queued records and stop the listener thread (no-op when not queued).
+    
+    The file handler is attached to the logger directly afterwards, so records
+    logged later (e.g. after app shutdown) are written synchronously instead
+    of piling up in a queue nobody drains.
+    """
+    global _queue_handler, _queue_listener
+    
+    with _listener_lock:
+        listener, _queue_listener = _queue_listener, None
+        queue_handler, _queue_handler = _queue_handler, None
+        if listener is None:
+            return
+        listener.stop()
+        logger = logging.getLogger(FILE_LOGGER_NAME)
+        logger.removeHandler(queue_handler)
+        for handler in listener.handlers:
+            if isinstance(handler, BufferedRotatingFileHandler):
+                handler.defer_flush = False
+                handler.flush_buffer()
+            logger.addHandler(handler)
+
+
+def _start_queue(logger: logging.Logger) -> None:
+    """Route the logger through a new queue and listener thread (lock held)."""
+    global _queue_handler, _queue_listener
+    
+    handler = _queued_file_handler
+    logger.removeHandler(handler)
+    handler.defer_flush = True
+    log_queue: queue.Queue = queue.Queue(maxsize=_queue_size)
+    _queue_handler = DroppingQueueHandler(log_queue)
+    _queue_listener = FlushingQueueListener(log_queue, handler)
+    _queue_listener.start()
+    logger.addHandler(_queue_handler)
+
+
+# Drain queued records at interpreter exit (before logging's own shutdown)
+atexit.register(stop_file_logging)
+
+
+def file_logging_stats() -> Optional[Dict[str, int]]:
+    """Queue depth and drop/write counts of the queued file logger (None when not queued)."""
+    handler, listener = _queue_handler, _queue_listener
+    if handler is None or listener is None:
+        return None
+    return {
+        "queue_depth": handler.queue.qsize(),
+        "queue_capacity": handler.queue.maxsize,
+        "written": listener.written,
+        "dropped": handler.dropped,
+    }
+
+
 def log_event_to_file(
     logger: logging.Logger,
     timestamp: str,
@@ -7,25 +7,51 @@ This service implements real logging infrastructure with:
 - Query and analytics APIs
 """
 
-from fastapi import FastAPI, Query, HTTPException
-from typing import Optional, Union
-from datetime import datetime
+import asyncio
+import json
+import threading
+import uuid
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Query, HTTPException, Request
+from fastapi.responses import JSONResponse
+from pydantic import ValidationError
+from typing import Any, Dict, List, Optional, Tuple, Union
+from datetime import datetime, timedelta
 from app.common.middleware import setup_logging, RequestIDMiddleware, get_cors_middleware_class, get_logger
 from app.common.config import settings
 from app.common.exceptions import register_exception_handlers, ServiceException
 from app.common.schemas import ErrorResponse
 from app.common.db import init_db, is_db_available, create_tables
 
-from .schemas import AppendEventRequest, AppendEventResponse, QueryLogsResponse, AnalyticsResponse
-from .repository import LogEventRepository
-from .logger_config import setup_file_logging, log_event_to_file
+from .schemas import (
+    AppendEventRequest,
+    AppendEventResponse,
+    AppendEventsResponse,
+    QueryLogsResponse,
+    AnalyticsResponse
+)
+from .repository import LogEventRepository, COUNT_MODES, encode_log_cursor, decode_log_cursor
+from .logger_config import (
+    setup_file_logging,
+    start_file_logging,
+    stop_file_logging,
+    log_event_to_file,
+    file_logging_stats
+)
+from .write_buffer import WriteBehindBuffer, BufferFullError
+from .rollups import AnalyticsCounters, ROLLUP_GRANULARITIES, bucket_start, rollup_increments
 
 # Configure unified logging
 setup_logging()
 logger = get_logger(__name__)
 
 # Set up file logging
-file_logger = setup_file_logging()
+file_logger = setup_file_logging(
+    log_file_path=settings.LOGS_FILE_PATH,
+    use_queue=settings.LOGS_FILE_QUEUE_ENABLED,
+    queue_size=settings.LOGS_FILE_QUEUE_SIZE,
+    compress_rotated=settings.LOGS_FILE_COMPRESS_ROTATED
+)
 
 # Initialize database connection (if available)
 db_available = init_db()
@@ -36,11 +62,107 @@ if db_available:
 else:
     logger.info("Database not available, using file-only logging")
 
+# Write-behind buffer for database inserts (created on first use)
+_event_writer: Optional[WriteBehindBuffer] = None
+_event_writer_lock = threading.Lock()
+
+# /analytics counts, kept current by every write (reconciled on first use)
+_analytics_counters = AnalyticsCounters()
+# Background reconciliations in flight (referenced so they are not garbage collected)
+_reconcile_tasks: set = set()
+
+
+def _record_persisted_events(events: List[Dict[str, Any]]) -> None:
+    """
+    Count events just written to the database in the /analytics counters and rollups.
+    
+    Rollup failures are logged, not raised: the events are already stored,
+    and the next reconciliation does not depend on rollups.
+    """
+    _analytics_counters.record(events)
+    if settings.LOGS_ANALYTICS_ROLLUPS_ENABLED:
+        try:
+            LogEventRepository.increment_rollups(rollup_increments(events))
+        except Exception as e:
+            logger.error(f"Failed to update analytics rollups for {len(events)} events: {e}")
+
+
+def _write_event(event: Dict[str, Any]) -> Optional[str]:
+    """Insert one log event and count it for /analytics."""
+    with _analytics_counters.writing():
+        event_id = LogEventRepository.create_log_event(**event)
+        if event_id:
+            _record_persisted_events([event])
+    return event_id
+
+
+def _write_event_batch(events: List[Dict[str, Any]]) -> int:
+    """Insert log events in one transaction and count them for /analytics."""
+    with _analytics_counters.writing():
+        written = LogEventRepository.bulk_create_log_events(events)
+        if written:
+            _record_persisted_events(events)
+    return written
+
+
+def _get_event_writer() -> WriteBehindBuffer:
+    """Get the write-behind buffer that batches log event inserts."""
+    global _event_writer
+    
+    if _event_writer is None:
+        with _event_writer_lock:
+            if _event_writer is None:
+                _event_writer = WriteBehindBuffer(
+                    _write_event_batch,
+                    max_batch_size=settings.LOGS_WRITE_BATCH_SIZE,
+                    flush_interval=settings.LOGS_WRITE_FLUSH_INTERVAL,
+                    max_pending=settings.LOGS_WRITE_BUFFER_MAX_EVENTS,
+                    name="log-event-writer"
+                )
+    return _event_writer
+
+
+def _close_event_writer() -> None:
+    """Write all buffered events and stop the writer thread."""
+    global _event_writer
+    
+    with _event_writer_lock:
+        writer, _event_writer = _event_writer, None
+    if writer is not None:
+        # Bounded so shutdown does not hang while the database is unreachable
+        writer.close(timeout=settings.LOGS_WRITE_ENQUEUE_TIMEOUT)
+        logger.info(f"Log event writer stopped: {writer.stats()}")
+
+
+async def _flush_event_writer() -> None:
+    """
+    Write buffered events before a consistent read (?consistent=true).
+    
+    Reads are otherwise eventually consistent: an acknowledged event becomes
+    visible once its batch is written, within about LOGS_WRITE_FLUSH_INTERVAL.
+    """
+    writer = _event_writer
+    if writer is not None and writer.pending():
+        await asyncio.to_thread(writer.flush, settings.LOGS_WRITE_ENQUEUE_TIMEOUT)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start the log file writer, and flush buffered log events to the database and the log file at shutdown."""
+    start_file_logging()
+    try:
+        yield
+    finally:
+        _close_event_writer()
+        stop_file_logging()
+
+
 # Initialize FastAPI app
 app = FastAPI(
     title="Logs Service",
     description="MCP microservice for event logging and auditing",
-    version="2.0.0"
+    version="2.0.0",
+    lifespan=lifespan
 )
 
 # Add middleware
@@ -58,17 +180,91 @@ async def health_check():
     return {
         "status": "healthy",
         "service": "logs_service",
-        "data_source": "database" if is_db_available() else "file_only"
+        "data_source": "database" if is_db_available() else "file_only",
+        "write_buffer": _event_writer.stats() if _event_writer is not None else None,
+        "analytics": _analytics_counters.stats(),
+        "file_log": file_logging_stats()
     }
 
 
+def _build_log_event(request: AppendEventRequest) -> Dict[str, Any]:
+    """
+    Convert an event request to log_events column values.
+    
+    Args:
+        request: Event data to log (LogEvent format)
+        
+    Returns:
+        Column values (timestamp, stage, service, level, message, context,
+        correlation_id, success)
+    """
+    # Parse timestamp
+    try:
+        event_timestamp = datetime.fromisoformat(request.timestamp.replace('Z', '+00:00'))
+    except (ValueError, AttributeError):
+        event_timestamp = datetime.utcnow()
+        logger.warning(f"Invalid timestamp format, using current time: {request.timestamp}")
+    
+    # Determine log level from success flag
+    level = "INFO" if request.success else "ERROR"
+    
+    # Merge context (request, response, metadata)
+    context = {}
+    if request.request:
+        context["request"] = request.request
+    if request.response:
+        context["response"] = request.response
+    if request.metadata:
+        context["metadata"] = request.metadata
+    
+    # Extract message from context or use default
+    message = "Event logged"
+    if request.metadata and "message" in request.metadata:
+        message = request.metadata["message"]
+    elif request.response and "message" in request.response:
+        message = request.response["message"]
+    
+    # Extract correlation_id from metadata if present
+    correlation_id = None
+    if request.metadata and "correlation_id" in request.metadata:
+        correlation_id = request.metadata["correlation_id"]
+    elif request.metadata and "request_id" in request.metadata:
+        correlation_id = request.metadata["request_id"]
+    
+    return {
+        "timestamp": event_timestamp,
+        "stage": request.stage,
+        "service": request.service,
+        "level": level,
+        "message": message,
+        "context": context,
+        "correlation_id": correlation_id,
+        "success": request.success
+    }
+
+
+def _log_event_to_file(request: AppendEventRequest, event: Dict[str, Any]) -> None:
+    """Write an event to the rotating JSON log file."""
+    log_event_to_file(
+        logger=file_logger,
+        timestamp=request.timestamp,
+        stage=event["stage"],
+        service=event["service"],
+        level=event["level"],
+        message=event["message"],
+        context=event["context"],
+        correlation_id=event["correlation_id"]
+    )
+
+
 @app.post("/append_event", response_model=Union[AppendEventResponse, ErrorResponse])
 async def append_event(request: AppendEventRequest) -> Union[AppendEventResponse, ErrorResponse]:
     """
     Append an event to the logs.
     
     This endpoint:
-    1. Writes to database (if available)
+    1. Writes to database (if available), through the write-behind buffer
+       unless LOGS_WRITE_BUFFER_ENABLED is off
     2. Writes to rotating log file (JSON format)
     3. Returns event ID
     
@@ -79,64 +275,28 @@ async def append_event(request: AppendEventRequest) -> Union[AppendEventResponse
         Event ID and status
     """
     try:
-        # Parse timestamp
-        try:
-            event_timestamp = datetime.fromisoformat(request.timestamp.replace('Z', '+00:00'))
-        except (ValueError, AttributeError):
-            event_timestamp = datetime.utcnow()
-            logger.warning(f"Invalid timestamp format, using current time: {request.timestamp}")
-        
-        # Determine log level from success flag
-        level = "INFO" if request.success else "ERROR"
-        
-        # Merge context (request, response, metadata)
-        context = {}
-        if request.request:
-            context["request"] = request.request
-        if request.response:
-            context["response"] = request.response
-        if request.metadata:
-            context["metadata"] = request.metadata
-        
-        # Extract message from context or use default
-        message = "Event logged"
-        if request.metadata and "message" in request.metadata:
-            message = request.metadata["message"]
-        elif request.response and "message" in request.response:
-            message = request.response["message"]
-        
-        # Extract correlation_id from metadata if present
-        correlation_id = None
-        if request.metadata and "correlation_id" in request.metadata:
-            correlation_id = request.metadata["correlation_id"]
-        elif request.metadata and "request_id" in request.metadata:
-            correlation_id = request.metadata["request_id"]
+        event = _build_log_event(request)
         
         # Write to database
         event_id = None
         if is_db_available():
-            event_id = LogEventRepository.create_log_event(
-                timestamp=event_timestamp,
-                stage=request.stage,
-                service=request.service,
-                level=level,
-                message=message,
-                context=context,
-                correlation_id=correlation_id,
-                success=request.success
-            )
+            if settings.LOGS_WRITE_BUFFER_ENABLED:
+                try:
+                    event_id = await _enqueue_event(event)
+                except BufferFullError as e:
+                    logger.warning(f"Log event rejected: {e}")
+                    return ErrorResponse(
+                        status="error",
+                        error_code="LOG_BUFFER_FULL",
+                        message="Log event buffer is full, retry later",
+                        details={"pending_events": _get_event_writer().pending()}
+                    )
+            else:
+                # Off the event loop: the write waits while an analytics recount runs
+                event_id = await asyncio.to_thread(_write_event, event)
         
         # Write to file
-        log_event_to_file(
-            logger=file_logger,
-            timestamp=request.timestamp,
-            stage=request.stage,
-            service=request.service,
-            level=level,
-            message=message,
-            context=context,
-            correlation_id=correlation_id
-        )
+        _log_event_to_file(request, event)
         
         logger.info(
             f"Logged event: stage={request.stage}, service={request.service}, "
@@ -158,6 +318,210 @@ async def append_event(request: AppendEventRequest) -> Union[AppendEventResponse
         )
 
 
+class _BatchTooLarge(Exception):
+    """More events than LOGS_BULK_MAX_EVENTS in an /append_events body."""
+
+
+class _PayloadTooLarge(Exception):
+    """An /append_events body or NDJSON line above its byte limit."""
+    
+    def __init__(self, what: str, limit: int):
+        super().__init__(f"{what} exceeds {limit} bytes")
+        self.what = what
+        self.limit = limit
+
+
+async def _read_event_payloads(http_request: Request) -> List[Any]:
+    """
+    Read the raw events of an /append_events body.
+    
+    NDJSON bodies (application/x-ndjson) are split into lines while they
+    stream in; other bodies must be a JSON array of events. Reading stops as
+    soon as the body passes LOGS_BULK_MAX_BODY_BYTES or an NDJSON line passes
+    LOGS_BULK_MAX_LINE_BYTES.
+    
+    Returns:
+        One JSON line (bytes) per event for NDJSON, or the decoded array items
+        
+    Raises:
+        ValueError: If a JSON body is not a JSON array
+        _BatchTooLarge: If the body holds more than LOGS_BULK_MAX_EVENTS events
+        _PayloadTooLarge: If the body or a line is above its byte limit
+    """
+    max_events = settings.LOGS_BULK_MAX_EVENTS
+    max_body = settings.LOGS_BULK_MAX_BODY_BYTES
+    max_line = settings.LOGS_BULK_MAX_LINE_BYTES
+    content_type = http_request.headers.get("content-type", "")
+    
+    content_length = http_request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > max_body:
+        raise _PayloadTooLarge("body", max_body)
+    
+    if "ndjson" in content_type or "jsonlines" in content_type:
+        lines: List[bytes] = []
+        pending = bytearray()
+        received = 0
+        async for chunk in http_request.stream():
+            received += len(chunk)
+            if received > max_body:
+                raise _PayloadTooLarge("body", max_body)
+            # Only the new chunk is searched; the unfinished line is kept in place
+            search_from = len(pending)
+            pending += chunk
+            line_start = 0
+            while True:
+                newline = pending.find(b"\n", search_from)
+                if newline == -1:
+                    break
+                if newline - line_start > max_line:
+                    raise _PayloadTooLarge("line", max_line)
+                line = bytes(pending[line_start:newline])
+                if line.strip():
+                    lines.append(line)
+                line_start = search_from = newline + 1
+            del pending[:line_start]
+            if len(pending) > max_line:
+                raise _PayloadTooLarge("line", max_line)
+            if len(lines) > max_events:
+                raise _BatchTooLarge(len(lines))
+        if pending.strip():
+            lines.append(bytes(pending))
+        if len(lines) > max_events:
+            raise _BatchTooLarge(len(lines))
+        return lines
+    
+    body = bytearray()
+    async for chunk in http_request.stream():
+        body += chunk
+        if len(body) > max_body:
+            raise _PayloadTooLarge("body", max_body)
+    payload = json.loads(body)
+    if not isinstance(payload, list):
+        raise ValueError("Body must be a JSON array of events or NDJSON")
+    if len(payload) > max_events:
+        raise _BatchTooLarge(len(payload))
+    return payload
+
+
+@app.post("/append_events", response_model=Union[AppendEventsResponse, ErrorResponse])
+async def append_events(http_request: Request) -> Union[AppendEventsResponse, ErrorResponse]:
+    """
+    Append a batch of events in one call.
+    
+    Accepts a JSON array of events or NDJSON (Content-Type: application/x-ndjson,
+    one event per line), in the /append_event format. Every event is validated;
+    valid events are written to the database in one transaction and to the
+    log file, invalid ones get an ErrorResponse in their slot.
+    
+    Args:
+        http_request: Request with the JSON array or NDJSON body
+        
+    Returns:
+        Per-event results in request order, or ErrorResponse if the body is
+        unreadable, too large (HTTP 413 above the byte limits), or the
+        database write fails
+    """
+    try:
+        try:
+            payloads = await _read_event_payloads(http_request)
+        except _PayloadTooLarge as e:
+            return JSONResponse(
+                status_code=413,
+                content=ErrorResponse(
+                    status="error",
+                    error_code="PAYLOAD_TOO_LARGE",
+                    message=f"Event batch {e.what} is larger than {e.limit} bytes",
+                    details={"exceeded": e.what, "max_bytes": e.limit}
+                ).model_dump()
+            )
+        except _BatchTooLarge as e:
+            return ErrorResponse(
+                status="error",
+                error_code="BATCH_TOO_LARGE",
+                message=f"At most {settings.LOGS_BULK_MAX_EVENTS} events per batch",
+                details={"count": e.args[0], "max": settings.LOGS_BULK_MAX_EVENTS}
+            )
+        except ValueError as e:
+            return ErrorResponse(
+                status="error",
+                error_code="INVALID_JSON",
+                message=f"Invalid event batch: {str(e)}",
+                details={}
+            )
+        
+        results: List[Union[AppendEventResponse, ErrorResponse]] = []
+        valid = []
+        for index, payload in enumerate(payloads):
+            try:
+                if isinstance(payload, bytes):
+                    request = AppendEventRequest.model_validate_json(payload)
+                else:
+                    request = AppendEventRequest.model_validate(payload)
+            except ValidationError as e:
+                results.append(ErrorResponse(
+                    status="error",
+                    error_code="VALIDATION_ERROR",
+                    message=f"Invalid event at index {index}",
+                    details={"index": index, "errors": json.loads(e.json(include_url=False))}
+                ))
+                continue
+            
+            event = _build_log_event(request)
+            if is_db_available():
+                event["id"] = uuid.uuid4()
+            valid.append((request, event))
+            results.append(AppendEventResponse(
+                status="success",
+                event_id=str(event["id"]) if "id" in event else request.event_id
+            ))
+        
+        # Write to database: one transaction for the whole batch
+        if valid and is_db_available():
+            await asyncio.to_thread(_write_event_batch, [event for _, event in valid])
+        
+        # Write to file
+        for request, event in valid:
+            _log_event_to_file(request, event)
+        
+        logger.info(f"Logged {len(valid)} events in batch ({len(payloads) - len(valid)} rejected)")
+        
+        return AppendEventsResponse(
+            status="success",
+            accepted=len(valid),
+            rejected=len(payloads) - len(valid),
+            results=results
+        )
+        
+    except Exception as e:
+        logger.error(f"Error appending events: {e}", exc_info=True)
+        return ErrorResponse(
+            status="error",
+            error_code="LOG_APPEND_FAILED",
+            message=f"Failed to append log events: {str(e)}",
+            details={"error_type": type(e).__name__}
+        )
+
+
+async def _enqueue_event(event: Dict[str, Any]) -> str:
+    """
+    Queue a log event for a batched insert and return its ID.
+    
+    When the buffer is full the wait for space runs in a worker thread, so
+    the event loop keeps serving other requests.
+    
+    Raises:
+        BufferFullError: If no space freed up within LOGS_WRITE_ENQUEUE_TIMEOUT
+    """
+    event_id = uuid.uuid4()
+    row = {"id": event_id, **event}
+    writer = _get_event_writer()
+    try:
+        writer.submit(row)
+    except BufferFullError:
+        await asyncio.to_thread(writer.submit, row, settings.LOGS_WRITE_ENQUEUE_TIMEOUT)
+    return str(event_id)
+
+
 @app.get("/logs", response_model=Union[QueryLogsResponse, ErrorResponse])
 async def query_logs(
     stage: Optional[str] = Query(None, description="Filter by workflow stage"),
@@ -167,7 +531,10 @@ async def query_logs(
     start_time: Optional[str] = Query(None, description="Start time (ISO format)"),
     end_time: Optional[str] = Query(None, description="End time (ISO format)"),
     limit: int = Query(100, ge=1, le=1000, description="Maximum number of results"),
-    offset: int = Query(0, ge=0, description="Offset for pagination")
+    offset: int = Query(0, ge=0, description="Offset for pagination (ignored with a cursor)"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page (keyset pagination)"),
+    count: Optional[str] = Query(None, description="Total count mode: exact, capped, estimate or none"),
+    consistent: bool = Query(False, description="Write buffered events first so every acknowledged event is included")
 ) -> Union[QueryLogsResponse, ErrorResponse]:
     """
     Query log events with filters.
@@ -179,7 +546,12 @@ async def query_logs(
     - level: Log level (INFO, ERROR, WARNING)
     - start_time/end_time: Time range (ISO format)
     
-    Returns paginated results.
+    Returns paginated results, newest first. Pass pagination.next_cursor as
+    cursor to fetch the next page; unlike offset this stays fast at any depth.
+    Events still in the write-behind buffer are only included with
+    consistent=true.
+    count trades total accuracy for speed on large tables (default:
+    LOGS_QUERY_COUNT_MODE).
     """
     try:
         # Parse time filters
@@ -208,8 +580,31 @@ async def query_logs(
                     details={}
                 )
         
+        keyset = None
+        if cursor:
+            try:
+                keyset = decode_log_cursor(cursor)
+            except ValueError:
+                return ErrorResponse(
+                    status="error",
+                    error_code="INVALID_CURSOR",
+                    message=f"Invalid cursor: {cursor}",
+                    details={}
+                )
+        
+        count_mode = count or settings.LOGS_QUERY_COUNT_MODE
+        if count_mode not in COUNT_MODES:
+            return ErrorResponse(
+                status="error",
+                error_code="INVALID_COUNT_MODE",
+                message=f"Invalid count mode: {count_mode}",
+                details={"allowed": list(COUNT_MODES)}
+            )
+        
         # Query logs
-        logs, total_count = LogEventRepository.query_logs(
+        if consistent:
+            await _flush_event_writer()
+        page = LogEventRepository.query_logs(
             stage=stage,
             service=service,
             correlation_id=correlation_id,
@@ -217,11 +612,15 @@ async def query_logs(
             start_time=start_dt,
             end_time=end_dt,
             limit=limit,
-            offset=offset
+            offset=offset,
+            cursor=keyset,
+            count_mode=count_mode,
+            count_cap=settings.LOGS_QUERY_COUNT_CAP
         )
+        logs = page["logs"]
         
         logger.info(
-            f"Queried logs: {len(logs)} results (total: {total_count}), "
+            f"Queried logs: {len(logs)} results (total: {page['total']}, count: {count_mode}), "
             f"filters: stage={stage}, service={service}, correlation_id={correlation_id}"
         )
         
@@ -230,9 +629,12 @@ async def query_logs(
             logs=logs,
             pagination={
                 "limit": limit,
-                "offset": offset,
+                "offset": 0 if keyset else offset,
                 "returned": len(logs),
-                "total": total_count
+                "total": page["total"],
+                "total_is_exact": page["total_is_exact"],
+                "has_more": page["has_more"],
+                "next_cursor": encode_log_cursor(page["next_cursor"]) if page["next_cursor"] else None
             }
         )
         
@@ -246,8 +648,77 @@ async def query_logs(
         )
 
 
+def _load_analytics_counts() -> Dict[str, Dict[str, int]]:
+    """Recount events for counter reconciliation, pruning expired minute rollups first."""
+    if settings.LOGS_ANALYTICS_ROLLUPS_ENABLED:
+        retention = timedelta(hours=settings.LOGS_ANALYTICS_MINUTE_ROLLUP_RETENTION_HOURS)
+        try:
+            LogEventRepository.prune_rollups("minute", datetime.utcnow() - retention)
+        except Exception as e:
+            logger.error(f"Failed to prune minute rollups: {e}")
+    return LogEventRepository.count_events()
+
+
+async def _current_analytics() -> Dict[str, Dict[str, int]]:
+    """
+    Event counts from the in-memory counters.
+    
+    The first call loads them from the database; once they are older than
+    LOGS_ANALYTICS_RECONCILE_INTERVAL, the current counts are returned while
+    a background task recounts.
+    """
+    age = _analytics_counters.age()
+    if age is None:
+        await asyncio.to_thread(_analytics_counters.reconcile, _load_analytics_counts)
+    elif age >= settings.LOGS_ANALYTICS_RECONCILE_INTERVAL and not _analytics_counters.reconciling:
+        task = asyncio.create_task(asyncio.to_thread(_analytics_counters.reconcile, _load_analytics_counts))
+        _reconcile_tasks.add(task)
+        task.add_done_callback(_reconcile_tasks.discard)
+    return _analytics_counters.snapshot()
+
+
+def _windowed_analytics(window_minutes: int) -> Tuple[Dict[str, Dict[str, int]], Dict[str, Any]]:
+    """
+    Event counts for the last window_minutes minutes.
+    
+    With rollups the window is aligned to buckets: the current (partial)
+    bucket plus the whole buckets before it. Hour buckets are used when the
+    window is a whole number of hours or reaches past the minute rollup
+    retention. Without rollups the events are counted directly.
+    
+    Args:
+        window_minutes: Window length in minutes
+        
+    Returns:
+        Tuple of (counts, window metadata)
+    """
+    now = datetime.utcnow()
+    if not settings.LOGS_ANALYTICS_ROLLUPS_ENABLED:
+        start = now - timedelta(minutes=window_minutes)
+        window = {"minutes": window_minutes, "start": start.isoformat(), "source": "database"}
+        return LogEventRepository.count_events(start_time=start), window
+    
+    retention_minutes = settings.LOGS_ANALYTICS_MINUTE_ROLLUP_RETENTION_HOURS * 60
+    granularity = "minute"
+    if window_minutes % 60 == 0 or window_minutes > retention_minutes:
+        granularity = "hour"
+    size = ROLLUP_GRANULARITIES[granularity]
+    buckets = -(-timedelta(minutes=window_minutes) // size)
+    start = bucket_start(now, granularity) - size * (buckets - 1)
+    window = {
+        "minutes": window_minutes,
+        "start": start.isoformat(),
+        "source": "rollups",
+        "granularity": granularity
+    }
+    return LogEventRepository.sum_rollups(granularity, start), window
+
+
 @app.get("/analytics", response_model=Union[AnalyticsResponse, ErrorResponse])
-async def get_analytics() -> Union[AnalyticsResponse, ErrorResponse]:
+async def get_analytics(
+    window_minutes: Optional[int] = Query(None, ge=1, description="Only count events from the last N minutes"),
+    consistent: bool = Query(False, description="Write buffered events first so every acknowledged event is counted")
+) -> Union[AnalyticsResponse, ErrorResponse]:
     """
     Get aggregated analytics from log events.
     
@@ -255,17 +726,34 @@ async def get_analytics() -> Union[AnalyticsResponse, ErrorResponse]:
     - stage: Number of logs per workflow stage
     - service: Number of logs per service
     - levels: Number of logs per log level (INFO, ERROR, WARNING)
+    
+    All-time counts come from in-memory counters (see
+    LOGS_ANALYTICS_RECONCILE_INTERVAL) instead of a table scan. window_minutes
+    counts recent events from rollups when LOGS_ANALYTICS_ROLLUPS_ENABLED is on.
+    Events still in the write-behind buffer are only counted with
+    consistent=true.
     """
     try:
-        analytics = LogEventRepository.get_analytics()
+        if consistent:
+            await _flush_event_writer()
+        window = None
+        if window_minutes:
+            analytics, window = await asyncio.to_thread(_windowed_analytics, window_minutes)
+        elif settings.LOGS_ANALYTICS_RECONCILE_INTERVAL > 0:
+            analytics = await _current_analytics()
+        else:
+            analytics = await asyncio.to_thread(LogEventRepository.get_analytics)
         
-        logger.info(f"Generated analytics: {sum(analytics['levels'].values())} total logs")
+        total = sum(analytics["levels"].values())
+        logger.info(f"Generated analytics: {total} total logs")
         
         return AnalyticsResponse(
             status="success",
             by_stage=analytics["by_stage"],
             by_service=analytics["by_service"],
-            levels=analytics["levels"]
+            levels=analytics["levels"],
+            total=total,
+            window=window
         )
         
     except Exception as e:
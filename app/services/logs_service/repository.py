@@ -4,7 +4,10 @@ Repository for log event persistence.
 Handles database operations for log events.
 """
 
-from typing import List, Optional, Dict, Any
+import base64
+import json
+import uuid
+from typing import List, Optional, Dict, Any, Tuple
 from datetime import datetime
 from app.common.db import get_db_session, is_db_available, SQLALCHEMY_AVAILABLE
 from app.common.middleware import get_logger
@@ -14,14 +17,60 @@ logger = get_logger(__name__)
 # Try to import SQLAlchemy (optional dependency)
 if SQLALCHEMY_AVAILABLE:
     try:
-        from sqlalchemy import and_, func
-        from app.common.models import LogEventORM
+        from sqlalchemy import and_, func, insert, text, tuple_
+        from sqlalchemy.dialects import postgresql, sqlite
+        from app.common.models import LogEventORM, LogEventRollupORM
     except ImportError:
         LogEventORM = None
+        LogEventRollupORM = None
         func = None
+        insert = None
 else:
     LogEventORM = None
+    LogEventRollupORM = None
     func = None
+    insert = None
+
+# Ways /logs can count matching events: exact (COUNT over every match),
+# capped (stops at a cap), estimate (planner statistics when unfiltered,
+# otherwise capped) and none (skip counting)
+COUNT_MODES = ("exact", "capped", "estimate", "none")
+
+
+def encode_log_cursor(cursor: Tuple[datetime, str]) -> str:
+    """
+    Encode a (timestamp, id) keyset position as an opaque page cursor.
+    
+    Args:
+        cursor: Timestamp and id of the last event of a page
+        
+    Returns:
+        URL-safe cursor string
+    """
+    timestamp, event_id = cursor
+    raw = json.dumps({"ts": timestamp.isoformat(), "id": str(event_id)}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_log_cursor(value: str) -> Tuple[datetime, str]:
+    """
+    Decode a cursor produced by encode_log_cursor.
+    
+    Args:
+        value: Cursor string
+        
+    Returns:
+        Tuple of (timestamp, id)
+        
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(value + "=" * (-len(value) % 4))
+        data = json.loads(raw)
+        return datetime.fromisoformat(data["ts"]), str(uuid.UUID(data["id"]))
+    except (ValueError, TypeError, KeyError) as e:
+        raise ValueError(f"Invalid cursor: {value}") from e
 
 
 class LogEventRepository:
@@ -86,6 +135,38 @@ class LogEventRepository:
             logger.error(f"Error creating log event in database: {e}", exc_info=True)
             return None
     
+    @staticmethod
+    def bulk_create_log_events(events: List[Dict[str, Any]]) -> int:
+        """
+        Insert many log events in one transaction (a single executemany).
+        
+        Args:
+            events: Column values per event (id, timestamp, stage, service, level,
+                message, context, correlation_id, success)
+            
+        Returns:
+            Number of events inserted (0 if the database is not available)
+            
+        Raises:
+            Exception: Database errors, so the caller can retry the batch
+        """
+        if not events:
+            return 0
+        
+        if not is_db_available() or not SQLALCHEMY_AVAILABLE or LogEventORM is None or insert is None:
+            logger.warning(f"Database not available, skipping persistence of {len(events)} log events")
+            return 0
+        
+        with get_db_session() as db:
+            if db is None:
+                return 0
+            
+            db.execute(insert(LogEventORM), events)
+            db.commit()
+        
+        logger.debug(f"Inserted {len(events)} log events in database")
+        return len(events)
+    
     @staticmethod
     def query_logs(
         stage: Optional[str] = None,
@@ -95,10 +176,18 @@ class LogEventRepository:
         start_time: Optional[datetime] = None,
         end_time: Optional[datetime] = None,
         limit: int = 100,
-        offset: int = 0
-    ) -> tuple[List[Dict[str, Any]], int]:
+        offset: int = 0,
+        cursor: Optional[Tuple[datetime, str]] = None,
+        count_mode: str = "exact",
+        count_cap: int = 10000
+    ) -> Dict[str, Any]:
         """
-        Query log events with filters.
+        Query a page of log events with filters, newest first.
+        
+        Pages are ordered by (timestamp, id) descending. Passing the cursor of
+        the previous page's last event (keyset pagination) seeks straight to
+        the next page through the timestamp index, however deep it is; offset
+        is only applied when no cursor is given.
         
         Args:
             stage: Filter by stage
@@ -108,19 +197,25 @@ class LogEventRepository:
             start_time: Filter by start time
             end_time: Filter by end time
             limit: Maximum number of results
-            offset: Offset for pagination
+            offset: Offset for pagination (ignored with a cursor)
+            cursor: (timestamp, id) of the last event of the previous page
+            count_mode: How to count matching events (see COUNT_MODES)
+            count_cap: Most rows counted in "capped" mode
             
         Returns:
-            Tuple of (list of log events as dicts, total count)
+            Dict with logs (list of log events as dicts), total (None in "none"
+            mode), total_is_exact, has_more and next_cursor ((timestamp, id) of
+            the last returned event, None on the last page)
         """
+        page = {"logs": [], "total": 0, "total_is_exact": True, "has_more": False, "next_cursor": None}
         if not is_db_available() or not SQLALCHEMY_AVAILABLE or LogEventORM is None:
             logger.warning("Database not available, returning empty results")
-            return [], 0
+            return page
         
         try:
             with get_db_session() as db:
                 if db is None:
-                    return [], 0
+                    return page
                 
                 # Build query with filters
                 query = db.query(LogEventORM)
@@ -143,15 +238,26 @@ class LogEventRepository:
                 if end_time:
                     query = query.filter(LogEventORM.timestamp <= end_time)
                 
-                # Get total count
-                total_count = query.count()
+                # Count matching events (before the cursor narrows the query)
+                filtered = any((stage, service, correlation_id, level, start_time, end_time))
+                total_count, total_is_exact = LogEventRepository._count_logs(
+                    db, query, count_mode, count_cap, filtered
+                )
                 
-                # Apply pagination
-                query = query.order_by(LogEventORM.timestamp.desc())
-                query = query.limit(limit).offset(offset)
+                # Apply pagination; id breaks timestamp ties so pages never overlap
+                if cursor is not None:
+                    cursor_ts, cursor_id = cursor
+                    query = query.filter(
+                        tuple_(LogEventORM.timestamp, LogEventORM.id) < tuple_(cursor_ts, uuid.UUID(str(cursor_id)))
+                    )
+                query = query.order_by(LogEventORM.timestamp.desc(), LogEventORM.id.desc())
+                if cursor is None and offset:
+                    query = query.offset(offset)
                 
-                # Execute query
-                log_events = query.all()
+                # Execute query, fetching one extra row to learn whether another page follows
+                log_events = query.limit(limit + 1).all()
+                has_more = len(log_events) > limit
+                log_events = log_events[:limit]
                 
                 # Convert to dicts
                 results = []
@@ -168,12 +274,56 @@ class LogEventRepository:
                         "success": event.success
                     })
                 
-                logger.debug(f"Queried {len(results)} log events (total: {total_count})")
-                return results, total_count
+                logger.debug(f"Queried {len(results)} log events (total: {total_count}, mode: {count_mode})")
+                return {
+                    "logs": results,
+                    "total": total_count,
+                    "total_is_exact": total_is_exact,
+                    "has_more": has_more,
+                    "next_cursor": (log_events[-1].timestamp, str(log_events[-1].id)) if has_more else None
+                }
                 
         except Exception as e:
             logger.error(f"Error querying log events: {e}", exc_info=True)
-            return [], 0
+            return page
+    
+    @staticmethod
+    def _count_logs(db, query, count_mode: str, count_cap: int, filtered: bool) -> Tuple[Optional[int], bool]:
+        """
+        Count the events matched by query.
+        
+        Args:
+            db: Database session
+            query: Filtered log event query
+            count_mode: "exact", "capped", "estimate" or "none"
+            count_cap: Most rows counted in "capped" mode
+            filtered: Whether query has any filters
+            
+        Returns:
+            Tuple of (count or None, whether the count is exact)
+        """
+        if count_mode == "none":
+            return None, False
+        
+        if count_mode == "exact":
+            return query.count(), True
+        
+        if count_mode == "estimate" and not filtered and db.get_bind().dialect.name == "postgresql":
+            # Planner statistics (kept current by autovacuum) instead of a scan;
+            # -1 means the table was never analyzed
+            estimate = db.execute(
+                text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:table)"),
+                {"table": LogEventORM.__tablename__}
+            ).scalar()
+            if estimate is not None and estimate >= 0:
+                return int(estimate), False
+        
+        # Capped: stop counting after count_cap + 1 matching rows
+        capped = query.with_entities(LogEventORM.id).limit(count_cap + 1).subquery()
+        count = db.query(func.count()).select_from(capped).scalar()
+        if count > count_cap:
+            return count_cap, False
+        return count, True
     
     @staticmethod
     def get_analytics() -> Dict[str, Dict[str, int]]:
@@ -183,55 +333,13 @@ class LogEventRepository:
         Returns:
             Dictionary with by_stage, by_service, and levels counts
         """
-        if not is_db_available() or not SQLALCHEMY_AVAILABLE or LogEventORM is None or func is None:
-            logger.warning("Database not available, returning empty analytics")
-            return {
-                "by_stage": {},
-                "by_service": {},
-                "levels": {}
-            }
-        
         try:
-            with get_db_session() as db:
-                if db is None:
-                    return {
-                        "by_stage": {},
-                        "by_service": {},
-                        "levels": {}
-                    }
-                
-                # Count by stage
-                stage_counts = db.query(
-                    LogEventORM.stage,
-                    func.count(LogEventORM.id)
-                ).group_by(LogEventORM.stage).all()
-                
-                by_stage = {stage: count for stage, count in stage_counts}
-                
-                # Count by service
-                service_counts = db.query(
-                    LogEventORM.service,
-                    func.count(LogEventORM.id)
-                ).group_by(LogEventORM.service).all()
-                
-                by_service = {service: count for service, count in service_counts}
-                
-                # Count by level
-                level_counts = db.query(
-                    LogEventORM.level,
-                    func.count(LogEventORM.id)
-                ).group_by(LogEventORM.level).all()
-                
-                levels = {level: count for level, count in level_counts}
-                
-                logger.debug(f"Generated analytics: {len(by_stage)} stages, {len(by_service)} services, {len(levels)} levels")
-                
-                return {
-                    "by_stage": by_stage,
-                    "by_service": by_service,
-                    "levels": levels
-                }
-                
+            analytics = LogEventRepository.count_events()
+            logger.debug(
+                f"Generated analytics: {len(analytics['by_stage'])} stages, "
+                f"{len(analytics['by_service'])} services, {len(analytics['levels'])} levels"
+            )
+            return analytics
         except Exception as e:
             logger.error(f"Error generating analytics: {e}", exc_info=True)
             return {
@@ -239,4 +347,159 @@ class LogEventRepository:
                 "by_service": {},
                 "levels": {}
             }
+    
+    @staticmethod
+    def count_events(start_time: Optional[datetime] = None) -> Dict[str, Dict[str, int]]:
+        """
+        Count log events by stage, service and level in one grouped scan.
+        
+        Args:
+            start_time: Only count events at or after this time
+            
+        Returns:
+            Dictionary with by_stage, by_service, and levels counts (empty
+            if the database is not available)
+            
+        Raises:
+            Exception: Database errors
+        """
+        if not is_db_available() or not SQLALCHEMY_AVAILABLE or LogEventORM is None or func is None:
+            logger.warning("Database not available, returning empty analytics")
+            return _fold_counts([])
+        
+        with get_db_session() as db:
+            if db is None:
+                return _fold_counts([])
+            
+            query = db.query(
+                LogEventORM.stage,
+                LogEventORM.service,
+                LogEventORM.level,
+                func.count(LogEventORM.id)
+            )
+            if start_time:
+                query = query.filter(LogEventORM.timestamp >= start_time)
+            
+            return _fold_counts(query.group_by(LogEventORM.stage, LogEventORM.service, LogEventORM.level).all())
+    
+    @staticmethod
+    def increment_rollups(rows: List[Dict[str, Any]]) -> int:
+        """
+        Add counts to rollup buckets, creating missing buckets (upsert).
+        
+        Args:
+            rows: Increments from rollups.rollup_increments
+            
+        Returns:
+            Number of buckets updated (0 if the database is not available)
+            
+        Raises:
+            Exception: Database errors, or a database without upsert support
+        """
+        if not rows:
+            return 0
+        
+        if not is_db_available() or not SQLALCHEMY_AVAILABLE or LogEventRollupORM is None:
+            return 0
+        
+        with get_db_session() as db:
+            if db is None:
+                return 0
+            
+            dialect = db.get_bind().dialect.name
+            if dialect == "postgresql":
+                stmt = postgresql.insert(LogEventRollupORM)
+            elif dialect == "sqlite":
+                stmt = sqlite.insert(LogEventRollupORM)
+            else:
+                raise NotImplementedError(f"Analytics rollups need PostgreSQL or SQLite, not {dialect}")
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["granularity", "bucket_start", "stage", "service", "level"],
+                set_={"count": LogEventRollupORM.count + stmt.excluded["count"]}
+            )
+            
+            # Same key order in every writer, so concurrent upserts cannot deadlock
+            rows = sorted(rows, key=lambda r: (r["granularity"], r["bucket_start"], r["stage"], r["service"], r["level"]))
+            db.execute(stmt, rows)
+            db.commit()
+        
+        return len(rows)
+    
+    @staticmethod
+    def sum_rollups(granularity: str, start_time: datetime) -> Dict[str, Dict[str, int]]:
+        """
+        Sum rollup buckets from start_time on.
+        
+        Args:
+            granularity: Bucket size ("minute" or "hour")
+            start_time: Start of the first bucket included
+            
+        Returns:
+            Dictionary with by_stage, by_service, and levels counts
+            
+        Raises:
+            Exception: Database errors
+        """
+        if not is_db_available() or not SQLALCHEMY_AVAILABLE or LogEventRollupORM is None or func is None:
+            return _fold_counts([])
+        
+        with get_db_session() as db:
+            if db is None:
+                return _fold_counts([])
+            
+            rows = db.query(
+                LogEventRollupORM.stage,
+                LogEventRollupORM.service,
+                LogEventRollupORM.level,
+                func.sum(LogEventRollupORM.count)
+            ).filter(
+                LogEventRollupORM.granularity == granularity,
+                LogEventRollupORM.bucket_start >= start_time
+            ).group_by(
+                LogEventRollupORM.stage, LogEventRollupORM.service, LogEventRollupORM.level
+            ).all()
+            
+            return _fold_counts(rows)
+    
+    @staticmethod
+    def prune_rollups(granularity: str, before: datetime) -> int:
+        """
+        Delete rollup buckets that start before a time.
+        
+        Args:
+            granularity: Bucket size ("minute" or "hour")
+            before: Oldest bucket start kept
+            
+        Returns:
+            Number of buckets deleted
+            
+        Raises:
+            Exception: Database errors
+        """
+        if not is_db_available() or not SQLALCHEMY_AVAILABLE or LogEventRollupORM is None:
+            return 0
+        
+        with get_db_session() as db:
+            if db is None:
+                return 0
+            
+            deleted = db.query(LogEventRollupORM).filter(
+                LogEventRollupORM.granularity == granularity,
+                LogEventRollupORM.bucket_start < before
+            ).delete(synchronize_session=False)
+            db.commit()
+        
+        logger.debug(f"Pruned {deleted} {granularity} rollup buckets before {before.isoformat()}")
+        return deleted
+
+
+def _fold_counts(rows) -> Dict[str, Dict[str, int]]:
+    """Fold (stage, service, level, count) rows into by_stage, by_service and levels counts."""
+    analytics: Dict[str, Dict[str, int]] = {"by_stage": {}, "by_service": {}, "levels": {}}
+    for stage, service, level, count in rows:
+        count = int(count or 0)
+        analytics["by_stage"][stage] = analytics["by_stage"].get(stage, 0) + count
+        analytics["by_service"][service] = analytics["by_service"].get(service, 0) + count
+        analytics["levels"][level] = analytics["levels"].get(level, 0) + count
+    return analytics
 
@@ -0,0 +1,212 @@
+"""
+Incrementally maintained analytics for /analytics.
+
+AnalyticsCounters keeps event counts by stage, service and level in memory.
+They are incremented after every successful database write and replaced
+periodically by a recount from the database (reconciliation), which also
+picks up events written by other processes and repairs any drift.
+/analytics reads them instead of grouping the whole log_events table.
+Each write and its record() run in a writing() section; a reconciliation
+waits for the sections in flight and holds new ones back while it recounts,
+so every event is counted either by the recount or by record(), never both.
+
+Rollup rows count events per time bucket (minute or hour), stage, service
+and level, so windowed analytics sum a few bucket rows instead of scanning
+events.
+"""
+
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+from app.common.middleware import get_logger
+
+logger = get_logger(__name__)
+
+# Rollup bucket sizes
+ROLLUP_GRANULARITIES = {
+    "minute": timedelta(minutes=1),
+    "hour": timedelta(hours=1),
+}
+
+# Dimension counted per event field
+_DIMENSIONS = {"by_stage": "stage", "by_service": "service", "levels": "level"}
+
+
+def bucket_start(timestamp: datetime, granularity: str) -> datetime:
+    """
+    Start of the rollup bucket containing a timestamp (naive UTC).
+
+    Args:
+        timestamp: Event timestamp (naive timestamps are taken as UTC)
+        granularity: "minute" or "hour"
+
+    Returns:
+        Bucket start
+    """
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    if granularity == "hour":
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    return timestamp.replace(second=0, microsecond=0)
+
+
+def rollup_increments(
+    events: Iterable[Dict[str, Any]],
+    granularities: Iterable[str] = tuple(ROLLUP_GRANULARITIES)
+) -> List[Dict[str, Any]]:
+    """
+    Aggregate events into rollup count increments.
+
+    Args:
+        events: Log event column values (timestamp, stage, service, level)
+        granularities: Bucket sizes to aggregate for
+
+    Returns:
+        One row per (granularity, bucket_start, stage, service, level) with its count
+    """
+    granularities = tuple(granularities)
+    counts: Counter = Counter()
+    for event in events:
+        for granularity in granularities:
+            key = (
+                granularity,
+                bucket_start(event["timestamp"], granularity),
+                event["stage"],
+                event["service"],
+                event["level"],
+            )
+            counts[key] += 1
+
+    return [
+        {
+            "granularity": granularity,
+            "bucket_start": start,
+            "stage": stage,
+            "service": service,
+            "level": level,
+            "count": count,
+        }
+        for (granularity, start, stage, service, level), count in counts.items()
+    ]
+
+
+def _empty_counts() -> Dict[str, Counter]:
+    return {name: Counter() for name in _DIMENSIONS}
+
+
+class AnalyticsCounters:
+    """Thread-safe event counts by stage, service and level."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = _empty_counts()
+        # Write sections in flight, and whether a reconciliation holds new ones back
+        self._sections = threading.Condition()
+        self._writers = 0
+        self._reconciling = False
+        self._loaded_at: Optional[float] = None
+        self.recorded = 0
+        self.reconciliations = 0
+        self.failed_reconciliations = 0
+
+    def record(self, events: Iterable[Dict[str, Any]]) -> None:
+        """
+        Count events that were just written to the database.
+
+        Args:
+            events: Log event column values (stage, service, level)
+        """
+        with self._lock:
+            for event in events:
+                for name, field in _DIMENSIONS.items():
+                    self._counts[name][event[field]] += 1
+                self.recorded += 1
+
+    @contextmanager
+    def writing(self) -> Iterator[None]:
+        """
+        Section around a database write and its record() call.
+
+        Waits while a reconciliation runs, so the write either commits before
+        the recount (and is recorded before it) or after it.
+        """
+        with self._sections:
+            while self._reconciling:
+                self._sections.wait()
+            self._writers += 1
+        try:
+            yield
+        finally:
+            with self._sections:
+                self._writers -= 1
+                self._sections.notify_all()
+
+    def reconcile(self, load: Callable[[], Dict[str, Dict[str, int]]]) -> bool:
+        """
+        Replace the counts with a recount from the database.
+
+        Waits for writing() sections in flight and holds new ones back until
+        the recount is done. Only one reconciliation runs at a time;
+        concurrent calls return at once.
+
+        Args:
+            load: Returns by_stage, by_service and levels counts from the database
+
+        Returns:
+            True if the counts were reconciled
+        """
+        with self._sections:
+            if self._reconciling:
+                return False
+            self._reconciling = True
+            while self._writers:
+                self._sections.wait()
+
+        try:
+            analytics = load()
+        except Exception as e:
+            logger.error(f"Reconciling analytics counters failed: {e}")
+            with self._lock:
+                self.failed_reconciliations += 1
+            return False
+        else:
+            with self._lock:
+                self._counts = {name: Counter(analytics.get(name, {})) for name in _DIMENSIONS}
+                self._loaded_at = time.monotonic()
+                self.reconciliations += 1
+            return True
+        finally:
+            with self._sections:
+                self._reconciling = False
+                self._sections.notify_all()
+
+    @property
+    def reconciling(self) -> bool:
+        """Whether a reconciliation is running."""
+        with self._sections:
+            return self._reconciling
+
+    def age(self) -> Optional[float]:
+        """Seconds since the last reconciliation (None before the first one)."""
+        with self._lock:
+            return None if self._loaded_at is None else time.monotonic() - self._loaded_at
+
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        """Current by_stage, by_service and levels counts."""
+        with self._lock:
+            return {name: {key: count for key, count in counts.items() if count} for name, counts in self._counts.items()}
+
+    def stats(self) -> Dict[str, Any]:
+        """Counter metrics."""
+        age = self.age()
+        with self._lock:
+            return {
+                "total": sum(self._counts["levels"].values()),
+                "recorded": self.recorded,
+                "reconciliations": self.reconciliations,
+                "failed_reconciliations": self.failed_reconciliations,
+                "seconds_since_reconcile": None if age is None else round(age, 1),
+            }
@@ -3,8 +3,9 @@ Pydantic schemas for the logs service.
 """
 
 from pydantic import BaseModel, Field, ConfigDict
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Union
 from datetime import datetime
+from app.common.schemas import ErrorResponse
 
 
 class AppendEventRequest(BaseModel):
@@ -26,11 +27,24 @@ class AppendEventResponse(BaseModel):
     event_id: Optional[str] = Field(None, description="Event ID if created")
 
 
+class AppendEventsResponse(BaseModel):
+    """Response after appending a batch of events."""
+    status: str = Field(..., description="Operation status")
+    accepted: int = Field(..., description="Number of events logged")
+    rejected: int = Field(..., description="Number of events that failed validation")
+    results: List[Union[AppendEventResponse, ErrorResponse]] = Field(
+        ..., description="Per-event results, in request order (invalid events do not fail the batch)"
+    )
+
+
 class QueryLogsResponse(BaseModel):
     """Response for log query."""
     status: str = Field(..., description="Operation status")
     logs: List[Dict[str, Any]] = Field(..., description="List of log events")
-    pagination: Dict[str, int] = Field(..., description="Pagination metadata")
+    pagination: Dict[str, Any] = Field(
+        ...,
+        description="Pagination metadata (limit, offset, returned, total, total_is_exact, has_more, next_cursor)"
+    )
 
 
 class AnalyticsResponse(BaseModel):
@@ -39,3 +53,8 @@ class AnalyticsResponse(BaseModel):
     by_stage: Dict[str, int] = Field(..., description="Count by stage")
     by_service: Dict[str, int] = Field(..., description="Count by service")
     levels: Dict[str, int] = Field(..., description="Count by log level")
+    total: Optional[int] = Field(None, description="Total events counted")
+    window: Optional[Dict[str, Any]] = Field(
+        None,
+        description="Time window counted (minutes, start, source, granularity); absent for all-time counts"
+    )
@@ -0,0 +1,231 @@
+"""
+Write-behind buffer for log event persistence.
+
+/append_event acknowledges an event once it is queued here; a background
+thread writes queued events to the database in batches (one bulk insert per
+batch instead of a session, commit and refresh per event). A batch is
+written when it reaches max_batch_size or flush_interval seconds after its
+first event arrived. The queue is bounded: when it is full, producers wait
+(backpressure) and fail with BufferFullError after their timeout.
+
+A batch that fails to write (e.g. during a database outage) is kept and
+retried with exponential backoff until it succeeds; meanwhile the queue
+fills up and producers get BufferFullError, so nothing that was accepted is
+discarded while the buffer runs. Only close() gives up: a batch still
+failing after the final attempt at shutdown is dropped and counted.
+"""
+
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+from app.common.middleware import get_logger
+
+logger = get_logger(__name__)
+
+# Queue marker that ends the current batch immediately (flush/close)
+_FLUSH = object()
+
+
+class BufferFullError(Exception):
+    """Raised when an event cannot be queued because the buffer stays full."""
+
+
+class WriteBehindBuffer:
+    """Bounded queue drained in batches by a background writer thread."""
+
+    def __init__(
+        self,
+        write_batch: Callable[[List[Any]], Any],
+        max_batch_size: int = 500,
+        flush_interval: float = 0.2,
+        max_pending: int = 10000,
+        max_backoff: float = 5.0,
+        name: str = "write-behind"
+    ):
+        """
+        Args:
+            write_batch: Writes a list of items; raising makes the batch retry
+            max_batch_size: Most items written per batch
+            flush_interval: Seconds a batch waits for more items after its first one
+            max_pending: Queued items before producers block
+            max_backoff: Longest wait in seconds between attempts to write a failing batch
+            name: Writer thread name
+        """
+        self.write_batch = write_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.flush_interval = flush_interval
+        self.max_backoff = max_backoff
+        self.name = name
+        self._queue: queue.Queue = queue.Queue(maxsize=max(1, max_pending))
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._progress = threading.Condition()
+        self._submitted = 0
+        self._completed = 0
+        self.batches = 0
+        self.written = 0
+        self.failed_batches = 0
+        self.dropped = 0
+
+    def start(self) -> None:
+        """Start the writer thread (no-op if already running)."""
+        with self._start_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+
+    def submit(self, item: Any, timeout: Optional[float] = 0) -> None:
+        """
+        Queue an item for writing.
+
+        Args:
+            item: Item passed to write_batch
+            timeout: Seconds to wait while the buffer is full (0 fails at once, None waits forever)
+
+        Raises:
+            BufferFullError: If the buffer stayed full for the whole timeout
+        """
+        self.start()
+        with self._progress:
+            self._submitted += 1
+        try:
+            if timeout == 0:
+                self._queue.put_nowait(item)
+            else:
+                self._queue.put(item, timeout=timeout)
+        except queue.Full:
+            with self._progress:
+                self._submitted -= 1
+            raise BufferFullError(f"{self.name} buffer is full ({self._queue.maxsize} pending items)")
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Write everything submitted so far without waiting for the flush interval.
+
+        Args:
+            timeout: Seconds to wait (None waits until done)
+
+        Returns:
+            True if every item submitted before the call was written (False while
+            a failing batch is being retried past the timeout)
+        """
+        with self._progress:
+            target = self._submitted
+            if self._completed >= target:
+                return True
+        self.start()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        try:
+            self._queue.put(_FLUSH, timeout=timeout)
+        except queue.Full:
+            return False
+        with self._progress:
+            while self._completed < target:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._progress.wait(remaining)
+        return True
+
+    def close(self, timeout: Optional[float] = None) -> bool:
+        """
+        Write all pending items and stop the writer thread.
+
+        Items that still cannot be written after the timeout get one final
+        attempt each and are dropped if it fails.
+
+        Args:
+            timeout: Seconds to wait for pending writes
+
+        Returns:
+            True if nothing was left unwritten
+        """
+        flushed = self.flush(timeout)
+        self._stop_event.set()
+        with self._start_lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            try:
+                # Wake the writer so it sees the stop flag
+                self._queue.put(_FLUSH, timeout=timeout)
+            except queue.Full:
+                pass
+            thread.join(timeout)
+        if not flushed:
+            logger.error(f"{self.name}: {self.pending()} items were not written before shutdown")
+        return flushed
+
+    def pending(self) -> int:
+        """Items submitted but not yet written."""
+        with self._progress:
+            return self._submitted - self._completed
+
+    def stats(self) -> Dict[str, Any]:
+        """Buffer and write metrics."""
+        with self._progress:
+            return {
+                "pending": self._submitted - self._completed,
+                "capacity": self._queue.maxsize,
+                "batches": self.batches,
+                "written": self.written,
+                "failed_batches": self.failed_batches,
+                "dropped": self.dropped,
+            }
+
+    def _run(self) -> None:
+        while not (self._stop_event.is_set() and self._queue.empty()):
+            batch = self._next_batch()
+            if batch:
+                self._write(batch)
+
+    def _next_batch(self) -> List[Any]:
+        """Wait for an item, then collect more until the batch is full or its interval ends."""
+        try:
+            first = self._queue.get(timeout=self.flush_interval)
+        except queue.Empty:
+            return []
+        if first is _FLUSH:
+            return []
+
+        batch = [first]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _FLUSH:
+                break
+            batch.append(item)
+        return batch
+
+    def _write(self, batch: List[Any]) -> None:
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                self.write_batch(batch)
+                with self._progress:
+                    self.batches += 1
+                    self.written += len(batch)
+                break
+            except Exception as e:
+                logger.error(f"{self.name}: writing {len(batch)} items failed (attempt {attempt}): {e}")
+                with self._progress:
+                    self.failed_batches += 1
+                if self._stop_event.is_set():
+                    logger.error(f"{self.name}: dropping {len(batch)} items that could not be written before shutdown")
+                    with self._progress:
+                        self.dropped += len(batch)
+                    break
+                # Keep the batch; close() interrupts the wait for a final attempt
+                self._stop_event.wait(min(0.1 * 2 ** (attempt - 1), self.max_backoff))
+
+        with self._progress:
+            self._completed += len(batch)
+            self._progress.notify_all()
@@ -0,0 +1,335 @@
+"""
+Columnar in-memory product catalog index.
+
+Built once when products are loaded so that per-request category filtering
+and price-band lookups do not need to copy and scan the whole product list.
+
+Rows are stored as plain columns; Product objects (and their decoded
+metadata) are only materialized for rows that are actually returned.
+"""
+
+import json
+import threading
+from bisect import bisect_left, bisect_right
+from itertools import count
+from typing import Dict, Iterable, List, Optional, Sequence
+from app.common.schemas import Product
+from app.common.middleware import get_logger
+
+from .keyword_index import KeywordIndex, KeywordMatcher, NUMPY_AVAILABLE as KEYWORD_INDEX_AVAILABLE
+
+logger = get_logger(__name__)
+
+# Monotonic catalog version shared by every catalog source (CSV, snapshot, database)
+_catalog_versions = count(1)
+
+
+def next_catalog_version() -> int:
+    """Allocate the next catalog version number."""
+    return next(_catalog_versions)
+
+
+class ProductCatalog:
+    """
+    Immutable columnar index over a product list.
+
+    Columns (one entry per row, row id == load order):
+    - product_ids, titles, descriptions, prices, categories (lowercased),
+      description_lengths, image_urls, raw metadata JSON
+
+    Indexes:
+    - category index: lowercased category -> ascending row ids
+    - price index: row ids sorted by price, with a parallel sorted price column
+    - keyword index: description token -> row ids (built on first use)
+
+    Loaders stamp `version` (monotonic per load) and `source_signature`
+    (data-source change-detection key) on catalogs they serve.
+    """
+
+    version: int = 0
+    source_signature: Optional[tuple] = None
+
+    def __init__(self, products: Iterable[Product] = ()):
+        builder = ProductCatalogBuilder()
+        for product in products:
+            builder.add_product(product)
+        self.__dict__.update(builder.build().__dict__)
+
+    @classmethod
+    def from_columns(
+        cls,
+        *,
+        product_ids: Sequence[str],
+        titles: Sequence[str],
+        descriptions: Sequence[str],
+        prices: Sequence[float],
+        categories: Sequence[str],
+        raw_categories: Sequence[str],
+        description_lengths: Sequence[int],
+        image_urls: Sequence[Optional[str]],
+        metadata_json: Sequence[Optional[str]],
+        category_index: Dict[str, Sequence[int]],
+        price_order: Sequence[int],
+        sorted_prices: Sequence[float],
+        products: Optional[Dict[int, Product]] = None
+    ) -> "ProductCatalog":
+        """
+        Assemble a catalog from prebuilt columns and indexes.
+
+        Columns only need to support len() and integer indexing, so they can
+        be plain lists or views over a memory-mapped snapshot.
+        """
+        catalog = cls.__new__(cls)
+        catalog.product_ids = product_ids
+        catalog.titles = titles
+        catalog.descriptions = descriptions
+        catalog.prices = prices
+        catalog.categories = categories
+        catalog.description_lengths = description_lengths
+        catalog.image_urls = image_urls
+        catalog._raw_categories = raw_categories
+        catalog._metadata_json = metadata_json
+        catalog._category_index = category_index
+        catalog._price_order = price_order
+        catalog._sorted_prices = sorted_prices
+        catalog._products = products if products is not None else {}
+        catalog._keyword_index = None
+        catalog._keyword_index_lock = threading.Lock()
+        return catalog
+
+    def __len__(self) -> int:
+        return len(self.product_ids)
+
+    @property
+    def products(self) -> List[Product]:
+        """All products in row order (materializes every row)."""
+        return self.get_products(range(len(self)))
+
+    @property
+    def category_keys(self) -> List[str]:
+        """Distinct lowercased categories in the catalog."""
+        return list(self._category_index.keys())
+
+    def rows_for_category(self, category: Optional[str]) -> List[int]:
+        """
+        Get row ids matching a category (case-insensitive, partial match).
+
+        Matching mirrors the legacy list filter: a row matches when the requested
+        category contains the product category or vice versa. Only the distinct
+        categories are scanned, never the products themselves.
+
+        Args:
+            category: Requested category, or None/empty for all rows
+
+        Returns:
+            Ascending list of row ids
+        """
+        if not category:
+            return list(range(len(self)))
+
+        category_lower = category.lower()
+
+        matching_keys = [
+            key for key in self._category_index
+            if category_lower in key or key in category_lower
+        ]
+        if not matching_keys:
+            return []
+        if len(matching_keys) == 1:
+            # Single matching category: rows are already sorted, no merge needed
+            return list(self._category_index[matching_keys[0]])
+
+        rows: List[int] = []
+        for key in matching_keys:
+            rows.extend(self._category_index[key])
+        rows.sort()
+        return rows
+
+    def rows_in_price_range(self, min_price: Optional[float] = None, max_price: Optional[float] = None) -> List[int]:
+        """
+        Get row ids with min_price <= price <= max_price, ordered by price.
+
+        Args:
+            min_price: Inclusive lower bound (None for unbounded)
+            max_price: Inclusive upper bound (None for unbounded)
+
+        Returns:
+            List of row ids ordered by ascending price
+        """
+        lo = 0 if min_price is None else bisect_left(self._sorted_prices, min_price)
+        hi = len(self._sorted_prices) if max_price is None else bisect_right(self._sorted_prices, max_price)
+        return list(self._price_order[lo:hi])
+
+    @property
+    def keyword_index(self) -> "KeywordIndex":
+        """Inverted index over the descriptions (built on first use)."""
+        index = self._keyword_index
+        if index is None:
+            with self._keyword_index_lock:
+                if self._keyword_index is None:
+                    self._keyword_index = KeywordIndex(self.descriptions)
+                index = self._keyword_index
+        return index
+
+    def keyword_matcher(self, rows: Sequence[int]) -> Optional["KeywordMatcher"]:
+        """
+        Keyword matcher for a candidate subset of rows (see keyword_index).
+
+        Args:
+            rows: Candidate row ids, aligned with the products being scored
+
+        Returns:
+            KeywordMatcher, or None if NumPy is not installed
+        """
+        if not KEYWORD_INDEX_AVAILABLE:
+            return None
+        return KeywordMatcher(self.keyword_index, rows)
+
+    def get_product(self, row: int) -> Product:
+        """
+        Get the product for a row, materializing (and memoizing) it on first use.
+
+        The model is built with model_construct, without Pydantic validation:
+        add_row stores values as given, so callers are responsible for their
+        types (the CSV loader requires the text fields and converts price to
+        float; snapshots and add_product carry already-typed values).
+        Metadata that is not a JSON object decodes to {}.
+        """
+        product = self._products.get(row)
+        if product is None:
+            product = Product.model_construct(
+                product_id=self.product_ids[row],
+                title=self.titles[row],
+                description=self.descriptions[row],
+                price=self.prices[row],
+                category=self._raw_categories[row],
+                image_url=self.image_urls[row],
+                metadata=self._decode_metadata(row)
+            )
+            self._products[row] = product
+        return product
+
+    def get_products(self, rows: Iterable[int]) -> List[Product]:
+        """Materialize the products for the given row ids."""
+        get_product = self.get_product
+        return [get_product(row) for row in rows]
+
+    def filter_by_category(self, category: Optional[str] = None) -> List[Product]:
+        """Get products matching a category (see rows_for_category)."""
+        return self.get_products(self.rows_for_category(category))
+
+    def _decode_metadata(self, row: int) -> Dict:
+        """Decode the deferred metadata JSON for a row."""
+        raw = self._metadata_json[row]
+        if not raw:
+            return {}
+        try:
+            metadata = json.loads(raw)
+        except ValueError as e:
+            logger.warning(f"Invalid metadata_json for product {self.product_ids[row]}: {e}")
+            return {}
+        return metadata if isinstance(metadata, dict) else {}
+
+
+class ProductCatalogBuilder:
+    """
+    Incrementally builds a ProductCatalog.
+
+    Rows can be appended one at a time (e.g. while streaming a CSV file);
+    the category index is maintained as rows arrive and the price index is
+    sorted once in build().
+    """
+
+    def __init__(self):
+        self.product_ids: List[str] = []
+        self.titles: List[str] = []
+        self.descriptions: List[str] = []
+        self.prices: List[float] = []
+        self.categories: List[str] = []
+        self.description_lengths: List[int] = []
+        self.image_urls: List[Optional[str]] = []
+        self._raw_categories: List[str] = []
+        self._metadata_json: List[Optional[str]] = []
+        self._products: Dict[int, Product] = {}
+        self._category_index: Dict[str, List[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self.product_ids)
+
+    def add_row(
+        self,
+        product_id: str,
+        title: str,
+        description: str,
+        price: float,
+        category: str,
+        image_url: Optional[str] = None,
+        metadata_json: Optional[str] = None
+    ) -> int:
+        """
+        Append a raw row; metadata JSON is kept undecoded until the row is materialized.
+
+        Values are stored as given, without type checks (see get_product).
+
+        Returns:
+            Row id of the appended row
+        """
+        row = len(self.product_ids)
+        category_lower = (category or "").lower()
+
+        self.product_ids.append(product_id)
+        self.titles.append(title)
+        self.descriptions.append(description)
+        self.prices.append(price)
+        self.categories.append(category_lower)
+        self.description_lengths.append(len(description or ""))
+        self.image_urls.append(image_url)
+        self._raw_categories.append(category)
+        self._metadata_json.append(metadata_json)
+        self._category_index.setdefault(category_lower, []).append(row)
+        return row
+
+    def add_product(self, product: Product) -> int:
+        """
+        Append an already-materialized Product.
+
+        Its metadata is also stored as JSON so the row column stays complete
+        (snapshots are written from the columns, not the memoized Product).
+        """
+        row = self.add_row(
+            product_id=product.product_id,
+            title=product.title,
+            description=product.description,
+            price=product.price,
+            category=product.category,
+            image_url=product.image_url,
+            metadata_json=json.dumps(product.metadata, default=str) if product.metadata else None
+        )
+        self._products[row] = product
+        return row
+
+    def build(self) -> ProductCatalog:
+        """Finish the catalog (sorts the price index); the builder must not be reused."""
+        # Sorted price index (stable, so equal prices keep catalog order)
+        price_order = sorted(range(len(self.prices)), key=self.prices.__getitem__)
+
+        logger.debug(
+            f"Built product catalog index: {len(self.product_ids)} products, "
+            f"{len(self._category_index)} categories"
+        )
+
+        return ProductCatalog.from_columns(
+            product_ids=self.product_ids,
+            titles=self.titles,
+            descriptions=self.descriptions,
+            prices=self.prices,
+            categories=self.categories,
+            raw_categories=self._raw_categories,
+            description_lengths=self.description_lengths,
+            image_urls=self.image_urls,
+            metadata_json=self._metadata_json,
+            category_index=self._category_index,
+            price_order=price_order,
+            sorted_prices=[self.prices[row] for row in price_order],
+            products=self._products
+        )
@@ -0,0 +1,187 @@
+"""
+Resident product catalog kept in sync with PostgreSQL.
+
+Instead of querying ProductORM on every request, the catalog is loaded once
+and then refreshed with delta syncs that fetch only rows whose updated_at
+advanced past the last high-water mark, using keyset pagination on
+(updated_at, product_id).
+"""
+
+import threading
+from typing import Dict, List, Optional, Tuple
+from app.common.schemas import Product
+from app.common.db import get_db_session, is_db_available
+from app.common.middleware import get_logger
+
+from .catalog import ProductCatalog, next_catalog_version
+
+# Import ProductORM only if SQLAlchemy is available
+try:
+    from sqlalchemy import and_, or_
+    from app.common.db import ProductORM
+    PRODUCTORM_AVAILABLE = ProductORM is not None
+except (ImportError, AttributeError):
+    PRODUCTORM_AVAILABLE = False
+    ProductORM = None
+
+logger = get_logger(__name__)
+
+
+def product_from_orm(p_orm) -> Product:
+    """Convert a ProductORM row to a Product."""
+    return Product(
+        product_id=p_orm.product_id,
+        title=p_orm.title,
+        description=p_orm.description,
+        price=p_orm.price,
+        category=p_orm.category,
+        image_url=p_orm.image_url,
+        metadata=p_orm.metadata or {}
+    )
+
+
+class DbCatalogSync:
+    """
+    Resident catalog mirrored from the ProductORM table.
+
+    - full_sync(): pages through the whole table by product_id and rebuilds
+      the catalog (also the only way deleted rows are dropped)
+    - sync(): fetches rows with updated_at >= high-water mark, paging by
+      (updated_at, product_id), and rebuilds the catalog only if rows changed
+
+    Rebuilt catalogs replace the current one in a single assignment, so
+    readers never take a lock and never see a partially applied delta.
+    """
+
+    def __init__(self, page_size: int = 1000):
+        self.page_size = page_size
+        self.high_water_mark: Optional[str] = None
+        self._rows: Dict[str, Product] = {}
+        self._catalog: Optional[ProductCatalog] = None
+        self._lock = threading.Lock()
+
+    @property
+    def catalog(self) -> Optional[ProductCatalog]:
+        """Currently served catalog (None before the first sync)."""
+        return self._catalog
+
+    def get_catalog(self) -> ProductCatalog:
+        """Get the resident catalog, running the initial full sync on first use."""
+        catalog = self._catalog
+        if catalog is not None:
+            return catalog
+
+        with self._lock:
+            if self._catalog is None:
+                self._full_sync_locked()
+            return self._catalog
+
+    def full_sync(self) -> int:
+        """
+        Reload every row from the database.
+
+        Returns:
+            Number of products in the new catalog
+        """
+        with self._lock:
+            return self._full_sync_locked()
+
+    def sync(self) -> bool:
+        """
+        Apply rows updated since the last sync.
+
+        Rows at exactly the high-water mark are re-fetched (updates are
+        upserts, so this is idempotent) so that rows committed later with the
+        same updated_at are not missed.
+
+        Returns:
+            True if the catalog changed
+        """
+        with self._lock:
+            if self._catalog is None:
+                self._full_sync_locked()
+                return True
+
+            if self.high_water_mark is None:
+                # No timestamps seen yet: anything with updated_at set is new
+                since_filter = ProductORM.updated_at.isnot(None)
+            else:
+                since_filter = ProductORM.updated_at >= self.high_water_mark
+            changed = self._fetch_all(since_filter, order_by_updated=True)
+
+            updated = [p for p in changed if self._rows.get(p.product_id) != p]
+            if not updated:
+                return False
+
+            for product in updated:
+                self._rows[product.product_id] = product
+            self._publish()
+            logger.info(f"Applied {len(updated)} product updates from database (high-water mark: {self.high_water_mark})")
+            return True
+
+    def _full_sync_locked(self) -> int:
+        self.high_water_mark = None
+        products = self._fetch_all(None, order_by_updated=False)
+        self._rows = {p.product_id: p for p in products}
+        self._publish()
+        logger.info(f"Loaded {len(self._rows)} products from database into resident catalog")
+        return len(self._rows)
+
+    def _publish(self) -> None:
+        catalog = ProductCatalog(self._rows.values())
+        catalog.version = next_catalog_version()
+        catalog.source_signature = ("database", self.high_water_mark)
+        self._catalog = catalog
+
+    def _fetch_all(self, base_filter, order_by_updated: bool) -> List[Product]:
+        """
+        Fetch matching rows page by page with keyset pagination.
+
+        Full syncs page on product_id; delta syncs page on (updated_at,
+        product_id). The high-water mark is advanced as rows are read.
+        """
+        if not is_db_available() or not PRODUCTORM_AVAILABLE:
+            return []
+
+        products: List[Product] = []
+        cursor: Optional[Tuple[Optional[str], str]] = None
+
+        with get_db_session() as db:
+            if db is None:
+                return []
+
+            while True:
+                query = db.query(ProductORM)
+                if base_filter is not None:
+                    query = query.filter(base_filter)
+
+                if order_by_updated:
+                    if cursor is not None:
+                        last_updated, last_id = cursor
+                        query = query.filter(or_(
+                            ProductORM.updated_at > last_updated,
+                            and_(ProductORM.updated_at == last_updated, ProductORM.product_id > last_id)
+                        ))
+                    query = query.order_by(ProductORM.updated_at, ProductORM.product_id)
+                else:
+                    if cursor is not None:
+                        query = query.filter(ProductORM.product_id > cursor[1])
+                    query = query.order_by(ProductORM.product_id)
+
+                page = query.limit(self.page_size).all()
+                if not page:
+                    break
+
+                for p_orm in page:
+                    products.append(product_from_orm(p_orm))
+                    if p_orm.updated_at is not None and (
+                        self.high_water_mark is None or p_orm.updated_at > self.high_water_mark
+                    ):
+                        self.high_water_mark = p_orm.updated_at
+
+                last = page[-1]
+                cursor = (last.updated_at, last.product_id)
+                if len(page) < self.page_size:
+                    break
+
+        return products
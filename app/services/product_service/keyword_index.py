@@ -0,0 +1,153 @@
+"""
+Token inverted index over product descriptions for keyword scoring.
+
+Description scoring counts the campaign keywords that occur in a product's
+lowercased description as substrings. A keyword without whitespace can only
+occur inside a single whitespace-delimited token, so its matching rows are
+the union of the posting lists of the vocabulary tokens that contain it:
+only the distinct tokens are scanned, never the descriptions. Keywords with
+whitespace (multi-word categories) intersect the posting lists of their
+words and verify the few remaining candidates with a substring test.
+Either way the result is exactly the set of rows `keyword in desc_lower`
+selects.
+"""
+
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Dict, Optional, Sequence
+from app.common.middleware import get_logger
+
+logger = get_logger(__name__)
+
+# Try to import NumPy (optional dependency for vectorized scoring)
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+# Distinct keywords whose matching rows are memoized per index
+MAX_CACHED_KEYWORDS = 4096
+
+
+class KeywordIndex:
+    """
+    Inverted index mapping lowercased description tokens to row ids.
+
+    Posting lists hold each row once per token (scores count matching
+    keywords, not occurrences) as ascending uint32 arrays.
+    """
+
+    def __init__(self, descriptions: Sequence[Optional[str]]):
+        self._n = len(descriptions)
+        self._descriptions = descriptions
+        postings: Dict[str, array] = {}
+        for row in range(self._n):
+            description = descriptions[row]
+            if not description:
+                continue
+            for token in set(description.lower().split()):
+                posting = postings.get(token)
+                if posting is None:
+                    posting = postings[token] = array("I")
+                posting.append(row)
+        self._postings = postings
+        self._matches: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        logger.info(f"Built keyword index over {self._n} descriptions ({len(postings)} distinct tokens)")
+
+    def __len__(self) -> int:
+        return self._n
+
+    @property
+    def vocabulary_size(self) -> int:
+        """Number of distinct tokens."""
+        return len(self._postings)
+
+    def rows_matching(self, keyword: str) -> "np.ndarray":
+        """
+        Get the rows whose lowercased description contains a keyword.
+
+        Args:
+            keyword: Lowercased keyword (as produced by _extract_keywords)
+
+        Returns:
+            Ascending int64 array of row ids
+        """
+        with self._lock:
+            rows = self._matches.get(keyword)
+            if rows is not None:
+                self._matches.move_to_end(keyword)
+                return rows
+
+        rows = self._lookup(keyword)
+        with self._lock:
+            self._matches[keyword] = rows
+            while len(self._matches) > MAX_CACHED_KEYWORDS:
+                self._matches.popitem(last=False)
+        return rows
+
+    def _lookup(self, keyword: str) -> "np.ndarray":
+        words = keyword.split()
+        if not words:
+            # An empty (or all-whitespace) keyword needs a substring scan
+            return np.array(
+                [row for row in range(self._n) if keyword in (self._descriptions[row] or "").lower()],
+                dtype=np.int64
+            )
+
+        if len(words) == 1 and words[0] == keyword:
+            return self._rows_containing(keyword)
+
+        # Rows containing every word are the only candidates for the phrase
+        candidates = None
+        for word in words:
+            rows = self._rows_containing(word)
+            candidates = rows if candidates is None else np.intersect1d(candidates, rows, assume_unique=True)
+            if len(candidates) == 0:
+                return candidates
+        return np.array(
+            [row for row in candidates.tolist() if keyword in self._descriptions[row].lower()],
+            dtype=np.int64
+        )
+
+    def _rows_containing(self, word: str) -> "np.ndarray":
+        """Union of the posting lists of every token containing a whitespace-free word."""
+        postings = [posting for token, posting in self._postings.items() if word in token]
+        if not postings:
+            return np.empty(0, dtype=np.int64)
+        if len(postings) == 1:
+            return np.frombuffer(postings[0], dtype=np.uint32).astype(np.int64)
+        return np.unique(np.concatenate([np.frombuffer(p, dtype=np.uint32) for p in postings])).astype(np.int64)
+
+
+class KeywordMatcher:
+    """
+    Keyword matches for a candidate subset of catalog rows.
+
+    Passed to the vectorized scoring functions in place of substring scans
+    over the candidates' descriptions.
+    """
+
+    def __init__(self, index: KeywordIndex, rows: Sequence[int]):
+        self._index = index
+        self._rows = np.asarray(rows, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def matches(self, keyword: str) -> "np.ndarray":
+        """
+        Get a float64 0/1 array marking candidates whose description contains a keyword.
+
+        Args:
+            keyword: Lowercased keyword
+
+        Returns:
+            Array aligned with the candidate rows
+        """
+        mask = np.zeros(len(self._index), dtype=np.float64)
+        mask[self._index.rows_matching(keyword)] = 1.0
+        return mask[self._rows]
@@ -2,16 +2,24 @@
 Product data loading from database or CSV.
 
 Supports:
-- PostgreSQL via SQLAlchemy
+- PostgreSQL via SQLAlchemy (per-request queries, or a resident catalog
+  kept current with delta syncs when PRODUCT_DB_RESIDENT_CATALOG is set)
+- Memory-mapped catalog snapshot (compiled from CSV or the database)
 - CSV file fallback
 """
 
 import os
 import csv
-from typing import List, Optional, Dict, Any
+import threading
+from itertools import islice
+from typing import List, Optional, Dict, Any, Tuple
 from pathlib import Path
 from app.common.schemas import Product
 from app.common.db import get_db_session, is_db_available
+from app.common.config import settings
+from .catalog import ProductCatalog, ProductCatalogBuilder, next_catalog_version
+from .db_sync import DbCatalogSync, product_from_orm
+from .keyword_index import KeywordMatcher
 
 # Import ProductORM only if SQLAlchemy is available
 try:
@@ -24,9 +32,20 @@ from app.common.middleware import get_logger
 
 logger = get_logger(__name__)
 
-# In-memory product cache (for CSV mode)
-_product_cache: List[Product] = []
-_csv_loaded = False
+# Rows parsed per chunk when streaming a CSV file
+CSV_CHUNK_SIZE = 10000
+
+# In-memory catalog index (for CSV mode), built once per load. Reloads build a
+# new catalog off the request path and replace this reference in one assignment,
+# so readers always see either the old or the new catalog, never a partial one.
+_catalog: Optional[ProductCatalog] = None
+_default_catalog: Optional[ProductCatalog] = None
+
+# Serializes catalog loads/reloads (readers never take this lock)
+_reload_lock = threading.Lock()
+
+# Resident DB catalog (PRODUCT_DB_RESIDENT_CATALOG), created on first use
+_db_sync: Optional[DbCatalogSync] = None
 
 
 def load_products_from_db(category: Optional[str] = None) -> List[Product]:
@@ -55,16 +74,7 @@ def load_products_from_db(category: Optional[str] = None) -> List[Product]:
             product_orms = query.all()
             
             for p_orm in product_orms:
-                product = Product(
-                    product_id=p_orm.product_id,
-                    title=p_orm.title,
-                    description=p_orm.description,
-                    price=p_orm.price,
-                    category=p_orm.category,
-                    image_url=p_orm.image_url,
-                    metadata=p_orm.metadata or {}
-                )
-                products.append(product)
+                products.append(product_from_orm(p_orm))
             
             logger.info(f"Loaded {len(products)} products from database" + 
                        (f" (category: {category})" if category else ""))
@@ -83,64 +93,195 @@ def load_products_from_csv(csv_path: Optional[str] = None) -> List[Product]:
     Expected CSV columns:
     - product_id, title, description, price, category, image_url, metadata_json
     
+    The file is parsed once into the catalog index (see load_catalog_from_csv);
+    this function materializes every row and is kept for callers that need the
+    full product list. Request handling should use get_catalog() instead.
+    
     Args:
-        csv_path: Path to CSV file. If None, looks for products.csv in service directory.
+        csv_path: Path to CSV file. If None, uses PRODUCT_CSV_PATH or products.csv in the service directory.
         
     Returns:
         List of Product objects
     """
-    global _product_cache, _csv_loaded
+    catalog = _ensure_csv_catalog(csv_path)
+    if catalog is None:
+        return _get_default_products()
     
-    if _csv_loaded:
-        return _product_cache.copy()
+    return catalog.products
+
+
+def load_catalog_from_csv(csv_path: Optional[str] = None, chunk_size: int = CSV_CHUNK_SIZE) -> Optional[ProductCatalog]:
+    """
+    Stream a products CSV file into a catalog index.
     
-    if csv_path is None:
-        # Default CSV location
-        service_dir = Path(__file__).parent
-        csv_path = service_dir / "products.csv"
+    Rows are parsed in chunks of `chunk_size` with a plain csv.reader and
+    appended to the index as they are read, so no intermediate list of rows
+    or Product objects is kept. Per-row validation is limited to the fields
+    the index needs (text fields present, numeric price); metadata_json is
+    stored undecoded and only parsed when a product is materialized. Rows
+    whose metadata_json is invalid or not a JSON object are therefore kept
+    with empty metadata (a warning is logged when they are materialized)
+    rather than skipped at load time.
     
-    csv_path = Path(csv_path)
+    Args:
+        csv_path: Path to CSV file. If None, uses PRODUCT_CSV_PATH or products.csv in the service directory.
+        chunk_size: Number of rows parsed per chunk
+        
+    Returns:
+        ProductCatalog, or None if the file is missing or cannot be read
+    """
+    csv_path = _default_csv_path() if csv_path is None else Path(csv_path)
     
     if not csv_path.exists():
         logger.warning(f"CSV file not found: {csv_path}. Using default sample products.")
-        return _get_default_products()
+        return None
     
-    products = []
+    builder = ProductCatalogBuilder()
+    skipped = 0
     try:
-        with open(csv_path, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
+        with open(csv_path, 'r', encoding='utf-8', newline='') as f:
+            reader = csv.reader(f)
+            header = next(reader, None)
+            if header is None:
+                logger.warning(f"CSV file is empty: {csv_path}")
+                return builder.build()
             
-            for row in reader:
-                try:
-                    # Parse metadata if present
-                    metadata = {}
-                    if 'metadata_json' in row and row['metadata_json']:
-                        import json
-                        metadata = json.loads(row['metadata_json'])
+            columns = {name: i for i, name in enumerate(header)}
+            id_col = columns.get('product_id')
+            title_col = columns.get('title', columns.get('name'))
+            description_col = columns.get('description')
+            price_col = columns.get('price')
+            category_col = columns.get('category')
+            image_col = columns.get('image_url')
+            metadata_col = columns.get('metadata_json')
+            
+            for chunk in iter(lambda: list(islice(reader, chunk_size)), []):
+                for row in chunk:
+                    product_id = _csv_field(row, id_col, '')
+                    title = _csv_field(row, title_col, '')
+                    description = _csv_field(row, description_col, '')
+                    category = _csv_field(row, category_col, 'general')
+                    
+                    try:
+                        if product_id is None or title is None or description is None or category is None:
+                            raise ValueError(f"row has {len(row)} fields, expected {len(header)}")
+                        price = float(_csv_field(row, price_col, 0))
+                    except (ValueError, TypeError) as e:
+                        skipped += 1
+                        logger.warning(f"Skipping invalid row in CSV: {e}")
+                        continue
                     
-                    product = Product(
-                        product_id=row.get('product_id', ''),
-                        title=row.get('title', row.get('name', '')),
-                        description=row.get('description', ''),
-                        price=float(row.get('price', 0)),
-                        category=row.get('category', 'general'),
-                        image_url=row.get('image_url'),
-                        metadata=metadata
+                    builder.add_row(
+                        product_id=product_id,
+                        title=title,
+                        description=description,
+                        price=price,
+                        category=category,
+                        image_url=_csv_field(row, image_col, None),
+                        metadata_json=_csv_field(row, metadata_col, None)
                     )
-                    products.append(product)
-                except (ValueError, KeyError) as e:
-                    logger.warning(f"Skipping invalid row in CSV: {e}")
-                    continue
-        
-        _product_cache = products
-        _csv_loaded = True
-        logger.info(f"Loaded {len(products)} products from CSV: {csv_path}")
+                
+                logger.debug(f"Parsed {len(builder)} products from CSV so far")
         
     except Exception as e:
         logger.error(f"Error loading products from CSV: {e}")
-        return _get_default_products()
+        return None
+    
+    catalog = builder.build()
+    logger.info(
+        f"Loaded {len(catalog)} products from CSV: {csv_path}"
+        + (f" ({skipped} invalid rows skipped)" if skipped else "")
+    )
+    return catalog
+
+
+def _csv_field(row: List[str], col: Optional[int], default: Any) -> Any:
+    """Get a CSV field by column index (default if the column is absent, None if the row is short)."""
+    if col is None:
+        return default
+    return row[col] if col < len(row) else None
+
+
+def _ensure_csv_catalog(csv_path: Optional[str] = None) -> Optional[ProductCatalog]:
+    """
+    Load the CSV catalog once and keep it resident; None if no CSV is available.
+    
+    A compiled snapshot (PRODUCT_SNAPSHOT_PATH, or products.snap next to the
+    CSV file) is preferred when it is at least as new as the CSV file.
+    """
+    global _catalog
+    
+    catalog = _catalog
+    if catalog is not None:
+        return catalog
     
-    return products.copy()
+    with _reload_lock:
+        # Another request may have finished loading while we waited
+        if _catalog is None:
+            _catalog = _load_catalog_from_source(csv_path)
+        return _catalog
+
+
+def _load_catalog_from_source(csv_path: Optional[str] = None) -> Optional[ProductCatalog]:
+    """Build a catalog from the snapshot or CSV source and stamp its version and source signature."""
+    # Take the signature first so that changes made during the load trigger another reload
+    signature = _source_signature(csv_path)
+    
+    catalog = _load_snapshot_catalog(csv_path)
+    if catalog is None:
+        catalog = load_catalog_from_csv(csv_path)
+    if catalog is None:
+        return None
+    
+    catalog.version = next_catalog_version()
+    catalog.source_signature = signature
+    return catalog
+
+
+def _default_csv_path() -> Path:
+    """Configured CSV location (PRODUCT_CSV_PATH), or products.csv in the service directory."""
+    if settings.PRODUCT_CSV_PATH:
+        return Path(settings.PRODUCT_CSV_PATH)
+    return Path(__file__).parent / "products.csv"
+
+
+def _source_paths(csv_path: Optional[str] = None) -> tuple:
+    """Resolve the (csv_path, snapshot_path) pair for the CSV data source."""
+    csv_path = _default_csv_path() if csv_path is None else Path(csv_path)
+    snapshot_path = Path(settings.PRODUCT_SNAPSHOT_PATH) if settings.PRODUCT_SNAPSHOT_PATH else csv_path.with_suffix(".snap")
+    return csv_path, snapshot_path
+
+
+def _source_signature(csv_path: Optional[str] = None) -> tuple:
+    """Change-detection signature of the CSV and snapshot files: (mtime_ns, size) or None for each."""
+    signature = []
+    for path in _source_paths(csv_path):
+        try:
+            stat = path.stat()
+            signature.append((stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            signature.append(None)
+    return tuple(signature)
+
+
+def _load_snapshot_catalog(csv_path: Optional[str] = None) -> Optional[ProductCatalog]:
+    """Map the catalog snapshot if one exists and is not older than the CSV file."""
+    from .snapshot import load_snapshot, SnapshotError
+    
+    csv_path, snapshot_path = _source_paths(csv_path)
+    
+    if not snapshot_path.exists():
+        return None
+    
+    if csv_path.exists() and csv_path.stat().st_mtime > snapshot_path.stat().st_mtime:
+        logger.warning(f"Product snapshot {snapshot_path} is older than {csv_path}, loading CSV instead")
+        return None
+    
+    try:
+        return load_snapshot(snapshot_path)
+    except SnapshotError as e:
+        logger.error(f"Error loading product snapshot: {e}")
+        return None
 
 
 def _get_default_products() -> List[Product]:
@@ -272,29 +413,92 @@ def load_products(category: Optional[str] = None) -> List[Product]:
     Returns:
         List of Product objects
     """
-    # Try database first
-    if is_db_available():
+    products, _ = load_candidates(category)
+    return products
+
+
+def load_candidates(category: Optional[str] = None) -> Tuple[List[Product], Optional[KeywordMatcher]]:
+    """
+    Load products like load_products, with a keyword matcher when served from a catalog.
+    
+    Args:
+        category: Optional category filter
+        
+    Returns:
+        Tuple of (products, keyword_matcher); keyword_matcher is None when
+        products were queried from the database per request (or NumPy is
+        not installed)
+    """
+    # Try database first (the resident DB catalog is served by get_catalog())
+    if is_db_available() and not _db_resident_enabled():
         products = load_products_from_db(category)
         if products:
-            return products
-    
-    # Fallback to CSV
-    products = load_products_from_csv()
-    if products:
-        if category:
-            # Filter by category (case-insensitive, partial match)
-            category_lower = category.lower()
-            products = [p for p in products if category_lower in p.category.lower() or p.category.lower() in category_lower]
-        return products
-    
-    # Last resort: default products
-    logger.warning("No data source available, using default sample products")
-    default_products = _get_default_products()
-    if category:
-        # Filter by category (case-insensitive, partial match)
-        category_lower = category.lower()
-        default_products = [p for p in default_products if category_lower in p.category.lower() or p.category.lower() in category_lower]
-    return default_products
+            return products, None
+    
+    # Resident DB catalog, or CSV fallback (served from the prebuilt catalog index)
+    catalog = get_catalog()
+    if len(catalog) == 0:
+        # Last resort: default products
+        logger.warning("No data source available, using default sample products")
+        catalog = _get_default_catalog()
+    
+    rows = catalog.rows_for_category(category)
+    return catalog.get_products(rows), catalog.keyword_matcher(rows)
+
+
+def get_catalog() -> ProductCatalog:
+    """
+    Get the catalog index for the active data source, loading it on first use.
+    
+    Returns:
+        The resident DB catalog (if enabled and non-empty), otherwise the
+        ProductCatalog built from the CSV file, or the default sample catalog
+        if the CSV file is missing or could not be loaded
+    """
+    if _db_resident_enabled():
+        catalog = _get_db_catalog()
+        if catalog is not None and len(catalog) > 0:
+            return catalog
+    
+    catalog = _ensure_csv_catalog()
+    if catalog is not None:
+        return catalog
+    
+    return _get_default_catalog()
+
+
+def _db_resident_enabled() -> bool:
+    """Whether products are served from the resident DB catalog."""
+    return settings.PRODUCT_DB_RESIDENT_CATALOG and is_db_available()
+
+
+def _get_db_sync() -> DbCatalogSync:
+    """Get the resident DB catalog sync (created once)."""
+    global _db_sync
+    
+    if _db_sync is None:
+        with _reload_lock:
+            if _db_sync is None:
+                _db_sync = DbCatalogSync(page_size=settings.PRODUCT_DB_SYNC_PAGE_SIZE)
+    return _db_sync
+
+
+def _get_db_catalog() -> Optional[ProductCatalog]:
+    """Get the resident DB catalog, running the initial full sync on first use."""
+    try:
+        return _get_db_sync().get_catalog()
+    except Exception as e:
+        logger.error(f"Error loading products from database: {e}")
+        return None
+
+
+def _get_default_catalog() -> ProductCatalog:
+    """Get the catalog index over the default sample products (built once)."""
+    global _default_catalog
+    
+    if _default_catalog is None:
+        _default_catalog = ProductCatalog(_get_default_products())
+    return _default_catalog
 
 
 def get_all_products() -> List[Product]:
@@ -307,9 +511,102 @@ def get_products_by_category(category: str) -> List[Product]:
     return load_products(category=category)
 
 
+def get_catalog_version() -> int:
+    """
+    Version of the catalog get_catalog() currently serves (0 when serving default sample products).
+    
+    Picks the source the same way get_catalog() does, so an empty resident
+    DB catalog reports the version of the CSV catalog served in its place.
+    """
+    if _db_resident_enabled() and _db_sync is not None:
+        db_catalog = _db_sync.catalog
+        if db_catalog is not None and len(db_catalog) > 0:
+            return db_catalog.version
+    catalog = _catalog
+    return catalog.version if catalog is not None else 0
+
+
 def reload_products() -> None:
-    """Force reload products from data source (clears cache)."""
-    global _product_cache, _csv_loaded
-    _product_cache = []
-    _csv_loaded = False
+    """
+    Force reload products from data source.
+    
+    The new catalog is built before it replaces the current one, so concurrent
+    requests keep being served from the old catalog until the swap.
+    """
+    global _catalog
+    
+    if _db_resident_enabled():
+        # Full sync also drops rows deleted since the last sync
+        _get_db_sync().full_sync()
+    
+    with _reload_lock:
+        _catalog = _load_catalog_from_source()
+    
+    logger.info(f"Product catalog reloaded (version {get_catalog_version()})")
+
+
+def refresh_catalog_if_changed() -> bool:
+    """
+    Reload the catalog if the CSV or snapshot file changed since it was loaded.
+    
+    With the resident DB catalog enabled, applies a delta sync of rows
+    updated since the last sync instead.
+    
+    Returns:
+        True if a reload happened, False if the source is unchanged
+    """
+    if _db_resident_enabled():
+        return _get_db_sync().sync()
+    
+    catalog = _catalog
+    current_signature = _source_signature()
+    if catalog is None:
+        # Nothing loaded yet: only reload once a source file appears
+        if current_signature == (None, None):
+            return False
+    elif current_signature == catalog.source_signature:
+        return False
+    
+    logger.info("Product data source changed, reloading catalog")
+    reload_products()
+    return True
+
 
+class CatalogReloader:
+    """
+    Background thread that polls the data source and hot-swaps the catalog.
+    
+    Change detection is a cheap stat() of the CSV and snapshot files (or an
+    updated_at delta query for the resident DB catalog); the expensive
+    rebuild runs on this thread, off the request path.
+    """
+    
+    def __init__(self, interval_seconds: float):
+        self.interval_seconds = interval_seconds
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+    
+    def start(self) -> None:
+        """Start polling (no-op if already running)."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="catalog-reloader", daemon=True)
+        self._thread.start()
+        logger.info(f"Catalog reloader started (interval: {self.interval_seconds}s)")
+    
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stop polling and wait for the thread to exit."""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+    
+    def _run(self) -> None:
+        while not self._stop_event.wait(self.interval_seconds):
+            try:
+                if refresh_catalog_if_changed():
+                    # Build the new catalog's keyword index here, not on the next request
+                    get_catalog().keyword_index
+            except Exception as e:
+                logger.error(f"Error refreshing product catalog: {e}", exc_info=True)
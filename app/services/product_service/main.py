@@ -8,8 +8,9 @@ This service implements real product selection logic including:
 - Campaign-aligned product selection
 """
 
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from typing import Union
+from typing import Dict, List, Union
 from app.common.middleware import setup_logging, RequestIDMiddleware, get_cors_middleware_class, get_logger
 from app.common.config import settings
 from app.common.exceptions import register_exception_handlers, ServiceException
@@ -17,12 +18,13 @@ from pydantic import ValidationError as PydanticValidationError
 from app.common.schemas import ErrorResponse
 from app.common.db import init_db, is_db_available
 
-from .schemas import SelectProductsRequest, SelectProductsResponse
+from .schemas import SelectProductsRequest, SelectProductsResponse, SelectProductsBatchRequest, SelectProductsBatchResponse
 
 # Support legacy API format for backward compatibility
 from typing import Optional as TypingOptional
-from .loaders import load_products, get_products_by_category
-from .scoring import score_products
+from .loaders import load_candidates, get_catalog, get_catalog_version, CatalogReloader
+from .scoring import select_top_products, select_top_products_batch
+from .score_cache import ScoringCache
 from .grouping import group_products
 
 # Configure unified logging
@@ -36,11 +38,36 @@ if db_available:
 else:
     logger.info("Using CSV fallback mode for product data")
 
+# Memoized selections per campaign-spec fingerprint, invalidated on catalog reload
+selection_cache = ScoringCache(
+    max_entries=settings.PRODUCT_SELECTION_CACHE_SIZE,
+    ttl_seconds=settings.PRODUCT_SELECTION_CACHE_TTL
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Warm the product catalog and run the hot reloader for the app's lifetime."""
+    reloader = None
+    if not is_db_available() or settings.PRODUCT_DB_RESIDENT_CATALOG:
+        # Build the catalog indexes before the first request instead of on it
+        get_catalog().keyword_index
+        if settings.PRODUCT_CATALOG_RELOAD_INTERVAL > 0:
+            reloader = CatalogReloader(settings.PRODUCT_CATALOG_RELOAD_INTERVAL)
+            reloader.start()
+    try:
+        yield
+    finally:
+        if reloader is not None:
+            reloader.stop()
+
+
 # Initialize FastAPI app
 app = FastAPI(
     title="Product Service",
     description="MCP microservice for product selection in ad campaigns",
-    version="2.0.0"
+    version="2.0.0",
+    lifespan=lifespan
 )
 
 # Add middleware
@@ -58,8 +85,78 @@ async def health_check():
     return {
         "status": "healthy",
         "service": "product_service",
+        "data_source": "database" if is_db_available() else "csv",
+        "selection_cache": selection_cache.stats()
+    }
+
+
+def _selection_cache_version() -> TypingOptional[int]:
+    """Catalog version to memoize selections against (None when products are queried per request)."""
+    if is_db_available() and not settings.PRODUCT_DB_RESIDENT_CATALOG:
+        return None
+    return get_catalog_version()
+
+
+def _build_selection_response(selected_scored: list, total_products_loaded: int) -> SelectProductsResponse:
+    """
+    Group scored selections and build the response with debug information.
+    
+    Args:
+        selected_scored: Selected (product, score, debug_info) tuples, best first
+        total_products_loaded: Number of candidate products that were scored
+        
+    Returns:
+        SelectProductsResponse for the selection
+    """
+    selected_products = [product for product, score, _ in selected_scored]
+    
+    # Step 4: Group selected products
+    logger.info("Grouping selected products by priority")
+    product_groups = group_products(selected_scored)
+    
+    # Step 5: Build debug information
+    scoring_details = {}
+    for product, score, debug_info in selected_scored:
+        scoring_details[product.product_id] = {
+            "score": score,
+            "breakdown": debug_info
+        }
+    
+    rules_applied = [
+        f"Category alignment: +0.4 (exact), +0.2 (similar)",
+        f"Price fit: Based on budget ratio (prefer products in budget/40 to budget/20 range)",
+        f"Description quality: +0.1 (length), +0.1 (keyword match)",
+        f"Metadata features: +0.1 (popularity, brand, features)",
+        f"Grouping thresholds: high >= 0.75, medium >= 0.45, low < 0.45"
+    ]
+    
+    debug_info = {
+        "scoring_details": scoring_details,
+        "selected_ids": [p.product_id for p in selected_products],
+        "rules_applied": rules_applied,
+        "total_products_loaded": total_products_loaded,
+        "total_products_selected": len(selected_products),
         "data_source": "database" if is_db_available() else "csv"
     }
+    
+    # Step 6: Build response
+    total_products = len(selected_products)
+    logger.info(
+        f"Selected {total_products} products: "
+        f"{sum(1 for g in product_groups if g.group == 'high')} high, "
+        f"{sum(1 for g in product_groups if g.group == 'medium')} medium, "
+        f"{sum(1 for g in product_groups if g.group == 'low')} low"
+    )
+    
+    return SelectProductsResponse(
+        status="success",
+        products=selected_products,
+        groups=product_groups,
+        debug=debug_info,
+        # Legacy fields for backward compatibility
+        product_groups=product_groups,
+        total_products=total_products
+    )
 
 
 @app.post("/select_products", response_model=Union[SelectProductsResponse, ErrorResponse])
@@ -140,98 +237,188 @@ async def select_products(request: SelectProductsRequest) -> Union[SelectProduct
                 details={"limit": limit}
             )
         
-        # Step 1: Load products
-        logger.info("Loading products from data source")
-        if campaign_spec.category:
-            all_products = get_products_by_category(campaign_spec.category)
+        # Steps 1-3 are memoized per campaign-spec fingerprint and catalog version
+        catalog_version = _selection_cache_version()
+        cached = selection_cache.get(campaign_spec, limit, catalog_version) if catalog_version is not None else None
+        if cached is not None:
+            total_products_loaded, selected_scored = cached
+            logger.info(f"Using cached selection of {len(selected_scored)} products (catalog version {catalog_version})")
         else:
-            all_products = load_products()
+            # Step 1: Load products
+            logger.info("Loading products from data source")
+            all_products, keyword_matcher = load_candidates(campaign_spec.category or None)
+            
+            if not all_products:
+                logger.warning("No products found in data source")
+                return ErrorResponse(
+                    status="error",
+                    error_code="NO_PRODUCTS_FOUND",
+                    message=f"No products found" + (f" for category '{campaign_spec.category}'" if campaign_spec.category else ""),
+                    details={"category": campaign_spec.category}
+                )
+            
+            logger.info(f"Loaded {len(all_products)} products from data source")
+            
+            # Step 2-3: Score products and select the top `limit` (partial selection)
+            logger.info(f"Scoring products based on campaign alignment, selecting top {limit}")
+            selected_scored = select_top_products(all_products, campaign_spec, limit, keyword_matcher=keyword_matcher)
+            
+            if not selected_scored:
+                logger.error("No products scored successfully")
+                return ErrorResponse(
+                    status="error",
+                    error_code="SCORING_FAILED",
+                    message="Failed to score products",
+                    details={}
+                )
+            
+            total_products_loaded = len(all_products)
+            # Only memoize if the catalog was not swapped while loading
+            if catalog_version is not None and catalog_version == _selection_cache_version():
+                selection_cache.put(campaign_spec, limit, catalog_version, (total_products_loaded, selected_scored))
         
-        if not all_products:
-            logger.warning("No products found in data source")
+        return _build_selection_response(selected_scored, total_products_loaded)
+        
+    except PydanticValidationError as e:
+        # Let FastAPI handle Pydantic validation errors (returns 422)
+        from fastapi import HTTPException, status
+        logger.warning(f"Pydantic validation error: {e.errors()}")
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=e.errors()
+        )
+    except ServiceException as e:
+        logger.error(f"Service error: {e.error_code} - {e.message}")
+        return ErrorResponse(
+            status="error",
+            error_code=e.error_code,
+            message=e.message,
+            details=e.details
+        )
+    except Exception as e:
+        logger.error(f"Unexpected error in select_products: {e}", exc_info=True)
+        return ErrorResponse(
+            status="error",
+            error_code="INTERNAL_ERROR",
+            message=f"Internal server error: {str(e)}",
+            details={"error_type": type(e).__name__}
+        )
+
+
+
+@app.post("/select_products/batch", response_model=Union[SelectProductsBatchResponse, ErrorResponse])
+async def select_products_batch(request: SelectProductsBatchRequest) -> Union[SelectProductsBatchResponse, ErrorResponse]:
+    """
+    Select products for many campaign specifications in one call.
+    
+    Equivalent to calling /select_products once per spec with the same limit,
+    but candidates are loaded once per distinct category and all specs that
+    share a candidate set are scored together (see select_top_products_batch).
+    Memoized selections are reused and stored as for single requests.
+    
+    A spec that fails validation or matches no products gets an ErrorResponse
+    in its slot; the other specs are still served.
+    
+    Args:
+        request: Batch request with campaign_specs and a shared limit
+        
+    Returns:
+        One SelectProductsResponse or ErrorResponse per spec, in request order,
+        or ErrorResponse if the batch itself is invalid
+    """
+    try:
+        campaign_specs = request.campaign_specs
+        limit = request.limit or 10
+        
+        if not campaign_specs:
             return ErrorResponse(
                 status="error",
-                error_code="NO_PRODUCTS_FOUND",
-                message=f"No products found" + (f" for category '{campaign_spec.category}'" if campaign_spec.category else ""),
-                details={"category": campaign_spec.category}
+                error_code="MISSING_REQUIRED_FIELDS",
+                message="campaign_specs must contain at least one campaign specification",
+                details={}
             )
         
-        logger.info(f"Loaded {len(all_products)} products from data source")
-        
-        # Step 2: Score products
-        logger.info("Scoring products based on campaign alignment")
-        scored_products = score_products(all_products, campaign_spec)
+        if len(campaign_specs) > settings.PRODUCT_BATCH_MAX_SPECS:
+            return ErrorResponse(
+                status="error",
+                error_code="BATCH_TOO_LARGE",
+                message=f"At most {settings.PRODUCT_BATCH_MAX_SPECS} campaign specifications per batch",
+                details={"count": len(campaign_specs), "max": settings.PRODUCT_BATCH_MAX_SPECS}
+            )
         
-        if not scored_products:
-            logger.error("No products scored successfully")
+        if limit <= 0:
+            logger.error(f"Invalid limit: {limit}")
             return ErrorResponse(
                 status="error",
-                error_code="SCORING_FAILED",
-                message="Failed to score products",
-                details={}
+                error_code="INVALID_LIMIT",
+                message="Limit must be greater than 0",
+                details={"limit": limit}
             )
         
-        # Step 3: Apply limit and select top products
-        logger.info(f"Selecting top {limit} products")
-        selected_scored = scored_products[:limit]
-        selected_products = [product for product, score, _ in selected_scored]
-        
-        # Step 4: Group selected products
-        logger.info("Grouping selected products by priority")
-        product_groups = group_products(selected_scored)
-        
-        # Step 5: Build debug information
-        scoring_details = {}
-        for product, score, debug_info in selected_scored:
-            scoring_details[product.product_id] = {
-                "score": score,
-                "breakdown": debug_info
-            }
-        
-        rules_applied = [
-            f"Category alignment: +0.4 (exact), +0.2 (similar)",
-            f"Price fit: Based on budget ratio (prefer products in budget/40 to budget/20 range)",
-            f"Description quality: +0.1 (length), +0.1 (keyword match)",
-            f"Metadata features: +0.1 (popularity, brand, features)",
-            f"Grouping thresholds: high >= 0.75, medium >= 0.45, low < 0.45"
-        ]
-        
-        debug_info = {
-            "scoring_details": scoring_details,
-            "selected_ids": [p.product_id for p in selected_products],
-            "rules_applied": rules_applied,
-            "total_products_loaded": len(all_products),
-            "total_products_selected": len(selected_products),
-            "data_source": "database" if is_db_available() else "csv"
-        }
+        logger.info(f"Selecting products for batch of {len(campaign_specs)} campaigns, limit={limit}")
+        
+        results: List[Union[SelectProductsResponse, ErrorResponse]] = [None] * len(campaign_specs)
+        catalog_version = _selection_cache_version()
+        
+        # Group uncached specs by candidate set (category matching is case-insensitive)
+        pending: Dict[str, List[int]] = {}
+        for i, campaign_spec in enumerate(campaign_specs):
+            if campaign_spec.budget <= 0:
+                results[i] = ErrorResponse(
+                    status="error",
+                    error_code="INVALID_BUDGET",
+                    message="Budget must be greater than 0",
+                    details={"budget": campaign_spec.budget}
+                )
+                continue
+            
+            cached = selection_cache.get(campaign_spec, limit, catalog_version) if catalog_version is not None else None
+            if cached is not None:
+                total_products_loaded, selected_scored = cached
+                results[i] = _build_selection_response(selected_scored, total_products_loaded)
+                continue
+            
+            pending.setdefault((campaign_spec.category or "").lower(), []).append(i)
+        
+        for indices in pending.values():
+            category = campaign_specs[indices[0]].category
+            all_products, keyword_matcher = load_candidates(category or None)
+            
+            if not all_products:
+                for i in indices:
+                    results[i] = ErrorResponse(
+                        status="error",
+                        error_code="NO_PRODUCTS_FOUND",
+                        message="No products found" + (f" for category '{category}'" if category else ""),
+                        details={"category": campaign_specs[i].category}
+                    )
+                continue
+            
+            selections = select_top_products_batch(
+                all_products, [campaign_specs[i] for i in indices], limit, keyword_matcher=keyword_matcher
+            )
+            cacheable = catalog_version is not None and catalog_version == _selection_cache_version()
+            for i, selected_scored in zip(indices, selections):
+                if not selected_scored:
+                    results[i] = ErrorResponse(
+                        status="error",
+                        error_code="SCORING_FAILED",
+                        message="Failed to score products",
+                        details={}
+                    )
+                    continue
+                
+                if cacheable:
+                    selection_cache.put(campaign_specs[i], limit, catalog_version, (len(all_products), selected_scored))
+                results[i] = _build_selection_response(selected_scored, len(all_products))
         
-        # Step 6: Build response
-        total_products = len(selected_products)
         logger.info(
-            f"Selected {total_products} products: "
-            f"{sum(1 for g in product_groups if g.group == 'high')} high, "
-            f"{sum(1 for g in product_groups if g.group == 'medium')} medium, "
-            f"{sum(1 for g in product_groups if g.group == 'low')} low"
+            f"Batch selection complete: {len(pending)} candidate sets loaded, "
+            f"{sum(1 for r in results if isinstance(r, ErrorResponse))} of {len(results)} campaigns failed"
         )
         
-        return SelectProductsResponse(
-            status="success",
-            products=selected_products,
-            groups=product_groups,
-            debug=debug_info,
-            # Legacy fields for backward compatibility
-            product_groups=product_groups,
-            total_products=total_products
-        )
+        return SelectProductsBatchResponse(status="success", results=results)
         
-    except PydanticValidationError as e:
-        # Let FastAPI handle Pydantic validation errors (returns 422)
-        from fastapi import HTTPException, status
-        logger.warning(f"Pydantic validation error: {e.errors()}")
-        raise HTTPException(
-            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-            detail=e.errors()
-        )
     except ServiceException as e:
         logger.error(f"Service error: {e.error_code} - {e.message}")
         return ErrorResponse(
@@ -241,7 +428,7 @@ async def select_products(request: SelectProductsRequest) -> Union[SelectProduct
             details=e.details
         )
     except Exception as e:
-        logger.error(f"Unexpected error in select_products: {e}", exc_info=True)
+        logger.error(f"Unexpected error in select_products_batch: {e}", exc_info=True)
         return ErrorResponse(
             status="error",
             error_code="INTERNAL_ERROR",
@@ -249,7 +436,6 @@ async def select_products(request: SelectProductsRequest) -> Union[SelectProduct
             details={"error_type": type(e).__name__}
         )
 
-
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8001)
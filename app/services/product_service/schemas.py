@@ -34,3 +34,21 @@ class SelectProductsResponse(BaseModel):
     total_products: Optional[int] = Field(None, description="Legacy: Total number of products selected")
     
     model_config = ConfigDict(from_attributes=True)
+
+
+class SelectProductsBatchRequest(BaseModel):
+    """Request to select products for many campaign specifications in one call."""
+    campaign_specs: List[CampaignSpec] = Field(..., description="Campaign specifications to select products for")
+    limit: Optional[int] = Field(default=10, description="Maximum number of products to select per campaign")
+    
+    model_config = ConfigDict(from_attributes=True)
+
+
+class SelectProductsBatchResponse(BaseModel):
+    """Response containing one selection result per campaign specification."""
+    status: str = Field(..., description="Response status: 'success' or 'error'")
+    results: List[Union[SelectProductsResponse, ErrorResponse]] = Field(
+        ..., description="Per-campaign results, in request order (errors do not fail the batch)"
+    )
+    
+    model_config = ConfigDict(from_attributes=True)
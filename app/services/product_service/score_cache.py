@@ -0,0 +1,166 @@
+"""
+Memoized product selection results keyed by campaign-spec fingerprint.
+
+The same campaign shapes (category, budget, objective, query keywords) are
+requested over and over against an unchanged catalog. A selection result
+depends only on the catalog contents and on the CampaignSpec fields that
+scoring reads, so it is cached under a canonical fingerprint of those fields
+plus the result limit. Entries belong to one catalog version: the first
+lookup against a different version drops every entry.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+from app.common.schemas import CampaignSpec
+from app.common.middleware import get_logger
+
+from .scoring import _extract_keywords
+
+logger = get_logger(__name__)
+
+
+def campaign_fingerprint(campaign_spec: CampaignSpec) -> Tuple:
+    """
+    Canonical fingerprint of the CampaignSpec fields that affect selection.
+
+    Specs that differ only in fields scoring ignores (platform, time_range,
+    metadata other than "brand", query words of 3 characters or fewer, word
+    order) share a fingerprint. The budget is kept exact because price
+    scores depend on the product-price-to-budget ratio, not on a tier.
+
+    Args:
+        campaign_spec: Campaign specification
+
+    Returns:
+        Hashable tuple identifying the selection inputs
+    """
+    brand = None
+    if campaign_spec.metadata and "brand" in campaign_spec.metadata:
+        brand = campaign_spec.metadata.get("brand", "").lower()
+
+    return (
+        # Raw category drives product loading; keywords cover its scoring use
+        campaign_spec.category,
+        float(campaign_spec.budget),
+        # Keyword matches are counted per keyword, so duplicates are kept
+        tuple(sorted(_extract_keywords(campaign_spec))),
+        brand,
+    )
+
+
+class ScoringCache:
+    """
+    Thread-safe LRU cache with per-entry TTL for product selection results.
+
+    - Bounded to max_entries (least recently used entries are evicted)
+    - Entries older than ttl_seconds are treated as misses (0 disables TTL)
+    - All entries are dropped when a lookup carries a different catalog version;
+      results computed against a replaced catalog are not stored
+
+    Cached values are shared between requests and must be treated as read-only.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 300.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._catalog_version: Optional[int] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        """Whether results are cached at all (max_entries > 0)."""
+        return self.max_entries > 0
+
+    def get(self, campaign_spec: CampaignSpec, limit: int, catalog_version: int) -> Optional[Any]:
+        """
+        Look up a cached selection result.
+
+        Args:
+            campaign_spec: Campaign specification
+            limit: Result limit the selection was made with
+            catalog_version: Version of the catalog the caller is serving
+
+        Returns:
+            Cached value, or None on a miss
+        """
+        if not self.enabled:
+            return None
+
+        key = (campaign_fingerprint(campaign_spec), limit)
+        with self._lock:
+            self._check_version(catalog_version)
+            entry = self._entries.get(key)
+            if entry is not None:
+                stored_at, value = entry
+                if self.ttl_seconds > 0 and time.monotonic() - stored_at > self.ttl_seconds:
+                    del self._entries[key]
+                    self.expirations += 1
+                else:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+            self.misses += 1
+            return None
+
+    def put(self, campaign_spec: CampaignSpec, limit: int, catalog_version: int, value: Any) -> None:
+        """
+        Store a selection result computed against catalog_version.
+
+        Args:
+            campaign_spec: Campaign specification
+            limit: Result limit the selection was made with
+            catalog_version: Version of the catalog the result was computed from
+            value: Result to cache
+        """
+        if not self.enabled:
+            return
+
+        key = (campaign_fingerprint(campaign_spec), limit)
+        with self._lock:
+            if catalog_version != self._catalog_version:
+                # Computed against a catalog that has since been replaced
+                return
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Drop all entries (metrics are kept)."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Cache size and hit/miss metrics."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "catalog_version": self._catalog_version,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+    def _check_version(self, catalog_version: int) -> None:
+        """Drop every entry when the served catalog version changes (lock held)."""
+        if catalog_version != self._catalog_version:
+            if self._entries:
+                self.invalidations += 1
+                logger.info(f"Catalog version {catalog_version} loaded, dropping {len(self._entries)} cached selections")
+            self._entries.clear()
+            self._catalog_version = catalog_version
@@ -2,14 +2,34 @@
 Product scoring logic for campaign matching.
 
 Implements rule-based scoring that can be extended with ML in the future.
+
+When NumPy is installed, score_products scores the whole candidate set with
+array operations (see compute_score_arrays); results are identical to the
+per-product compute_product_score path. Candidates served from a catalog
+can pass a KeywordMatcher so keyword matches come from the catalog's
+inverted index instead of scanning every description.
 """
 
-from typing import Dict, Tuple
+import heapq
+from typing import Dict, List, Optional, Tuple
 from app.common.schemas import Product, CampaignSpec
 from app.common.middleware import get_logger
 
+from .keyword_index import KeywordMatcher
+
 logger = get_logger(__name__)
 
+# Try to import NumPy (optional dependency for vectorized scoring)
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+    logger.info("NumPy not available, using per-product scoring")
+
+SCORE_COMPONENTS = ("category_score", "price_score", "description_score", "metadata_score")
+
 
 def compute_product_score(product: Product, campaign_spec: CampaignSpec) -> Tuple[float, Dict]:
     """
@@ -162,6 +182,22 @@ def _compute_description_score(description: str, campaign_spec: CampaignSpec) ->
     
     # Keyword match score (max 0.1)
     desc_lower = description.lower()
+    keywords = _extract_keywords(campaign_spec)
+    
+    keyword_matches = sum(1 for keyword in keywords if keyword in desc_lower)
+    keyword_score = min(0.1, keyword_matches * 0.03)
+    score += keyword_score
+    
+    return min(0.2, score)
+
+
+def _extract_keywords(campaign_spec: CampaignSpec) -> List[str]:
+    """
+    Extract description-matching keywords from a campaign specification.
+    
+    Keywords are the category, the objective and user query words longer
+    than 3 characters, all lowercased.
+    """
     keywords = []
     
     if campaign_spec.category:
@@ -175,11 +211,7 @@ def _compute_description_score(description: str, campaign_spec: CampaignSpec) ->
         query_words = campaign_spec.user_query.lower().split()
         keywords.extend([w for w in query_words if len(w) > 3])
     
-    keyword_matches = sum(1 for keyword in keywords if keyword in desc_lower)
-    keyword_score = min(0.1, keyword_matches * 0.03)
-    score += keyword_score
-    
-    return min(0.2, score)
+    return keywords
 
 
 def _compute_metadata_score(metadata: Dict, campaign_spec: CampaignSpec) -> float:
@@ -220,17 +252,229 @@ def _compute_metadata_score(metadata: Dict, campaign_spec: CampaignSpec) -> floa
     return min(0.1, score)
 
 
-def score_products(products: list, campaign_spec: CampaignSpec) -> list:
+def compute_score_arrays(
+    products: list,
+    campaign_spec: CampaignSpec,
+    keyword_matcher: Optional[KeywordMatcher] = None
+) -> Dict[str, "np.ndarray"]:
+    """
+    Compute score components for a whole candidate set with NumPy.
+    
+    Applies the same rules as compute_product_score, in the same order of
+    floating-point operations, so every score matches the per-product path.
+    String and dict inputs (categories, descriptions, metadata) are reduced
+    to numeric columns first; all arithmetic then runs on arrays.
+    
+    Args:
+        products: List of Product objects
+        campaign_spec: Campaign specification
+        keyword_matcher: Catalog keyword index over the products' rows (matches
+            keywords without scanning descriptions)
+        
+    Returns:
+        Dictionary mapping each SCORE_COMPONENTS name and "total_score"
+        to a float64 array aligned with products
+    """
+    if not NUMPY_AVAILABLE:
+        raise RuntimeError("NumPy is required for vectorized scoring")
+    
+    return _score_arrays_from_columns(_prepare_score_columns(products, keyword_matcher), campaign_spec)
+
+
+def _prepare_score_columns(products: list, keyword_matcher: Optional[KeywordMatcher] = None) -> Dict:
+    """
+    Reduce products to the numeric and lowercased columns scoring reads.
+    
+    The columns do not depend on the campaign, so they are built once per
+    candidate set; per-campaign intermediate results (category scores,
+    keyword matches, brand matches) are memoized in the returned dict and
+    shared by every campaign scored against it.
+    """
+    n = len(products)
+    if keyword_matcher is not None and len(keyword_matcher) != n:
+        raise ValueError(f"Keyword matcher covers {len(keyword_matcher)} rows, expected {n}")
+    descriptions = [p.description or "" for p in products]
+    
+    has_metadata = np.zeros(n, dtype=bool)
+    popularity = np.zeros(n, dtype=np.float64)
+    has_popularity = np.zeros(n, dtype=bool)
+    feature_counts = np.zeros(n, dtype=np.float64)
+    has_features = np.zeros(n, dtype=bool)
+    for i, product in enumerate(products):
+        metadata = product.metadata
+        if not metadata:
+            continue
+        has_metadata[i] = True
+        
+        if "popularity" in metadata:
+            try:
+                popularity[i] = float(metadata["popularity"])
+                has_popularity[i] = True
+            except (ValueError, TypeError):
+                pass
+        
+        if "features" in metadata and isinstance(metadata["features"], list):
+            feature_counts[i] = len(metadata["features"])
+            has_features[i] = True
+    
+    return {
+        "products": products,
+        "n": n,
+        "categories": [p.category for p in products],
+        "prices": np.fromiter((p.price for p in products), dtype=np.float64, count=n),
+        # Lowercased only when keywords have to be matched by scanning
+        "descriptions": descriptions,
+        "descriptions_lower": None,
+        "keyword_matcher": keyword_matcher,
+        "lengths": np.fromiter((len(d) for d in descriptions), dtype=np.float64, count=n),
+        "has_metadata": has_metadata,
+        "popularity": popularity,
+        "has_popularity": has_popularity,
+        "feature_counts": feature_counts,
+        "has_features": has_features,
+        # Memoized per-campaign intermediates
+        "category_scores": {},
+        "keyword_matches": {},
+        "brand_matches": {},
+    }
+
+
+def _score_arrays_from_columns(columns: Dict, campaign_spec: CampaignSpec) -> Dict[str, "np.ndarray"]:
+    """Score one campaign against prepared columns (see compute_score_arrays)."""
+    n = columns["n"]
+    
+    # 1. Category alignment: score each distinct category once
+    category_scores = columns["category_scores"].get(campaign_spec.category)
+    if category_scores is None:
+        category_cache: Dict[str, float] = {}
+        category_scores = np.empty(n, dtype=np.float64)
+        for i, category in enumerate(columns["categories"]):
+            if category not in category_cache:
+                category_cache[category] = _compute_category_score(category, campaign_spec.category)
+            category_scores[i] = category_cache[category]
+        columns["category_scores"][campaign_spec.category] = category_scores
+    
+    # 2. Price fit
+    prices = columns["prices"]
+    budget = campaign_spec.budget
+    if budget <= 0:
+        price_scores = np.full(n, 0.1)
+    else:
+        ratio = prices / budget
+        if budget < 1000:
+            conditions = [ratio < 0.025, ratio < 0.05, ratio < 0.1]
+            choices = [0.3, 0.2, 0.1]
+        else:
+            conditions = [
+                (ratio >= 0.025) & (ratio < 0.05),
+                (ratio >= 0.01) & (ratio < 0.025),
+                (ratio >= 0.05) & (ratio < 0.1),
+                ratio < 0.01,
+            ]
+            choices = [0.3, 0.25, 0.2, 0.1]
+        price_scores = np.select(conditions, choices, default=0.05)
+    
+    # 3. Description quality: one index lookup (or substring scan) per distinct keyword
+    lengths = columns["lengths"]
+    matches = np.zeros(n)
+    for keyword in _extract_keywords(campaign_spec):
+        keyword_matches = columns["keyword_matches"].get(keyword)
+        if keyword_matches is None:
+            keyword_matches = _keyword_match_array(columns, keyword)
+            columns["keyword_matches"][keyword] = keyword_matches
+        matches = matches + keyword_matches
+    length_scores = np.minimum(0.1, lengths / 300.0 * 0.1)
+    keyword_scores = np.minimum(0.1, matches * 0.03)
+    description_scores = np.minimum(0.2, length_scores + keyword_scores)
+    description_scores[lengths == 0] = 0.0
+    
+    # 4. Metadata features
+    metadata_scores = _compute_metadata_score_array(columns, campaign_spec)
+    
+    # Clip to [0, 1] (fmin/fmax mirror Python's min/max handling of NaN)
+    total_scores = category_scores + price_scores + description_scores + metadata_scores
+    total_scores = np.fmax(0.0, np.fmin(1.0, total_scores))
+    
+    return {
+        "category_score": category_scores,
+        "price_score": price_scores,
+        "description_score": description_scores,
+        "metadata_score": metadata_scores,
+        "total_score": total_scores,
+    }
+
+
+def _keyword_match_array(columns: Dict, keyword: str) -> "np.ndarray":
+    """0/1 array marking products whose lowercased description contains keyword."""
+    if columns["keyword_matcher"] is not None:
+        return columns["keyword_matcher"].matches(keyword)
+    
+    if columns["descriptions_lower"] is None:
+        columns["descriptions_lower"] = [d.lower() for d in columns["descriptions"]]
+    return np.fromiter(
+        (keyword in d for d in columns["descriptions_lower"]), dtype=np.float64, count=columns["n"]
+    )
+
+
+def _compute_metadata_score_array(columns: Dict, campaign_spec: CampaignSpec) -> "np.ndarray":
+    """Vectorized equivalent of _compute_metadata_score over prepared columns."""
+    campaign_brand = None
+    if campaign_spec.metadata and "brand" in campaign_spec.metadata:
+        campaign_brand = campaign_spec.metadata.get("brand", "").lower()
+    
+    brand_match = columns["brand_matches"].get(campaign_brand)
+    if brand_match is None:
+        brand_match = np.zeros(columns["n"], dtype=bool)
+        if campaign_brand is not None:
+            for i, product in enumerate(columns["products"]):
+                metadata = product.metadata
+                if metadata:
+                    product_brand = metadata.get("brand", "").lower()
+                    brand_match[i] = bool(product_brand) and campaign_brand in product_brand
+        columns["brand_matches"][campaign_brand] = brand_match
+    
+    # Adding 0.0 for absent terms leaves the running sum bit-identical
+    scores = np.where(columns["has_popularity"], np.fmin(0.05, columns["popularity"] * 0.05), 0.0)
+    scores = scores + np.where(brand_match, 0.03, 0.0)
+    scores = scores + np.where(columns["has_features"], np.minimum(0.02, columns["feature_counts"] * 0.005), 0.0)
+    scores = np.minimum(0.1, scores)
+    scores[~columns["has_metadata"]] = 0.0
+    return scores
+
+
+def score_products(
+    products: list,
+    campaign_spec: CampaignSpec,
+    vectorized: Optional[bool] = None,
+    keyword_matcher: Optional[KeywordMatcher] = None
+) -> list:
     """
     Score a list of products and return sorted by score (descending).
     
     Args:
         products: List of Product objects
         campaign_spec: Campaign specification
+        vectorized: Use NumPy batch scoring (default: when NumPy is installed)
+        keyword_matcher: Catalog keyword index over the products' rows (vectorized path only)
         
     Returns:
         List of tuples (product, score, debug_info) sorted by score descending
     """
+    if vectorized is None:
+        vectorized = NUMPY_AVAILABLE
+    
+    if vectorized and products:
+        arrays = compute_score_arrays(products, campaign_spec, keyword_matcher)
+        columns = {name: arrays[name].tolist() for name in SCORE_COMPONENTS + ("total_score",)}
+        totals = columns["total_score"]
+        
+        # Stable descending order, same tie-breaking as list.sort(reverse=True)
+        order = np.argsort(-arrays["total_score"], kind="stable")
+        return [
+            (products[i], totals[i], {name: columns[name][i] for name in columns})
+            for i in order.tolist()
+        ]
+    
     scored_products = []
     
     for product in products:
@@ -242,3 +486,104 @@ def score_products(products: list, campaign_spec: CampaignSpec) -> list:
     
     return scored_products
 
+
+def select_top_products(
+    products: list,
+    campaign_spec: CampaignSpec,
+    limit: int,
+    vectorized: Optional[bool] = None,
+    keyword_matcher: Optional[KeywordMatcher] = None
+) -> list:
+    """
+    Score products and return only the top `limit`, sorted by score (descending).
+    
+    Equivalent to score_products(products, campaign_spec)[:limit], including
+    tie-breaking (equal scores keep catalog order), but avoids a full sort:
+    the vectorized path uses a partial partition and builds debug breakdowns
+    only for the selected products; the per-product path uses a bounded heap.
+    
+    Args:
+        products: List of Product objects
+        campaign_spec: Campaign specification
+        limit: Maximum number of products to return
+        vectorized: Use NumPy batch scoring (default: when NumPy is installed)
+        keyword_matcher: Catalog keyword index over the products' rows (vectorized path only)
+        
+    Returns:
+        List of tuples (product, score, debug_info) sorted by score descending
+    """
+    if limit <= 0 or not products:
+        return []
+    
+    if vectorized is None:
+        vectorized = NUMPY_AVAILABLE
+    
+    if not vectorized:
+        scored = [compute_product_score(product, campaign_spec) for product in products]
+        top_rows = heapq.nsmallest(limit, range(len(products)), key=lambda i: (-scored[i][0], i))
+        return [(products[i], scored[i][0], scored[i][1]) for i in top_rows]
+    
+    return _select_top_from_arrays(products, compute_score_arrays(products, campaign_spec, keyword_matcher), limit)
+
+
+def select_top_products_batch(
+    products: list,
+    campaign_specs: List[CampaignSpec],
+    limit: int,
+    vectorized: Optional[bool] = None,
+    keyword_matcher: Optional[KeywordMatcher] = None
+) -> List[list]:
+    """
+    Select the top `limit` products for each of several campaigns over one candidate set.
+    
+    Equivalent to [select_top_products(products, spec, limit) for spec in
+    campaign_specs], but the per-product columns (prices, lowercased
+    descriptions, decoded metadata features) are extracted once and
+    intermediate results are shared between campaigns with the same
+    category, keywords or brand.
+    
+    Args:
+        products: List of Product objects
+        campaign_specs: Campaign specifications
+        limit: Maximum number of products to return per campaign
+        vectorized: Use NumPy batch scoring (default: when NumPy is installed)
+        keyword_matcher: Catalog keyword index over the products' rows (vectorized path only)
+        
+    Returns:
+        One list of (product, score, debug_info) tuples per campaign, in input order
+    """
+    if vectorized is None:
+        vectorized = NUMPY_AVAILABLE
+    
+    if not vectorized or limit <= 0 or not products:
+        return [select_top_products(products, spec, limit, vectorized=vectorized) for spec in campaign_specs]
+    
+    columns = _prepare_score_columns(products, keyword_matcher)
+    return [
+        _select_top_from_arrays(products, _score_arrays_from_columns(columns, spec), limit)
+        for spec in campaign_specs
+    ]
+
+
+def _select_top_from_arrays(products: list, arrays: Dict[str, "np.ndarray"], limit: int) -> list:
+    """Partially select the top `limit` rows of computed score arrays (see select_top_products)."""
+    totals = arrays["total_score"]
+    n = len(products)
+    
+    if limit >= n:
+        chosen = np.arange(n)
+    else:
+        # kth largest score; everything above it is selected, ties at the
+        # boundary are filled in catalog order
+        kth = np.partition(totals, n - limit)[n - limit]
+        above = np.flatnonzero(totals > kth)
+        ties = np.flatnonzero(totals == kth)[:limit - len(above)]
+        chosen = np.sort(np.concatenate([above, ties]))
+    
+    order = chosen[np.argsort(-totals[chosen], kind="stable")]
+    
+    names = SCORE_COMPONENTS + ("total_score",)
+    return [
+        (products[i], float(totals[i]), {name: float(arrays[name][i]) for name in names})
+        for i in order.tolist()
+    ]
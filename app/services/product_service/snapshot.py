@@ -0,0 +1,326 @@
+"""
+Memory-mapped binary product catalog snapshots.
+
+A snapshot is a compiled form of the product catalog (from products.csv or
+the ProductORM table) that loads with mmap in milliseconds. Several uvicorn
+workers on one host then share a single page-cache copy of the catalog
+instead of each holding its own product objects.
+
+File layout (little-endian):
+- 8-byte magic b"PCATSNP1"
+- uint64 length of the JSON section directory, followed by the directory:
+  {"version": 1, "rows": n, "sections": {name: [offset, length, format]}}
+- 8-byte aligned sections: fixed-width numeric columns ("d" float64,
+  "I" uint32, "Q" uint64) and string columns stored as an offset array
+  plus a UTF-8 heap plus a null mask.
+
+Usage:
+    python -m app.services.product_service.snapshot --csv products.csv --output products.snap
+    python -m app.services.product_service.snapshot --db --output products.snap
+"""
+
+import json
+import mmap
+import os
+import struct
+from array import array
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+from app.common.middleware import get_logger
+
+from .catalog import ProductCatalog
+
+logger = get_logger(__name__)
+
+SNAPSHOT_MAGIC = b"PCATSNP1"
+SNAPSHOT_VERSION = 1
+
+# String columns stored as offsets + heap + null mask
+STRING_COLUMNS = ("product_ids", "titles", "descriptions", "image_urls", "metadata_json")
+
+
+class SnapshotError(Exception):
+    """Raised when a snapshot file is missing, corrupt or of an unsupported version."""
+
+
+class MappedStringColumn(Sequence):
+    """Read-only string column decoded on access from a memory-mapped heap."""
+
+    def __init__(self, offsets: memoryview, heap: memoryview, nulls: memoryview):
+        self._offsets = offsets
+        self._heap = heap
+        self._nulls = nulls
+
+    def __len__(self) -> int:
+        return len(self._nulls)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if self._nulls[index]:
+            return None
+        return str(self._heap[self._offsets[index]:self._offsets[index + 1]], "utf-8")
+
+
+class CodedStringColumn(Sequence):
+    """Read-only column of small-cardinality strings stored as integer codes."""
+
+    def __init__(self, codes: memoryview, table: List[str]):
+        self._codes = codes
+        self._table = table
+
+    def __len__(self) -> int:
+        return len(self._codes)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        return self._table[self._codes[index]]
+
+
+def _encode_strings(values: Sequence[Optional[str]]) -> Tuple[array, bytes, bytes]:
+    """Encode a string column as (uint64 offsets, UTF-8 heap, null mask)."""
+    offsets = array("Q", [0])
+    nulls = bytearray(len(values))
+    chunks = []
+    position = 0
+    for i, value in enumerate(values):
+        if value is None:
+            nulls[i] = 1
+        else:
+            encoded = value.encode("utf-8")
+            chunks.append(encoded)
+            position += len(encoded)
+        offsets.append(position)
+    return offsets, b"".join(chunks), bytes(nulls)
+
+
+def write_snapshot(catalog: ProductCatalog, output_path: Union[str, Path]) -> Path:
+    """
+    Compile a catalog into a snapshot file.
+
+    The file is written to a temporary path and renamed into place, so
+    readers never observe a partially written snapshot.
+
+    Args:
+        catalog: Catalog to compile
+        output_path: Destination snapshot path
+
+    Returns:
+        Path of the written snapshot
+    """
+    output_path = Path(output_path)
+    n = len(catalog)
+
+    # Category dictionary: raw categories -> codes, rows grouped by code
+    raw_categories = [catalog._raw_categories[row] or "" for row in range(n)]
+    category_table: List[str] = []
+    category_codes_by_name: Dict[str, int] = {}
+    category_codes = array("I")
+    rows_by_code: List[List[int]] = []
+    for row, category in enumerate(raw_categories):
+        code = category_codes_by_name.get(category)
+        if code is None:
+            code = len(category_table)
+            category_codes_by_name[category] = code
+            category_table.append(category)
+            rows_by_code.append([])
+        category_codes.append(code)
+        rows_by_code[code].append(row)
+
+    category_rows = array("Q")
+    category_row_offsets = array("Q", [0])
+    for rows in rows_by_code:
+        category_rows.extend(rows)
+        category_row_offsets.append(len(category_rows))
+
+    price_order = array("Q", catalog.rows_in_price_range())
+    prices = array("d", (catalog.prices[row] for row in range(n)))
+
+    sections: Dict[str, Tuple[bytes, str]] = {
+        "prices": (prices.tobytes(), "d"),
+        "sorted_prices": (array("d", (prices[row] for row in price_order)).tobytes(), "d"),
+        "price_order": (price_order.tobytes(), "Q"),
+        "description_lengths": (array("I", (catalog.description_lengths[row] for row in range(n))).tobytes(), "I"),
+        "category_codes": (category_codes.tobytes(), "I"),
+        "category_rows": (category_rows.tobytes(), "Q"),
+        "category_row_offsets": (category_row_offsets.tobytes(), "Q"),
+    }
+    for name in STRING_COLUMNS:
+        column = catalog._metadata_json if name == "metadata_json" else getattr(catalog, name)
+        offsets, heap, nulls = _encode_strings([column[row] for row in range(n)])
+        sections[f"{name}.offsets"] = (offsets.tobytes(), "Q")
+        sections[f"{name}.heap"] = (heap, "B")
+        sections[f"{name}.nulls"] = (nulls, "B")
+
+    # Lay out sections after the directory, each 8-byte aligned
+    def build_directory(base: int) -> Tuple[bytes, Dict[str, list]]:
+        layout = {}
+        offset = base
+        for name, (data, fmt) in sections.items():
+            offset = (offset + 7) & ~7
+            layout[name] = [offset, len(data), fmt]
+            offset += len(data)
+        directory = {
+            "version": SNAPSHOT_VERSION,
+            "rows": n,
+            "category_table": category_table,
+            "sections": layout,
+        }
+        return json.dumps(directory, ensure_ascii=False).encode("utf-8"), layout
+
+    # Directory size depends on offsets, which depend on directory size: iterate to a fixed point
+    directory_bytes, layout = build_directory(0)
+    while True:
+        base = len(SNAPSHOT_MAGIC) + 8 + len(directory_bytes)
+        candidate, layout = build_directory(base)
+        if len(candidate) == len(directory_bytes):
+            directory_bytes = candidate
+            break
+        directory_bytes = candidate
+
+    tmp_path = output_path.with_name(output_path.name + ".tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(SNAPSHOT_MAGIC)
+        f.write(struct.pack("<Q", len(directory_bytes)))
+        f.write(directory_bytes)
+        for name, (data, _fmt) in sections.items():
+            f.write(b"\0" * (layout[name][0] - f.tell()))
+            f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, output_path)
+
+    logger.info(f"Wrote product snapshot with {n} products to {output_path}")
+    return output_path
+
+
+def load_snapshot(snapshot_path: Union[str, Path]) -> ProductCatalog:
+    """
+    Load a snapshot file as a catalog backed by a read-only memory map.
+
+    Only the section directory and the category table are decoded; every
+    column is a view over the mapping, so pages are shared with other
+    processes mapping the same file and are faulted in on access.
+
+    Args:
+        snapshot_path: Path to a snapshot written by write_snapshot
+
+    Returns:
+        ProductCatalog whose columns are views over the snapshot
+
+    Raises:
+        SnapshotError: If the file is missing, corrupt or of another version
+    """
+    snapshot_path = Path(snapshot_path)
+    try:
+        with open(snapshot_path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError) as e:
+        raise SnapshotError(f"Cannot map snapshot {snapshot_path}: {e}") from e
+
+    buffer = memoryview(mapped)
+    try:
+        header_size = len(SNAPSHOT_MAGIC) + 8
+        if len(buffer) < header_size or bytes(buffer[:len(SNAPSHOT_MAGIC)]) != SNAPSHOT_MAGIC:
+            raise SnapshotError(f"Not a product snapshot: {snapshot_path}")
+        (directory_length,) = struct.unpack_from("<Q", buffer, len(SNAPSHOT_MAGIC))
+        directory = json.loads(str(buffer[header_size:header_size + directory_length], "utf-8"))
+        if directory.get("version") != SNAPSHOT_VERSION:
+            raise SnapshotError(f"Unsupported snapshot version {directory.get('version')}: {snapshot_path}")
+
+        def section(name: str) -> memoryview:
+            offset, length, fmt = directory["sections"][name]
+            if offset + length > len(buffer):
+                raise SnapshotError(f"Truncated snapshot section '{name}': {snapshot_path}")
+            view = buffer[offset:offset + length]
+            return view if fmt == "B" else view.cast(fmt)
+
+        category_table: List[str] = directory["category_table"]
+        category_rows = section("category_rows")
+        category_row_offsets = section("category_row_offsets")
+
+        # Category index keyed by lowercased category; raw categories differing
+        # only in case share a key and are merged back into row order
+        category_index: Dict[str, Sequence[int]] = {}
+        for code, category in enumerate(category_table):
+            rows = category_rows[category_row_offsets[code]:category_row_offsets[code + 1]]
+            key = category.lower()
+            if key in category_index:
+                category_index[key] = sorted(list(category_index[key]) + list(rows))
+            else:
+                category_index[key] = rows
+
+        strings = {
+            name: MappedStringColumn(section(f"{name}.offsets"), section(f"{name}.heap"), section(f"{name}.nulls"))
+            for name in STRING_COLUMNS
+        }
+        category_codes = section("category_codes")
+    except SnapshotError:
+        raise
+    except (KeyError, ValueError, TypeError, struct.error) as e:
+        raise SnapshotError(f"Corrupt snapshot {snapshot_path}: {e}") from e
+
+    catalog = ProductCatalog.from_columns(
+        product_ids=strings["product_ids"],
+        titles=strings["titles"],
+        descriptions=strings["descriptions"],
+        prices=section("prices"),
+        categories=CodedStringColumn(category_codes, [c.lower() for c in category_table]),
+        raw_categories=CodedStringColumn(category_codes, category_table),
+        description_lengths=section("description_lengths"),
+        image_urls=strings["image_urls"],
+        metadata_json=strings["metadata_json"],
+        category_index=category_index,
+        price_order=section("price_order"),
+        sorted_prices=section("sorted_prices")
+    )
+    # Keep the mapping alive for as long as the catalog references its views
+    catalog._mmap = mapped
+
+    logger.info(f"Mapped product snapshot with {len(catalog)} products from {snapshot_path}")
+    return catalog
+
+
+def compile_snapshot_from_csv(csv_path: Optional[str], output_path: Union[str, Path]) -> Optional[Path]:
+    """Compile products.csv into a snapshot (None if the CSV cannot be loaded)."""
+    from .loaders import load_catalog_from_csv
+
+    catalog = load_catalog_from_csv(csv_path)
+    if catalog is None:
+        return None
+    return write_snapshot(catalog, output_path)
+
+
+def compile_snapshot_from_db(output_path: Union[str, Path]) -> Optional[Path]:
+    """Compile the ProductORM table into a snapshot (None if the database has no products)."""
+    from .loaders import load_products_from_db
+
+    products = load_products_from_db()
+    if not products:
+        return None
+    return write_snapshot(ProductCatalog(products), output_path)
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+    from app.common.db import init_db
+
+    parser = argparse.ArgumentParser(description="Compile a memory-mapped product catalog snapshot")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--csv", help="Path to products CSV file")
+    source.add_argument("--db", action="store_true", help="Read products from DATABASE_URL")
+    parser.add_argument("--output", required=True, help="Snapshot output path")
+    args = parser.parse_args()
+
+    if args.db:
+        init_db()
+        written = compile_snapshot_from_db(args.output)
+    else:
+        written = compile_snapshot_from_csv(args.csv, args.output)
+
+    if written is None:
+        print("No products found, snapshot not written", file=sys.stderr)
+        sys.exit(1)
+    print(f"Snapshot written to {written}")
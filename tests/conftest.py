@@ -452,6 +452,24 @@ def test_db_session(monkeypatch):
     yield
 
 
+@pytest.fixture(scope="session", autouse=True)
+def logs_service_file_log(tmp_path_factory):
+    """Write the logs service's JSON event file to a temp directory instead of logs/."""
+    from app.common.config import settings
+    from app.services.logs_service.logger_config import setup_file_logging, stop_file_logging
+    original_path = settings.LOGS_FILE_PATH
+    settings.LOGS_FILE_PATH = str(tmp_path_factory.mktemp("logs") / "logs_service.log")
+    setup_file_logging(
+        log_file_path=settings.LOGS_FILE_PATH,
+        use_queue=settings.LOGS_FILE_QUEUE_ENABLED,
+        queue_size=settings.LOGS_FILE_QUEUE_SIZE,
+        compress_rotated=settings.LOGS_FILE_COMPRESS_ROTATED
+    )
+    yield
+    stop_file_logging()
+    settings.LOGS_FILE_PATH = original_path
+
+
 @pytest.fixture(autouse=True)
 def disable_external_apis(monkeypatch):
     """Automatically disable external API calls in tests."""
@@ -461,3 +479,29 @@ def disable_external_apis(monkeypatch):
     # Disable Meta API key
     monkeypatch.setenv("META_ACCESS_TOKEN", "")
     yield
+
+
+@pytest.fixture(autouse=True)
+def isolated_llm_cache(monkeypatch):
+    """Give each test an empty, memory-only LLM response cache."""
+    from app.services.creative_service import creative_utils
+    from app.services.creative_service.llm_cache import LLMResponseCache
+    monkeypatch.setattr(creative_utils, "llm_cache", LLMResponseCache(max_entries=128))
+    yield
+
+
+@pytest.fixture(autouse=True)
+def disable_image_asset_cache(monkeypatch):
+    """Disable the generated-image asset cache (it downloads generated images)."""
+    from app.services.creative_service import creative_utils
+    monkeypatch.setattr(creative_utils, "image_cache", None)
+    yield
+
+
+@pytest.fixture(autouse=True)
+def reset_provider_limiters():
+    """Start each test with fresh provider rate limiters."""
+    from app.services.creative_service.rate_limiter import reset_provider_limiters as reset
+    reset()
+    yield
+    reset()
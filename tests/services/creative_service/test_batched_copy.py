@@ -0,0 +1,170 @@
+"""
+Tests for batched multi-product copy generation.
+"""
+
+import json
+import re
+import threading
+import pytest
+from unittest.mock import patch
+from app.common.schemas import Product
+from app.services.creative_service.creative_utils import (
+    build_batch_copy_prompt,
+    parse_batch_copy_response,
+    load_creative_policy
+)
+from tests.testdata import VALID_CAMPAIGN_SPEC_META_ELECTRONICS
+
+COPY_RESPONSE = '{"headline": "Single Headline", "primary_text": "Single primary text for the ad."}'
+
+
+def _products(count: int):
+    return [
+        Product(
+            product_id=f"P{i}",
+            title=f"Product {i}",
+            description=f"Description for product {i}",
+            price=49.99,
+            category="electronics",
+        )
+        for i in range(count)
+    ]
+
+
+class FakeLLM:
+    """Fake call_gemini_text answering batched and per-item prompts."""
+
+    def __init__(self, drop_items=(), fail_batches=False):
+        self.drop_items = set(drop_items)
+        self.fail_batches = fail_batches
+        self.calls = {"batch": 0, "copy": 0, "image_prompt": 0}
+        self.batch_sizes = []
+        self._lock = threading.Lock()
+
+    def __call__(self, prompt, response_schema=None, max_output_tokens=None):
+        if response_schema and "creatives" in response_schema.get("properties", {}):
+            with self._lock:
+                self.calls["batch"] += 1
+            if self.fail_batches:
+                raise RuntimeError("LLM unavailable")
+            items = re.findall(r"^Item (\d+):\n- Title: (.+)$", prompt, re.MULTILINE)
+            with self._lock:
+                self.batch_sizes.append(len(items))
+            return json.dumps({"creatives": [
+                {
+                    "item_id": item_id,
+                    "headline": f"Batched {title}",
+                    "primary_text": f"Batched text for {title}.",
+                    "image_description": f"Studio photo of {title}",
+                }
+                for item_id, title in items if title not in self.drop_items
+            ]})
+        with self._lock:
+            self.calls["copy" if response_schema else "image_prompt"] += 1
+        return COPY_RESPONSE if response_schema else "A product photo"
+
+
+def _request(products, **ab_config):
+    return {
+        "campaign_spec": VALID_CAMPAIGN_SPEC_META_ELECTRONICS.model_dump(),
+        "products": [p.model_dump() for p in products],
+        "ab_config": {
+            "variants_per_product": 2,
+            "max_creatives": 10,
+            "enable_image_generation": False,
+            "batch_copy_generation": True,
+            **ab_config,
+        },
+    }
+
+
+class TestBatchCopyPrompt:
+    """Test building and parsing batched prompts."""
+
+    def test_prompt_lists_every_item(self):
+        """Test each item appears with its id, product and variant approach."""
+        products = _products(2)
+        prompt = build_batch_copy_prompt(
+            [("1", products[0], "A"), ("2", products[1], "B")],
+            VALID_CAMPAIGN_SPEC_META_ELECTRONICS,
+            load_creative_policy()
+        )
+        assert "Item 1:\n- Title: Product 0" in prompt
+        assert "Item 2:\n- Title: Product 1" in prompt
+        assert "storytelling" in prompt
+        assert '"creatives"' in prompt
+
+    def test_parse_keeps_complete_known_items(self):
+        """Test unknown, duplicate and incomplete entries are dropped."""
+        response = json.dumps({"creatives": [
+            {"item_id": "1", "headline": "H1", "primary_text": "T1", "image_description": "D1"},
+            {"item_id": "1", "headline": "dup", "primary_text": "dup"},
+            {"item_id": "2", "headline": "", "primary_text": "T2"},
+            {"item_id": 3, "headline": "H3", "primary_text": "T3"},
+            {"item_id": "9", "headline": "H9", "primary_text": "T9"},
+            "not an object",
+        ]})
+        parsed = parse_batch_copy_response(response, ["1", "2", "3"])
+        assert parsed == {
+            "1": {"headline": "H1", "primary_text": "T1", "image_description": "D1"},
+            "3": {"headline": "H3", "primary_text": "T3", "image_description": None},
+        }
+
+    @pytest.mark.parametrize("response", [None, "", "not json", '{"creatives": "x"}', "[]"])
+    def test_parse_invalid_responses(self, response):
+        """Test unusable responses parse to no items."""
+        assert parse_batch_copy_response(response, ["1"]) == {}
+
+    def test_parse_markdown_wrapped(self):
+        """Test markdown code fences are stripped."""
+        response = '```json\n{"creatives": [{"item_id": "1", "headline": "H", "primary_text": "T"}]}\n```'
+        assert parse_batch_copy_response(response, ["1"])["1"]["headline"] == "H"
+
+
+class TestBatchedGeneration:
+    """Test /generate_creatives in batched copy mode."""
+
+    def test_batches_replace_per_item_calls(self, creative_client):
+        """Test 8 creatives take 2 batched calls and no per-item LLM calls."""
+        fake = FakeLLM()
+        with patch("app.services.creative_service.main.call_gemini_text", side_effect=fake):
+            data = creative_client.post("/generate_creatives", json=_request(_products(4), copy_batch_size=5)).json()
+
+        assert data["status"] == "success"
+        assert fake.calls == {"batch": 2, "copy": 0, "image_prompt": 0}
+        assert sorted(fake.batch_sizes) == [3, 5]
+        assert [(c["product_id"], c["variant_id"], c["headline"]) for c in data["creatives"]] == [
+            (f"P{i}", v, f"Batched Product {i}") for i in range(4) for v in ["A", "B"]
+        ]
+        assert all(r["batched"] for r in data["debug"]["raw_llm_responses"])
+        assert [call["parsed_items"] for call in data["debug"]["batch_copy_calls"]] == [5, 3]
+
+    def test_missing_items_fall_back_to_per_item_calls(self, creative_client):
+        """Test items left out of the batch response get their own calls."""
+        fake = FakeLLM(drop_items={"Product 1"})
+        with patch("app.services.creative_service.main.call_gemini_text", side_effect=fake):
+            data = creative_client.post("/generate_creatives", json=_request(_products(2))).json()
+
+        assert fake.calls == {"batch": 1, "copy": 2, "image_prompt": 2}
+        assert [c["headline"] for c in data["creatives"]] == [
+            "Batched Product 0", "Batched Product 0", "Single Headline", "Single Headline"
+        ]
+        assert data["debug"]["batch_copy_calls"][0]["fallback_items"] == ["3", "4"]
+
+    def test_failed_batch_falls_back(self, creative_client):
+        """Test a batch call that raises falls back to per-item calls for all its items."""
+        fake = FakeLLM(fail_batches=True)
+        with patch("app.services.creative_service.main.call_gemini_text", side_effect=fake):
+            data = creative_client.post("/generate_creatives", json=_request(_products(2))).json()
+
+        assert data["status"] == "success"
+        assert fake.calls == {"batch": 1, "copy": 4, "image_prompt": 4}
+        assert data["debug"]["batch_copy_calls"][0]["error"] == "LLM unavailable"
+
+    def test_disabled_by_default(self, creative_client):
+        """Test per-item calls are used unless batching is requested."""
+        fake = FakeLLM()
+        with patch("app.services.creative_service.main.call_gemini_text", side_effect=fake):
+            creative_client.post("/generate_creatives", json=_request(_products(1), batch_copy_generation=False))
+
+        assert fake.calls == {"batch": 0, "copy": 2, "image_prompt": 2}
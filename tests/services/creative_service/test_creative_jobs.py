@@ -0,0 +1,297 @@
+"""
+Tests for asynchronous creative generation jobs.
+"""
+
+import threading
+import time
+import pytest
+from unittest.mock import patch
+from app.common.config import settings
+from app.services.creative_service import main
+from app.services.creative_service.jobs import (
+    JobStore,
+    CreativeJobRunner,
+    JOB_QUEUED,
+    JOB_RUNNING,
+    JOB_SUCCEEDED,
+    JOB_FAILED
+)
+from tests.testdata import VALID_CAMPAIGN_SPEC_META_ELECTRONICS, SAMPLE_PRODUCTS_ELECTRONICS
+
+COPY_RESPONSE = '{"headline": "Test Headline", "primary_text": "Test primary text content for the ad."}'
+
+
+def _wait_for(store, job_id, statuses=(JOB_SUCCEEDED, JOB_FAILED), timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = store.get_job(job_id)
+        if job["status"] in statuses:
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"Job {job_id} did not reach {statuses}")
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    yield store
+    store.close()
+
+
+class TestJobStore:
+    """Test job persistence and incremental results."""
+
+    def test_lifecycle_and_cursor(self, store):
+        """Test creatives are returned in order from a cursor."""
+        job_id = store.create_job({"products": []})
+        assert store.get_job(job_id)["status"] == JOB_QUEUED
+
+        assert store.claim(job_id, "runner-a", 60) == 1
+        for i in range(3):
+            store.append_creative(job_id, {"creative_id": f"C{i}"})
+
+        assert store.get_job(job_id)["creatives_total"] == 3
+        assert [c["creative_id"] for c in store.get_creatives(job_id, 1)] == ["C1", "C2"]
+        assert store.get_creatives(job_id, 3) == []
+        assert len(store.get_creatives(job_id, attempt=1)) == 3
+        assert store.get_creatives(job_id, attempt=2) == []
+
+        store.finish(job_id, JOB_SUCCEEDED, result={"status": "success"})
+        job = store.get_job(job_id)
+        assert (job["status"], job["result"]) == (JOB_SUCCEEDED, {"status": "success"})
+        assert store.unfinished_jobs() == []
+
+    def test_missing_job(self, store):
+        """Test unknown job IDs return None."""
+        assert store.get_job("missing") is None
+
+    def test_unfinished_jobs_survive_reopen(self, tmp_path):
+        """Test a new store on the same file sees jobs left queued or running."""
+        path = str(tmp_path / "jobs.sqlite3")
+        first = JobStore(path)
+        queued = first.create_job({"n": 1})
+        running = first.create_job({"n": 2})
+        first.claim(running, "runner-a", lease_seconds=-1)
+        first.append_creative(running, {"creative_id": "partial"})
+        first.close()
+
+        second = JobStore(path)
+        assert set(second.unfinished_jobs()) == {queued, running}
+        # A rerun starts from an empty result list
+        assert second.claim(running, "runner-b", 60) == 2
+        assert second.get_job(running)["creatives_total"] == 0
+        second.close()
+
+    def test_live_lease_blocks_claims(self, store):
+        """Test a job owned under a live lease is neither orphaned nor claimable by another runner."""
+        queued = store.create_job({}, owner="runner-a", lease_seconds=60)
+        running = store.create_job({})
+        store.claim(running, "runner-a", 60)
+
+        assert store.orphaned_jobs() == []
+        assert store.claim(queued, "runner-b", 60) is None
+        assert store.claim(running, "runner-b", 60) is None
+        assert store.claim(queued, "runner-a", 60) == 1
+
+    def test_expired_lease_is_taken_over(self, store):
+        """Test a job whose lease expired is recovered and its old owner can no longer write."""
+        job_id = store.create_job({})
+        store.claim(job_id, "runner-a", lease_seconds=-1)
+        assert store.orphaned_jobs() == [job_id]
+
+        assert store.claim(job_id, "runner-b", 60) == 2
+        assert not store.append_creative(job_id, {"creative_id": "stale"}, owner="runner-a")
+        assert not store.finish(job_id, JOB_FAILED, error="stale", owner="runner-a")
+        assert store.append_creative(job_id, {"creative_id": "C0"}, owner="runner-b")
+        job = store.get_job(job_id)
+        assert (job["status"], job["owner"], job["creatives_total"]) == (JOB_RUNNING, "runner-b", 1)
+
+    def test_renew_leases(self, store):
+        """Test renewing keeps an owner's jobs out of recovery."""
+        job_id = store.create_job({})
+        store.claim(job_id, "runner-a", lease_seconds=-1)
+        assert store.renew_leases("runner-a", 60) == 1
+        assert store.orphaned_jobs() == []
+
+    def test_old_store_is_migrated(self, tmp_path):
+        """Test a store created before leases gets the new columns."""
+        import sqlite3
+        path = str(tmp_path / "old.sqlite3")
+        conn = sqlite3.connect(path)
+        conn.execute(
+            "CREATE TABLE creative_jobs (job_id TEXT PRIMARY KEY, status TEXT NOT NULL, request TEXT NOT NULL, "
+            "result TEXT, error TEXT, created_at TEXT NOT NULL, updated_at TEXT NOT NULL)"
+        )
+        conn.execute("INSERT INTO creative_jobs VALUES ('old', 'running', '{}', NULL, NULL, 'x', 'x')")
+        conn.commit()
+        conn.close()
+
+        store = JobStore(path)
+        assert store.orphaned_jobs() == ["old"]
+        assert store.claim("old", "runner-a", 60) == 1
+        store.close()
+
+
+class TestCreativeJobRunner:
+    """Test jobs run on background workers."""
+
+    def test_results_are_visible_while_running(self, store):
+        """Test creatives appear before the job finishes."""
+        release = threading.Event()
+
+        def handler(request, on_creative):
+            on_creative({"creative_id": "C0"})
+            release.wait(5)
+            on_creative({"creative_id": "C1"})
+            return {"status": "success"}
+
+        runner = CreativeJobRunner(store, handler, max_workers=1)
+        job_id = runner.submit({})
+        _wait_for(store, job_id, statuses=(JOB_RUNNING,))
+        while store.get_job(job_id)["creatives_total"] < 1:
+            time.sleep(0.01)
+        assert store.get_job(job_id)["status"] == JOB_RUNNING
+
+        release.set()
+        job = _wait_for(store, job_id)
+        assert job["status"] == JOB_SUCCEEDED
+        assert [c["creative_id"] for c in store.get_creatives(job_id)] == ["C0", "C1"]
+        runner.shutdown(wait=True)
+
+    def test_failures_are_recorded(self, store):
+        """Test handler exceptions and error responses fail the job."""
+        def handler(request, on_creative):
+            if request["raise"]:
+                raise RuntimeError("boom")
+            return {"status": "error", "message": "No creatives"}
+
+        runner = CreativeJobRunner(store, handler, max_workers=2)
+        raised = runner.submit({"raise": True})
+        errored = runner.submit({"raise": False})
+
+        assert _wait_for(store, raised)["error"] == "boom"
+        job = _wait_for(store, errored)
+        assert (job["status"], job["error"]) == (JOB_FAILED, "No creatives")
+        runner.shutdown(wait=True)
+
+    def test_recover_requeues_unfinished_jobs(self, store):
+        """Test jobs left by a previous process are run on recovery."""
+        job_id = store.create_job({})
+        runner = CreativeJobRunner(store, lambda request, on_creative: {"status": "success"})
+
+        assert runner.recover() == 1
+        assert _wait_for(store, job_id)["status"] == JOB_SUCCEEDED
+        runner.shutdown(wait=True)
+
+    def test_recover_skips_jobs_of_live_runners(self, store):
+        """Test a starting runner does not rerun jobs another live runner is executing."""
+        release = threading.Event()
+
+        def handler(request, on_creative):
+            on_creative({"creative_id": "C0"})
+            release.wait(5)
+            return {"status": "success"}
+
+        first = CreativeJobRunner(store, handler, max_workers=1)
+        job_id = first.submit({})
+        while store.get_job(job_id)["creatives_total"] < 1:
+            time.sleep(0.01)
+
+        second = CreativeJobRunner(store, handler)
+        assert second.recover() == 0
+        release.set()
+        job = _wait_for(store, job_id)
+        assert (job["status"], job["attempts"], job["creatives_total"]) == (JOB_SUCCEEDED, 1, 1)
+        first.shutdown(wait=True)
+        second.shutdown(wait=True)
+
+    def test_heartbeat_recovers_orphans_and_gives_up(self, store):
+        """Test orphaned jobs are picked up by the heartbeat and fail after max_attempts runs."""
+        job_id = store.create_job({})
+        for runner in ("dead-1", "dead-2"):
+            store.claim(job_id, runner, lease_seconds=-1)
+        calls = []
+
+        def handler(request, on_creative):
+            calls.append(request)
+            return {"status": "success"}
+
+        runner = CreativeJobRunner(store, handler, lease_seconds=0.05, max_attempts=2)
+        job = _wait_for(store, job_id)
+        assert (job["status"], job["attempts"]) == (JOB_FAILED, 3)
+        assert "2 attempts" in job["error"]
+        assert calls == []
+        runner.shutdown(wait=True)
+
+
+class TestCreativeJobEndpoints:
+    """Test the job API on the creative service."""
+
+    @pytest.fixture(autouse=True)
+    def job_runner(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(settings, "CREATIVE_JOB_DB_PATH", str(tmp_path / "jobs.sqlite3"))
+        monkeypatch.setattr(main, "_job_runner", None)
+        yield
+        main._shutdown_job_runner()
+
+    def test_submit_and_poll(self, creative_client):
+        """Test a submitted job returns at once and its creatives can be fetched incrementally."""
+        request = {
+            "campaign_spec": VALID_CAMPAIGN_SPEC_META_ELECTRONICS.model_dump(),
+            "products": [p.model_dump() for p in SAMPLE_PRODUCTS_ELECTRONICS[:2]],
+            "ab_config": {"variants_per_product": 2, "max_creatives": 3, "enable_image_generation": True},
+        }
+
+        with patch("app.services.creative_service.main.call_gemini_text", return_value=COPY_RESPONSE), \
+             patch("app.services.creative_service.main.call_openai_image", return_value="https://example.com/image.jpg"):
+            response = creative_client.post("/generate_creatives/jobs", json=request)
+            assert response.status_code == 202
+            job_id = response.json()["job_id"]
+            _wait_for(main._get_job_runner().store, job_id)
+
+        first = creative_client.get(f"/generate_creatives/jobs/{job_id}", params={"cursor": 0}).json()
+        assert first["job_status"] == JOB_SUCCEEDED
+        assert first["creatives_total"] == first["next_cursor"] == 3
+        assert [(c["product_id"], c["variant_id"]) for c in first["creatives"]] == [
+            (SAMPLE_PRODUCTS_ELECTRONICS[0].product_id, "A"),
+            (SAMPLE_PRODUCTS_ELECTRONICS[0].product_id, "B"),
+            (SAMPLE_PRODUCTS_ELECTRONICS[1].product_id, "A"),
+        ]
+        assert first["debug"]["summary"]["total_creatives_generated"] == 3
+
+        later = creative_client.get(f"/generate_creatives/jobs/{job_id}", params={"cursor": 2}).json()
+        assert [c["creative_id"] for c in later["creatives"]] == [first["creatives"][2]["creative_id"]]
+
+    def test_cursor_resets_when_job_is_rerun(self, creative_client):
+        """Test a poll with the previous attempt's cursor starts over once the job was reclaimed."""
+        def creative(variant):
+            return {"product_id": "P1", "platform": "meta", "variant_id": variant, "primary_text": "Text"}
+
+        store = main._get_job_runner().store
+        job_id = store.create_job({"products": []}, owner="runner-a", lease_seconds=60)
+        store.claim(job_id, "runner-a", 60)
+        for i in range(2):
+            store.append_creative(job_id, creative(f"A{i}"), owner="runner-a")
+
+        first = creative_client.get(f"/generate_creatives/jobs/{job_id}", params={"cursor": 0}).json()
+        assert (first["attempt"], first["next_cursor"], first["cursor_reset"]) == (1, 2, False)
+
+        # runner-a died: its lease expires and runner-b reruns the job
+        with patch("app.services.creative_service.jobs.time.time", return_value=time.time() + 120):
+            assert store.claim(job_id, "runner-b", 60) == 2
+        store.append_creative(job_id, creative("B0"), owner="runner-b")
+
+        params = {"cursor": first["next_cursor"], "attempt": first["attempt"]}
+        second = creative_client.get(f"/generate_creatives/jobs/{job_id}", params=params).json()
+        assert (second["attempt"], second["cursor_reset"], second["next_cursor"]) == (2, True, 1)
+        assert [c["variant_id"] for c in second["creatives"]] == ["B0"]
+
+        params = {"cursor": second["next_cursor"], "attempt": second["attempt"]}
+        third = creative_client.get(f"/generate_creatives/jobs/{job_id}", params=params).json()
+        assert (third["creatives"], third["cursor_reset"]) == ([], False)
+
+    def test_unknown_job(self, creative_client):
+        """Test polling an unknown job returns JOB_NOT_FOUND."""
+        data = creative_client.get("/generate_creatives/jobs/missing").json()
+        assert data["status"] == "error"
+        assert data["error_code"] == "JOB_NOT_FOUND"
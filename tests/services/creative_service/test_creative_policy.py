@@ -0,0 +1,114 @@
+"""
+Tests for the cached, pre-compiled creative policy.
+"""
+
+import copy
+import os
+import pytest
+from unittest.mock import patch
+from app.services.creative_service import creative_utils
+from app.services.creative_service.creative_utils import load_creative_policy, get_policy_for_category
+from app.services.creative_service.policy import CreativePolicy
+
+POLICY_YAML = """
+default:
+  copy_style: direct_response
+  tone: professional
+electronics:
+  copy_style: technical_benefit
+  tags: [tech, gadgets]
+home:
+  copy_style: cozy
+"""
+
+
+@pytest.fixture
+def policy_file(tmp_path):
+    path = tmp_path / "creative_policy.yaml"
+    path.write_text(POLICY_YAML)
+    return path
+
+
+def _bump_mtime(path):
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+class TestPolicyCache:
+    """Test the policy file is parsed once per modification."""
+
+    def test_parsed_once_until_modified(self, policy_file):
+        """Test repeated loads share one parsed policy and a modified file is re-read."""
+        with patch.object(creative_utils.yaml, "safe_load", wraps=creative_utils.yaml.safe_load) as mock_load:
+            first = load_creative_policy(str(policy_file))
+            assert load_creative_policy(str(policy_file)) is first
+            assert mock_load.call_count == 1
+
+            policy_file.write_text(POLICY_YAML.replace("cozy", "warm"))
+            _bump_mtime(policy_file)
+            reloaded = load_creative_policy(str(policy_file))
+
+        assert mock_load.call_count == 2
+        assert reloaded is not first
+        assert reloaded["home"]["copy_style"] == "warm"
+
+    def test_missing_file_uses_default(self, tmp_path):
+        """Test a missing file yields the default policy."""
+        policy = load_creative_policy(str(tmp_path / "missing.yaml"))
+        assert policy["default"]["copy_style"] == "direct_response"
+        assert get_policy_for_category("anything", policy) is policy["default"]
+
+    def test_policy_is_read_only(self, policy_file):
+        """Test the shared policy and its profiles cannot be mutated."""
+        policy = load_creative_policy(str(policy_file))
+        assert isinstance(policy, dict)
+        with pytest.raises(TypeError):
+            policy["toys"] = {}
+        with pytest.raises(TypeError):
+            policy["electronics"]["tone"] = "casual"
+        assert policy["electronics"]["tags"] == ("tech", "gadgets")
+        # Copies are ordinary mutable dicts
+        profile = copy.copy(policy["electronics"])
+        profile["tone"] = "casual"
+
+
+class TestCategoryResolution:
+    """Test memoized resolution matches the linear scan."""
+
+    @pytest.mark.parametrize("category", [
+        "electronics", "Electronics", "consumer electronics", "home decor", "HOME", "toys", "", None,
+    ])
+    def test_matches_plain_dict_lookup(self, policy_file, category):
+        """Test CreativePolicy.resolve agrees with resolving against a plain dict."""
+        policy = load_creative_policy(str(policy_file))
+        plain = {key: dict(profile) for key, profile in policy.items()}
+        assert get_policy_for_category(category, policy) == get_policy_for_category(category, plain)
+
+    def test_resolution_is_memoized(self, policy_file):
+        """Test repeated resolutions return the same profile object."""
+        policy = load_creative_policy(str(policy_file))
+        assert policy.resolve("Consumer Electronics") is policy.resolve("consumer electronics")
+        assert policy.resolve("consumer electronics") is policy["electronics"]
+
+    def test_fallback_without_default_key(self):
+        """Test policies without a default category fall back to the built-in default."""
+        policy = CreativePolicy({"toys": {"copy_style": "playful"}}, {"copy_style": "direct_response"})
+        assert policy.resolve("garden")["copy_style"] == "direct_response"
+
+
+class TestPolicyInRequests:
+    """Test generate_creatives works with the shared read-only policy."""
+
+    def test_style_profile_in_creatives(self, creative_client, mock_gemini_text, mock_gemini_image):
+        """Test creatives carry the resolved style profile as a plain object."""
+        from tests.testdata import VALID_CAMPAIGN_SPEC_META_ELECTRONICS, SAMPLE_PRODUCTS_ELECTRONICS
+
+        request = {
+            "campaign_spec": VALID_CAMPAIGN_SPEC_META_ELECTRONICS.model_dump(),
+            "products": [SAMPLE_PRODUCTS_ELECTRONICS[0].model_dump()],
+            "ab_config": {"variants_per_product": 1, "max_creatives": 1, "enable_image_generation": False},
+        }
+        data = creative_client.post("/generate_creatives", json=request).json()
+
+        expected = load_creative_policy().resolve(SAMPLE_PRODUCTS_ELECTRONICS[0].category)
+        assert data["creatives"][0]["style_profile"] == dict(expected)
@@ -0,0 +1,117 @@
+"""
+Tests for streaming creatives over NDJSON and server-sent events.
+"""
+
+import asyncio
+import json
+from unittest.mock import patch
+from app.common.schemas import Creative
+from app.services.creative_service import main
+from app.services.creative_service.schemas import GenerateCreativesRequest
+from tests.testdata import VALID_CAMPAIGN_SPEC_META_ELECTRONICS, SAMPLE_PRODUCTS_ELECTRONICS
+
+COPY_RESPONSE = '{"headline": "Stream Headline", "primary_text": "Streamed primary text for the ad."}'
+
+
+def _request(**ab_config):
+    return {
+        "campaign_spec": VALID_CAMPAIGN_SPEC_META_ELECTRONICS.model_dump(),
+        "products": [p.model_dump() for p in SAMPLE_PRODUCTS_ELECTRONICS[:2]],
+        "ab_config": {"variants_per_product": 2, "max_creatives": 4, "enable_image_generation": False, **ab_config},
+    }
+
+
+def _fake_llm(prompt, response_schema=None, max_output_tokens=None):
+    return COPY_RESPONSE if response_schema else "A product photo"
+
+
+def _parse_sse(body):
+    events = []
+    for message in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in message.split("\n"))
+        events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+class TestCreativeStream:
+    """Test /generate_creatives/stream."""
+
+    def test_ndjson_matches_batch_response(self, creative_client):
+        """Test streamed creatives, ordered by index, match the batch response and the summary comes last."""
+        with patch("app.services.creative_service.main.call_gemini_text", side_effect=_fake_llm):
+            batch = creative_client.post("/generate_creatives", json=_request()).json()
+            response = creative_client.post("/generate_creatives/stream", json=_request())
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        events = [json.loads(line) for line in response.text.splitlines()]
+        assert [e["event"] for e in events] == ["creative"] * 4 + ["summary"]
+
+        streamed = [e["creative"] for e in sorted(events[:-1], key=lambda e: e["index"])]
+        key = lambda c: (c["product_id"], c["variant_id"], c["headline"], c["primary_text"])
+        assert [key(c) for c in streamed] == [key(c) for c in batch["creatives"]]
+        assert events[-1]["creatives_total"] == 4
+        assert events[-1]["debug"]["summary"]["total_creatives_generated"] == 4
+
+    def test_sse_format(self, creative_client):
+        """Test the SSE variant uses event/data messages."""
+        with patch("app.services.creative_service.main.call_gemini_text", side_effect=_fake_llm):
+            response = creative_client.post("/generate_creatives/stream?format=sse", json=_request(max_creatives=1))
+
+        assert response.headers["content-type"].startswith("text/event-stream")
+        events = _parse_sse(response.text)
+        assert [name for name, _ in events] == ["creative", "summary"]
+        assert events[0][1]["creative"]["headline"] == "Stream Headline"
+
+    def test_error_event_when_nothing_generated(self, creative_client):
+        """Test an error event closes the stream when no creative is kept."""
+        async def no_creative(*args, **kwargs):
+            return None, {}
+
+        with patch("app.services.creative_service.main._generate_creative", side_effect=no_creative):
+            response = creative_client.post("/generate_creatives/stream", json=_request())
+
+        events = [json.loads(line) for line in response.text.splitlines()]
+        assert len(events) == 1
+        assert events[0]["event"] == "error"
+        assert events[0]["error_code"] == "CREATIVE_GENERATION_FAILED"
+
+    def test_unknown_format_rejected(self, creative_client):
+        """Test formats other than ndjson and sse are rejected."""
+        assert creative_client.post("/generate_creatives/stream?format=xml", json=_request()).status_code == 400
+
+
+class TestEarlyDelivery:
+    """Test creatives are handed over as soon as their unit finishes."""
+
+    def test_slow_first_unit_does_not_hold_back_others(self):
+        """Test on_creative receives unit 1 while unit 0 is still running, and the response keeps unit order."""
+        request = GenerateCreativesRequest.model_validate(_request(variants_per_product=1, max_creatives=2))
+
+        async def scenario():
+            second_delivered = asyncio.Event()
+            delivered = []
+
+            async def fake_generate(product, variant, *args, **kwargs):
+                if product.product_id == request.products[0].product_id:
+                    # Only finishes once the second creative was streamed
+                    await asyncio.wait_for(second_delivered.wait(), timeout=5)
+                creative = Creative(
+                    product_id=product.product_id, platform="meta", variant_id=variant,
+                    primary_text="Text", headline=product.title
+                )
+                return creative, {}
+
+            def on_creative(index, creative):
+                delivered.append((index, creative.product_id))
+                second_delivered.set()
+
+            with patch("app.services.creative_service.main._generate_creative", side_effect=fake_generate):
+                response = await main._generate_creatives(request, on_creative=on_creative)
+            return response, delivered
+
+        response, delivered = asyncio.run(scenario())
+        product_ids = [p.product_id for p in request.products]
+        assert response.status == "success"
+        assert delivered == [(1, product_ids[1]), (0, product_ids[0])]
+        assert [c.product_id for c in response.creatives] == product_ids
@@ -0,0 +1,132 @@
+"""
+Tests for concurrent creative generation in generate_creatives.
+"""
+
+import threading
+import time
+import pytest
+from unittest.mock import patch
+from app.common.config import settings
+from app.common.schemas import Product
+from tests.testdata import VALID_CAMPAIGN_SPEC_META_ELECTRONICS
+
+CALL_LATENCY = 0.2
+COPY_RESPONSE = '{"headline": "Test Headline", "primary_text": "Test primary text content for the ad."}'
+
+
+def _products(count: int):
+    return [
+        Product(
+            product_id=f"P{i}",
+            title=f"Product {i}",
+            description=f"Description for product {i}",
+            price=49.99,
+            category="electronics",
+        ).model_dump()
+        for i in range(count)
+    ]
+
+
+class SlowClients:
+    """Fake LLM and image clients with fixed latency that track calls in flight."""
+
+    def __init__(self, failing_products=()):
+        self.failing_products = set(failing_products)
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._lock = threading.Lock()
+
+    def _call(self, result):
+        with self._lock:
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            time.sleep(CALL_LATENCY)
+            return result
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def text(self, prompt, response_schema=None):
+        for product_id in self.failing_products:
+            if f"Product {product_id[1:]}\n" in prompt:
+                raise RuntimeError("LLM unavailable")
+        return self._call(COPY_RESPONSE if response_schema else "A product photo")
+
+    def image(self, prompt):
+        return self._call("https://example.com/generated.jpg")
+
+
+@pytest.fixture
+def slow_clients():
+    def make(failing_products=()):
+        clients = SlowClients(failing_products)
+        patchers = [
+            patch("app.services.creative_service.main.call_gemini_text", side_effect=clients.text),
+            patch("app.services.creative_service.main.call_openai_image", side_effect=clients.image),
+        ]
+        for patcher in patchers:
+            patcher.start()
+        started.extend(patchers)
+        return clients
+
+    started = []
+    yield make
+    for patcher in started:
+        patcher.stop()
+
+
+class TestConcurrentGeneration:
+    """Test product x variant chains run concurrently and merge in order."""
+
+    def test_chains_run_concurrently(self, creative_client, slow_clients):
+        """Test ten creatives take about one chain's latency, not the sum."""
+        slow_clients()
+        request = {
+            "campaign_spec": VALID_CAMPAIGN_SPEC_META_ELECTRONICS.model_dump(),
+            "products": _products(5),
+            "ab_config": {"variants_per_product": 2, "max_creatives": 10, "enable_image_generation": True},
+        }
+
+        started = time.monotonic()
+        data = creative_client.post("/generate_creatives", json=request).json()
+        elapsed = time.monotonic() - started
+
+        # Sequential: 10 chains x 3 calls x CALL_LATENCY = 6s; one chain is 2 x CALL_LATENCY
+        assert elapsed < 10 * 3 * CALL_LATENCY / 2
+        assert data["status"] == "success"
+        assert [(c["product_id"], c["variant_id"]) for c in data["creatives"]] == \
+            [(f"P{i}", v) for i in range(5) for v in ["A", "B"]]
+        assert [(e["product_id"], e["variant"]) for e in data["debug"]["copy_prompts"]] == \
+            [(f"P{i}", v) for i in range(5) for v in ["A", "B"]]
+
+    def test_concurrency_limit(self, creative_client, slow_clients, monkeypatch):
+        """Test calls in flight never exceed CREATIVE_MAX_CONCURRENCY."""
+        monkeypatch.setattr(settings, "CREATIVE_MAX_CONCURRENCY", 3)
+        clients = slow_clients()
+        request = {
+            "campaign_spec": VALID_CAMPAIGN_SPEC_META_ELECTRONICS.model_dump(),
+            "products": _products(4),
+            "ab_config": {"variants_per_product": 2, "max_creatives": 10, "enable_image_generation": True},
+        }
+
+        data = creative_client.post("/generate_creatives", json=request).json()
+
+        assert len(data["creatives"]) == 8
+        assert clients.peak_in_flight == 3
+
+    def test_failed_chains_are_replaced_in_order(self, creative_client, slow_clients):
+        """Test max_creatives is filled with the next units when chains fail, as when generating one by one."""
+        slow_clients(failing_products=["P0"])
+        request = {
+            "campaign_spec": VALID_CAMPAIGN_SPEC_META_ELECTRONICS.model_dump(),
+            "products": _products(4),
+            "ab_config": {"variants_per_product": 2, "max_creatives": 3, "enable_image_generation": True},
+        }
+
+        data = creative_client.post("/generate_creatives", json=request).json()
+
+        assert [(c["product_id"], c["variant_id"]) for c in data["creatives"]] == \
+            [("P1", "A"), ("P1", "B"), ("P2", "A")]
+        # Units past the limit are never started
+        assert {e["product_id"] for e in data["debug"]["copy_prompts"]} == {"P0", "P1", "P2"}
@@ -0,0 +1,210 @@
+"""
+Tests for the generated-image asset cache.
+"""
+
+import pytest
+from unittest.mock import patch, MagicMock
+from app.services.creative_service import creative_utils
+from app.services.creative_service.asset_cache import (
+    ImageAssetCache,
+    LocalAssetStore,
+    is_public_base_url,
+    normalize_image_prompt,
+)
+
+PNG_BYTES = b"\x89PNG\r\n\x1a\nfake image"
+PROMPT = "Professional product photo of wireless headphones on a white desk, soft studio lighting"
+
+
+def _download(content=PNG_BYTES, content_type="image/png"):
+    response = MagicMock()
+    response.content = content
+    response.headers = {"content-type": content_type}
+    response.raise_for_status.return_value = None
+    return response
+
+
+@pytest.fixture
+def make_cache(tmp_path):
+    caches = []
+
+    def make(**kwargs):
+        store = LocalAssetStore(str(tmp_path / "assets"), "http://assets.test/assets")
+        cache = ImageAssetCache(store, generation_params={"model": "dall-e-3"}, **kwargs)
+        caches.append(cache)
+        return cache
+
+    yield make
+    for cache in caches:
+        cache.close()
+
+
+class TestImageAssetCache:
+    """Test exact and fuzzy prompt deduplication."""
+
+    def test_normalize(self):
+        """Test case and whitespace differences normalize away."""
+        assert normalize_image_prompt("  Red\tSHOES \n on grass ") == "red shoes on grass"
+
+    def test_exact_hit_returns_stored_copy(self, make_cache):
+        """Test a stored image is returned for the same normalized prompt."""
+        cache = make_cache()
+        assert cache.lookup(PROMPT) is None
+
+        with patch("app.services.creative_service.asset_cache.httpx.get", return_value=_download()) as mock_get:
+            stored_url = cache.store_generated(PROMPT, "https://provider.test/tmp/image.png")
+
+        mock_get.assert_called_once()
+        asset_name = stored_url.rsplit("/", 1)[1]
+        assert stored_url == f"http://assets.test/assets/{asset_name}"
+        assert asset_name.endswith(".png")
+        with open(cache.store.path_for(asset_name), "rb") as f:
+            assert f.read() == PNG_BYTES
+
+        assert cache.lookup(f"  {PROMPT.upper()} ") == stored_url
+        stats = cache.stats()
+        assert (stats["exact_hits"], stats["misses"], stats["assets"]) == (1, 1, 1)
+
+    def test_generation_params_are_part_of_the_key(self, make_cache):
+        """Test images generated with other parameters are not reused."""
+        cache = make_cache()
+        other = ImageAssetCache(cache.store, generation_params={"model": "dall-e-2"})
+        assert cache.prompt_hash(PROMPT) != other.prompt_hash(PROMPT)
+        other.close()
+
+    def test_fuzzy_match(self, make_cache):
+        """Test near-duplicate prompts reuse a stored image above the threshold."""
+        cache = make_cache(fuzzy_threshold=0.8)
+        with patch("app.services.creative_service.asset_cache.httpx.get", return_value=_download(content_type="image/jpeg")):
+            stored_url = cache.store_generated(PROMPT, "https://provider.test/image")
+
+        assert stored_url.endswith(".jpg")
+        assert cache.lookup(PROMPT + ", high resolution") == stored_url
+        assert cache.lookup("Lifestyle photo of a smartwatch on a runner's wrist") is None
+        assert cache.stats()["fuzzy_hits"] == 1
+
+    def test_fuzzy_matching_off_by_default(self, make_cache):
+        """Test only exact normalized prompts match without a threshold."""
+        cache = make_cache()
+        with patch("app.services.creative_service.asset_cache.httpx.get", return_value=_download()):
+            cache.store_generated(PROMPT, "https://provider.test/image")
+
+        assert cache.lookup(PROMPT + ", high resolution") is None
+
+    def test_download_failure_keeps_provider_url(self, make_cache):
+        """Test the provider URL is returned and nothing is indexed when the download fails."""
+        cache = make_cache()
+        with patch("app.services.creative_service.asset_cache.httpx.get", side_effect=Exception("timeout")):
+            assert cache.store_generated(PROMPT, "https://provider.test/image") == "https://provider.test/image"
+
+        assert cache.lookup(PROMPT) is None
+        assert cache.stats()["store_errors"] == 1
+
+    def test_storing_a_prompt_again_replaces_its_entry(self, make_cache):
+        """Test a re-stored prompt keeps one index entry, pointing at the new asset."""
+        cache = make_cache(fuzzy_threshold=0.8)
+        with patch("app.services.creative_service.asset_cache.httpx.get", return_value=_download()):
+            cache.store_generated(PROMPT, "https://provider.test/first")
+        with patch("app.services.creative_service.asset_cache.httpx.get", return_value=_download(content_type="image/jpeg")):
+            stored_url = cache.store_generated(PROMPT, "https://provider.test/second")
+
+        assert cache.stats()["assets"] == 1
+        assert cache.lookup(PROMPT + ", high resolution") == stored_url
+        assert make_cache().stats()["assets"] == 1
+
+    def test_index_survives_restart(self, make_cache):
+        """Test a new cache on the same directory finds stored assets, including fuzzy matches."""
+        with patch("app.services.creative_service.asset_cache.httpx.get", return_value=_download()):
+            stored_url = make_cache().store_generated(PROMPT, "https://provider.test/image")
+
+        reopened = make_cache(fuzzy_threshold=0.8)
+        assert reopened.lookup(PROMPT) == stored_url
+        assert reopened.lookup(PROMPT + ", high resolution") == stored_url
+
+
+class TestCachedImageGeneration:
+    """Test call_openai_image and the /assets route use the cache."""
+
+    def test_repeated_prompt_skips_generation(self, make_cache, creative_client, monkeypatch):
+        """Test the second identical prompt is served from the store and the asset is downloadable."""
+        cache = make_cache()
+        monkeypatch.setattr(creative_utils, "image_cache", cache)
+        client = MagicMock()
+        client.images.generate.return_value = MagicMock(data=[MagicMock(url="https://provider.test/image")])
+
+        with patch.object(creative_utils, "openai_image_client", client), \
+             patch("app.services.creative_service.asset_cache.httpx.get", return_value=_download()):
+            first = creative_utils.call_openai_image(PROMPT)
+            second = creative_utils.call_openai_image(PROMPT)
+
+        assert first == second
+        assert first.startswith("http://assets.test/assets/")
+        client.images.generate.assert_called_once()
+
+        response = creative_client.get(f"/assets/{first.rsplit('/', 1)[1]}")
+        assert response.status_code == 200
+        assert response.content == PNG_BYTES
+        assert creative_client.get("/health").json()["image_cache"]["exact_hits"] == 1
+
+    @pytest.mark.parametrize("asset_name", ["missing.png", "..%2Findex.sqlite3", "index.sqlite3"])
+    def test_unknown_assets_are_not_served(self, make_cache, creative_client, monkeypatch, asset_name):
+        """Test only stored asset names are served."""
+        monkeypatch.setattr(creative_utils, "image_cache", make_cache())
+        assert creative_client.get(f"/assets/{asset_name}").status_code == 404
+
+
+class TestAssetBaseUrl:
+    """Test the cache is only enabled with a publicly reachable asset URL."""
+
+    @pytest.mark.parametrize("url,public", [
+        ("https://cdn.example.com/assets", True),
+        ("http://203.0.113.9/assets", False),
+        ("http://8.8.8.8/assets", True),
+        ("http://localhost:8002/assets", False),
+        ("http://127.0.0.1:8002/assets", False),
+        ("http://10.0.0.5/assets", False),
+        ("http://[::1]/assets", False),
+        ("http://creative_service:8002/assets", False),
+        ("ftp://cdn.example.com/assets", False),
+        (None, False),
+    ])
+    def test_is_public_base_url(self, url, public):
+        """Test loopback, private and single-label hosts are rejected."""
+        assert is_public_base_url(url) is public
+
+    def test_cache_off_without_public_base_url(self, monkeypatch):
+        """Test the default settings (no CREATIVE_ASSET_BASE_URL) leave the cache off."""
+        monkeypatch.setattr(creative_utils.settings, "CREATIVE_IMAGE_CACHE_ENABLED", True)
+        monkeypatch.setattr(creative_utils.settings, "CREATIVE_ASSET_BASE_URL", None)
+        assert creative_utils._create_image_cache() is None
+
+        monkeypatch.setattr(creative_utils.settings, "CREATIVE_ASSET_BASE_URL", "http://localhost:8002/assets")
+        assert creative_utils._create_image_cache() is None
+
+    @pytest.mark.parametrize("overrides,warns", [
+        ({}, False),
+        ({"CREATIVE_IMAGE_CACHE_ENABLED": True}, True),
+        ({"CREATIVE_ASSET_BASE_URL": "http://localhost:8002/assets"}, True),
+    ])
+    def test_warns_only_when_misconfigured(self, monkeypatch, overrides, warns):
+        """Test the default (no base URL) logs at debug level; an explicit but unusable setup warns."""
+        from app.common.config import Settings
+        monkeypatch.delenv("CREATIVE_IMAGE_CACHE_ENABLED", raising=False)
+        monkeypatch.delenv("CREATIVE_ASSET_BASE_URL", raising=False)
+        monkeypatch.setattr(creative_utils, "settings", Settings(_env_file=None, **overrides))
+
+        with patch.object(creative_utils.logger, "warning") as mock_warning, \
+             patch.object(creative_utils.logger, "debug") as mock_debug:
+            assert creative_utils._create_image_cache() is None
+        assert mock_warning.called is warns
+        assert mock_debug.called is not warns
+
+    def test_cache_on_with_public_base_url(self, monkeypatch, tmp_path):
+        """Test stored asset URLs use the configured public base URL."""
+        monkeypatch.setattr(creative_utils.settings, "CREATIVE_ASSET_BASE_URL", "https://cdn.example.com/assets/")
+        monkeypatch.setattr(creative_utils.settings, "CREATIVE_IMAGE_CACHE_DIR", str(tmp_path))
+        cache = creative_utils._create_image_cache()
+        try:
+            assert cache.store.url_for("a.png") == "https://cdn.example.com/assets/a.png"
+        finally:
+            cache.close()
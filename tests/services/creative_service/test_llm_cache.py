@@ -0,0 +1,179 @@
+"""
+Tests for the content-addressed LLM response cache.
+"""
+
+import pytest
+from unittest.mock import patch, MagicMock
+from app.services.creative_service import creative_utils
+from app.services.creative_service.llm_cache import LLMResponseCache, llm_cache_key
+from tests.testdata import VALID_CAMPAIGN_SPEC_META_ELECTRONICS, SAMPLE_PRODUCTS_ELECTRONICS
+
+COPY_RESPONSE = '{"headline": "Test Headline", "primary_text": "Test primary text content for the ad."}'
+
+
+def _key(**overrides):
+    fields = {
+        "provider": "openai",
+        "model": "gpt-4.1-mini",
+        "prompt": "Write ad copy",
+        "temperature": 0.7,
+        "max_output_tokens": 500,
+        "response_format": True,
+    }
+    fields.update(overrides)
+    return llm_cache_key(**fields)
+
+
+class TestLLMCacheKey:
+    """Test the key covers every input that determines a response."""
+
+    def test_stable_for_equal_inputs(self):
+        """Test equal inputs (including schema key order) give the same key."""
+        assert _key() == _key()
+        assert _key(response_format={"a": 1, "b": 2}) == _key(response_format={"b": 2, "a": 1})
+
+    @pytest.mark.parametrize("override", [
+        {"provider": "gemini"},
+        {"model": "gpt-4.1"},
+        {"prompt": "Write ad copy!"},
+        {"temperature": 0.2},
+        {"max_output_tokens": 200},
+        {"response_format": False},
+    ])
+    def test_changes_with_inputs(self, override):
+        """Test each input changes the key."""
+        assert _key(**override) != _key()
+
+
+class TestLLMResponseCache:
+    """Test memory LRU, disk tier and TTL."""
+
+    def test_memory_lru(self):
+        """Test the least recently used entry is evicted at capacity."""
+        cache = LLMResponseCache(max_entries=2)
+        cache.put("a", "A")
+        cache.put("b", "B")
+        assert cache.get("a") == "A"
+        cache.put("c", "C")
+
+        assert cache.get("b") is None
+        assert (cache.get("a"), cache.get("c")) == ("A", "C")
+        stats = cache.stats()
+        assert (stats["memory_hits"], stats["misses"], stats["evictions"]) == (3, 1, 1)
+
+    def test_disk_tier_survives_restart(self, tmp_path):
+        """Test a new cache on the same directory serves stored responses."""
+        LLMResponseCache(cache_dir=str(tmp_path)).put(_key(), COPY_RESPONSE)
+
+        cache = LLMResponseCache(cache_dir=str(tmp_path))
+        assert cache.get(_key()) == COPY_RESPONSE
+        assert cache.get(_key()) == COPY_RESPONSE
+        stats = cache.stats()
+        assert (stats["disk_hits"], stats["memory_hits"]) == (1, 1)
+
+    def test_ttl_applies_to_both_tiers(self, tmp_path, monkeypatch):
+        """Test entries older than the TTL are misses in memory and on disk."""
+        now = [1_000_000.0]
+        monkeypatch.setattr("app.services.creative_service.llm_cache.time.time", lambda: now[0])
+        cache = LLMResponseCache(ttl_seconds=60, cache_dir=str(tmp_path))
+        cache.put("k", "v")
+
+        now[0] += 30
+        assert cache.get("k") == "v"
+        assert LLMResponseCache(ttl_seconds=60, cache_dir=str(tmp_path)).get("k") == "v"
+
+        now[0] += 31
+        assert cache.get("k") is None
+        assert cache.stats()["expirations"] == 2
+        assert not list(tmp_path.rglob("*.json"))
+
+    def test_corrupt_disk_entry_is_a_miss(self, tmp_path):
+        """Test unreadable disk entries are counted and ignored."""
+        cache = LLMResponseCache(cache_dir=str(tmp_path))
+        cache.put("abcd", "v")
+        cache.clear()
+        (tmp_path / "ab" / "abcd.json").write_text("{not json")
+
+        assert cache.get("abcd") is None
+        assert cache.stats()["disk_errors"] == 1
+
+    def test_disabled(self, tmp_path):
+        """Test max_entries=0 disables both tiers."""
+        cache = LLMResponseCache(max_entries=0, cache_dir=str(tmp_path))
+        cache.put("k", "v")
+        assert cache.get("k") is None
+        assert not list(tmp_path.rglob("*.json"))
+
+
+class TestCachedTextCalls:
+    """Test call_gemini_text reads and fills the cache."""
+
+    def test_repeated_prompt_is_served_from_cache(self):
+        """Test the second identical call does not reach the API."""
+        with patch.object(creative_utils, 'openai_client', MagicMock()), \
+             patch.object(creative_utils, '_call_openai_api_internal', return_value=COPY_RESPONSE) as mock_call:
+            first = creative_utils.call_gemini_text("prompt", response_schema={"type": "object"})
+            second = creative_utils.call_gemini_text("prompt", response_schema={"type": "object"})
+            # Free-text mode is a different request
+            creative_utils.call_gemini_text("prompt")
+
+        assert first == second == COPY_RESPONSE
+        assert mock_call.call_count == 2
+
+    def test_failures_are_not_cached(self):
+        """Test empty responses are retried on the next call."""
+        with patch.object(creative_utils, 'openai_client', None), \
+             patch.object(creative_utils, 'gemini_model', MagicMock()), \
+             patch.object(creative_utils, '_call_gemini_api_internal', side_effect=[None, COPY_RESPONSE]) as mock_call:
+            assert creative_utils.call_gemini_text("prompt") is None
+            assert creative_utils.call_gemini_text("prompt") == COPY_RESPONSE
+
+        assert mock_call.call_count == 2
+
+    def test_context_opt_out(self):
+        """Test llm_cache_enabled=False bypasses the cache."""
+        token = creative_utils.llm_cache_enabled.set(False)
+        try:
+            with patch.object(creative_utils, 'openai_client', MagicMock()), \
+                 patch.object(creative_utils, '_call_openai_api_internal', return_value=COPY_RESPONSE) as mock_call:
+                creative_utils.call_gemini_text("prompt")
+                creative_utils.call_gemini_text("prompt")
+        finally:
+            creative_utils.llm_cache_enabled.reset(token)
+
+        assert mock_call.call_count == 2
+        assert creative_utils.llm_cache.stats()["entries"] == 0
+
+
+class TestGenerateCreativesCache:
+    """Test /generate_creatives reuses responses across requests."""
+
+    def _request(self, **ab_config):
+        return {
+            "campaign_spec": VALID_CAMPAIGN_SPEC_META_ELECTRONICS.model_dump(),
+            "products": [SAMPLE_PRODUCTS_ELECTRONICS[0].model_dump()],
+            "ab_config": {"variants_per_product": 1, "max_creatives": 1, "enable_image_generation": False, **ab_config},
+        }
+
+    def test_rerun_hits_cache(self, creative_client):
+        """Test a repeated request makes no new LLM calls and /health reports the hits."""
+        with patch.object(creative_utils, 'openai_client', MagicMock()), \
+             patch.object(creative_utils, '_call_openai_api_internal', return_value=COPY_RESPONSE) as mock_call:
+            creative_client.post("/generate_creatives", json=self._request())
+            calls = mock_call.call_count
+            data = creative_client.post("/generate_creatives", json=self._request()).json()
+
+        assert data["status"] == "success"
+        assert calls > 0
+        assert mock_call.call_count == calls
+        assert creative_client.get("/health").json()["llm_cache"]["memory_hits"] == calls
+
+    def test_request_opt_out(self, creative_client):
+        """Test use_llm_cache=False sends every prompt to the API."""
+        with patch.object(creative_utils, 'openai_client', MagicMock()), \
+             patch.object(creative_utils, '_call_openai_api_internal', return_value=COPY_RESPONSE) as mock_call:
+            creative_client.post("/generate_creatives", json=self._request())
+            calls = mock_call.call_count
+            creative_client.post("/generate_creatives", json=self._request(use_llm_cache=False))
+
+        assert mock_call.call_count == 2 * calls
@@ -0,0 +1,211 @@
+"""
+Tests for provider rate limiting, adaptive concurrency and retry classification.
+"""
+
+import threading
+import time
+import pytest
+import requests
+from unittest.mock import patch, MagicMock
+from tenacity import wait_none
+from app.services.creative_service import creative_utils
+from app.services.creative_service.rate_limiter import (
+    AdaptiveConcurrencyLimit,
+    ProviderLimiter,
+    TokenBucket,
+    get_provider_limiter,
+    is_retryable_error,
+    is_throttle_error,
+    provider_backoff,
+)
+
+
+class StatusError(Exception):
+    """Client error carrying an HTTP status, like the OpenAI SDK errors."""
+
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.response = MagicMock(status_code=status_code, headers=headers or {})
+
+
+class RateLimitError(Exception):
+    """Provider throttling error recognized by class name."""
+
+
+def _http_error(status_code):
+    return requests.HTTPError(response=MagicMock(status_code=status_code, headers={}))
+
+
+class TestRetryClassification:
+    """Test which provider errors are retried."""
+
+    @pytest.mark.parametrize("exc", [
+        StatusError(429), StatusError(503), StatusError(408), _http_error(502),
+        RateLimitError("slow down"), requests.Timeout("read timed out"),
+        requests.ConnectionError("reset"), TimeoutError(), ConnectionResetError(),
+    ])
+    def test_retryable(self, exc):
+        """Test throttling, timeouts, connection failures and 5xx are retried."""
+        assert is_retryable_error(exc)
+
+    @pytest.mark.parametrize("exc", [
+        StatusError(400), StatusError(401), _http_error(404),
+        ValueError("bad response"), KeyError("choices"), Exception("Replicate API error"),
+    ])
+    def test_not_retryable(self, exc):
+        """Test client errors and programming errors fail immediately."""
+        assert not is_retryable_error(exc)
+
+    def test_throttle_detection(self):
+        """Test only 429s and throttling classes count as throttling."""
+        assert is_throttle_error(_http_error(429))
+        assert is_throttle_error(RateLimitError())
+        assert not is_throttle_error(StatusError(503))
+
+    def test_backoff_honors_retry_after(self):
+        """Test the jittered wait is raised to the provider's Retry-After."""
+        retry_state = MagicMock(attempt_number=1)
+        retry_state.outcome.exception.return_value = StatusError(429, {"retry-after": "7"})
+        assert provider_backoff(min_seconds=0, max_seconds=1)(retry_state) == 7
+
+        retry_state.outcome.exception.return_value = StatusError(503)
+        assert 0 <= provider_backoff(min_seconds=0, max_seconds=1)(retry_state) <= 1
+
+
+class TestTokenBucket:
+    """Test request/token rate limiting."""
+
+    def test_burst_then_wait(self):
+        """Test the capacity is available at once and further tokens wait for the refill."""
+        bucket = TokenBucket(rate_per_minute=600, capacity=2)
+        assert bucket.acquire() == 0
+        assert bucket.acquire() == 0
+
+        started = time.monotonic()
+        waited = bucket.acquire()
+        assert waited == pytest.approx(0.1, abs=0.02)
+        assert time.monotonic() - started >= 0.09
+
+    def test_zero_rate_is_unlimited(self):
+        """Test a zero rate never blocks."""
+        bucket = TokenBucket(rate_per_minute=0)
+        assert all(bucket.acquire(1000) == 0 for _ in range(10))
+
+
+class TestAdaptiveConcurrency:
+    """Test AIMD concurrency adjustments."""
+
+    def test_throttle_halves_and_success_recovers(self):
+        """Test congestion halves the limit once per cooldown and successes add back."""
+        limit = AdaptiveConcurrencyLimit(maximum=8, latency_target=10, cooldown=60)
+        limit.on_congestion()
+        limit.on_congestion()
+        assert limit.limit == 4
+        assert limit.decreases == 1
+
+        for _ in range(5):
+            limit.on_success(0.1)
+        assert int(limit.limit) == 5
+
+    def test_slow_success_counts_as_congestion(self):
+        """Test a call slower than the latency target reduces the limit."""
+        limit = AdaptiveConcurrencyLimit(maximum=8, latency_target=1)
+        limit.on_success(5)
+        assert limit.limit == 4
+
+    def test_limit_never_below_minimum(self):
+        """Test repeated congestion stops at the minimum."""
+        limit = AdaptiveConcurrencyLimit(maximum=4, minimum=1, cooldown=0)
+        for _ in range(10):
+            limit.on_congestion()
+        assert limit.limit == 1
+
+    def test_in_flight_calls_bounded(self):
+        """Test no more calls run than the current limit."""
+        limiter = ProviderLimiter("test", max_concurrency=2)
+        active, peak = [0], [0]
+        lock = threading.Lock()
+
+        def call():
+            with limiter.request():
+                with lock:
+                    active[0] += 1
+                    peak[0] = max(peak[0], active[0])
+                time.sleep(0.02)
+                with lock:
+                    active[0] -= 1
+
+        threads = [threading.Thread(target=call) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert peak[0] == 2
+        assert limiter.stats()["calls"] == 6
+
+
+class TestProviderCalls:
+    """Test provider calls go through the shared limiters and retry policy."""
+
+    @pytest.fixture
+    def no_wait(self):
+        """Retry without sleeping."""
+        fns = [creative_utils._call_openai_api_internal, creative_utils.call_replicate_video]
+        originals = [fn.retry.wait for fn in fns]
+        for fn in fns:
+            fn.retry.wait = wait_none()
+        yield
+        for fn, original in zip(fns, originals):
+            fn.retry.wait = original
+
+    def _openai_client(self, side_effect):
+        client = MagicMock()
+        client.chat.completions.create.side_effect = side_effect
+        return client
+
+    def test_throttled_openai_call_retries_and_reduces_concurrency(self, no_wait):
+        """Test a 429 is retried and lowers the shared OpenAI concurrency limit."""
+        response = MagicMock(choices=[MagicMock(message=MagicMock(content=" copy "))])
+        client = self._openai_client([StatusError(429), response])
+
+        with patch.object(creative_utils, "openai_client", client):
+            assert creative_utils._call_openai_api_internal("prompt") == "copy"
+
+        stats = get_provider_limiter("openai").stats()
+        assert client.chat.completions.create.call_count == 2
+        assert (stats["calls"], stats["throttled"], stats["concurrency_decreases"]) == (2, 1, 1)
+        assert stats["concurrency_limit"] < 16
+
+    def test_non_retryable_openai_error_fails_fast(self, no_wait):
+        """Test a 400 is raised after a single attempt."""
+        client = self._openai_client(StatusError(400))
+
+        with patch.object(creative_utils, "openai_client", client):
+            with pytest.raises(StatusError):
+                creative_utils._call_openai_api_internal("prompt")
+
+        client.chat.completions.create.assert_called_once()
+
+    def test_replicate_only_retries_transient_errors(self, no_wait):
+        """Test Replicate timeouts are retried but validation errors are not."""
+        client = MagicMock()
+        client.run.side_effect = [requests.Timeout("timed out"), "https://replicate.test/video.mp4"]
+        with patch.object(creative_utils, "replicate_client", client):
+            assert creative_utils.call_replicate_video("https://img", "spin") == "https://replicate.test/video.mp4"
+        assert client.run.call_count == 2
+
+        client.run.reset_mock(side_effect=True)
+        client.run.side_effect = ValueError("invalid input")
+        with patch.object(creative_utils, "replicate_client", client):
+            with pytest.raises(ValueError):
+                creative_utils.call_replicate_video("https://img", "spin")
+        client.run.assert_called_once()
+
+    def test_health_reports_provider_limits(self, creative_client):
+        """Test /health exposes the limiters in use."""
+        get_provider_limiter("gemini")
+        limits = creative_client.get("/health").json()["provider_limits"]
+        assert limits["gemini"]["concurrency_limit"] >= 1
+        assert limits["gemini"]["requests_per_minute"] > 0
@@ -0,0 +1,128 @@
+"""
+Tests for parallel segment downloads and streaming video concatenation.
+"""
+
+import os
+import threading
+import time
+import pytest
+from unittest.mock import patch, Mock
+from app.common.config import settings
+from app.services.creative_service import creative_utils
+
+SEGMENT_URLS = [f"https://replicate.test/segment_{i}.mp4" for i in range(4)]
+
+
+def _concat_inputs(cmd):
+    """Read the inputs listed in the concat file passed to FFmpeg."""
+    with open(cmd[cmd.index("-i") + 1]) as f:
+        return [line.strip()[len("file '"):-1] for line in f if line.strip()]
+
+
+@pytest.fixture
+def ffmpeg_available():
+    with patch("shutil.which", return_value="/usr/bin/ffmpeg"):
+        yield
+
+
+class TestParallelDownloads:
+    """Test segments are downloaded concurrently and concatenated in order."""
+
+    def test_downloads_overlap_and_keep_order(self, ffmpeg_available, tmp_path, monkeypatch):
+        """Test downloads run in parallel and the concat list keeps playback order."""
+        monkeypatch.setattr(settings, "CREATIVE_VIDEO_DOWNLOAD_WORKERS", 4)
+        monkeypatch.setattr(settings, "CREATIVE_VIDEO_TEMP_DIR", str(tmp_path))
+        active, peak = [0], [0]
+        lock = threading.Lock()
+        listed = []
+
+        def download(url, output_path):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            # Later segments finish first
+            time.sleep(0.05 * (4 - int(url[-5])))
+            with lock:
+                active[0] -= 1
+            return True
+
+        def run(cmd, **kwargs):
+            listed.extend(_concat_inputs(cmd))
+            return Mock(returncode=0)
+
+        with patch.object(creative_utils, "download_video", side_effect=download), \
+             patch("subprocess.run", side_effect=run):
+            result = creative_utils.concatenate_videos(SEGMENT_URLS, str(tmp_path / "out.mp4"))
+
+        assert result == str(tmp_path / "out.mp4")
+        assert peak[0] == 4
+        assert [os.path.basename(path) for path in listed] == [f"segment_{i}.mp4" for i in range(4)]
+        # The temp directory is placed under CREATIVE_VIDEO_TEMP_DIR and removed afterwards
+        assert all(os.path.dirname(os.path.dirname(path)) == str(tmp_path) for path in listed)
+        assert not any(name.startswith("video_concat_") for name in os.listdir(tmp_path))
+
+    def test_failed_download_skips_pending_segments(self, ffmpeg_available, monkeypatch):
+        """Test a failed download aborts without running FFmpeg or starting queued downloads."""
+        monkeypatch.setattr(settings, "CREATIVE_VIDEO_DOWNLOAD_WORKERS", 1)
+        calls = []
+
+        def download(url, output_path):
+            calls.append(url)
+            return False
+
+        with patch.object(creative_utils, "download_video", side_effect=download), \
+             patch("subprocess.run") as mock_run:
+            assert creative_utils.concatenate_videos(SEGMENT_URLS, "/tmp/out.mp4") is None
+
+        assert calls == SEGMENT_URLS[:1]
+        mock_run.assert_not_called()
+
+
+class TestStreamingConcat:
+    """Test FFmpeg reading segment URLs directly."""
+
+    @pytest.fixture(autouse=True)
+    def streaming(self, monkeypatch):
+        monkeypatch.setattr(settings, "CREATIVE_VIDEO_CONCAT_STREAMING", True)
+
+    def test_streams_urls_without_downloading(self, ffmpeg_available):
+        """Test FFmpeg gets the URLs and network protocols and nothing is downloaded."""
+        commands = []
+
+        def run(cmd, **kwargs):
+            commands.append((cmd, _concat_inputs(cmd)))
+            return Mock(returncode=0)
+
+        with patch.object(creative_utils, "download_video") as mock_download, \
+             patch("subprocess.run", side_effect=run):
+            assert creative_utils.concatenate_videos(SEGMENT_URLS, "/tmp/out.mp4") == "/tmp/out.mp4"
+
+        mock_download.assert_not_called()
+        cmd, inputs = commands[0]
+        assert inputs == SEGMENT_URLS
+        assert "https" in cmd[cmd.index("-protocol_whitelist") + 1]
+
+    def test_falls_back_to_downloads(self, ffmpeg_available):
+        """Test a failed streaming run retries with downloaded segments."""
+        commands = []
+
+        def run(cmd, **kwargs):
+            commands.append(_concat_inputs(cmd))
+            return Mock(returncode=1 if len(commands) == 1 else 0, stderr="", stdout="")
+
+        with patch.object(creative_utils, "download_video", return_value=True) as mock_download, \
+             patch("subprocess.run", side_effect=run):
+            assert creative_utils.concatenate_videos(SEGMENT_URLS, "/tmp/out.mp4") == "/tmp/out.mp4"
+
+        assert mock_download.call_count == len(SEGMENT_URLS)
+        assert commands[0] == SEGMENT_URLS
+        assert [os.path.basename(path) for path in commands[1]] == [f"segment_{i}.mp4" for i in range(4)]
+
+    def test_local_paths_are_not_streamed(self, ffmpeg_available):
+        """Test non-http inputs always take the download path."""
+        with patch.object(creative_utils, "download_video", return_value=True) as mock_download, \
+             patch("subprocess.run", return_value=Mock(returncode=0)) as mock_run:
+            creative_utils.concatenate_videos(["/data/a.mp4", "https://replicate.test/b.mp4"], "/tmp/out.mp4")
+
+        assert mock_download.call_count == 2
+        assert "-protocol_whitelist" not in mock_run.call_args.args[0]
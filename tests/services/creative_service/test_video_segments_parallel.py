@@ -0,0 +1,226 @@
+"""
+Tests for parallel storyline video segment generation.
+"""
+
+import threading
+import time
+import pytest
+from unittest.mock import MagicMock, patch
+from app.common.config import settings
+from app.services.creative_service import creative_utils
+
+SEGMENT_LATENCY = 0.2
+
+
+def _storyline(count: int):
+    return {
+        "segments": [
+            {"segment_id": i + 1, "video_prompt": f"Prompt {i + 1}"}
+            for i in range(count)
+        ]
+    }
+
+
+class FakeReplicate:
+    """Fake Replicate video call with per-prompt latency, failures and cancellation."""
+
+    def __init__(self, latencies=None, failing_prompts=()):
+        self.latencies = latencies or {}
+        self.failing_prompts = set(failing_prompts)
+        self.calls = []
+        self.cancelled = []
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, image_url, prompt, cancel_event=None):
+        with self._lock:
+            self.calls.append(prompt)
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            if (cancel_event or threading.Event()).wait(self.latencies.get(prompt, SEGMENT_LATENCY)):
+                with self._lock:
+                    self.cancelled.append(prompt)
+                return None
+            if prompt in self.failing_prompts:
+                raise RuntimeError("Replicate unavailable")
+            return f"https://example.com/{prompt.replace(' ', '_')}.mp4"
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+class TestParallelSegments:
+    """Test segments run on a bounded pool and keep storyline order."""
+
+    def test_segments_run_in_parallel_in_order(self, monkeypatch):
+        """Test three segments take about one segment's latency and keep their order."""
+        monkeypatch.setattr(settings, "CREATIVE_VIDEO_SEGMENT_WORKERS", 3)
+        fake = FakeReplicate(latencies={"Prompt 1": 0.3, "Prompt 2": 0.1, "Prompt 3": 0.2})
+        progress = []
+
+        with patch.object(creative_utils, "call_replicate_video", side_effect=fake):
+            started = time.monotonic()
+            urls = creative_utils.generate_video_segments("https://example.com/img.jpg", _storyline(3), progress=progress)
+            elapsed = time.monotonic() - started
+
+        assert elapsed < 0.6
+        assert urls == [f"https://example.com/Prompt_{i}.mp4" for i in (1, 2, 3)]
+        assert [(p["segment_id"], p["status"]) for p in progress] == [(1, "succeeded"), (2, "succeeded"), (3, "succeeded")]
+        assert all(p["elapsed_seconds"] is not None for p in progress)
+
+    def test_worker_limit(self, monkeypatch):
+        """Test segments in flight never exceed CREATIVE_VIDEO_SEGMENT_WORKERS."""
+        monkeypatch.setattr(settings, "CREATIVE_VIDEO_SEGMENT_WORKERS", 2)
+        fake = FakeReplicate()
+
+        with patch.object(creative_utils, "call_replicate_video", side_effect=fake):
+            urls = creative_utils.generate_video_segments("https://example.com/img.jpg", _storyline(5))
+
+        assert all(urls)
+        assert fake.peak_in_flight == 2
+
+    def test_soft_failure_does_not_cancel(self, monkeypatch):
+        """Test a segment returning no video is recorded without cancelling siblings."""
+        monkeypatch.setattr(settings, "CREATIVE_VIDEO_SEGMENT_WORKERS", 1)
+        progress = []
+
+        with patch.object(creative_utils, "call_replicate_video", side_effect=[None, "a.mp4", "b.mp4"]):
+            urls = creative_utils.generate_video_segments("https://example.com/img.jpg", _storyline(3), progress=progress)
+
+        assert urls == [None, "a.mp4", "b.mp4"]
+        assert [p["status"] for p in progress] == ["failed", "succeeded", "succeeded"]
+
+
+class TestHardFailures:
+    """Test hard failures cancel sibling segments."""
+
+    def test_exception_cancels_pending_siblings(self, monkeypatch):
+        """Test segments not yet started are never submitted to Replicate after a failure."""
+        monkeypatch.setattr(settings, "CREATIVE_VIDEO_SEGMENT_WORKERS", 1)
+        fake = FakeReplicate(failing_prompts=["Prompt 1"])
+        progress = []
+
+        with patch.object(creative_utils, "call_replicate_video", side_effect=fake):
+            urls = creative_utils.generate_video_segments("https://example.com/img.jpg", _storyline(3), progress=progress)
+
+        assert urls == [None, None, None]
+        assert fake.calls == ["Prompt 1"]
+        assert [p["status"] for p in progress] == ["failed", "cancelled", "cancelled"]
+        assert progress[0]["error"] == "Replicate unavailable"
+
+    def test_timeout_abandons_segment(self, monkeypatch):
+        """Test a segment over the timeout is abandoned without waiting for it."""
+        monkeypatch.setattr(settings, "CREATIVE_VIDEO_SEGMENT_WORKERS", 2)
+        monkeypatch.setattr(settings, "CREATIVE_VIDEO_SEGMENT_TIMEOUT", 0.2)
+        fake = FakeReplicate(latencies={"Prompt 1": 0.05, "Prompt 2": 1.5, "Prompt 3": 0.05})
+        progress = []
+
+        with patch.object(creative_utils, "call_replicate_video", side_effect=fake):
+            started = time.monotonic()
+            urls = creative_utils.generate_video_segments("https://example.com/img.jpg", _storyline(3), progress=progress)
+            elapsed = time.monotonic() - started
+
+        assert elapsed < 1.0
+        assert urls[1] is None
+        assert progress[1]["status"] == "timed_out"
+        assert urls[0] == "https://example.com/Prompt_1.mp4"
+
+        # The abandoned segment is told to cancel its prediction
+        deadline = time.monotonic() + 2
+        while not fake.cancelled and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert fake.cancelled == ["Prompt 2"]
+
+
+class FakePrediction:
+    """Replicate prediction that succeeds after a number of polls."""
+
+    def __init__(self, polls_until_done=2, status="succeeded", output="https://replicate.test/video.mp4"):
+        self.id = "pred-1"
+        self.status = "starting"
+        self.error = None
+        self.output = None
+        self.polls_until_done = polls_until_done
+        self.final_status = status
+        self.final_output = output
+        self.cancel = MagicMock()
+
+    def reload(self):
+        self.polls_until_done -= 1
+        if self.polls_until_done <= 0:
+            self.status = self.final_status
+            self.output = self.final_output
+            self.error = "model crashed" if self.final_status == "failed" else None
+
+
+class TestCancellablePrediction:
+    """Test segment predictions are polled and cancelled on Replicate."""
+
+    @pytest.fixture
+    def client(self, monkeypatch):
+        monkeypatch.setattr(settings, "CREATIVE_VIDEO_POLL_INTERVAL", 0.01)
+        client = MagicMock()
+        with patch.object(creative_utils, "replicate_client", client):
+            yield client
+
+    def test_polls_until_succeeded(self, client):
+        """Test the prediction output is returned once it succeeds."""
+        client.predictions.create.return_value = FakePrediction()
+
+        url = creative_utils.call_replicate_video("https://img", "spin", cancel_event=threading.Event())
+
+        assert url == "https://replicate.test/video.mp4"
+        client.run.assert_not_called()
+        assert client.predictions.create.call_args.kwargs["model"] == settings.REPLICATE_VIDEO_MODEL
+
+    def test_cancel_event_cancels_prediction(self, client):
+        """Test setting the event cancels the running prediction and returns None."""
+        prediction = FakePrediction(polls_until_done=10 ** 6)
+        client.predictions.create.return_value = prediction
+        cancel_event = threading.Event()
+        threading.Timer(0.05, cancel_event.set).start()
+
+        assert creative_utils.call_replicate_video("https://img", "spin", cancel_event=cancel_event) is None
+        prediction.cancel.assert_called_once()
+
+    def test_failed_prediction_raises(self, client):
+        """Test a failed prediction raises with its error."""
+        client.predictions.create.return_value = FakePrediction(status="failed")
+
+        with pytest.raises(RuntimeError, match="model crashed"):
+            creative_utils.call_replicate_video("https://img", "spin", cancel_event=threading.Event())
+
+
+class TestProgressInDebug:
+    """Test segment progress is reported in the generate_creatives debug info."""
+
+    def test_debug_includes_segment_progress(self, creative_client):
+        """Test storyline_video_generation debug entries carry per-segment status."""
+        from tests.testdata import VALID_CAMPAIGN_SPEC_META_ELECTRONICS, SAMPLE_PRODUCTS_ELECTRONICS
+
+        request = {
+            "campaign_spec": VALID_CAMPAIGN_SPEC_META_ELECTRONICS.model_dump(),
+            "products": [SAMPLE_PRODUCTS_ELECTRONICS[0].model_dump()],
+            "ab_config": {
+                "variants_per_product": 1,
+                "max_creatives": 1,
+                "enable_image_generation": True,
+                "enable_storyline_video": True,
+            },
+        }
+        storyline = dict(_storyline(2), theme="modern lifestyle", style="minimalist_modern", total_duration=10, num_segments=2)
+        for segment in storyline["segments"]:
+            segment.update(duration=5, scene_description="Scene", camera_movement="zoom", focus="product")
+
+        with patch("app.services.creative_service.main.call_gemini_text",
+                   return_value='{"headline": "Test", "primary_text": "Content"}'), \
+             patch("app.services.creative_service.main.call_openai_image", return_value="https://example.com/image.jpg"), \
+             patch("app.services.creative_service.main.generate_storyline", return_value=storyline), \
+             patch("app.services.creative_service.main.concatenate_videos", return_value="/tmp/final.mp4"), \
+             patch.object(creative_utils, "call_replicate_video", side_effect=["a.mp4", "b.mp4"]):
+            data = creative_client.post("/generate_creatives", json=request).json()
+
+        entry = data["debug"]["storyline_video_generation"][0]
+        assert [(p["segment_id"], p["status"]) for p in entry["segment_progress"]] == [(1, "succeeded"), (2, "succeeded")]
@@ -0,0 +1,248 @@
+"""
+Tests for incrementally maintained analytics counters and rollups.
+"""
+
+import threading
+import time
+import pytest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from app.services.logs_service import main
+from app.services.logs_service.repository import LogEventRepository
+from app.services.logs_service.rollups import AnalyticsCounters, bucket_start, rollup_increments
+
+client = TestClient(main.app)
+
+
+def _event(stage="creative", service="creative_service", level="INFO", timestamp=None):
+    return {"stage": stage, "service": service, "level": level, "timestamp": timestamp or datetime.utcnow()}
+
+
+def _request_event(stage, success=True, minutes_ago=0):
+    return {
+        "timestamp": (datetime.utcnow() - timedelta(minutes=minutes_ago)).isoformat(),
+        "stage": stage,
+        "service": f"{stage}_service",
+        "success": success,
+    }
+
+
+@pytest.fixture
+def sqlite_db(monkeypatch):
+    """SQLite-backed log tables and fresh analytics counters."""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import StaticPool
+    from app.common import db
+    from app.common.models import LogEventORM, LogEventRollupORM
+
+    # One shared connection: requests are served on the TestClient's thread
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    LogEventORM.__table__.create(engine)
+    LogEventRollupORM.__table__.create(engine)
+    monkeypatch.setattr(main, "_analytics_counters", AnalyticsCounters())
+    monkeypatch.setattr(main.settings, "LOGS_ANALYTICS_ROLLUPS_ENABLED", True)
+
+    with patch.object(db, "_engine", engine), patch.object(db, "_SessionLocal", sessionmaker(bind=engine)):
+        yield engine
+    main._close_event_writer()
+
+
+class TestAnalyticsCounters:
+    """Test AnalyticsCounters."""
+
+    def test_record_and_snapshot(self):
+        """Test recorded events are counted per dimension."""
+        counters = AnalyticsCounters()
+        counters.record([_event(), _event(stage="strategy", service="strategy_service", level="ERROR")])
+
+        assert counters.snapshot() == {
+            "by_stage": {"creative": 1, "strategy": 1},
+            "by_service": {"creative_service": 1, "strategy_service": 1},
+            "levels": {"INFO": 1, "ERROR": 1},
+        }
+
+    def test_write_during_reconcile_counted_once(self):
+        """Test a write started during a recount waits for it and is counted on top of it."""
+        counters = AnalyticsCounters()
+        counters.record([_event()] * 5)
+        writer_started = threading.Event()
+        seen_during_load = []
+
+        def write():
+            writer_started.set()
+            with counters.writing():
+                counters.record([_event(stage="strategy")])
+
+        writer = threading.Thread(target=write)
+
+        def load():
+            writer.start()
+            writer_started.wait(5)
+            time.sleep(0.05)
+            seen_during_load.append(counters.snapshot()["by_stage"])
+            return {"by_stage": {"creative": 2}, "by_service": {"creative_service": 2}, "levels": {"INFO": 2}}
+
+        assert counters.age() is None
+        assert counters.reconcile(load)
+        writer.join(5)
+        assert seen_during_load == [{"creative": 5}]
+        assert counters.snapshot()["by_stage"] == {"creative": 2, "strategy": 1}
+        assert counters.age() is not None
+
+    def test_reconcile_waits_for_writes_in_flight(self):
+        """Test a recount only starts once writes in flight have been recorded."""
+        counters = AnalyticsCounters()
+        in_write = threading.Event()
+        release = threading.Event()
+        seen_during_load = []
+
+        def write():
+            with counters.writing():
+                in_write.set()
+                release.wait(5)
+                counters.record([_event()])
+
+        def load():
+            seen_during_load.append(counters.snapshot()["by_stage"])
+            return {"by_stage": {"creative": 1}, "by_service": {"creative_service": 1}, "levels": {"INFO": 1}}
+
+        writer = threading.Thread(target=write)
+        writer.start()
+        in_write.wait(5)
+        reconciler = threading.Thread(target=counters.reconcile, args=(load,))
+        reconciler.start()
+        time.sleep(0.05)
+        assert seen_during_load == []
+
+        release.set()
+        writer.join(5)
+        reconciler.join(5)
+        assert seen_during_load == [{"creative": 1}]
+        assert counters.snapshot()["by_stage"] == {"creative": 1}
+
+    def test_failed_reconcile_keeps_counts(self):
+        """Test counts survive a failing recount."""
+        counters = AnalyticsCounters()
+        counters.record([_event()])
+
+        def load():
+            raise RuntimeError("database unavailable")
+
+        assert not counters.reconcile(load)
+        assert counters.snapshot()["levels"] == {"INFO": 1}
+        assert counters.stats()["failed_reconciliations"] == 1
+        assert not counters.reconciling
+
+    def test_one_reconcile_at_a_time(self):
+        """Test a reconcile started during another one returns at once."""
+        counters = AnalyticsCounters()
+        nested = []
+
+        def load():
+            nested.append(counters.reconcile(lambda: {}))
+            return {}
+
+        assert counters.reconcile(load)
+        assert nested == [False]
+
+
+class TestRollupIncrements:
+    """Test rollup bucketing."""
+
+    def test_buckets(self):
+        """Test events are counted per minute and hour bucket, in UTC."""
+        ts = datetime(2026, 3, 1, 10, 15, 42)
+        aware = datetime(2026, 3, 1, 12, 15, 5, tzinfo=timezone(timedelta(hours=2)))
+        rows = rollup_increments([_event(timestamp=ts), _event(timestamp=aware)])
+
+        by_key = {(r["granularity"], r["bucket_start"]): r["count"] for r in rows}
+        assert by_key == {
+            ("minute", datetime(2026, 3, 1, 10, 15)): 2,
+            ("hour", datetime(2026, 3, 1, 10, 0)): 2,
+        }
+        assert bucket_start(ts, "hour") == datetime(2026, 3, 1, 10)
+
+
+class TestAnalyticsEndpoint:
+    """Test /analytics served from counters and rollups."""
+
+    def test_counts_without_rescanning(self, sqlite_db):
+        """Test the first call recounts from the database and later writes update the counters in place."""
+        client.post("/append_events", json=[_request_event("product"), _request_event("creative", success=False)])
+        first = client.get("/analytics").json()
+        assert first["by_stage"] == {"product": 1, "creative": 1}
+        assert first["levels"] == {"INFO": 1, "ERROR": 1}
+        assert first["total"] == 2
+
+        with patch.object(LogEventRepository, "count_events", side_effect=AssertionError("full scan")):
+            client.post("/append_event", json=_request_event("product"))
+            data = client.get("/analytics?consistent=true").json()
+
+        assert data["status"] == "success"
+        assert data["by_stage"] == {"product": 2, "creative": 1}
+        assert data["by_service"]["product_service"] == 2
+        assert data["window"] is None
+
+    def test_stale_counters_reconciled_in_background(self, sqlite_db, monkeypatch):
+        """Test counters older than the reconcile interval are recounted."""
+        client.get("/analytics")
+        # A write the counters cannot see (e.g. from another replica)
+        LogEventRepository.bulk_create_log_events([{**_event(), "message": "direct", "context": {}, "success": True}])
+        monkeypatch.setattr(main.settings, "LOGS_ANALYTICS_RECONCILE_INTERVAL", 0.001)
+        time.sleep(0.01)
+
+        client.get("/analytics")
+        deadline = time.monotonic() + 5
+        while main._analytics_counters.stats()["reconciliations"] < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert client.get("/analytics").json()["by_stage"] == {"creative": 1}
+
+    def test_window_from_rollups(self, sqlite_db):
+        """Test windowed analytics sum rollup buckets."""
+        client.post("/append_events", json=[
+            _request_event("product"),
+            _request_event("creative", minutes_ago=10),
+            _request_event("strategy", minutes_ago=60 * 5),
+        ])
+
+        with patch.object(LogEventRepository, "count_events", side_effect=AssertionError("full scan")):
+            recent = client.get("/analytics?window_minutes=5").json()
+            hour = client.get("/analytics?window_minutes=120").json()
+
+        assert recent["by_stage"] == {"product": 1}
+        assert recent["window"]["granularity"] == "minute"
+        assert recent["window"]["source"] == "rollups"
+        assert hour["by_stage"] == {"product": 1, "creative": 1}
+        assert hour["window"]["granularity"] == "hour"
+
+    def test_window_without_rollups(self, sqlite_db, monkeypatch):
+        """Test windows are counted from events when rollups are disabled."""
+        monkeypatch.setattr(main.settings, "LOGS_ANALYTICS_ROLLUPS_ENABLED", False)
+        client.post("/append_events", json=[_request_event("product"), _request_event("creative", minutes_ago=30)])
+
+        data = client.get("/analytics?window_minutes=15").json()
+        assert data["by_stage"] == {"product": 1}
+        assert data["window"]["source"] == "database"
+
+    def test_reconcile_prunes_expired_minute_rollups(self, sqlite_db, monkeypatch):
+        """Test minute rollups older than the retention are deleted when reconciling."""
+        monkeypatch.setattr(main.settings, "LOGS_ANALYTICS_MINUTE_ROLLUP_RETENTION_HOURS", 1)
+        client.post("/append_events", json=[_request_event("product"), _request_event("creative", minutes_ago=180)])
+        client.get("/analytics")
+
+        from sqlalchemy import text
+        with sqlite_db.connect() as conn:
+            minute_rows = conn.execute(text("SELECT stage FROM log_event_rollups WHERE granularity = 'minute'")).all()
+            hour_rows = conn.execute(text("SELECT stage FROM log_event_rollups WHERE granularity = 'hour'")).all()
+        assert [row.stage for row in minute_rows] == ["product"]
+        assert len(hour_rows) == 2
+
+    def test_recount_every_request_when_interval_is_zero(self, sqlite_db, monkeypatch):
+        """Test LOGS_ANALYTICS_RECONCILE_INTERVAL=0 counts from the database each time."""
+        monkeypatch.setattr(main.settings, "LOGS_ANALYTICS_RECONCILE_INTERVAL", 0)
+        with patch.object(LogEventRepository, "count_events", wraps=LogEventRepository.count_events) as mock_count:
+            client.get("/analytics")
+            client.get("/analytics")
+        assert mock_count.call_count == 2
@@ -0,0 +1,163 @@
+"""
+Tests for the bulk append_events endpoint.
+"""
+
+import json
+import uuid
+import pytest
+from datetime import datetime
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from app.services.logs_service import main
+from app.services.logs_service.repository import LogEventRepository
+
+client = TestClient(main.app)
+
+
+def _event(i, **overrides):
+    event = {
+        "timestamp": datetime.utcnow().isoformat(),
+        "stage": "creative",
+        "service": "creative_service",
+        "success": True,
+        "metadata": {"message": f"event {i}", "correlation_id": "corr-bulk"},
+    }
+    event.update(overrides)
+    return event
+
+
+def _ndjson(events):
+    return "\n".join(json.dumps(event) for event in events) + "\n"
+
+
+@pytest.fixture
+def mock_db():
+    """Pretend a database is configured and capture bulk inserts."""
+    with patch.object(main, "is_db_available", return_value=True), \
+         patch.object(LogEventRepository, "bulk_create_log_events", side_effect=lambda rows: len(rows)) as mock_bulk, \
+         patch.object(LogEventRepository, "create_log_event") as mock_create:
+        yield mock_bulk, mock_create
+
+
+class TestAppendEvents:
+    """Test /append_events."""
+
+    def test_json_array_single_transaction(self, mock_db):
+        """Test an array is written with one bulk insert and ids come back in order."""
+        mock_bulk, mock_create = mock_db
+        response = client.post("/append_events", json=[_event(i) for i in range(3)])
+
+        data = response.json()
+        assert data["status"] == "success"
+        assert (data["accepted"], data["rejected"]) == (3, 0)
+        mock_bulk.assert_called_once()
+        mock_create.assert_not_called()
+        rows = mock_bulk.call_args.args[0]
+        assert [row["message"] for row in rows] == ["event 0", "event 1", "event 2"]
+        assert [r["event_id"] for r in data["results"]] == [str(row["id"]) for row in rows]
+        assert all(isinstance(row["id"], uuid.UUID) for row in rows)
+
+    def test_ndjson_with_invalid_lines(self, mock_db):
+        """Test NDJSON events are validated one by one and invalid ones are reported in place."""
+        mock_bulk, _ = mock_db
+        body = _ndjson([_event(0), {"stage": "creative"}, _event(2, success=False)]) + "\n"
+        response = client.post(
+            "/append_events",
+            content=body.encode(),
+            headers={"Content-Type": "application/x-ndjson"},
+        )
+
+        data = response.json()
+        assert (data["accepted"], data["rejected"]) == (2, 1)
+        assert [r["status"] for r in data["results"]] == ["success", "error", "success"]
+        error = data["results"][1]
+        assert error["error_code"] == "VALIDATION_ERROR"
+        assert error["details"]["index"] == 1
+        assert {e["loc"][0] for e in error["details"]["errors"]} >= {"timestamp", "service", "success"}
+
+        rows = mock_bulk.call_args.args[0]
+        assert [row["level"] for row in rows] == ["INFO", "ERROR"]
+
+    def test_ndjson_malformed_line(self, mock_db):
+        """Test a line that is not JSON is rejected without failing the batch."""
+        body = _ndjson([_event(0)]) + "{not json\n"
+        data = client.post(
+            "/append_events", content=body.encode(), headers={"Content-Type": "application/x-ndjson"}
+        ).json()
+
+        assert (data["accepted"], data["rejected"]) == (1, 1)
+        assert data["results"][1]["error_code"] == "VALIDATION_ERROR"
+
+    def test_without_database(self):
+        """Test events are accepted (file only) and keep their own event ids without a database."""
+        data = client.post("/append_events", json=[_event(0, event_id="evt-1"), _event(1)]).json()
+
+        assert data["accepted"] == 2
+        assert [r["event_id"] for r in data["results"]] == ["evt-1", None]
+
+    @pytest.mark.parametrize("body", [b'{"stage": "creative"}', b"not json"])
+    def test_invalid_body(self, body):
+        """Test a body that is neither an array nor NDJSON is rejected."""
+        data = client.post("/append_events", content=body, headers={"Content-Type": "application/json"}).json()
+        assert data["error_code"] == "INVALID_JSON"
+
+    def test_batch_too_large(self, monkeypatch):
+        """Test batches above LOGS_BULK_MAX_EVENTS are rejected in both formats."""
+        monkeypatch.setattr(main.settings, "LOGS_BULK_MAX_EVENTS", 2)
+        events = [_event(i) for i in range(3)]
+
+        assert client.post("/append_events", json=events).json()["error_code"] == "BATCH_TOO_LARGE"
+        data = client.post(
+            "/append_events", content=_ndjson(events).encode(), headers={"Content-Type": "application/x-ndjson"}
+        ).json()
+        assert data["error_code"] == "BATCH_TOO_LARGE"
+        assert data["details"] == {"count": 3, "max": 2}
+
+    def test_ndjson_split_across_chunks(self, mock_db):
+        """Test lines spanning several body chunks are reassembled."""
+        body = _ndjson([_event(i) for i in range(3)]).encode()
+        chunks = [body[i:i + 7] for i in range(0, len(body), 7)]
+        data = client.post(
+            "/append_events", content=iter(chunks), headers={"Content-Type": "application/x-ndjson"}
+        ).json()
+
+        assert (data["accepted"], data["rejected"]) == (3, 0)
+        assert [row["message"] for row in mock_db[0].call_args.args[0]] == ["event 0", "event 1", "event 2"]
+
+    def test_body_too_large(self, mock_db, monkeypatch):
+        """Test bodies above LOGS_BULK_MAX_BODY_BYTES get HTTP 413 in both formats."""
+        monkeypatch.setattr(main.settings, "LOGS_BULK_MAX_BODY_BYTES", 200)
+        events = [_event(i) for i in range(3)]
+
+        response = client.post("/append_events", json=events)
+        assert response.status_code == 413
+        assert response.json()["details"] == {"exceeded": "body", "max_bytes": 200}
+
+        body = _ndjson(events).encode()
+        # Streamed without a Content-Length, so the limit applies while reading
+        response = client.post(
+            "/append_events", content=iter([body[:150], body[150:]]), headers={"Content-Type": "application/x-ndjson"}
+        )
+        assert response.status_code == 413
+        assert response.json()["error_code"] == "PAYLOAD_TOO_LARGE"
+        mock_db[0].assert_not_called()
+
+    def test_line_too_large(self, mock_db, monkeypatch):
+        """Test an NDJSON line above LOGS_BULK_MAX_LINE_BYTES gets HTTP 413, even before its newline arrives."""
+        monkeypatch.setattr(main.settings, "LOGS_BULK_MAX_LINE_BYTES", 100)
+        long_line = json.dumps(_event(0, metadata={"message": "x" * 200}))
+
+        for body in (_ndjson([_event(1)]) + long_line + "\n", long_line):
+            response = client.post(
+                "/append_events", content=body.encode(), headers={"Content-Type": "application/x-ndjson"}
+            )
+            assert response.status_code == 413
+            assert response.json()["details"] == {"exceeded": "line", "max_bytes": 100}
+
+    def test_database_failure_fails_batch(self, mock_db):
+        """Test a failed transaction is reported for the whole batch."""
+        mock_bulk, _ = mock_db
+        mock_bulk.side_effect = RuntimeError("connection lost")
+
+        data = client.post("/append_events", json=[_event(0)]).json()
+        assert data["error_code"] == "LOG_APPEND_FAILED"
@@ -0,0 +1,155 @@
+"""
+Tests for queued, buffered JSON file logging.
+"""
+
+import gzip
+import json
+import logging
+import queue
+import time
+import pytest
+from fastapi.testclient import TestClient
+from app.services.logs_service import main
+from app.services.logs_service.logger_config import (
+    BufferedRotatingFileHandler,
+    DroppingQueueHandler,
+    JSONFormatter,
+    file_logging_stats,
+    log_event_to_file,
+    setup_file_logging,
+    stop_file_logging,
+)
+
+
+def _read_lines(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+@pytest.fixture
+def queued_file_logger(tmp_path):
+    """Queued file logger writing to a temp file; restores the service's logger afterwards."""
+    path = tmp_path / "events.log"
+    yield setup_file_logging(str(path)), path
+    stop_file_logging()
+    setup_file_logging(
+        log_file_path=main.settings.LOGS_FILE_PATH,
+        use_queue=main.settings.LOGS_FILE_QUEUE_ENABLED,
+        queue_size=main.settings.LOGS_FILE_QUEUE_SIZE,
+        compress_rotated=main.settings.LOGS_FILE_COMPRESS_ROTATED
+    )
+
+
+class TestQueuedFileLogging:
+    """Test records are written by the listener thread."""
+
+    def test_events_written_off_thread(self, queued_file_logger):
+        """Test events reach the file once the queue drains, with their creation time."""
+        logger, path = queued_file_logger
+        before = time.time()
+        log_event_to_file(
+            logger, timestamp="2024-01-01T00:00:00", stage="creative", service="creative_service",
+            level="INFO", message="Creative generated", context={"metadata": {"n": 1}}, correlation_id="corr-1"
+        )
+
+        assert _wait_for(lambda: path.exists() and _read_lines(path))
+        [line] = _read_lines(path)
+        assert (line["service"], line["stage"], line["message"]) == ("creative_service", "creative", "Creative generated")
+        assert line["context"] == {"metadata": {"n": 1}}
+        assert line["correlation_id"] == "corr-1"
+        assert line["timestamp"] >= time.strftime("%Y-%m-%dT%H:%M", time.gmtime(before))
+        assert file_logging_stats()["written"] == 1
+
+    def test_exception_and_args_resolved_before_queueing(self, queued_file_logger):
+        """Test message arguments and tracebacks survive the queue."""
+        logger, path = queued_file_logger
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            logger.error("failed %s", "upload", exc_info=True)
+        stop_file_logging()
+
+        [line] = _read_lines(path)
+        assert line["message"] == "failed upload"
+        assert "ValueError: boom" in line["exception"]
+
+    def test_stop_writes_queued_records(self, queued_file_logger):
+        """Test stopping drains everything that was queued."""
+        logger, path = queued_file_logger
+        for i in range(200):
+            logger.info(f"event {i}")
+        stop_file_logging()
+
+        assert [line["message"] for line in _read_lines(path)] == [f"event {i}" for i in range(200)]
+        assert file_logging_stats() is None
+
+    def test_consecutive_lifespans(self, queued_file_logger):
+        """Test records are written during and between two app lifespans, with no orphaned queue."""
+        logger, path = queued_file_logger
+        event = {"timestamp": "2024-01-01T00:00:00", "stage": "creative", "service": "creative_service", "success": True}
+
+        for n in range(2):
+            with TestClient(main.app) as client:
+                client.post("/append_event", json={**event, "metadata": {"message": f"lifespan {n}"}})
+                assert file_logging_stats() is not None
+                assert len(logger.handlers) == 1 and isinstance(logger.handlers[0], DroppingQueueHandler)
+
+            # Between lifespans records go straight to the file
+            assert file_logging_stats() is None
+            assert [type(h) for h in logger.handlers] == [BufferedRotatingFileHandler]
+            logger.info(f"between {n}")
+            assert _read_lines(path)[-1]["message"] == f"between {n}"
+
+        assert [line["message"] for line in _read_lines(path)] == ["lifespan 0", "between 0", "lifespan 1", "between 1"]
+
+    def test_health_reports_queue(self, queued_file_logger):
+        """Test /health exposes queue depth metrics."""
+        stats = TestClient(main.app).get("/health").json()["file_log"]
+        assert stats["queue_capacity"] == 10000
+        assert stats["queue_depth"] >= 0
+
+
+class TestHandlers:
+    """Test the queue handler and buffered file handler on their own."""
+
+    def test_full_queue_drops_records(self):
+        """Test records are dropped, not blocked on, when the queue is full."""
+        handler = DroppingQueueHandler(queue.Queue(maxsize=1))
+        for i in range(3):
+            handler.handle(logging.makeLogRecord({"msg": f"record {i}", "levelno": logging.INFO}))
+
+        assert handler.queue.qsize() == 1
+        assert handler.dropped == 2
+
+    def test_compressed_rotation(self, tmp_path):
+        """Test rotated files are gzip-compressed."""
+        path = tmp_path / "events.log"
+        handler = BufferedRotatingFileHandler(str(path), maxBytes=300, backupCount=2, encoding="utf-8", compress=True)
+        handler.setFormatter(JSONFormatter())
+        for i in range(5):
+            handler.handle(logging.makeLogRecord({"msg": f"record {i} " + "x" * 100, "levelno": logging.INFO}))
+        handler.close()
+
+        rotated = tmp_path / "events.log.1.gz"
+        assert rotated.exists()
+        with gzip.open(rotated, "rt", encoding="utf-8") as f:
+            assert json.loads(f.readline())["message"].startswith("record")
+
+    def test_deferred_flush(self, tmp_path):
+        """Test records stay buffered until flush_buffer when flushing is deferred."""
+        path = tmp_path / "events.log"
+        handler = BufferedRotatingFileHandler(str(path), encoding="utf-8")
+        handler.setFormatter(JSONFormatter())
+        handler.handle(logging.makeLogRecord({"msg": "buffered", "levelno": logging.INFO}))
+
+        assert path.read_text() == ""
+        handler.flush_buffer()
+        assert _read_lines(path)[0]["message"] == "buffered"
+        handler.close()
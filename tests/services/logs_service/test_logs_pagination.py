@@ -0,0 +1,146 @@
+"""
+Tests for keyset pagination and count modes of the query_logs endpoint.
+"""
+
+import uuid
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from app.services.logs_service import main
+from app.services.logs_service.repository import LogEventRepository, encode_log_cursor, decode_log_cursor
+
+client = TestClient(main.app)
+
+BASE_TIME = datetime(2026, 1, 1, 12, 0, 0)
+
+
+@pytest.fixture
+def sqlite_logs():
+    """SQLite-backed log_events table with 7 events; events 2-4 share a timestamp."""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import StaticPool
+    from app.common import db
+    from app.common.models import LogEventORM
+
+    # One shared connection: requests are served on the TestClient's thread
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    LogEventORM.__table__.create(engine)
+    events = [
+        {
+            "id": uuid.uuid4(),
+            "timestamp": BASE_TIME - timedelta(minutes=max(i, 2) if i <= 4 else i),
+            "stage": "creative" if i % 2 == 0 else "strategy",
+            "service": "creative_service", "level": "INFO", "message": f"event {i}",
+            "context": {"i": i}, "correlation_id": "corr-page", "success": True,
+            # created_at uses a PostgreSQL server default, so set it here
+            "created_at": BASE_TIME,
+        }
+        for i in range(7)
+    ]
+
+    with patch.object(db, "_engine", engine), patch.object(db, "_SessionLocal", sessionmaker(bind=engine)):
+        LogEventRepository.bulk_create_log_events(events)
+        yield events
+
+
+def _expected_order(events):
+    ordered = sorted(events, key=lambda e: (e["timestamp"], e["id"].hex), reverse=True)
+    return [str(e["id"]) for e in ordered]
+
+
+class TestKeysetPagination:
+    """Test cursor-based paging through /logs."""
+
+    def test_cursor_walks_all_pages_without_overlap(self, sqlite_logs):
+        """Test following next_cursor returns every event once, newest first, across timestamp ties."""
+        seen = []
+        cursor = None
+        pages = 0
+        while True:
+            url = "/logs?limit=2" + (f"&cursor={cursor}" if cursor else "")
+            data = client.get(url).json()
+            pagination = data["pagination"]
+            seen.extend(log["id"] for log in data["logs"])
+            pages += 1
+            cursor = pagination["next_cursor"]
+            if not pagination["has_more"]:
+                assert cursor is None
+                break
+
+        assert pages == 4
+        assert seen == _expected_order(sqlite_logs)
+
+    def test_offset_page_matches_cursor_page(self, sqlite_logs):
+        """Test offset pagination still works and hands out a cursor for the following page."""
+        first = client.get("/logs?limit=3").json()
+        by_offset = client.get("/logs?limit=3&offset=3").json()
+        by_cursor = client.get(f"/logs?limit=3&cursor={first['pagination']['next_cursor']}").json()
+
+        assert [log["id"] for log in by_offset["logs"]] == [log["id"] for log in by_cursor["logs"]]
+        assert by_offset["pagination"]["total"] == 7
+
+    def test_cursor_with_filters(self, sqlite_logs):
+        """Test filters apply to every page."""
+        first = client.get("/logs?stage=creative&limit=2").json()
+        second = client.get(f"/logs?stage=creative&limit=2&cursor={first['pagination']['next_cursor']}").json()
+
+        logs = first["logs"] + second["logs"]
+        assert len(logs) == 4
+        assert {log["stage"] for log in logs} == {"creative"}
+        assert second["pagination"]["has_more"] is False
+
+    def test_invalid_cursor(self):
+        """Test a malformed cursor is rejected."""
+        data = client.get("/logs?cursor=not-a-cursor").json()
+        assert data["error_code"] == "INVALID_CURSOR"
+
+    def test_cursor_round_trip(self):
+        """Test cursors decode to the position they were made from."""
+        event_id = str(uuid.uuid4())
+        assert decode_log_cursor(encode_log_cursor((BASE_TIME, event_id))) == (BASE_TIME, event_id)
+
+
+class TestCountModes:
+    """Test the count parameter of /logs."""
+
+    def test_exact_by_default(self, sqlite_logs):
+        """Test the default count is exact."""
+        pagination = client.get("/logs?limit=2").json()["pagination"]
+        assert (pagination["total"], pagination["total_is_exact"]) == (7, True)
+
+    def test_capped(self, sqlite_logs, monkeypatch):
+        """Test capped counts stop at the cap and say so."""
+        monkeypatch.setattr(main.settings, "LOGS_QUERY_COUNT_CAP", 5)
+        pagination = client.get("/logs?count=capped").json()["pagination"]
+        assert (pagination["total"], pagination["total_is_exact"]) == (5, False)
+
+        pagination = client.get("/logs?count=capped&stage=strategy").json()["pagination"]
+        assert (pagination["total"], pagination["total_is_exact"]) == (3, True)
+
+    def test_estimate_falls_back_to_capped(self, sqlite_logs):
+        """Test estimate uses a capped count where planner statistics are unavailable."""
+        pagination = client.get("/logs?count=estimate").json()["pagination"]
+        assert (pagination["total"], pagination["total_is_exact"]) == (7, True)
+
+    def test_none_skips_count(self, sqlite_logs):
+        """Test count=none returns the page without a total."""
+        with patch("sqlalchemy.orm.Query.count") as mock_count:
+            data = client.get("/logs?count=none&limit=2").json()
+
+        mock_count.assert_not_called()
+        assert data["pagination"]["total"] is None
+        assert data["pagination"]["has_more"] is True
+        assert len(data["logs"]) == 2
+
+    def test_default_mode_from_settings(self, sqlite_logs, monkeypatch):
+        """Test LOGS_QUERY_COUNT_MODE sets the default."""
+        monkeypatch.setattr(main.settings, "LOGS_QUERY_COUNT_MODE", "none")
+        assert client.get("/logs").json()["pagination"]["total"] is None
+
+    def test_invalid_count_mode(self):
+        """Test unknown count modes are rejected."""
+        data = client.get("/logs?count=approximate").json()
+        assert data["error_code"] == "INVALID_COUNT_MODE"
+        assert "capped" in data["details"]["allowed"]
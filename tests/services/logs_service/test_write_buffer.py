@@ -0,0 +1,262 @@
+"""
+Tests for write-behind batched log event ingestion.
+"""
+
+import threading
+import time
+import uuid
+import pytest
+from datetime import datetime
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from app.services.logs_service import main
+from app.services.logs_service.repository import LogEventRepository
+from app.services.logs_service.write_buffer import WriteBehindBuffer, BufferFullError
+
+
+class RecordingWriter:
+    """write_batch fake recording batches, optionally failing or blocking."""
+
+    def __init__(self, failures=0, gate=None):
+        self.batches = []
+        self.failures = failures
+        self.gate = gate
+        self._lock = threading.Lock()
+
+    def __call__(self, batch):
+        if self.gate is not None:
+            self.gate.wait(5)
+        with self._lock:
+            if self.failures:
+                self.failures -= 1
+                raise RuntimeError("database unavailable")
+            self.batches.append(list(batch))
+
+    @property
+    def items(self):
+        return [item for batch in self.batches for item in batch]
+
+
+@pytest.fixture
+def make_buffer():
+    buffers = []
+
+    def make(writer, **kwargs):
+        buffer = WriteBehindBuffer(writer, **kwargs)
+        buffers.append(buffer)
+        return buffer
+
+    yield make
+    for buffer in buffers:
+        buffer.close(timeout=5)
+
+
+class TestWriteBehindBuffer:
+    """Test batching, flushing and backpressure."""
+
+    def test_batches_by_size(self, make_buffer):
+        """Test a burst is written in full batches, in submission order."""
+        writer = RecordingWriter()
+        buffer = make_buffer(writer, max_batch_size=100, flush_interval=1)
+        for i in range(250):
+            buffer.submit(i)
+
+        assert buffer.flush(timeout=5)
+        assert writer.items == list(range(250))
+        assert [len(batch) for batch in writer.batches][:2] == [100, 100]
+        assert buffer.stats()["written"] == 250
+
+    def test_batches_by_time(self, make_buffer):
+        """Test a partial batch is written after the flush interval without an explicit flush."""
+        writer = RecordingWriter()
+        buffer = make_buffer(writer, max_batch_size=100, flush_interval=0.05)
+        buffer.submit("a")
+        buffer.submit("b")
+
+        deadline = time.monotonic() + 2
+        while not writer.batches and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert writer.batches == [["a", "b"]]
+
+    def test_flush_does_not_wait_for_interval(self, make_buffer):
+        """Test flush writes a partial batch immediately."""
+        writer = RecordingWriter()
+        buffer = make_buffer(writer, max_batch_size=100, flush_interval=30)
+        buffer.submit("a")
+
+        started = time.monotonic()
+        assert buffer.flush(timeout=5)
+        assert time.monotonic() - started < 1
+        assert writer.items == ["a"]
+        assert buffer.pending() == 0
+
+    def test_backpressure_when_full(self, make_buffer):
+        """Test submissions fail once the bounded queue stays full."""
+        gate = threading.Event()
+        writer = RecordingWriter(gate=gate)
+        buffer = make_buffer(writer, max_batch_size=1, flush_interval=0.01, max_pending=2)
+        buffer.submit(0)
+        # Wait until the writer holds item 0, then fill the queue
+        deadline = time.monotonic() + 2
+        while buffer._queue.qsize() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        buffer.submit(1)
+        buffer.submit(2)
+
+        with pytest.raises(BufferFullError):
+            buffer.submit(3)
+        with pytest.raises(BufferFullError):
+            buffer.submit(3, timeout=0.05)
+
+        gate.set()
+        buffer.submit(3, timeout=5)
+        assert buffer.flush(timeout=5)
+        assert writer.items == [0, 1, 2, 3]
+
+    def test_failed_batch_is_retried(self, make_buffer):
+        """Test a failing write is retried before anything is dropped."""
+        writer = RecordingWriter(failures=1)
+        buffer = make_buffer(writer, flush_interval=0.01)
+        buffer.submit("a")
+
+        assert buffer.flush(timeout=5)
+        assert writer.items == ["a"]
+        assert (buffer.stats()["failed_batches"], buffer.stats()["dropped"]) == (1, 0)
+
+    def test_batch_kept_while_writes_fail(self, make_buffer):
+        """Test a batch survives a longer outage and holds back the queue meanwhile."""
+        writer = RecordingWriter(failures=4)
+        buffer = make_buffer(writer, max_batch_size=1, flush_interval=0.01, max_pending=1, max_backoff=0.05)
+        buffer.submit("a")
+        buffer.submit("b", timeout=1)
+
+        # Backpressure instead of loss while "a" cannot be written
+        with pytest.raises(BufferFullError):
+            buffer.submit("c")
+        assert buffer.flush(timeout=5)
+        assert writer.items == ["a", "b"]
+        assert buffer.stats()["dropped"] == 0
+
+    def test_close_drops_batch_that_still_fails(self):
+        """Test close gives up on a batch that cannot be written, after a final attempt."""
+        writer = RecordingWriter(failures=1000)
+        buffer = WriteBehindBuffer(writer, flush_interval=0.01, max_backoff=30)
+        buffer.submit("a")
+
+        assert not buffer.flush(timeout=0.1)
+        started = time.monotonic()
+        assert not buffer.close(timeout=2)
+        assert time.monotonic() - started < 5
+        assert writer.items == []
+        assert buffer.stats()["dropped"] == 1
+
+    def test_close_writes_pending_items(self):
+        """Test close writes everything queued and stops the writer thread."""
+        writer = RecordingWriter()
+        buffer = WriteBehindBuffer(writer, max_batch_size=10, flush_interval=30)
+        for i in range(25):
+            buffer.submit(i)
+
+        assert buffer.close(timeout=5)
+        assert writer.items == list(range(25))
+        assert buffer._thread is None
+
+
+class TestBulkInsert:
+    """Test LogEventRepository.bulk_create_log_events."""
+
+    def test_inserts_batch_in_one_transaction(self):
+        """Test all rows of a batch are inserted."""
+        from sqlalchemy import create_engine
+        from sqlalchemy.orm import sessionmaker
+        from app.common import db
+        from app.common.models import LogEventORM
+
+        engine = create_engine("sqlite://")
+        LogEventORM.__table__.create(engine)
+        events = [
+            {
+                "id": uuid.uuid4(), "timestamp": datetime.utcnow(), "stage": "creative",
+                "service": "creative_service", "level": "INFO", "message": f"event {i}",
+                "context": {"i": i}, "correlation_id": "corr-1", "success": True,
+            }
+            for i in range(3)
+        ]
+
+        with patch.object(db, "_engine", engine), patch.object(db, "_SessionLocal", sessionmaker(bind=engine)):
+            assert LogEventRepository.bulk_create_log_events(events) == 3
+            with db.get_db_session() as session:
+                # created_at uses a PostgreSQL server default, so read the other columns
+                rows = session.query(LogEventORM.id, LogEventORM.context).order_by(LogEventORM.message).all()
+
+        assert [row.id for row in rows] == [event["id"] for event in events]
+        assert rows[2].context == {"i": 2}
+
+    def test_noop_without_database(self):
+        """Test nothing is written when no database is configured."""
+        assert LogEventRepository.bulk_create_log_events([{"stage": "x"}]) == 0
+
+
+class TestBufferedAppendEvent:
+    """Test /append_event through the write-behind buffer."""
+
+    @pytest.fixture
+    def buffered_db(self):
+        writer = RecordingWriter()
+        with patch.object(main, "is_db_available", return_value=True), \
+             patch.object(LogEventRepository, "bulk_create_log_events", side_effect=writer), \
+             patch.object(LogEventRepository, "create_log_event") as mock_create:
+            yield writer, mock_create
+        main._close_event_writer()
+
+    def test_acknowledged_before_write_and_flushed_on_query(self, buffered_db):
+        """Test events get IDs immediately and are written in a batch before a consistent query."""
+        writer, mock_create = buffered_db
+        client = TestClient(main.app)
+        event_ids = []
+        for i in range(3):
+            response = client.post("/append_event", json={
+                "timestamp": datetime.utcnow().isoformat(),
+                "stage": "creative",
+                "service": "creative_service",
+                "success": True,
+                "metadata": {"message": f"event {i}", "correlation_id": "corr-1"},
+            })
+            event_ids.append(response.json()["event_id"])
+
+        assert client.get("/logs?consistent=true").json()["status"] == "success"
+        mock_create.assert_not_called()
+        assert [str(row["id"]) for row in writer.items] == event_ids
+        assert [row["message"] for row in writer.items] == ["event 0", "event 1", "event 2"]
+        assert writer.items[0]["correlation_id"] == "corr-1"
+        assert client.get("/health").json()["write_buffer"]["written"] == 3
+
+    def test_reads_do_not_flush_by_default(self, buffered_db, monkeypatch):
+        """Test plain reads leave batching to the writer thread."""
+        monkeypatch.setattr(main.settings, "LOGS_WRITE_FLUSH_INTERVAL", 30)
+        client = TestClient(main.app)
+        client.post("/append_event", json={
+            "timestamp": datetime.utcnow().isoformat(),
+            "stage": "creative",
+            "service": "creative_service",
+            "success": True,
+        })
+
+        with patch.object(WriteBehindBuffer, "flush") as mock_flush:
+            client.get("/logs")
+            client.get("/analytics")
+        mock_flush.assert_not_called()
+        assert main._get_event_writer().pending() == 1
+
+    def test_full_buffer_returns_error(self, buffered_db, monkeypatch):
+        """Test a full buffer rejects the event with LOG_BUFFER_FULL."""
+        monkeypatch.setattr(main.settings, "LOGS_WRITE_ENQUEUE_TIMEOUT", 0.01)
+        with patch.object(WriteBehindBuffer, "submit", side_effect=BufferFullError("full")):
+            response = TestClient(main.app).post("/append_event", json={
+                "timestamp": datetime.utcnow().isoformat(),
+                "stage": "creative",
+                "service": "creative_service",
+                "success": True,
+            })
+
+        assert response.json()["error_code"] == "LOG_BUFFER_FULL"
@@ -0,0 +1,159 @@
+"""
+Tests for the columnar product catalog index.
+"""
+
+import pytest
+from app.common.schemas import Product
+from app.services.product_service.catalog import ProductCatalog, ProductCatalogBuilder
+from app.services.product_service import loaders
+
+
+def _make_product(product_id: str, category: str, price: float) -> Product:
+    return Product(
+        product_id=product_id,
+        title=f"Product {product_id}",
+        description=f"Description for {product_id}",
+        price=price,
+        category=category,
+        metadata={}
+    )
+
+
+@pytest.fixture
+def catalog():
+    """Small catalog with overlapping category names."""
+    return ProductCatalog([
+        _make_product("P1", "electronics", 100.0),
+        _make_product("P2", "Home", 20.0),
+        _make_product("P3", "home decor", 50.0),
+        _make_product("P4", "electronics", 20.0),
+        _make_product("P5", "fashion", 300.0),
+    ])
+
+
+class TestProductCatalog:
+    """Test catalog columns and indexes."""
+
+    def test_columns(self, catalog):
+        """Test columns are aligned with the input order."""
+        assert len(catalog) == 5
+        assert catalog.product_ids == ["P1", "P2", "P3", "P4", "P5"]
+        assert catalog.prices == [100.0, 20.0, 50.0, 20.0, 300.0]
+        assert catalog.categories[1] == "home"
+        assert catalog.description_lengths[0] == len("Description for P1")
+
+    def test_exact_category(self, catalog):
+        """Test exact category lookup returns rows in catalog order."""
+        products = catalog.filter_by_category("Electronics")
+        assert [p.product_id for p in products] == ["P1", "P4"]
+
+    def test_partial_category_matches_legacy_filter(self, catalog):
+        """Test partial matching matches the legacy list comprehension."""
+        for category in ["home", "home decor", "decor", "elec", "nothing", "home decor and garden"]:
+            category_lower = category.lower()
+            expected = [
+                p.product_id for p in catalog.products
+                if category_lower in p.category.lower() or p.category.lower() in category_lower
+            ]
+            assert [p.product_id for p in catalog.filter_by_category(category)] == expected
+
+    def test_no_category_returns_all(self, catalog):
+        """Test empty category returns all products."""
+        assert len(catalog.filter_by_category(None)) == 5
+        assert len(catalog.filter_by_category("")) == 5
+
+    def test_price_range(self, catalog):
+        """Test price band lookup is inclusive and ordered by price."""
+        rows = catalog.rows_in_price_range(20.0, 100.0)
+        assert [catalog.product_ids[r] for r in rows] == ["P2", "P4", "P3", "P1"]
+        assert catalog.rows_in_price_range(min_price=200.0) == [4]
+        assert catalog.rows_in_price_range(max_price=10.0) == []
+
+
+class TestLoaderCatalog:
+    """Test loaders serve products from the catalog index."""
+
+    def test_csv_load_builds_catalog(self, tmp_path, monkeypatch):
+        """Test loading a CSV builds the index used by load_products."""
+        csv_path = tmp_path / "products.csv"
+        csv_path.write_text(
+            "product_id,title,description,price,category,image_url,metadata_json\n"
+            "C1,Cable,USB cable,9.99,accessories,,\n"
+            "C2,Phone,Smart phone,499.0,electronics,,{\"brand\": \"X\"}\n"
+        )
+        monkeypatch.setattr(loaders, "is_db_available", lambda: False)
+        loaders.reload_products()
+        try:
+            loaders.load_products_from_csv(str(csv_path))
+            catalog = loaders.get_catalog()
+            assert catalog.product_ids == ["C1", "C2"]
+
+            products = loaders.load_products(category="electronics")
+            assert [p.product_id for p in products] == ["C2"]
+            assert products[0].metadata == {"brand": "X"}
+        finally:
+            loaders.reload_products()
+
+    def test_default_products_when_csv_missing(self, monkeypatch):
+        """Test default sample catalog is used when no CSV is present."""
+        monkeypatch.setattr(loaders, "is_db_available", lambda: False)
+        loaders.reload_products()
+        products = loaders.load_products(category="accessories")
+        assert products
+        assert all(p.category == "accessories" for p in products)
+
+
+class TestStreamingCsvLoader:
+    """Test chunked CSV ingestion into the catalog."""
+
+    @pytest.fixture
+    def csv_path(self, tmp_path):
+        path = tmp_path / "products.csv"
+        path.write_text(
+            "product_id,name,description,price,category,image_url,metadata_json\n"
+            "A1,Lamp,Desk lamp,25.5,home,,{\"popularity\": 0.5}\n"
+            "A2,Broken,Bad price,not-a-number,home,,\n"
+            "A3,Chair,Office chair,120,furniture,https://example.com/c.jpg,\n"
+            "A4,Short row\n"
+            "A5,Rug,Wool rug,80,home,,{not json}\n"
+        )
+        return path
+
+    @pytest.mark.parametrize("chunk_size", [1, 2, 1000])
+    def test_rows_loaded_in_chunks(self, csv_path, chunk_size):
+        """Test valid rows are indexed regardless of chunk size."""
+        catalog = loaders.load_catalog_from_csv(str(csv_path), chunk_size=chunk_size)
+        assert catalog.product_ids == ["A1", "A3", "A5"]
+        assert catalog.titles == ["Lamp", "Chair", "Rug"]
+        assert catalog.prices == [25.5, 120.0, 80.0]
+
+    def test_metadata_decoded_on_materialization(self, csv_path):
+        """Test metadata JSON is kept raw until the product is returned."""
+        catalog = loaders.load_catalog_from_csv(str(csv_path))
+        assert catalog._products == {}
+
+        lamp = catalog.get_product(0)
+        assert lamp.metadata == {"popularity": 0.5}
+        assert catalog.get_product(0) is lamp
+        assert 1 not in catalog._products
+
+        # Invalid metadata no longer drops the row; it decodes to empty metadata
+        assert catalog.get_product(2).metadata == {}
+
+    def test_missing_file_returns_none(self, tmp_path):
+        """Test a missing CSV file yields no catalog."""
+        assert loaders.load_catalog_from_csv(str(tmp_path / "missing.csv")) is None
+
+    def test_builder_matches_product_constructor(self):
+        """Test incremental builder produces the same index as from products."""
+        products = [_make_product(f"P{i}", ["home", "toys"][i % 2], float(10 - i)) for i in range(6)]
+        builder = ProductCatalogBuilder()
+        for product in products:
+            builder.add_product(product)
+        built = builder.build()
+        direct = ProductCatalog(products)
+
+        assert built.product_ids == direct.product_ids
+        assert built.rows_for_category("toys") == direct.rows_for_category("toys")
+        assert built.rows_in_price_range(6.0, 8.0) == direct.rows_in_price_range(6.0, 8.0)
+        assert built.get_product(3) is products[3]
@@ -0,0 +1,84 @@
+"""
+Tests for hot catalog reload.
+"""
+
+import os
+import time
+import pytest
+from app.common.config import settings
+from app.services.product_service import loaders
+
+HEADER = "product_id,title,description,price,category,image_url,metadata_json\n"
+
+
+@pytest.fixture
+def feed(tmp_path, monkeypatch):
+    """Point the loader at a temporary product feed."""
+    csv_path = tmp_path / "products.csv"
+    csv_path.write_text(HEADER + "R1,Lamp,Desk lamp,20,home,,\n")
+    monkeypatch.setattr(settings, "PRODUCT_CSV_PATH", str(csv_path))
+    monkeypatch.setattr(loaders, "is_db_available", lambda: False)
+    loaders.reload_products()
+    yield csv_path
+    monkeypatch.undo()
+    loaders.reload_products()
+
+
+def _rewrite(csv_path, body: str) -> None:
+    """Rewrite the feed and move its mtime forward so the change is detected."""
+    csv_path.write_text(HEADER + body)
+    stat = csv_path.stat()
+    os.utime(csv_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+class TestCatalogReload:
+    """Test change detection and atomic swap."""
+
+    def test_unchanged_source_does_not_reload(self, feed):
+        """Test refresh is a no-op while the feed is unchanged."""
+        catalog = loaders.get_catalog()
+        assert loaders.refresh_catalog_if_changed() is False
+        assert loaders.get_catalog() is catalog
+
+    def test_changed_source_swaps_catalog(self, feed):
+        """Test a feed change builds and swaps in a new catalog version."""
+        old_catalog = loaders.get_catalog()
+        old_version = loaders.get_catalog_version()
+        held_products = old_catalog.filter_by_category("home")
+
+        _rewrite(feed, "R1,Lamp,Desk lamp,20,home,,\nR2,Rug,Wool rug,80,home,,\n")
+        assert loaders.refresh_catalog_if_changed() is True
+
+        new_catalog = loaders.get_catalog()
+        assert new_catalog is not old_catalog
+        assert loaders.get_catalog_version() > old_version
+        assert [p.product_id for p in loaders.load_products("home")] == ["R1", "R2"]
+
+        # Requests holding the old catalog keep a consistent view
+        assert [p.product_id for p in held_products] == ["R1"]
+        assert old_catalog.product_ids == ["R1"]
+
+    def test_reload_products_never_exposes_empty_catalog(self, feed):
+        """Test reload_products swaps instead of clearing."""
+        loaders.get_catalog()
+        loaders.reload_products()
+        assert loaders._catalog is not None
+        assert loaders.get_catalog().product_ids == ["R1"]
+
+
+class TestCatalogReloader:
+    """Test the background reloader thread."""
+
+    def test_reloader_picks_up_changes(self, feed):
+        """Test the reloader swaps the catalog after the feed changes."""
+        loaders.get_catalog()
+        reloader = loaders.CatalogReloader(interval_seconds=0.01)
+        reloader.start()
+        try:
+            _rewrite(feed, "R9,Chair,Office chair,120,home,,\n")
+            deadline = time.time() + 5
+            while time.time() < deadline and loaders.get_catalog().product_ids != ["R9"]:
+                time.sleep(0.01)
+            assert loaders.get_catalog().product_ids == ["R9"]
+        finally:
+            reloader.stop(timeout=5)
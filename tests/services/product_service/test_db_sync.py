@@ -0,0 +1,143 @@
+"""
+Tests for the resident product catalog synced from the database.
+"""
+
+import pytest
+from app.common import db
+from app.common.config import settings
+from app.services.product_service import loaders
+from app.services.product_service.db_sync import DbCatalogSync
+
+sqlalchemy = pytest.importorskip("sqlalchemy")
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+
+@pytest.fixture
+def database(monkeypatch):
+    """In-memory SQLite database with the products table, wired into app.common.db."""
+    engine = sqlalchemy.create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    db.ProductORM.__table__.create(engine)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    monkeypatch.setattr(db, "_engine", engine)
+    monkeypatch.setattr(db, "_SessionLocal", session_factory)
+    yield session_factory
+    engine.dispose()
+
+
+def _upsert(session_factory, product_id: str, updated_at: str, price: float = 10.0, category: str = "home") -> None:
+    with session_factory() as session:
+        session.merge(db.ProductORM(
+            product_id=product_id,
+            title=f"Product {product_id}",
+            description=f"Description for {product_id}",
+            price=price,
+            category=category,
+            updated_at=updated_at
+        ))
+        session.commit()
+
+
+def _delete(session_factory, product_id: str) -> None:
+    with session_factory() as session:
+        session.query(db.ProductORM).filter(db.ProductORM.product_id == product_id).delete()
+        session.commit()
+
+
+class TestDbCatalogSync:
+    """Test full and delta syncs."""
+
+    def test_full_sync_loads_all_rows(self, database):
+        """Test the initial sync loads every row and records the high-water mark."""
+        _upsert(database, "P2", "2024-01-02T00:00:00")
+        _upsert(database, "P1", "2024-01-01T00:00:00")
+
+        sync = DbCatalogSync(page_size=1)
+        catalog = sync.get_catalog()
+        assert sorted(catalog.product_ids) == ["P1", "P2"]
+        assert sync.high_water_mark == "2024-01-02T00:00:00"
+        assert catalog.source_signature == ("database", "2024-01-02T00:00:00")
+
+    def test_delta_applies_updates_and_inserts(self, database):
+        """Test a delta sync picks up changed and new rows only."""
+        _upsert(database, "P1", "2024-01-01T00:00:00", price=10.0)
+        _upsert(database, "P2", "2024-01-02T00:00:00", price=20.0)
+        sync = DbCatalogSync(page_size=1)
+        old_catalog = sync.get_catalog()
+
+        assert sync.sync() is False
+        assert sync.catalog is old_catalog
+
+        _upsert(database, "P1", "2024-01-03T00:00:00", price=15.0)
+        _upsert(database, "P3", "2024-01-03T00:00:00", price=30.0, category="toys")
+        assert sync.sync() is True
+
+        catalog = sync.catalog
+        assert catalog.version > old_catalog.version
+        prices = dict(zip(catalog.product_ids, catalog.prices))
+        assert prices == {"P1": 15.0, "P2": 20.0, "P3": 30.0}
+        assert [p.product_id for p in catalog.filter_by_category("toys")] == ["P3"]
+        assert sync.high_water_mark == "2024-01-03T00:00:00"
+
+        # The previous catalog is left untouched for readers still holding it
+        assert dict(zip(old_catalog.product_ids, old_catalog.prices)) == {"P1": 10.0, "P2": 20.0}
+
+    def test_rows_committed_at_high_water_mark_are_not_missed(self, database):
+        """Test rows sharing the high-water mark timestamp are picked up later."""
+        _upsert(database, "P1", "2024-01-01T00:00:00")
+        sync = DbCatalogSync(page_size=1)
+        sync.get_catalog()
+
+        _upsert(database, "P0", "2024-01-01T00:00:00")
+        assert sync.sync() is True
+        assert sorted(sync.catalog.product_ids) == ["P0", "P1"]
+
+    def test_full_sync_drops_deleted_rows(self, database):
+        """Test deletes are applied by a full sync."""
+        _upsert(database, "P1", "2024-01-01T00:00:00")
+        _upsert(database, "P2", "2024-01-01T00:00:00")
+        sync = DbCatalogSync()
+        sync.get_catalog()
+
+        _delete(database, "P2")
+        assert sync.full_sync() == 1
+        assert sync.catalog.product_ids == ["P1"]
+
+
+class TestLoaderDbResidentCatalog:
+    """Test loaders serve the resident DB catalog when enabled."""
+
+    @pytest.fixture
+    def resident(self, database, monkeypatch):
+        monkeypatch.setattr(settings, "PRODUCT_DB_RESIDENT_CATALOG", True)
+        monkeypatch.setattr(loaders, "is_db_available", lambda: True)
+        monkeypatch.setattr(loaders, "_db_sync", None)
+        yield database
+        monkeypatch.undo()
+        loaders.reload_products()
+
+    def test_load_products_and_refresh(self, resident):
+        """Test requests are served from the catalog and refresh applies deltas."""
+        _upsert(resident, "P1", "2024-01-01T00:00:00", category="home decor")
+        assert [p.product_id for p in loaders.load_products("home")] == ["P1"]
+        version = loaders.get_catalog_version()
+
+        _upsert(resident, "P2", "2024-01-02T00:00:00", category="home")
+        assert loaders.refresh_catalog_if_changed() is True
+        assert [p.product_id for p in loaders.load_products("home")] == ["P1", "P2"]
+        assert loaders.get_catalog_version() > version
+        assert loaders.refresh_catalog_if_changed() is False
+
+    def test_version_of_csv_fallback_when_db_is_empty(self, resident, tmp_path, monkeypatch):
+        """Test an empty DB catalog reports the version of the CSV catalog served instead."""
+        csv_path = tmp_path / "products.csv"
+        csv_path.write_text("product_id,title,description,price,category,image_url,metadata_json\nR1,Lamp,Desk lamp,20,home,,\n")
+        monkeypatch.setattr(settings, "PRODUCT_CSV_PATH", str(csv_path))
+        loaders.reload_products()
+        version = loaders.get_catalog_version()
+        assert version == loaders.get_catalog().version > 0
+
+        loaders.reload_products()
+        assert loaders.get_catalog_version() == loaders.get_catalog().version > version
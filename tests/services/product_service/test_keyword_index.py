@@ -0,0 +1,102 @@
+"""
+Tests for the description keyword inverted index.
+"""
+
+import pytest
+from app.common.schemas import Product, CampaignSpec
+from app.services.product_service import loaders
+from app.services.product_service.catalog import ProductCatalog
+from app.services.product_service.keyword_index import NUMPY_AVAILABLE, KeywordIndex
+from app.services.product_service.scoring import select_top_products, select_top_products_batch
+
+pytestmark = pytest.mark.skipif(not NUMPY_AVAILABLE, reason="NumPy not installed")
+
+DESCRIPTIONS = [
+    "Premium Wireless headphones for music lovers",
+    "Home decor lamp, perfect for the living room",
+    "",
+    None,
+    "HOME\tDECOR rug\nwith  double  spaces",
+    "Electronics gadget: smart-home hub",
+    "Café crème set ☕ for conversions",
+    "sales sale salesman",
+]
+
+
+@pytest.fixture
+def index():
+    return KeywordIndex(DESCRIPTIONS)
+
+
+class TestKeywordIndex:
+    """Test index lookups match substring scans exactly."""
+
+    @pytest.mark.parametrize("keyword", [
+        "home", "decor", "home decor", "me de", "sale", "sales", "smart-home", "home hub",
+        "café", "☕", "conversions", "wireless headphones", "o", "  ", "missing", "double  spaces",
+    ])
+    def test_matches_substring_scan(self, index, keyword):
+        """Test rows_matching equals the rows `keyword in desc.lower()` selects."""
+        expected = [row for row, d in enumerate(DESCRIPTIONS) if keyword in (d or "").lower()]
+        assert index.rows_matching(keyword).tolist() == expected
+
+    def test_lookups_are_memoized(self, index):
+        """Test repeated lookups return the cached rows."""
+        assert index.rows_matching("home") is index.rows_matching("home")
+
+    def test_matcher_aligns_with_candidate_rows(self):
+        """Test catalog matchers return matches in candidate order."""
+        catalog = ProductCatalog([
+            Product(product_id=f"P{i}", title="t", description=d or "", price=1.0,
+                    category=["home", "electronics"][i % 2])
+            for i, d in enumerate(DESCRIPTIONS)
+        ])
+        rows = catalog.rows_for_category("electronics")
+        matches = catalog.keyword_matcher(rows).matches("home")
+        assert matches.tolist() == [1.0 if "home" in (DESCRIPTIONS[r] or "").lower() else 0.0 for r in rows]
+
+
+class TestIndexedScoring:
+    """Test scoring with the keyword index matches scanning descriptions."""
+
+    @pytest.fixture
+    def catalog(self):
+        words = ["home", "decor", "electronics", "sale", "premium", "wireless", "conversions", "lamp"]
+        return ProductCatalog([
+            Product(
+                product_id=f"P{i}",
+                title=f"Product {i}",
+                description=" ".join(words[(i * k) % len(words)] for k in range(1, i % 5 + 2)).title(),
+                price=float(10 + (i * 37) % 400),
+                category=["home decor", "electronics", "home"][i % 3],
+            )
+            for i in range(90)
+        ])
+
+    @pytest.mark.parametrize("category", ["home", "electronics", "home decor", ""])
+    def test_indexed_selection_matches_scan(self, catalog, category):
+        """Test select_top_products results are unchanged by the keyword matcher."""
+        campaign = CampaignSpec(
+            user_query="Premium wireless home decor sale for conversions",
+            platform="meta",
+            budget=2000.0,
+            objective="conversions",
+            category=category,
+        )
+        rows = catalog.rows_for_category(category)
+        products = catalog.get_products(rows)
+        matcher = catalog.keyword_matcher(rows)
+
+        indexed = select_top_products(products, campaign, 20, keyword_matcher=matcher)
+        scanned = select_top_products(products, campaign, 20, vectorized=False)
+        assert [(p.product_id, s, d) for p, s, d in indexed] == [(p.product_id, s, d) for p, s, d in scanned]
+
+        batch = select_top_products_batch(products, [campaign, campaign], 20, keyword_matcher=matcher)
+        assert batch == [indexed, indexed]
+
+    def test_load_candidates_returns_matcher(self, monkeypatch):
+        """Test loaders pair catalog candidates with a matcher over the same rows."""
+        monkeypatch.setattr(loaders, "is_db_available", lambda: False)
+        products, matcher = loaders.load_candidates("electronics")
+        assert products
+        assert len(matcher) == len(products)
@@ -0,0 +1,130 @@
+"""
+Tests for memoized product selections.
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+from app.common.schemas import CampaignSpec
+from app.services.product_service import main
+from app.services.product_service.score_cache import ScoringCache, campaign_fingerprint
+
+
+def _spec(**overrides) -> CampaignSpec:
+    fields = {
+        "user_query": "Promote wireless headphones",
+        "platform": "meta",
+        "budget": 1000.0,
+        "objective": "conversions",
+        "category": "electronics",
+        "metadata": {},
+    }
+    fields.update(overrides)
+    return CampaignSpec(**fields)
+
+
+class TestCampaignFingerprint:
+    """Test which spec fields the fingerprint depends on."""
+
+    def test_ignores_fields_scoring_does_not_read(self):
+        """Test platform, time range, short words and word order do not change the fingerprint."""
+        base = campaign_fingerprint(_spec())
+        assert campaign_fingerprint(_spec(platform="tiktok")) == base
+        assert campaign_fingerprint(_spec(time_range={"start": "2024-01-01", "end": "2024-02-01"})) == base
+        assert campaign_fingerprint(_spec(user_query="wireless headphones promote for")) == base
+        assert campaign_fingerprint(_spec(metadata={"audience": "students"})) == base
+
+    def test_depends_on_scoring_inputs(self):
+        """Test fields that change scores change the fingerprint."""
+        base = campaign_fingerprint(_spec())
+        assert campaign_fingerprint(_spec(budget=1001.0)) != base
+        assert campaign_fingerprint(_spec(category="Electronics")) != base
+        assert campaign_fingerprint(_spec(objective="sales")) != base
+        assert campaign_fingerprint(_spec(user_query="Promote wireless wireless headphones")) != base
+        assert campaign_fingerprint(_spec(metadata={"brand": "AudioTech"})) != base
+
+
+class TestScoringCache:
+    """Test LRU, TTL and catalog-version invalidation."""
+
+    def test_hit_and_miss_metrics(self):
+        """Test a stored selection is returned for an equivalent spec."""
+        cache = ScoringCache(max_entries=4)
+        assert cache.get(_spec(), 10, 1) is None
+        cache.put(_spec(), 10, 1, "result")
+
+        assert cache.get(_spec(platform="google"), 10, 1) == "result"
+        assert cache.get(_spec(), 5, 1) is None
+        stats = cache.stats()
+        assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 2, 1)
+
+    def test_lru_eviction(self):
+        """Test the least recently used entry is evicted at capacity."""
+        cache = ScoringCache(max_entries=2)
+        for budget in (100.0, 200.0, 300.0):
+            cache.get(_spec(budget=budget), 10, 1)
+            cache.put(_spec(budget=budget), 10, 1, budget)
+            if budget == 200.0:
+                # Touch the first entry so the second becomes least recently used
+                assert cache.get(_spec(budget=100.0), 10, 1) == 100.0
+
+        assert cache.get(_spec(budget=200.0), 10, 1) is None
+        assert cache.get(_spec(budget=100.0), 10, 1) == 100.0
+        assert cache.get(_spec(budget=300.0), 10, 1) == 300.0
+        assert cache.stats()["evictions"] == 1
+
+    def test_ttl_expiry(self, monkeypatch):
+        """Test entries older than the TTL are misses."""
+        now = [1000.0]
+        monkeypatch.setattr("app.services.product_service.score_cache.time.monotonic", lambda: now[0])
+        cache = ScoringCache(ttl_seconds=60)
+        cache.get(_spec(), 10, 1)
+        cache.put(_spec(), 10, 1, "result")
+
+        now[0] += 30
+        assert cache.get(_spec(), 10, 1) == "result"
+        now[0] += 31
+        assert cache.get(_spec(), 10, 1) is None
+        assert cache.stats()["expirations"] == 1
+
+    def test_catalog_version_change_invalidates(self):
+        """Test a new catalog version drops entries and stale results are not stored."""
+        cache = ScoringCache()
+        cache.get(_spec(), 10, 1)
+        cache.put(_spec(), 10, 1, "v1")
+
+        assert cache.get(_spec(), 10, 2) is None
+        assert cache.stats()["entries"] == 0
+        assert cache.stats()["invalidations"] == 1
+
+        # A request that computed against version 1 finishes after the swap
+        cache.put(_spec(), 10, 1, "v1")
+        assert cache.get(_spec(), 10, 2) is None
+
+    def test_disabled(self):
+        """Test max_entries=0 disables caching."""
+        cache = ScoringCache(max_entries=0)
+        cache.put(_spec(), 10, 1, "result")
+        assert cache.get(_spec(), 10, 1) is None
+
+
+class TestSelectProductsCache:
+    """Test /select_products serves repeated campaign shapes from the cache."""
+
+    @pytest.fixture
+    def client(self, monkeypatch):
+        monkeypatch.setattr(main, "selection_cache", ScoringCache(max_entries=8))
+        monkeypatch.setattr(main, "is_db_available", lambda: False)
+        return TestClient(main.app)
+
+    def test_repeated_request_hits_cache(self, client):
+        """Test an equivalent request returns the same selection from the cache."""
+        request = {"campaign_spec": _spec().model_dump(), "limit": 3}
+        first = client.post("/select_products", json=request).json()
+
+        request["campaign_spec"]["platform"] = "tiktok"
+        second = client.post("/select_products", json=request).json()
+
+        assert first["status"] == "success"
+        assert second["debug"] == first["debug"]
+        assert main.selection_cache.stats()["hits"] == 1
+        assert client.get("/health").json()["selection_cache"]["hits"] == 1
@@ -5,8 +5,11 @@ Tests for product scoring logic.
 import pytest
 from app.common.schemas import Product, CampaignSpec
 from app.services.product_service.scoring import (
+    NUMPY_AVAILABLE,
     compute_product_score,
     score_products,
+    select_top_products,
+    select_top_products_batch,
     _compute_category_score,
     _compute_price_score,
     _compute_description_score
@@ -201,3 +204,140 @@ class TestScoreProducts:
         assert len(scored) == len(products)
         assert all(len(item) == 3 for item in scored)  # (product, score, debug_info)
 
+
+
+@pytest.mark.skipif(not NUMPY_AVAILABLE, reason="NumPy not installed")
+class TestVectorizedScoring:
+    """Test NumPy batch scoring matches per-product scoring."""
+    
+    @pytest.fixture
+    def mixed_products(self):
+        """Products covering every scoring branch."""
+        categories = ["electronics", "Electronics Gear", "elec", "home", "fashion", ""]
+        metadata_options = [
+            None,
+            {},
+            {"popularity": 0.8},
+            {"popularity": "not-a-number"},
+            {"brand": "AudioTech", "features": ["a", "b", "c", "d", "e"]},
+            {"popularity": 2.0, "brand": "tech", "features": "not-a-list"},
+        ]
+        descriptions = ["", "Short", "Premium electronics for conversions at home " * 3, "A" * 400]
+        prices = [1.0, 15.0, 30.0, 75.0, 150.0, 500.0, 5000.0]
+        
+        products = []
+        for i in range(60):
+            products.append(Product(
+                product_id=f"P{i}",
+                title=f"Product {i}",
+                description=descriptions[i % len(descriptions)],
+                price=prices[i % len(prices)],
+                category=categories[i % len(categories)],
+                metadata=metadata_options[i % len(metadata_options)]
+            ))
+        return products
+    
+    @pytest.mark.parametrize("budget", [0, 500, 999, 1000, 2000, 50000])
+    @pytest.mark.parametrize("campaign_metadata", [None, {"brand": "tech"}])
+    def test_vectorized_matches_per_product(self, mixed_products, budget, campaign_metadata):
+        """Test scores, breakdowns and order are identical in both paths."""
+        campaign = CampaignSpec(
+            user_query="Promote premium electronics at home",
+            platform="meta",
+            budget=budget,
+            objective="conversions",
+            category="electronics",
+            metadata=campaign_metadata
+        )
+        
+        vectorized = score_products(mixed_products, campaign, vectorized=True)
+        per_product = score_products(mixed_products, campaign, vectorized=False)
+        
+        assert [(p.product_id, s, d) for p, s, d in vectorized] == \
+            [(p.product_id, s, d) for p, s, d in per_product]
+        assert all(isinstance(s, float) for _, s, _ in vectorized)
+    
+    def test_vectorized_empty_list(self, sample_campaign_spec):
+        """Test empty product list returns empty result."""
+        assert score_products([], sample_campaign_spec, vectorized=True) == []
+
+
+class TestSelectTopProducts:
+    """Test top-K partial selection."""
+    
+    @pytest.fixture
+    def tied_products(self):
+        """Products with many equal scores to exercise tie-breaking."""
+        return [
+            Product(
+                product_id=f"P{i}",
+                title=f"Product {i}",
+                description="Electronics product" if i % 3 else "Plain",
+                price=[50.0, 75.0, 500.0][i % 3],
+                category=["electronics", "fashion"][i % 2],
+            )
+            for i in range(30)
+        ]
+    
+    @pytest.mark.parametrize("vectorized", [
+        False,
+        pytest.param(True, marks=pytest.mark.skipif(not NUMPY_AVAILABLE, reason="NumPy not installed")),
+    ])
+    @pytest.mark.parametrize("limit", [1, 3, 7, 10, 30, 100])
+    def test_matches_full_sort(self, tied_products, sample_campaign_spec, vectorized, limit):
+        """Test top-K result equals the head of the fully sorted list."""
+        expected = score_products(tied_products, sample_campaign_spec, vectorized=False)[:limit]
+        selected = select_top_products(tied_products, sample_campaign_spec, limit, vectorized=vectorized)
+        
+        assert [(p.product_id, s, d) for p, s, d in selected] == \
+            [(p.product_id, s, d) for p, s, d in expected]
+    
+    def test_non_positive_limit(self, tied_products, sample_campaign_spec):
+        """Test non-positive limit selects nothing."""
+        assert select_top_products(tied_products, sample_campaign_spec, 0) == []
+
+
+class TestSelectTopProductsBatch:
+    """Test batch selection over a shared candidate set."""
+    
+    @pytest.fixture
+    def campaigns(self):
+        """Campaigns sharing and differing in category, keywords, budget and brand."""
+        return [
+            CampaignSpec(user_query=query, platform="meta", budget=budget, objective=objective,
+                         category=category, metadata=metadata)
+            for query, budget, objective, category, metadata in [
+                ("Promote electronics", 2000.0, "conversions", "electronics", None),
+                ("Promote electronics", 500.0, "conversions", "electronics", None),
+                ("Fashion product sale", 2000.0, "sales", "fashion", {"brand": "tech"}),
+                ("Promote electronics", 2000.0, "conversions", "electronics", None),
+                ("", 0.0, "traffic", "", {}),
+            ]
+        ]
+    
+    @pytest.mark.parametrize("vectorized", [
+        False,
+        pytest.param(True, marks=pytest.mark.skipif(not NUMPY_AVAILABLE, reason="NumPy not installed")),
+    ])
+    @pytest.mark.parametrize("limit", [0, 1, 7, 100])
+    def test_matches_single_selection(self, campaigns, vectorized, limit):
+        """Test each batch result equals selecting for that campaign alone."""
+        products = [
+            Product(
+                product_id=f"P{i}",
+                title=f"Product {i}",
+                description=["Electronics product for sales", "Plain", "Fashion from tech"][i % 3],
+                price=[5.0, 50.0, 75.0, 500.0][i % 4],
+                category=["electronics", "fashion", "home"][i % 3],
+                metadata=[None, {"brand": "TechWear", "popularity": 0.4}][i % 2]
+            )
+            for i in range(40)
+        ]
+        
+        batch = select_top_products_batch(products, campaigns, limit, vectorized=vectorized)
+        
+        assert len(batch) == len(campaigns)
+        for campaign, selected in zip(campaigns, batch):
+            expected = select_top_products(products, campaign, limit, vectorized=False)
+            assert [(p.product_id, s, d) for p, s, d in selected] == \
+                [(p.product_id, s, d) for p, s, d in expected]
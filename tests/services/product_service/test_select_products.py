@@ -4,7 +4,9 @@ Integration tests for product selection endpoint.
 
 import pytest
 from fastapi.testclient import TestClient
+from app.services.product_service import main
 from app.services.product_service.main import app
+from app.services.product_service.score_cache import ScoringCache
 from app.common.schemas import CampaignSpec, Product
 
 client = TestClient(app)
@@ -230,3 +232,50 @@ class TestSelectProductsEndpoint:
         assert data["status"] == "success"
         assert len(data["products"]) > 0
 
+
+class TestSelectProductsBatchEndpoint:
+    """Test select_products/batch endpoint."""
+    
+    def test_batch_matches_single_requests(self, valid_campaign_spec, monkeypatch):
+        """Test each batch result equals the single-spec response."""
+        # Compute both sides instead of serving one from the selection cache
+        monkeypatch.setattr(main, "selection_cache", ScoringCache(max_entries=0))
+        specs = [
+            valid_campaign_spec.model_dump(),
+            {**valid_campaign_spec.model_dump(), "budget": 300.0},
+            {**valid_campaign_spec.model_dump(), "category": "accessories"},
+        ]
+        
+        response = client.post("/select_products/batch", json={"campaign_specs": specs, "limit": 3})
+        assert response.status_code == 200
+        data = response.json()
+        
+        assert data["status"] == "success"
+        assert len(data["results"]) == len(specs)
+        for spec, result in zip(specs, data["results"]):
+            single = client.post("/select_products", json={"campaign_spec": spec, "limit": 3}).json()
+            assert result == single
+    
+    def test_batch_reports_per_spec_errors(self, valid_campaign_spec):
+        """Test an invalid spec fails only its own slot."""
+        specs = [
+            {**valid_campaign_spec.model_dump(), "budget": 0},
+            valid_campaign_spec.model_dump(),
+        ]
+        
+        data = client.post("/select_products/batch", json={"campaign_specs": specs}).json()
+        
+        assert data["status"] == "success"
+        assert data["results"][0]["error_code"] == "INVALID_BUDGET"
+        assert data["results"][1]["status"] == "success"
+    
+    def test_batch_invalid_requests(self, valid_campaign_spec):
+        """Test empty batches and non-positive limits are rejected."""
+        empty = client.post("/select_products/batch", json={"campaign_specs": []}).json()
+        assert empty["error_code"] == "MISSING_REQUIRED_FIELDS"
+        
+        invalid_limit = client.post(
+            "/select_products/batch",
+            json={"campaign_specs": [valid_campaign_spec.model_dump()], "limit": -1}
+        ).json()
+        assert invalid_limit["error_code"] == "INVALID_LIMIT"
@@ -0,0 +1,126 @@
+"""
+Tests for memory-mapped product catalog snapshots.
+"""
+
+import os
+import pytest
+from app.common.schemas import Product
+from app.services.product_service import loaders
+from app.services.product_service.catalog import ProductCatalog
+from app.services.product_service.snapshot import (
+    SnapshotError,
+    load_snapshot,
+    write_snapshot,
+    compile_snapshot_from_csv,
+)
+
+
+@pytest.fixture
+def catalog():
+    """Catalog with nullable fields, unicode text and case-variant categories."""
+    return ProductCatalog([
+        Product(product_id="S1", title="Kettle", description="Electric kettle", price=30.0,
+                category="Home", image_url=None, metadata={"brand": "Boil"}),
+        Product(product_id="S2", title="Café mug", description="Ceramic mug ☕", price=8.5,
+                category="home", image_url="https://example.com/mug.jpg", metadata=None),
+        Product(product_id="S3", title="Headphones", description="", price=199.0,
+                category="electronics", image_url=None, metadata={}),
+        Product(product_id="S4", title="Lamp", description="Floor lamp", price=30.0,
+                category="home decor", image_url=None, metadata=None),
+    ])
+
+
+class TestSnapshotRoundTrip:
+    """Test writing and mapping snapshots."""
+
+    def test_columns_and_indexes_round_trip(self, catalog, tmp_path):
+        """Test mapped catalog matches the source catalog."""
+        path = write_snapshot(catalog, tmp_path / "products.snap")
+        mapped = load_snapshot(path)
+
+        assert len(mapped) == len(catalog)
+        for row in range(len(catalog)):
+            assert mapped.product_ids[row] == catalog.product_ids[row]
+            assert mapped.titles[row] == catalog.titles[row]
+            assert mapped.descriptions[row] == catalog.descriptions[row]
+            assert mapped.prices[row] == catalog.prices[row]
+            assert mapped.categories[row] == catalog.categories[row]
+            assert mapped.description_lengths[row] == catalog.description_lengths[row]
+            assert mapped.image_urls[row] == catalog.image_urls[row]
+
+        for category in ["home", "HOME", "decor", "electronics", "toys", None]:
+            assert mapped.rows_for_category(category) == catalog.rows_for_category(category)
+        assert mapped.rows_in_price_range(8.5, 30.0) == catalog.rows_in_price_range(8.5, 30.0)
+
+    def test_metadata_round_trips_from_products(self, catalog, tmp_path):
+        """Test metadata of a catalog built from Product objects survives write/load."""
+        mapped = load_snapshot(write_snapshot(catalog, tmp_path / "products.snap"))
+
+        assert mapped.get_product(0).metadata == {"brand": "Boil"}
+        assert mapped.get_product(1).metadata == {}
+        assert [p.metadata or {} for p in mapped.products] == [p.metadata or {} for p in catalog.products]
+
+    def test_products_materialize_from_snapshot(self, tmp_path):
+        """Test products (including metadata) are rebuilt from the mapped heap."""
+        csv_path = tmp_path / "products.csv"
+        csv_path.write_text(
+            "product_id,title,description,price,category,image_url,metadata_json\n"
+            "M1,Mouse,Wireless mouse,25,electronics,,{\"dpi\": 1600}\n"
+        )
+        path = compile_snapshot_from_csv(str(csv_path), tmp_path / "products.snap")
+        product = load_snapshot(path).get_product(0)
+
+        assert product.product_id == "M1"
+        assert product.price == 25.0
+        assert product.image_url == ""
+        assert product.metadata == {"dpi": 1600}
+
+    def test_empty_catalog(self, tmp_path):
+        """Test an empty catalog round-trips."""
+        mapped = load_snapshot(write_snapshot(ProductCatalog([]), tmp_path / "empty.snap"))
+        assert len(mapped) == 0
+        assert mapped.rows_for_category("home") == []
+
+    def test_corrupt_snapshot_raises(self, tmp_path):
+        """Test invalid files raise SnapshotError."""
+        path = tmp_path / "bad.snap"
+        path.write_bytes(b"not a snapshot at all")
+        with pytest.raises(SnapshotError):
+            load_snapshot(path)
+        with pytest.raises(SnapshotError):
+            load_snapshot(tmp_path / "missing.snap")
+
+
+class TestLoaderSnapshot:
+    """Test loaders prefer a fresh snapshot over the CSV file."""
+
+    @pytest.fixture
+    def csv_path(self, tmp_path):
+        path = tmp_path / "products.csv"
+        path.write_text(
+            "product_id,title,description,price,category,image_url,metadata_json\n"
+            "C1,Cable,USB cable,9.99,accessories,,\n"
+        )
+        return path
+
+    def test_fresh_snapshot_is_used(self, csv_path, catalog):
+        """Test a snapshot newer than the CSV file is mapped instead of parsing the CSV."""
+        snapshot_path = write_snapshot(catalog, csv_path.with_suffix(".snap"))
+        os.utime(csv_path, (1, 1))
+        loaders.reload_products()
+        try:
+            assert loaders.load_products_from_csv(str(csv_path))[0].product_id == "S1"
+            assert loaders.get_catalog() is not None
+            assert snapshot_path.exists()
+        finally:
+            loaders.reload_products()
+
+    def test_stale_snapshot_is_ignored(self, csv_path, catalog):
+        """Test a snapshot older than the CSV file falls back to the CSV."""
+        snapshot_path = write_snapshot(catalog, csv_path.with_suffix(".snap"))
+        os.utime(snapshot_path, (1, 1))
+        loaders.reload_products()
+        try:
+            assert [p.product_id for p in loaders.load_products_from_csv(str(csv_path))] == ["C1"]
+        finally:
+            loaders.reload_products()